@@ -0,0 +1,145 @@
+"""
+In-process stand-in for the LM Studio server used by the benchmark suite.
+
+The real SDK talks to LM Studio over its own websocket protocol, so instead of
+emulating that wire format the fake replaces the `lms.Client` the LLM layer
+connects through. Everything above the SDK boundary (LLM_Manager, its retry and
+scheduling logic, worker threads, the Discord bot) runs unmodified, while the
+fake model sleeps for a configurable prefill time (proportional to the prompt
+size) and streams tokens at a configurable rate.
+"""
+import threading
+import time
+from types import SimpleNamespace
+
+
+class FakeServerConfig:
+    """
+    Latency model of the fake server.
+
+    Args:
+        base_latency (float): Fixed overhead per prediction, in seconds.
+        prefill_tokens_per_second (float): Prompt processing speed.
+        tokens_per_second (float): Generation speed.
+        image_tokens (int): Prompt tokens charged per attached image.
+        response_tokens (int): Tokens generated per response.
+        upload_latency (float): Time for prepare_image, in seconds.
+        parallel_slots (int): Predictions the fake server runs at once.
+    """
+    def __init__(self, base_latency=0.005, prefill_tokens_per_second=20000.0, tokens_per_second=400.0,
+                 image_tokens=576, response_tokens=60, upload_latency=0.002, parallel_slots=1):
+        self.base_latency = base_latency
+        self.prefill_tokens_per_second = prefill_tokens_per_second
+        self.tokens_per_second = tokens_per_second
+        self.image_tokens = image_tokens
+        self.response_tokens = response_tokens
+        self.upload_latency = upload_latency
+        self.parallel_slots = parallel_slots
+
+
+def _count_prompt_tokens(chat, image_tokens):
+    """Roughly counts the prompt tokens of an lms.Chat (4 characters per token)."""
+    tokens = 0
+    for message in chat._messages:
+        for part in message.content:
+            if hasattr(part, "file_type"):
+                tokens += image_tokens
+            else:
+                tokens += max(1, len(getattr(part, "text", "") or "") // 4)
+    return tokens
+
+
+class FakePredictionStream:
+    """Mimics lms.PredictionStream: iterate for fragments, then call result()."""
+    def __init__(self, model, chat):
+        self.model = model
+        self.chat = chat
+        self._result = None
+        self._cancelled = False
+
+    def __iter__(self):
+        config = self.model.config
+        prompt_tokens = _count_prompt_tokens(self.chat, config.image_tokens)
+        with self.model.server_slots:
+            time.sleep(config.base_latency + prompt_tokens / config.prefill_tokens_per_second)
+            words = []
+            for index in range(config.response_tokens):
+                if self._cancelled:
+                    break
+                time.sleep(1.0 / config.tokens_per_second)
+                word = f"palavra{index} "
+                words.append(word)
+                yield SimpleNamespace(content=word)
+        self.model.stats["predictions"] += 1
+        self.model.stats["prompt_tokens"] += prompt_tokens
+        self._result = SimpleNamespace(
+            content="".join(words).strip(),
+            stats=SimpleNamespace(prompt_tokens_count=prompt_tokens, predicted_tokens_count=config.response_tokens)
+        )
+
+    def result(self):
+        return self._result
+
+    def cancel(self):
+        self._cancelled = True
+
+
+class FakeModel:
+    """Mimics the lms LLM handle returned by client.llm.model()."""
+    def __init__(self, identifier, config, server_slots):
+        self.identifier = identifier
+        self.config = config
+        self.server_slots = server_slots
+        self.stats = {"predictions": 0, "prompt_tokens": 0}
+
+    def respond_stream(self, chat, **kwargs):
+        return FakePredictionStream(self, chat)
+
+    def respond(self, chat, **kwargs):
+        stream = self.respond_stream(chat, **kwargs)
+        for _ in stream:
+            pass
+        return stream.result()
+
+    def get_context_length(self):
+        return 8192
+
+
+class FakeClient:
+    """Mimics lms.Client. Construct through FakeLMStudio.client_factory()."""
+    def __init__(self, server, api_host=None):
+        self.server = server
+        self.api_host = api_host
+        self.llm = SimpleNamespace(model=self._model)
+
+    def _model(self, identifier=None, **kwargs):
+        return self.server.model(identifier)
+
+    def prepare_image(self, src, name=None):
+        time.sleep(self.server.config.upload_latency)
+        identifier = str(src) if isinstance(src, str) else name or "image.png"
+        return {"type": "file", "name": name or "image.png", "identifier": identifier, "sizeBytes": 0, "fileType": "image"}
+
+    def close(self):
+        pass
+
+
+class FakeLMStudio:
+    """
+    A fake LM Studio "server" shared by every client created from it.
+    """
+    def __init__(self, config=None):
+        self.config = config or FakeServerConfig()
+        self.server_slots = threading.BoundedSemaphore(self.config.parallel_slots)
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def model(self, identifier):
+        with self._lock:
+            if identifier not in self._models:
+                self._models[identifier] = FakeModel(identifier, self.config, self.server_slots)
+            return self._models[identifier]
+
+    def client_factory(self):
+        """Returns a callable to patch over lms.Client."""
+        return lambda api_host=None, **kwargs: FakeClient(self, api_host)
@@ -0,0 +1,371 @@
+"""
+End-to-end latency and throughput benchmarks for Local Vision.
+
+Usage:
+    python benchmarks/run_benchmarks.py -o benchmarks/results/current.json
+    python benchmarks/run_benchmarks.py --quick --compare benchmarks/results/baseline.json
+
+Model calls are served by the in-process fake LM Studio in fake_lmstudio.py, with
+configurable latency and token rate, so results measure the application's own
+overhead and scaling rather than a particular GPU. Results are written as JSON;
+--compare prints the relative change of every metric against a previous run.
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import queue
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.fake_lmstudio import FakeLMStudio, FakeServerConfig
+from local_vision.data.database_manager import DatabaseManager
+from local_vision.data.history_manager import HistoryManager
+from local_vision.logic.llm_manager import LLM_Manager
+
+
+def summarize(samples):
+    """Returns latency statistics (in milliseconds) for a list of durations in seconds."""
+    ordered = sorted(samples)
+
+    def percentile(p):
+        index = min(len(ordered) - 1, max(0, round(p / 100 * (len(ordered) - 1))))
+        return ordered[index] * 1000
+
+    return {
+        "count": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": percentile(50),
+        "p95_ms": percentile(95),
+        "p99_ms": percentile(99),
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def make_image(path, size, fmt):
+    from PIL import Image
+    image = Image.effect_noise(size, 64).convert("RGB")
+    image.save(path, fmt)
+
+
+def make_llm_manager(fake, max_concurrent_requests=None):
+    with patch("local_vision.logic.llm_manager.lms.Client", fake.client_factory()):
+        return LLM_Manager(model_identifier="bench-model", max_concurrent_requests=max_concurrent_requests)
+
+
+def bench_description_latency(fake, image_path, runs):
+    """Time from get_image_description() to the description arriving on the result queue."""
+    llm_manager = make_llm_manager(fake)
+    samples = []
+    for _ in range(runs):
+        result_queue = queue.Queue()
+        start = time.perf_counter()
+        llm_manager.get_image_description(image_path, result_queue)
+        response = result_queue.get()
+        samples.append(time.perf_counter() - start)
+        assert response["type"] == "description", response
+
+    first_fragment = []
+    for _ in range(runs):
+        result_queue = queue.Queue()
+        start = time.perf_counter()
+        llm_manager.get_image_description(image_path, result_queue, stream=True)
+        first = None
+        while True:
+            response = result_queue.get()
+            if response["type"] == "fragment" and first is None:
+                first = time.perf_counter() - start
+            if response["type"] in ("description", "error"):
+                break
+        first_fragment.append(first)
+
+    return {"end_to_end": summarize(samples), "time_to_first_fragment": summarize(first_fragment)}
+
+
+def bench_chat_latency(fake, image_path, lengths, runs):
+    """get_text_response latency as the conversation grows."""
+    llm_manager = make_llm_manager(fake)
+    results = {}
+    for length in lengths:
+        history = []
+        for index in range(length):
+            if index % 10 == 0:
+                history.append({"actor": "user", "type": "image", "content": None, "image_path": image_path})
+            elif index % 2:
+                history.append({"actor": "user", "type": "text", "content": f"Pergunta {index} sobre a imagem?", "image_path": None})
+            else:
+                history.append({"actor": "assistant", "type": "text_response", "content": "Resposta detalhada " * 8, "image_path": None})
+
+        samples = []
+        for _ in range(runs):
+            result_queue = queue.Queue()
+            start = time.perf_counter()
+            llm_manager.get_text_response("E agora?", history, result_queue)
+            response = result_queue.get()
+            samples.append(time.perf_counter() - start)
+            assert response["type"] == "text_response", response
+        results[str(length)] = summarize(samples)
+    return results
+
+
+def bench_history(sizes, batch):
+    """HistoryManager insert and read throughput as the database grows."""
+    results = {}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_manager = DatabaseManager(os.path.join(temp_dir, "bench.db"))
+        db_manager.connect()
+        db_manager.create_tables()
+        history_manager = HistoryManager(db_manager)
+
+        filler = history_manager.create_conversation("filler")
+        probe = history_manager.create_conversation("probe")
+        for index in range(200):
+            history_manager.save_interaction(probe, "user" if index % 2 else "system", "text", content=f"mensagem {index} " * 10)
+
+        current = 0
+        for size in sorted(sizes):
+            rows = [
+                (filler, datetime.datetime.now().isoformat(), "user", "text", f"linha {i}", None)
+                for i in range(current, size)
+            ]
+            db_manager.conn.executemany(
+                "INSERT INTO interactions (conversation_id, timestamp, actor, type, content, image_path) VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            db_manager.conn.commit()
+            current = size
+
+            start = time.perf_counter()
+            for index in range(batch):
+                history_manager.save_interaction(filler, "user", "text", content=f"nova {index}")
+            insert_elapsed = time.perf_counter() - start
+            current += batch
+
+            read_samples = []
+            for _ in range(20):
+                start = time.perf_counter()
+                history_manager.get_conversation_history(probe, as_dict=True)
+                read_samples.append(time.perf_counter() - start)
+
+            results[str(size)] = {
+                "inserts_per_second": batch / insert_elapsed,
+                "read_200_rows": summarize(read_samples),
+            }
+        db_manager.conn.close()
+    return results
+
+
+def bench_thumbnails(temp_dir, runs):
+    """ImageProcessor.process_and_resize decode+thumbnail time per source size."""
+    try:
+        from local_vision.logic.image_processor import ImageProcessor
+    except Exception as e:
+        return {"skipped": f"ImageProcessor unavailable: {e}"}
+
+    results = {}
+    for label, size, fmt, ext in [
+        ("png_800x600", (800, 600), "PNG", "png"),
+        ("jpeg_1920x1080", (1920, 1080), "JPEG", "jpg"),
+        ("jpeg_4000x3000", (4000, 3000), "JPEG", "jpg"),
+    ]:
+        path = os.path.join(temp_dir, f"{label}.{ext}")
+        make_image(path, size, fmt)
+        samples = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            assert ImageProcessor.process_and_resize(path) is not None
+            samples.append(time.perf_counter() - start)
+        results[label] = summarize(samples)
+    return results
+
+
+def bench_markdown(runs):
+    """strip_markdown and streaming stripper throughput on a typical formatted response."""
+    from local_vision.logic.text_normalizer import MarkdownStreamStripper, strip_markdown
+
+    response = (
+        "## Descrição\nA imagem mostra um **gato laranja** deitado sobre um *sofá* azul, "
+        "perto de uma janela com `luz_natural`. Veja [referência](https://example.com/gato_laranja).\n"
+        "- Pelagem: curta\n- Expressão: relaxada\n\n```\nmetadados\n```\n"
+    ) * 20
+    fragments = [response[i:i + 4] for i in range(0, len(response), 4)]
+
+    one_shot = []
+    streamed = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        strip_markdown(response)
+        one_shot.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        stripper = MarkdownStreamStripper()
+        for fragment in fragments:
+            stripper.feed(fragment)
+        stripper.flush()
+        streamed.append(time.perf_counter() - start)
+    return {"chars": len(response), "one_shot": summarize(one_shot), "streamed_4_char_fragments": summarize(streamed)}
+
+
+def bench_discord(fake, image_path, messages, concurrency):
+    """Messages per second the Discord bot handles with concurrent image messages."""
+    from local_vision.logic.discord_bot import DiscordBot
+
+    with open(image_path, "rb") as f:
+        image_bytes = f.read()
+
+    async def save(target):
+        with open(target, "wb") as f:
+            f.write(image_bytes)
+
+    class FakeDiscordMessage:
+        def __init__(self, attachments=()):
+            self.author = "user"
+            self.attachments = list(attachments)
+
+        async def reply(self, content):
+            return FakeDiscordMessage()
+
+        async def edit(self, content):
+            return None
+
+        async def delete(self):
+            return None
+
+    def make_message():
+        return FakeDiscordMessage([SimpleNamespace(content_type="image/png", save=save)])
+
+    results = {}
+    for mode in ("per_attachment", "streaming"):
+        llm_manager = make_llm_manager(fake, concurrency)
+        bot = DiscordBot("bench-token", llm_manager, streaming_replies=(mode == "streaming"))
+        bot.loop.set_default_executor(ThreadPoolExecutor(max_workers=concurrency * 2 + 4))
+
+        async def run():
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def one():
+                async with semaphore:
+                    start = time.perf_counter()
+                    await bot.on_message(make_message())
+                    return time.perf_counter() - start
+
+            start = time.perf_counter()
+            samples = await asyncio.gather(*(one() for _ in range(messages)))
+            return time.perf_counter() - start, samples
+
+        elapsed, samples = bot.loop.run_until_complete(run())
+        bot.loop.close()
+        results[mode] = {"messages_per_second": messages / elapsed, "per_message": summarize(samples)}
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)), stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def flatten(data, prefix=""):
+    """Flattens nested result dicts into {"a.b.c": number}."""
+    flat = {}
+    for key, value in data.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(baseline, current):
+    """Returns one line per metric with its relative change against the baseline."""
+    old = flatten(baseline["results"])
+    new = flatten(current["results"])
+    lines = []
+    for name in sorted(set(old) & set(new)):
+        if old[name]:
+            change = (new[name] - old[name]) / old[name] * 100
+            lines.append(f"{name:70s} {old[name]:12.3f} -> {new[name]:12.3f} ({change:+.1f}%)")
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the Local Vision benchmark suite.")
+    parser.add_argument("-o", "--output", help="Write JSON results to this file (default: stdout).")
+    parser.add_argument("--compare", help="Previous results JSON to diff against.")
+    parser.add_argument("--quick", action="store_true", help="Fewer iterations, for smoke runs.")
+    parser.add_argument("--base-latency", type=float, default=0.005, help="Fake server overhead per prediction (s).")
+    parser.add_argument("--tokens-per-second", type=float, default=400.0, help="Fake server generation speed.")
+    parser.add_argument("--prefill-tokens-per-second", type=float, default=20000.0, help="Fake server prompt speed.")
+    parser.add_argument("--response-tokens", type=int, default=60, help="Tokens generated per fake response.")
+    args = parser.parse_args(argv)
+
+    runs = 5 if args.quick else 20
+    config = FakeServerConfig(
+        base_latency=args.base_latency,
+        prefill_tokens_per_second=args.prefill_tokens_per_second,
+        tokens_per_second=args.tokens_per_second,
+        response_tokens=args.response_tokens,
+    )
+    fake = FakeLMStudio(config)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        image_path = os.path.join(temp_dir, "bench.png")
+        make_image(image_path, (640, 480), "PNG")
+
+        results = {
+            "description_latency": bench_description_latency(fake, image_path, runs),
+            "chat_latency_by_length": bench_chat_latency(
+                fake, image_path, [0, 10, 50] if args.quick else [0, 10, 50, 200], runs
+            ),
+            "history_throughput_by_db_size": bench_history(
+                [1000, 10000] if args.quick else [1000, 10000, 100000], 200 if args.quick else 1000
+            ),
+            "thumbnail_decode": bench_thumbnails(temp_dir, runs),
+            "markdown_strip": bench_markdown(runs * 5),
+            "discord_throughput": bench_discord(fake, image_path, 10 if args.quick else 40, 4),
+        }
+
+    report = {
+        "meta": {
+            "timestamp": datetime.datetime.now().isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "quick": args.quick,
+            "fake_server": vars(config),
+        },
+        "results": results,
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        sys.stderr.write("\n".join(compare(baseline, report)) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,420 @@
+"""
+Online backup, export and import of the history database.
+
+Usage:
+    python -m local_vision.backup backup backups/local_vision.db
+    python -m local_vision.backup export history.jsonl.gz
+    python -m local_vision.backup import history.jsonl.gz --images-dir imported_images
+
+All three are safe while the application is running. The backup copies the
+live database a few pages at a time with the SQLite backup API. The export
+reads from such a copy instead of the live file and streams every conversation
+to gzip-compressed JSON Lines, with its images bundled once per content hash;
+the import adds them back as new conversations in batches. Neither holds more
+than one batch of rows (or one image) in memory.
+This module must stay free of tkinter/customtkinter imports.
+"""
+import argparse
+import base64
+import configparser
+import datetime
+import gzip
+import hashlib
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+import msgspec
+
+from local_vision.data.database_manager import DatabaseManager
+from local_vision.logging_setup import configure_logging_from_config
+from local_vision.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMAT = "local_vision-history"
+EXPORT_VERSION = 1
+
+
+class OnlineBackup:
+    """
+    Copies the live database with the SQLite online backup API.
+
+    Each step copies `pages` pages under the DatabaseManager lock and the copy
+    sleeps between steps with the lock released, so the connection is only held
+    for a moment at a time and the UI keeps writing. The backup runs on the
+    connection the application already uses: writes made through it during the
+    backup are copied too instead of restarting it.
+    """
+    def __init__(self, db_manager, pages=256, sleep=0.005):
+        """
+        Initializes the OnlineBackup.
+
+        Args:
+            db_manager (DatabaseManager): The database to copy.
+            pages (int): Pages copied per step.
+            sleep (float): Seconds between steps.
+        """
+        self.db_manager = db_manager
+        self.pages = pages
+        self.sleep = sleep
+        self.remaining = None
+        self.total = None
+
+    def _progress(self, status, remaining, total):
+        self.remaining = remaining
+        self.total = total
+
+    def run(self, target_path):
+        """
+        Writes a consistent copy of the database to target_path, on the calling thread.
+
+        The copy is written next to the target and renamed once complete, so
+        target_path never holds a partial backup.
+
+        Returns:
+            str: target_path.
+        """
+        source = self.db_manager.conn or self.db_manager.connect()
+        os.makedirs(os.path.dirname(os.path.abspath(target_path)), exist_ok=True)
+        partial = target_path + ".partial"
+        _remove(partial)
+        target = sqlite3.connect(partial)
+        lock = self.db_manager._lock
+
+        def progress(status, remaining, total):
+            self._progress(status, remaining, total)
+            if remaining:
+                # Steps run holding the lock; the other threads use the connection in between.
+                lock.release()
+                try:
+                    time.sleep(self.sleep)
+                finally:
+                    lock.acquire()
+
+        start = time.perf_counter()
+        try:
+            with tracer.span("db.backup"), lock:
+                source.backup(target, pages=self.pages, progress=progress, sleep=0)
+        except BaseException:
+            target.close()
+            _remove(partial)
+            raise
+        target.close()
+        os.replace(partial, target_path)
+        logger.info(
+            f"Backed up {self.db_manager.db_file} to {target_path} "
+            f"({self.total} pages in {time.perf_counter() - start:.1f}s)"
+        )
+        return target_path
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _rows(connection, query, params=(), batch_size=500):
+    """Yields the rows of a query, fetching batch_size at a time."""
+    cursor = connection.execute(query, params)
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield from rows
+
+
+_encoder = msgspec.json.Encoder()
+
+
+def _write(out, record):
+    out.write(_encoder.encode(record))
+    out.write(b"\n")
+
+
+def _export_image(out, image_path, written):
+    """Bundles an image under its content hash, once; returns the bundle name or None if unreadable."""
+    try:
+        with open(image_path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    name = hashlib.sha256(data).hexdigest() + os.path.splitext(image_path)[1].lower()
+    if name not in written:
+        _write(out, {"kind": "image", "name": name, "data": data})
+        written.add(name)
+    return name
+
+
+def export_history(db_manager, output_path, batch_size=500):
+    """
+    Exports every conversation to a gzip-compressed JSON Lines file.
+
+    A header line is followed, per conversation, by the conversation, its
+    interactions, checkpoints and image hashes. Images are bundled (base64) once
+    per content hash, before the first interaction that shows them; an image
+    that no longer exists is left out and its interaction keeps the old path.
+    Embeddings are not exported: the semantic indexer recomputes them.
+
+    Returns:
+        dict: Number of conversations, interactions and images exported.
+    """
+    counts = {"conversations": 0, "interactions": 0, "images": 0}
+    written = set()
+    partial = output_path + ".partial"
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # A long read on the live file would block the application's writes; read a copy instead.
+        snapshot = sqlite3.connect(OnlineBackup(db_manager).run(os.path.join(temp_dir, "snapshot.db")))
+        try:
+            with gzip.open(partial, "wb") as out, tracer.span("history.export"):
+                _write(out, {
+                    "kind": "header", "format": EXPORT_FORMAT, "version": EXPORT_VERSION,
+                    "exported_at": datetime.datetime.now().isoformat(timespec="seconds"),
+                })
+                conversations = _rows(
+                    snapshot, "SELECT conversation_id, start_timestamp, user_nickname FROM conversations "
+                    "ORDER BY conversation_id", batch_size=batch_size
+                )
+                for conversation_id, start_timestamp, nickname in conversations:
+                    _write(out, {
+                        "kind": "conversation", "conversation_id": conversation_id,
+                        "start_timestamp": start_timestamp, "user_nickname": nickname,
+                    })
+                    counts["conversations"] += 1
+                    interactions = _rows(
+                        snapshot, "SELECT interaction_id, timestamp, actor, type, content, image_path FROM interactions "
+                        "WHERE conversation_id = ? ORDER BY interaction_id", (conversation_id,), batch_size
+                    )
+                    for interaction_id, timestamp, actor, interaction_type, content, image_path in interactions:
+                        image = _export_image(out, image_path, written) if image_path else None
+                        _write(out, {
+                            "kind": "interaction", "interaction_id": interaction_id, "timestamp": timestamp,
+                            "actor": actor, "type": interaction_type, "content": content,
+                            "image_path": image_path, "image": image,
+                        })
+                        counts["interactions"] += 1
+                    checkpoints = _rows(
+                        snapshot, "SELECT timestamp, upto_interaction_id, summary FROM checkpoints "
+                        "WHERE conversation_id = ? ORDER BY checkpoint_id", (conversation_id,), batch_size
+                    )
+                    for timestamp, upto_interaction_id, summary in checkpoints:
+                        _write(out, {
+                            "kind": "checkpoint", "timestamp": timestamp,
+                            "upto_interaction_id": upto_interaction_id, "summary": summary,
+                        })
+                    image_hashes = _rows(
+                        snapshot, "SELECT interaction_id, dhash, description FROM image_hashes "
+                        "WHERE conversation_id = ? ORDER BY interaction_id", (conversation_id,), batch_size
+                    )
+                    for interaction_id, dhash, description in image_hashes:
+                        _write(out, {
+                            "kind": "image_hash", "interaction_id": interaction_id,
+                            "dhash": dhash, "description": description,
+                        })
+        except BaseException:
+            _remove(partial)
+            raise
+        finally:
+            snapshot.close()
+    os.replace(partial, output_path)
+    counts["images"] = len(written)
+    logger.info(f"Exported {counts} to {output_path}")
+    return counts
+
+
+class _Importer:
+    """Adds the records of an export to the database, one batch at a time."""
+    INSERT_INTERACTIONS = (
+        "INSERT INTO interactions (interaction_id, conversation_id, timestamp, actor, type, content, image_path) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)"
+    )
+    INSERT_CHECKPOINTS = (
+        "INSERT INTO checkpoints (conversation_id, timestamp, upto_interaction_id, summary) VALUES (?, ?, ?, ?)"
+    )
+    INSERT_IMAGE_HASHES = (
+        "INSERT OR REPLACE INTO image_hashes (interaction_id, conversation_id, dhash, description) VALUES (?, ?, ?, ?)"
+    )
+    # Interaction IDs are assigned after the highest one ever used.
+    LAST_INTERACTION_ID = (
+        "SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'interactions'), 0), "
+        "COALESCE((SELECT MAX(interaction_id) FROM interactions), 0))"
+    )
+
+    def __init__(self, db_manager, images_dir, batch_size):
+        self.db_manager = db_manager
+        self.images_dir = images_dir
+        self.batch_size = batch_size
+        self.counts = {"conversations": 0, "interactions": 0, "images": 0}
+        self.conversation_id = None
+        # Exported -> new interaction ID, for the current conversation only.
+        self.interaction_ids = {}
+        self.interactions = []
+        self.checkpoints = []
+        self.image_hashes = []
+
+    def add(self, record):
+        kind = record["kind"]
+        if kind == "conversation":
+            self.flush()
+            self.conversation_id = self.db_manager.execute_crud_query(
+                "INSERT INTO conversations (start_timestamp, user_nickname) VALUES (?, ?)",
+                (record["start_timestamp"], record["user_nickname"])
+            )
+            if self.conversation_id is None:
+                raise ValueError("could not insert a conversation")
+            self.interaction_ids = {}
+            self.counts["conversations"] += 1
+            return
+        if kind == "image":
+            self._write_image(record["name"], record["data"])
+            return
+        if self.conversation_id is None:
+            raise ValueError(f"{kind} record before any conversation")
+        if kind == "interaction":
+            self.interactions.append(record)
+        elif kind == "checkpoint":
+            self._flush_interactions()
+            upto = self.interaction_ids.get(record["upto_interaction_id"])
+            if upto is not None:
+                self.checkpoints.append((self.conversation_id, record["timestamp"], upto, record["summary"]))
+        elif kind == "image_hash":
+            self._flush_interactions()
+            interaction_id = self.interaction_ids.get(record["interaction_id"])
+            if interaction_id is not None:
+                self.image_hashes.append((interaction_id, self.conversation_id, record["dhash"], record["description"]))
+        if max(len(self.interactions), len(self.checkpoints), len(self.image_hashes)) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        self._flush_interactions()
+        if self.checkpoints:
+            self.db_manager.execute_many(self.INSERT_CHECKPOINTS, self.checkpoints)
+            self.checkpoints = []
+        if self.image_hashes:
+            self.db_manager.execute_many(self.INSERT_IMAGE_HASHES, self.image_hashes)
+            self.image_hashes = []
+
+    def _flush_interactions(self):
+        if not self.interactions:
+            return
+        with self.db_manager.transaction() as cursor:
+            # Read inside the transaction, so no other writer takes these IDs meanwhile.
+            last_id = cursor.execute(self.LAST_INTERACTION_ID).fetchone()[0]
+            rows = []
+            for new_id, record in enumerate(self.interactions, last_id + 1):
+                self.interaction_ids[record["interaction_id"]] = new_id
+                image_path = record.get("image_path")
+                if record.get("image"):
+                    image_path = os.path.abspath(os.path.join(self.images_dir, os.path.basename(record["image"])))
+                rows.append((
+                    new_id, self.conversation_id, record["timestamp"], record["actor"], record["type"],
+                    record.get("content"), image_path
+                ))
+            cursor.executemany(self.INSERT_INTERACTIONS, rows)
+        self.counts["interactions"] += len(rows)
+        self.interactions = []
+
+    def _write_image(self, name, data):
+        path = os.path.join(self.images_dir, os.path.basename(name))
+        if os.path.exists(path):
+            return
+        with open(path + ".partial", "wb") as f:
+            f.write(base64.b64decode(data))
+        os.replace(path + ".partial", path)
+        self.counts["images"] += 1
+
+
+def import_history(db_manager, input_path, images_dir, batch_size=500):
+    """
+    Imports an export made by export_history as new conversations.
+
+    Conversations and interactions get new IDs, so an export can be imported
+    into a database that already has history. Rows are inserted with
+    executemany, batch_size at a time, each batch in its own short transaction;
+    bundled images are written to images_dir, named by their content hash.
+
+    Returns:
+        dict: Number of conversations, interactions and images imported.
+
+    Raises:
+        ValueError: If the file is not an export or a record is malformed.
+    """
+    os.makedirs(images_dir, exist_ok=True)
+    importer = _Importer(db_manager, images_dir, batch_size)
+    with gzip.open(input_path, "rb") as lines, tracer.span("history.import"):
+        header = msgspec.json.decode(next(lines, b"null"))
+        if not isinstance(header, dict) or header.get("format") != EXPORT_FORMAT:
+            raise ValueError(f"{input_path} is not a Local Vision history export")
+        if header.get("version", 0) > EXPORT_VERSION:
+            raise ValueError(f"{input_path} was exported by a newer version (format {header['version']})")
+        for number, line in enumerate(lines, 2):
+            if not line.strip():
+                continue
+            try:
+                importer.add(msgspec.json.decode(line))
+            except (KeyError, TypeError, ValueError, msgspec.DecodeError) as e:
+                raise ValueError(f"{input_path}, line {number}: {e}") from e
+        importer.flush()
+    logger.info(f"Imported {importer.counts} from {input_path}")
+    return importer.counts
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m local_vision.backup",
+        description="Back up, export and import the Local Vision history database, also while the app is running."
+    )
+    parser.add_argument("--db", default="local_vision.db", help="SQLite database file.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    backup = commands.add_parser("backup", help="Copy the database with the SQLite online backup API.")
+    backup.add_argument("output", help="Backup file to write.")
+    export = commands.add_parser("export", help="Export every conversation and its images to compressed JSON Lines.")
+    export.add_argument("output", help="Export file, e.g. history.jsonl.gz.")
+    export.add_argument("--batch-size", type=int, default=500, help="Rows read per query batch.")
+    importer = commands.add_parser("import", help="Add the conversations of an export to the database.")
+    importer.add_argument("input", help="Export file made by the export command.")
+    importer.add_argument("--images-dir", default="imported_images", help="Where the bundled images are written.")
+    importer.add_argument("--batch-size", type=int, default=500, help="Rows inserted per transaction.")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command in ("backup", "export") and not os.path.exists(args.db):
+        build_parser().error(f"database {args.db} does not exist")
+
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+    configure_logging_from_config(config)
+
+    db_manager = DatabaseManager(args.db)
+    db_manager.connect()
+    db_manager.create_tables()
+    if args.command == "backup":
+        OnlineBackup(db_manager).run(args.output)
+        sys.stderr.write(f"Backup written to {args.output}\n")
+        return 0
+    if args.command == "export":
+        counts = export_history(db_manager, args.output, args.batch_size)
+        verb = "Exported"
+    else:
+        try:
+            counts = import_history(db_manager, args.input, args.images_dir, args.batch_size)
+        except (OSError, ValueError) as e:
+            sys.stderr.write(f"Import failed: {e}\n")
+            return 1
+        verb = "Imported"
+    sys.stderr.write(
+        f"{verb} {counts['conversations']} conversations, {counts['interactions']} interactions "
+        f"and {counts['images']} images.\n"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,389 @@
+"""
+Headless batch describer for whole folders of images.
+
+Usage:
+    python -m local_vision.batch photos/ more_photos/ -o descriptions.jsonl
+    find photos -name "*.png" | python -m local_vision.batch --stdin -o alt_text.csv
+
+Already described files are skipped through a manifest stored next to the output
+file and the rows already in the output, so an interrupted (or killed) run can
+simply be started again with the same arguments.
+This module must stay free of tkinter/customtkinter imports.
+"""
+import argparse
+import configparser
+import csv
+import hashlib
+import io
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+
+from local_vision.logging_setup import configure_logging_from_config
+from local_vision.logic.llm_manager import LLM_Manager
+from local_vision.logic.response_profiles import read_profiles
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_FORMATS = ('.png', '.jpg', '.jpeg')
+CSV_FIELDS = ["path", "sha256", "description", "cached"]
+
+
+class Manifest:
+    """
+    Remembers which files were already described, keyed by path and by content hash.
+    """
+    def __init__(self, path):
+        """
+        Initializes the Manifest, loading a previous checkpoint if one exists.
+
+        Args:
+            path (str): The path to the JSON manifest file.
+        """
+        self.path = path
+        self.files = {}
+        self.descriptions = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            self.files = data.get("files", {})
+            self.descriptions = data.get("descriptions", {})
+
+    def is_done(self, path, digest):
+        """Returns True if this exact file was already written to the output."""
+        return self.files.get(path) == digest
+
+    def cached_description(self, digest):
+        """Returns a stored description for identical content, or None."""
+        return self.descriptions.get(digest)
+
+    def record(self, path, digest, description):
+        """Marks a file as described."""
+        self.files[path] = digest
+        self.descriptions[digest] = description
+
+    def save(self):
+        """Atomically writes the manifest checkpoint to disk."""
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"files": self.files, "descriptions": self.descriptions}, f, ensure_ascii=False)
+        os.replace(temp_path, self.path)
+
+
+class ResultWriter:
+    """
+    Appends one result row per image to a JSONL or CSV output.
+
+    The rows of an existing output are kept in existing_rows, keyed by path, so a
+    resumed run can skip them; a row torn by a killed run is dropped from the file.
+    """
+    def __init__(self, path, output_format):
+        """
+        Initializes the ResultWriter.
+
+        Args:
+            path (str): Output file path, or "-" for stdout.
+            output_format (str): Either "jsonl" or "csv".
+        """
+        self.output_format = output_format
+        self.existing_rows = {}
+        if path == "-":
+            self.file = sys.stdout
+            is_new = True
+        else:
+            if os.path.exists(path) and os.path.getsize(path) > 0:
+                self.existing_rows = {row["path"]: row for row in self._recover(path, output_format)}
+            is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+            self.file = open(path, "a", encoding="utf-8", newline="")
+
+        self.csv_writer = None
+        if output_format == "csv":
+            self.csv_writer = csv.DictWriter(self.file, fieldnames=CSV_FIELDS)
+            if is_new:
+                self.csv_writer.writeheader()
+
+    @staticmethod
+    def _recover(path, output_format):
+        """Returns the complete rows of an existing output, rewriting it without a torn last row."""
+        with open(path, encoding="utf-8", newline="") as f:
+            text = f.read()
+        if output_format == "csv":
+            reader = csv.DictReader(io.StringIO(text))
+            rows = [row for row in reader if row.get("cached") in ("True", "False")]
+            for row in rows:
+                row["cached"] = row["cached"] == "True"
+        else:
+            rows = []
+            for line in text.splitlines():
+                try:
+                    rows.append(json.loads(line))
+                except ValueError:
+                    pass
+        rows = [row for row in rows if row.get("path") and row.get("sha256")]
+
+        if not text.endswith("\n"):
+            temp_path = path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8", newline="") as f:
+                if output_format == "csv":
+                    writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+                    writer.writeheader()
+                    writer.writerows({field: row.get(field, "") for field in CSV_FIELDS} for row in rows)
+                else:
+                    f.writelines(json.dumps(row, ensure_ascii=False) + "\n" for row in rows)
+            os.replace(temp_path, path)
+        return rows
+
+    def write(self, row):
+        """Writes a single result row."""
+        if self.csv_writer:
+            self.csv_writer.writerow({field: row.get(field, "") for field in CSV_FIELDS})
+        else:
+            self.file.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        if self.file is not sys.stdout:
+            self.file.close()
+
+
+class ProgressReporter:
+    """
+    Prints throughput and ETA for a batch run to stderr.
+    """
+    def __init__(self, total, stream=None, interval=1.0):
+        self.total = total
+        self.stream = stream or sys.stderr
+        self.interval = interval
+        self.done = 0
+        self.described = 0
+        self.cached = 0
+        self.skipped = 0
+        self.failed = 0
+        self.failures = []
+        self.start_time = time.monotonic()
+        self._last_report = 0.0
+
+    def update(self, outcome):
+        """Counts one finished file ('described', 'cached', 'skipped' or 'failed') and reports if due."""
+        self.done += 1
+        setattr(self, outcome, getattr(self, outcome) + 1)
+        now = time.monotonic()
+        if now - self._last_report >= self.interval or self.done == self.total:
+            self._last_report = now
+            self.stream.write(self.format_line(now) + "\n")
+            self.stream.flush()
+
+    def fail(self, path, error):
+        """Counts a failed file, remembering it for the final summary."""
+        self.failures.append((path, str(error)))
+        self.update("failed")
+
+    def format_line(self, now=None):
+        """Returns a one-line progress summary."""
+        elapsed = (now or time.monotonic()) - self.start_time
+        rate = self.described / elapsed if elapsed > 0 else 0.0
+        remaining = self.total - self.done
+        eta = f"{remaining / rate:.0f}s" if rate > 0 else "?"
+        return (
+            f"[{self.done}/{self.total}] described={self.described} cached={self.cached} skipped={self.skipped} "
+            f"failed={self.failed} rate={rate:.2f} img/s eta={eta}"
+        )
+
+
+def iter_image_paths(sources, read_stdin=False, recursive=True):
+    """
+    Yields image paths from files, directories and optionally stdin (one path per line).
+    """
+    def expand(source):
+        if os.path.isdir(source):
+            if recursive:
+                for root, dirs, files in os.walk(source):
+                    dirs.sort()
+                    for name in sorted(files):
+                        if name.lower().endswith(SUPPORTED_FORMATS):
+                            yield os.path.join(root, name)
+            else:
+                for name in sorted(os.listdir(source)):
+                    path = os.path.join(source, name)
+                    if os.path.isfile(path) and name.lower().endswith(SUPPORTED_FORMATS):
+                        yield path
+        elif source.lower().endswith(SUPPORTED_FORMATS):
+            yield source
+
+    for source in sources:
+        yield from expand(source)
+    if read_stdin:
+        for line in sys.stdin:
+            line = line.strip()
+            if line:
+                yield from expand(line)
+
+
+def file_sha256(path):
+    """Returns the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def run_batch(llm_manager, paths, writer, manifest, concurrency=1, checkpoint_every=10, reporter=None):
+    """
+    Describes every path, writing results and checkpointing the manifest as it goes.
+
+    Files with identical content are only sent to the model once, even when they
+    are processed concurrently. Failed files are not written to the output or the
+    manifest, so each path appears at most once in the output and a resumed run
+    retries them; they are listed in reporter.failures instead. Rows already in the
+    output count as done even when a killed run never checkpointed them.
+
+    Returns:
+        ProgressReporter: The final counters of the run.
+    """
+    paths = [os.path.abspath(path) for path in dict.fromkeys(paths)]
+    reporter = reporter or ProgressReporter(len(paths))
+    for row in getattr(writer, "existing_rows", {}).values():
+        if not manifest.is_done(row["path"], row["sha256"]):
+            manifest.record(row["path"], row["sha256"], row["description"])
+
+    lock = threading.Lock()
+    in_flight = {}
+
+    def process(path):
+        digest = file_sha256(path)
+        if manifest.is_done(path, digest):
+            return path, digest, None, "skipped"
+
+        with lock:
+            owner = in_flight.get(digest)
+            is_owner = owner is None
+            if is_owner:
+                owner = in_flight[digest] = Future()
+        if not is_owner:
+            return path, digest, owner.result(), "cached"
+
+        cached = manifest.cached_description(digest)
+        try:
+            description = cached if cached is not None else llm_manager.describe_image(path)
+        except Exception as e:
+            owner.set_exception(e)
+            raise
+        owner.set_result(description)
+        return path, digest, description, "cached" if cached is not None else "described"
+
+    since_checkpoint = 0
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        futures = {executor.submit(process, path): path for path in paths}
+        try:
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    path, digest, description, outcome = future.result()
+                except Exception as e:
+                    logger.error(f"Batch: failed to describe {path}: {e}")
+                    reporter.fail(path, e)
+                    continue
+
+                if outcome == "skipped":
+                    reporter.update("skipped")
+                    continue
+
+                writer.write({"path": path, "sha256": digest, "description": description, "cached": outcome == "cached"})
+                manifest.record(path, digest, description)
+                reporter.update(outcome)
+
+                since_checkpoint += 1
+                if since_checkpoint >= checkpoint_every:
+                    writer.flush()
+                    manifest.save()
+                    since_checkpoint = 0
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+    writer.flush()
+    manifest.save()
+    return reporter
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m local_vision.batch",
+        description="Describe whole folders of images with the local LM Studio model."
+    )
+    parser.add_argument("paths", nargs="*", help="Image files or directories to describe.")
+    parser.add_argument("--stdin", action="store_true", help="Also read image paths from stdin, one per line.")
+    parser.add_argument("--no-recursive", action="store_true", help="Do not descend into subdirectories.")
+    parser.add_argument("-o", "--output", default="descriptions.jsonl", help="Output file (.jsonl or .csv), or - for stdout.")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="Output format (default: from the output extension).")
+    parser.add_argument("--manifest", help="Manifest/checkpoint file (default: <output>.manifest.json).")
+    parser.add_argument("-j", "--concurrency", type=int, default=1, help="Number of descriptions in flight at once.")
+    parser.add_argument("--checkpoint-every", type=int, default=10, help="Save the manifest every N new results.")
+    parser.add_argument("--model", help="LM Studio model identifier (default: ModelIdentifier from config.ini).")
+    parser.add_argument("--base-url", default="http://localhost:1234/v1", help="LM Studio server URL.")
+    parser.add_argument("--profile", help="Response profile, e.g. fast or detailed (default: ResponseProfile from config.ini).")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if not args.paths and not args.stdin:
+        build_parser().error("give at least one path or --stdin")
+
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+    configure_logging_from_config(config)
+
+    output_format = args.format or ("csv" if args.output.lower().endswith(".csv") else "jsonl")
+    manifest_path = args.manifest or (
+        "descriptions.manifest.json" if args.output == "-" else args.output + ".manifest.json"
+    )
+
+    model_identifier = args.model or config.get('Settings', 'ModelIdentifier', fallback='local-model')
+    profiles = read_profiles(config)
+    if args.profile and args.profile.lower() not in profiles:
+        build_parser().error(f"unknown profile {args.profile}; choose from {', '.join(sorted(profiles))}")
+
+    paths = list(iter_image_paths(args.paths, read_stdin=args.stdin, recursive=not args.no_recursive))
+    if not paths:
+        sys.stderr.write("No images found.\n")
+        return 1
+
+    llm_manager = LLM_Manager(
+        model_identifier=model_identifier,
+        base_url=args.base_url,
+        max_concurrent_requests=args.concurrency,
+        profiles=profiles,
+        default_profile=args.profile or config.get('Settings', 'ResponseProfile', fallback=None)
+    )
+    manifest = Manifest(manifest_path)
+    writer = ResultWriter(args.output, output_format)
+    try:
+        reporter = run_batch(
+            llm_manager, paths, writer, manifest,
+            concurrency=args.concurrency, checkpoint_every=args.checkpoint_every
+        )
+    except KeyboardInterrupt:
+        writer.flush()
+        manifest.save()
+        sys.stderr.write("Interrupted; progress saved. Run the same command again to resume.\n")
+        return 130
+    finally:
+        writer.close()
+
+    sys.stderr.write("Done. " + reporter.format_line() + "\n")
+    for path, error in reporter.failures:
+        sys.stderr.write(f"Failed: {path}: {error}\n")
+    return 0 if reporter.failed == 0 else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,11 @@
+import logging
 import sqlite3
+import threading
+from contextlib import contextmanager
 from sqlite3 import Error
+from local_vision.tracing import tracer
+
+logger = logging.getLogger(__name__)
 
 class DatabaseManager:
     """
@@ -14,16 +20,19 @@ class DatabaseManager:
         """
         self.db_file = db_file
         self.conn = None
+        # Background workers (history compaction) share the connection with the UI
+        # thread, so each statement and its commit run under this lock.
+        self._lock = threading.RLock()
 
     def connect(self):
         """
         Create a database connection to the SQLite database.
         """
         try:
-            self.conn = sqlite3.connect(self.db_file)
-            print(f"Successfully connected to SQLite version {sqlite3.version}")
+            self.conn = sqlite3.connect(self.db_file, check_same_thread=False)
+            logger.debug(f"Connected to {self.db_file} (SQLite {sqlite3.sqlite_version})")
         except Error as e:
-            print(e)
+            logger.error(f"Could not connect to {self.db_file}: {e}")
         return self.conn
 
     def create_tables(self):
@@ -49,16 +58,65 @@ class DatabaseManager:
             FOREIGN KEY (conversation_id) REFERENCES conversations (conversation_id)
         );
         """
+        create_interactions_index = """
+        CREATE INDEX IF NOT EXISTS idx_interactions_conversation
+        ON interactions (conversation_id, interaction_id);
+        """
+        # A checkpoint summarizes every interaction of a conversation up to and
+        # including upto_interaction_id, so context can be built without them.
+        create_checkpoints_table = """
+        CREATE TABLE IF NOT EXISTS checkpoints (
+            checkpoint_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            conversation_id INTEGER NOT NULL,
+            timestamp TEXT NOT NULL,
+            upto_interaction_id INTEGER NOT NULL,
+            summary TEXT NOT NULL,
+            FOREIGN KEY (conversation_id) REFERENCES conversations (conversation_id)
+        );
+        """
+        create_checkpoints_index = """
+        CREATE INDEX IF NOT EXISTS idx_checkpoints_conversation
+        ON checkpoints (conversation_id, upto_interaction_id);
+        """
+        # Perceptual hash of an image interaction (stored as a signed 64-bit integer)
+        # and the description the model gave for it, once there is one.
+        create_image_hashes_table = """
+        CREATE TABLE IF NOT EXISTS image_hashes (
+            interaction_id INTEGER PRIMARY KEY,
+            conversation_id INTEGER NOT NULL,
+            dhash INTEGER NOT NULL,
+            description TEXT,
+            FOREIGN KEY (interaction_id) REFERENCES interactions (interaction_id),
+            FOREIGN KEY (conversation_id) REFERENCES conversations (conversation_id)
+        );
+        """
+        # Embedding of a text or description interaction as little-endian float16.
+        create_embeddings_table = """
+        CREATE TABLE IF NOT EXISTS embeddings (
+            interaction_id INTEGER NOT NULL,
+            model TEXT NOT NULL,
+            conversation_id INTEGER NOT NULL,
+            vector BLOB NOT NULL,
+            PRIMARY KEY (interaction_id, model),
+            FOREIGN KEY (interaction_id) REFERENCES interactions (interaction_id),
+            FOREIGN KEY (conversation_id) REFERENCES conversations (conversation_id)
+        );
+        """
         try:
             if not self.conn:
                 self.connect()
             cursor = self.conn.cursor()
             cursor.execute(create_conversations_table)
             cursor.execute(create_interactions_table)
+            cursor.execute(create_interactions_index)
+            cursor.execute(create_checkpoints_table)
+            cursor.execute(create_checkpoints_index)
+            cursor.execute(create_image_hashes_table)
+            cursor.execute(create_embeddings_table)
             self.conn.commit()
-            print("Tables created successfully.")
+            logger.debug("Tables created successfully.")
         except Error as e:
-            print(e)
+            logger.error(f"Could not create tables: {e}")
 
     def execute_crud_query(self, query, params=()):
         """
@@ -72,21 +130,58 @@ class DatabaseManager:
             list: The result of the query (for 'SELECT' statements).
         """
         try:
+            with self._lock:
+                if not self.conn:
+                    self.connect()
+                cursor = self.conn.cursor()
+                with tracer.span("db.query"):
+                    cursor.execute(query, params)
+                    if query.strip().upper().startswith("SELECT"):
+                        return cursor.fetchall()
+                with tracer.span("db.commit"):
+                    self.conn.commit()
+                return cursor.lastrowid
+        except Error as e:
+            logger.error(f"Query failed: {e}")
+            return None
+
+    @contextmanager
+    def transaction(self):
+        """
+        Runs a block of statements as one transaction on the shared connection.
+
+        Yields a cursor; the block is committed if it succeeds and rolled back if
+        it raises. Other threads wait for the connection meanwhile, so keep the
+        block short (for example one batch of a bulk insert).
+        """
+        with self._lock:
             if not self.conn:
                 self.connect()
             cursor = self.conn.cursor()
-            cursor.execute(query, params)
-            if query.strip().upper().startswith("SELECT"):
-                return cursor.fetchall()
-            else:
+            with tracer.span("db.transaction"):
+                cursor.execute("BEGIN IMMEDIATE")
+                try:
+                    yield cursor
+                except BaseException:
+                    self.conn.rollback()
+                    raise
                 self.conn.commit()
-                return cursor.lastrowid
-        except Error as e:
-            print(e)
-            return None
+
+    def execute_many(self, query, rows):
+        """
+        Executes a statement once per row of parameters, in a single transaction.
+
+        Returns:
+            int: The number of rows changed.
+        """
+        with self.transaction() as cursor:
+            cursor.executemany(query, rows)
+            return cursor.rowcount
 
 if __name__ == '__main__':
+    from local_vision.logging_setup import configure_logging
+    configure_logging()
     db_manager = DatabaseManager()
     db_manager.connect()
     db_manager.create_tables()
-    print("Database setup complete.")
+    logger.info("Database setup complete.")
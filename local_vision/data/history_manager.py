@@ -1,4 +1,6 @@
 from local_vision.data.database_manager import DatabaseManager
+from local_vision.records import Conversation, Interaction, to_records
+from local_vision.tracing import tracer
 import datetime
 
 class HistoryManager:
@@ -39,6 +41,9 @@ class HistoryManager:
             interaction_type (str): The type of interaction ('text', 'image', 'description').
             content (str, optional): The text content of the interaction. Defaults to None.
             image_path (str, optional): The path to the image file. Defaults to None.
+
+        Returns:
+            int: The ID of the new interaction.
         """
         timestamp = datetime.datetime.now().isoformat()
         query = """
@@ -46,17 +51,18 @@ class HistoryManager:
         VALUES (?, ?, ?, ?, ?, ?)
         """
         params = (conversation_id, timestamp, actor, interaction_type, content, image_path)
-        self.db_manager.execute_crud_query(query, params)
+        with tracer.span("history.save", type=interaction_type):
+            return self.db_manager.execute_crud_query(query, params)
 
     def get_conversations(self):
         """
         Retrieves all conversations from the database.
 
         Returns:
-            list: A list of all conversations.
+            list: Conversation records, newest first.
         """
         query = "SELECT * FROM conversations ORDER BY start_timestamp DESC"
-        return self.db_manager.execute_crud_query(query)
+        return to_records(Conversation, self.db_manager.execute_crud_query(query))
 
     def get_conversation_history(self, conversation_id, as_dict=False):
         """
@@ -64,35 +70,222 @@ class HistoryManager:
 
         Args:
             conversation_id (int): The ID of the conversation.
-            as_dict (bool): If True, returns a list of dictionaries.
+            as_dict (bool): If True, returns Interaction records (which also read like
+                dictionaries) instead of raw rows.
 
         Returns:
             list: A list of all interactions in the conversation.
         """
         query = "SELECT * FROM interactions WHERE conversation_id = ? ORDER BY timestamp ASC"
         params = (conversation_id,)
-        history = self.db_manager.execute_crud_query(query, params)
+        with tracer.span("history.read"):
+            history = self.db_manager.execute_crud_query(query, params)
 
         if not as_dict:
             return history
 
-        dict_history = []
-        for row in history:
-            dict_history.append({
-                "interaction_id": row[0],
-                "conversation_id": row[1],
-                "timestamp": row[2],
-                "actor": row[3],
-                "type": row[4],
-                "content": row[5],
-                "image_path": row[6]
-            })
-        return dict_history
+        return to_records(Interaction, history)
+
+    def save_checkpoint(self, conversation_id, upto_interaction_id, summary):
+        """
+        Stores a summary of a conversation up to an interaction.
+
+        Args:
+            conversation_id (int): The ID of the conversation.
+            upto_interaction_id (int): The last interaction covered by the summary.
+            summary (str): The summary text.
+
+        Returns:
+            int: The ID of the new checkpoint.
+        """
+        timestamp = datetime.datetime.now().isoformat()
+        query = """
+        INSERT INTO checkpoints (conversation_id, timestamp, upto_interaction_id, summary)
+        VALUES (?, ?, ?, ?)
+        """
+        params = (conversation_id, timestamp, upto_interaction_id, summary)
+        with tracer.span("history.checkpoint"):
+            return self.db_manager.execute_crud_query(query, params)
+
+    def get_latest_checkpoint(self, conversation_id):
+        """
+        Retrieves the most recent checkpoint of a conversation.
+
+        Returns:
+            dict: upto_interaction_id, summary and timestamp, or None if there is none.
+        """
+        query = """
+        SELECT upto_interaction_id, summary, timestamp FROM checkpoints
+        WHERE conversation_id = ? ORDER BY upto_interaction_id DESC LIMIT 1
+        """
+        rows = self.db_manager.execute_crud_query(query, (conversation_id,))
+        if not rows:
+            return None
+        upto_interaction_id, summary, timestamp = rows[0]
+        return {"upto_interaction_id": upto_interaction_id, "summary": summary, "timestamp": timestamp}
+
+    def get_interactions_after(self, conversation_id, interaction_id=0, limit=None):
+        """
+        Retrieves the interactions of a conversation that follow an interaction.
+
+        Args:
+            conversation_id (int): The ID of the conversation.
+            interaction_id (int): Only interactions with a greater ID are returned.
+            limit (int, optional): Return only the most recent interactions.
+
+        Returns:
+            list: Interaction records in chronological order.
+        """
+        query = "SELECT * FROM interactions WHERE conversation_id = ? AND interaction_id > ? ORDER BY interaction_id DESC"
+        params = (conversation_id, interaction_id)
+        if limit:
+            query += " LIMIT ?"
+            params += (limit,)
+        with tracer.span("history.read"):
+            rows = self.db_manager.execute_crud_query(query, params)
+        return to_records(Interaction, reversed(rows or []))
+
+    def get_interactions_before(self, conversation_id, interaction_id=None, limit=50):
+        """
+        Retrieves one page of a conversation, walking back from the newest interaction.
+
+        Args:
+            conversation_id (int): The ID of the conversation.
+            interaction_id (int, optional): Only interactions with a smaller ID are
+                returned; None starts from the newest one.
+            limit (int): Page size.
+
+        Returns:
+            list: Interaction records, newest first. Pass the ID of the last one
+            to get the next page.
+        """
+        query = "SELECT * FROM interactions WHERE conversation_id = ?"
+        params = (conversation_id,)
+        if interaction_id is not None:
+            query += " AND interaction_id < ?"
+            params += (interaction_id,)
+        query += " ORDER BY interaction_id DESC LIMIT ?"
+        params += (limit,)
+        with tracer.span("history.read_page"):
+            rows = self.db_manager.execute_crud_query(query, params)
+        return to_records(Interaction, rows)
+
+    def get_context(self, conversation_id, limit=None):
+        """
+        Retrieves what a model needs to continue a conversation.
 
+        Instead of the full history this reads the latest checkpoint, returned as a
+        leading interaction of type 'summary', and the interactions after it. The
+        amount read stays bounded as long as conversations are compacted.
+
+        Args:
+            conversation_id (int): The ID of the conversation.
+            limit (int, optional): Maximum number of interactions after the checkpoint.
+
+        Returns:
+            list: Interaction records in chronological order.
+        """
+        checkpoint = self.get_latest_checkpoint(conversation_id)
+        upto = checkpoint["upto_interaction_id"] if checkpoint else 0
+        context = self.get_interactions_after(conversation_id, upto, limit)
+        if checkpoint:
+            context.insert(0, Interaction(
+                None, conversation_id, checkpoint["timestamp"], "system", "summary", checkpoint["summary"]
+            ))
+        return context
+
+    def save_image_hash(self, interaction_id, conversation_id, dhash):
+        """
+        Stores the perceptual hash of an image interaction.
+
+        Args:
+            interaction_id (int): The image interaction.
+            conversation_id (int): The ID of the conversation.
+            dhash (int): Signed 64-bit form of the hash.
+        """
+        query = "INSERT OR REPLACE INTO image_hashes (interaction_id, conversation_id, dhash) VALUES (?, ?, ?)"
+        self.db_manager.execute_crud_query(query, (interaction_id, conversation_id, dhash))
+
+    def set_image_description(self, interaction_id, description):
+        """Records the description the model gave for a hashed image."""
+        query = "UPDATE image_hashes SET description = ? WHERE interaction_id = ?"
+        self.db_manager.execute_crud_query(query, (description, interaction_id))
+
+    def get_image_hashes(self):
+        """
+        Retrieves every stored image hash.
+
+        Returns:
+            list: (interaction_id, conversation_id, dhash, description) rows.
+        """
+        query = "SELECT interaction_id, conversation_id, dhash, description FROM image_hashes"
+        return self.db_manager.execute_crud_query(query) or []
+
+    def get_interactions(self, interaction_ids):
+        """
+        Retrieves interactions by ID.
+
+        Returns:
+            list: Interaction records in the order of interaction_ids; missing IDs are skipped.
+        """
+        if not interaction_ids:
+            return []
+        placeholders = ", ".join("?" for _ in interaction_ids)
+        query = f"SELECT * FROM interactions WHERE interaction_id IN ({placeholders})"
+        rows = to_records(Interaction, self.db_manager.execute_crud_query(query, tuple(interaction_ids)))
+        by_id = {row.interaction_id: row for row in rows}
+        return [by_id[interaction_id] for interaction_id in interaction_ids if interaction_id in by_id]
+
+    def save_embedding(self, interaction_id, conversation_id, model, vector):
+        """
+        Stores the embedding of an interaction.
+
+        Args:
+            interaction_id (int): The embedded interaction.
+            conversation_id (int): The ID of the conversation.
+            model (str): The embedding model identifier.
+            vector (bytes): The packed vector.
+        """
+        query = """
+        INSERT OR REPLACE INTO embeddings (interaction_id, model, conversation_id, vector)
+        VALUES (?, ?, ?, ?)
+        """
+        self.db_manager.execute_crud_query(query, (interaction_id, model, conversation_id, vector))
+
+    def get_embeddings(self, model):
+        """
+        Retrieves every embedding computed with a model.
+
+        Returns:
+            list: (interaction_id, conversation_id, vector) rows.
+        """
+        query = "SELECT interaction_id, conversation_id, vector FROM embeddings WHERE model = ?"
+        return self.db_manager.execute_crud_query(query, (model,)) or []
+
+    def get_unembedded_interactions(self, model, after_interaction_id=0, limit=32):
+        """
+        Retrieves text and description interactions that have no embedding for a model yet.
+
+        Args:
+            model (str): The embedding model identifier.
+            after_interaction_id (int): Only interactions with a greater ID are returned.
+            limit (int): Maximum number of interactions.
+
+        Returns:
+            list: (interaction_id, conversation_id, content) rows in ID order.
+        """
+        query = """
+        SELECT i.interaction_id, i.conversation_id, i.content FROM interactions i
+        LEFT JOIN embeddings e ON e.interaction_id = i.interaction_id AND e.model = ?
+        WHERE i.interaction_id > ? AND i.type IN ('description', 'text')
+          AND i.content IS NOT NULL AND i.content != '' AND e.interaction_id IS NULL
+        ORDER BY i.interaction_id LIMIT ?
+        """
+        return self.db_manager.execute_crud_query(query, (model, after_interaction_id, limit)) or []
 
     def delete_conversation(self, conversation_id):
         """
-        Deletes a conversation and all its interactions.
+        Deletes a conversation, its interactions, checkpoints, image hashes and embeddings.
 
         Args:
             conversation_id (int): The ID of the conversation to delete.
@@ -101,5 +294,14 @@ class HistoryManager:
         params = (conversation_id,)
         self.db_manager.execute_crud_query(query_interactions, params)
 
+        query_checkpoints = "DELETE FROM checkpoints WHERE conversation_id = ?"
+        self.db_manager.execute_crud_query(query_checkpoints, params)
+
+        query_image_hashes = "DELETE FROM image_hashes WHERE conversation_id = ?"
+        self.db_manager.execute_crud_query(query_image_hashes, params)
+
+        query_embeddings = "DELETE FROM embeddings WHERE conversation_id = ?"
+        self.db_manager.execute_crud_query(query_embeddings, params)
+
         query_conversation = "DELETE FROM conversations WHERE conversation_id = ?"
         self.db_manager.execute_crud_query(query_conversation, params)
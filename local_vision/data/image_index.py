@@ -0,0 +1,192 @@
+import logging
+import threading
+
+from local_vision.data.history_manager import HistoryManager
+from local_vision.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+_HASH_BITS = 64
+
+
+def hamming_distance(a, b):
+    """Number of bits in which two hashes differ."""
+    return (a ^ b).bit_count()
+
+
+def _to_signed(value):
+    """SQLite integers are signed 64-bit, so the upper half of the hash range is stored negative."""
+    return value - (1 << _HASH_BITS) if value >= 1 << (_HASH_BITS - 1) else value
+
+
+def _to_unsigned(value):
+    return value & ((1 << _HASH_BITS) - 1)
+
+
+class HashBuckets:
+    """
+    Banded buckets over 64-bit hashes for Hamming-distance search.
+
+    Each hash is split into `bands` bands of equal width and filed under every
+    (band, value) pair. Two hashes that differ in fewer bits than there are bands
+    must agree exactly on at least one band, so a search only checks the hashes
+    sharing a bucket with the query instead of all of them. Wider searches fall
+    back to a scan.
+    """
+    def __init__(self, bands=8):
+        self.bands = bands
+        self._band_bits = _HASH_BITS // bands
+        self._band_mask = (1 << self._band_bits) - 1
+        self._buckets = [{} for _ in range(bands)]
+        self._hashes = {}
+
+    def __len__(self):
+        return len(self._hashes)
+
+    def _keys(self, value):
+        return [(value >> (band * self._band_bits)) & self._band_mask for band in range(self.bands)]
+
+    def add(self, value, item):
+        """Files item under a hash."""
+        self._hashes[item] = value
+        for buckets, key in zip(self._buckets, self._keys(value)):
+            buckets.setdefault(key, set()).add(item)
+
+    def remove(self, item):
+        """Removes an item; unknown items are ignored."""
+        value = self._hashes.pop(item, None)
+        if value is None:
+            return
+        for buckets, key in zip(self._buckets, self._keys(value)):
+            bucket = buckets[key]
+            bucket.discard(item)
+            if not bucket:
+                del buckets[key]
+
+    def search(self, value, max_distance):
+        """
+        Finds the items whose hash is within max_distance bits of value.
+
+        Returns:
+            list: (distance, item) tuples, closest first.
+        """
+        if max_distance < self.bands:
+            candidates = set()
+            for buckets, key in zip(self._buckets, self._keys(value)):
+                candidates.update(buckets.get(key, ()))
+        else:
+            candidates = self._hashes
+        found = []
+        for item in candidates:
+            distance = hamming_distance(value, self._hashes[item])
+            if distance <= max_distance:
+                found.append((distance, item))
+        found.sort(key=lambda match: match[0])
+        return found
+
+
+class ImageHashIndex:
+    """
+    Finds previously seen images that look like a new one.
+
+    The perceptual hashes are stored in SQLite next to the interactions and loaded
+    into HashBuckets on first use, so near-duplicate lookups never scan the table.
+    Each entry remembers the description the model gave, which lets a
+    near-duplicate reuse it instead of running the vision model again.
+    """
+    def __init__(self, history_manager: HistoryManager):
+        """
+        Initializes the ImageHashIndex.
+
+        Args:
+            history_manager (HistoryManager): Where the hashes are persisted.
+        """
+        self.history_manager = history_manager
+        self._lock = threading.Lock()
+        self._buckets = None
+        self._entries = {}
+
+    def _load(self):
+        if self._buckets is not None:
+            return
+        self._buckets = HashBuckets()
+        with tracer.span("image_index.load"):
+            for interaction_id, conversation_id, dhash, description in self.history_manager.get_image_hashes():
+                self._insert(interaction_id, conversation_id, _to_unsigned(dhash), description)
+        logger.debug(f"ImageHashIndex: Loaded {len(self._entries)} image hashes")
+
+    def _insert(self, interaction_id, conversation_id, image_hash, description=None):
+        self._buckets.remove(interaction_id)
+        self._entries[interaction_id] = {
+            "interaction_id": interaction_id,
+            "conversation_id": conversation_id,
+            "hash": image_hash,
+            "description": description,
+        }
+        self._buckets.add(image_hash, interaction_id)
+
+    def add(self, interaction_id, conversation_id, image_hash):
+        """Indexes and stores the hash of a new image interaction."""
+        with self._lock:
+            self._load()
+            self.history_manager.save_image_hash(interaction_id, conversation_id, _to_signed(image_hash))
+            self._insert(interaction_id, conversation_id, image_hash)
+
+    def set_description(self, interaction_id, description):
+        """Records the description of an indexed image so near-duplicates can reuse it."""
+        with self._lock:
+            self._load()
+            entry = self._entries.get(interaction_id)
+            if entry is None:
+                return
+            entry["description"] = description
+            self.history_manager.set_image_description(interaction_id, description)
+
+    def find(self, image_hash, max_distance):
+        """
+        Finds indexed images within max_distance bits of a hash.
+
+        Returns:
+            list: Dicts with interaction_id, conversation_id, distance and description, closest first.
+        """
+        with self._lock:
+            self._load()
+            with tracer.span("image_index.search"):
+                matches = self._buckets.search(image_hash, max_distance)
+            return [dict(self._entries[interaction_id], distance=distance) for distance, interaction_id in matches]
+
+    def find_description(self, image_hash, max_distance):
+        """
+        Returns the closest near-duplicate that already has a description, or None.
+        """
+        for match in self.find(image_hash, max_distance):
+            if match["description"]:
+                return match
+        return None
+
+    def find_similar_conversations(self, conversation_id, max_distance):
+        """
+        Finds other conversations containing images similar to those of a conversation.
+
+        Returns:
+            list: Conversation IDs, the one with the closest image first.
+        """
+        with self._lock:
+            self._load()
+            hashes = [entry["hash"] for entry in self._entries.values() if entry["conversation_id"] == conversation_id]
+        best = {}
+        for image_hash in hashes:
+            for match in self.find(image_hash, max_distance):
+                other = match["conversation_id"]
+                if other != conversation_id and match["distance"] < best.get(other, max_distance + 1):
+                    best[other] = match["distance"]
+        return sorted(best, key=lambda other: (best[other], other))
+
+    def remove_conversation(self, conversation_id):
+        """Forgets the images of a deleted conversation."""
+        with self._lock:
+            if self._buckets is None:
+                return
+            for interaction_id in [i for i, e in self._entries.items() if e["conversation_id"] == conversation_id]:
+                del self._entries[interaction_id]
+                self._buckets.remove(interaction_id)
@@ -0,0 +1,282 @@
+"""
+Headless Discord bot service: the bot without the desktop application.
+
+Usage:
+    python -m local_vision.discord_service --health-port 8766
+    LOCAL_VISION_DISCORD_TOKEN=... python -m local_vision.discord_service --config /etc/local_vision/config.ini
+
+The bot runs on the main event loop; nothing from tkinter, customtkinter or the
+TTS engine is imported. Settings come from the [Settings] and [DiscordService]
+sections of the config file, overridden by LOCAL_VISION_* environment variables
+(see ENVIRONMENT), overridden by the command line.
+
+Health is reported as a JSON file rewritten every few seconds and/or on
+GET http://<health-host>:<health-port>/health (200 when ready, 503 otherwise).
+On SIGTERM or SIGINT the bot stops accepting messages, waits up to DrainTimeout
+seconds for the descriptions in flight to be replied, cancels the rest and exits.
+"""
+import argparse
+import asyncio
+import configparser
+import datetime
+import logging
+import os
+import signal
+import sys
+import time
+
+import msgspec
+
+from local_vision.logging_setup import configure_logging_from_config
+from local_vision.logic.discord_bot import DiscordBot
+from local_vision.logic.llm_manager import LLM_Manager
+from local_vision.logic.model_supervisor import ModelSupervisor
+from local_vision.logic.response_profiles import parse_channel_profiles, read_profiles
+
+logger = logging.getLogger(__name__)
+
+# Environment variable -> (config section, option) it overrides.
+ENVIRONMENT = {
+    "LOCAL_VISION_DISCORD_TOKEN": ("Settings", "DiscordToken"),
+    "LOCAL_VISION_MODEL": ("Settings", "ModelIdentifier"),
+    "LOCAL_VISION_BASE_URL": ("DiscordService", "BaseUrl"),
+    "LOCAL_VISION_CONCURRENCY": ("DiscordService", "Concurrency"),
+    "LOCAL_VISION_HEALTH_FILE": ("DiscordService", "HealthFile"),
+    "LOCAL_VISION_HEALTH_PORT": ("DiscordService", "HealthPort"),
+    "LOCAL_VISION_DRAIN_TIMEOUT": ("DiscordService", "DrainTimeout"),
+}
+
+
+def read_config(path, environ=None):
+    """
+    Reads the config file and applies the LOCAL_VISION_* environment overrides.
+
+    Returns:
+        configparser.ConfigParser: The merged settings.
+    """
+    environ = os.environ if environ is None else environ
+    config = configparser.ConfigParser()
+    config.read(path)
+    for variable, (section, option) in ENVIRONMENT.items():
+        if environ.get(variable):
+            if not config.has_section(section):
+                config.add_section(section)
+            config.set(section, option, environ[variable])
+    return config
+
+
+class DiscordService:
+    """
+    Runs a DiscordBot until a stop signal, reporting its health and draining it on the way out.
+
+    status is "starting" until the bot connects, then "ready", "draining" after a
+    stop signal and "stopped" at the end.
+    """
+    HEALTH_INTERVAL = 5.0
+
+    def __init__(self, bot, llm_manager, health_file=None, health_port=None, health_host="127.0.0.1",
+                 drain_timeout=60.0):
+        """
+        Initializes the DiscordService.
+
+        Args:
+            bot (DiscordBot): The bot to run.
+            llm_manager (LLM_Manager): Its model manager; requests still running after the drain are cancelled.
+            health_file (str, optional): JSON file rewritten with the status every HEALTH_INTERVAL seconds.
+            health_port (int, optional): Port of the HTTP health endpoint; 0 picks a free port.
+            health_host (str): Address the health endpoint listens on.
+            drain_timeout (float): Seconds to wait for in-flight descriptions after a stop signal.
+        """
+        self.bot = bot
+        self.llm_manager = llm_manager
+        self.health_file = health_file
+        self.health_port = health_port
+        self.health_host = health_host
+        self.drain_timeout = drain_timeout
+        self.state = "starting"
+        self.started_at = time.monotonic()
+        self._stop = None
+        self._health_server = None
+
+    def status(self):
+        """Returns the health report of the service."""
+        if self.state == "starting" and self.bot.is_ready():
+            self.state = "ready"
+        return {
+            "status": self.state,
+            "connected": self.bot.is_ready(),
+            "in_flight": self.bot.in_flight,
+            "handled": self.bot.handled,
+            "uptime_s": round(time.monotonic() - self.started_at, 1),
+            "time": datetime.datetime.now().isoformat(timespec="seconds"),
+        }
+
+    def request_stop(self, signum=None):
+        """Starts the shutdown; safe to call more than once."""
+        if self._stop is not None and not self._stop.is_set():
+            name = signal.Signals(signum).name if signum else "stop request"
+            logger.info(f"Received {name}, draining {self.bot.in_flight} messages in flight")
+            self._stop.set()
+
+    async def run(self):
+        """
+        Runs the bot until it is stopped or its connection ends.
+
+        Returns:
+            int: 0 after a clean shutdown, 1 if the bot stopped on its own (e.g. a bad token).
+        """
+        self._stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(signum, self.request_stop, signum)
+            except (NotImplementedError, RuntimeError, ValueError):
+                # Windows, or not the main thread.
+                try:
+                    signal.signal(signum, lambda number, frame: loop.call_soon_threadsafe(self.request_stop, number))
+                except ValueError:
+                    pass
+
+        if self.health_port is not None:
+            self._health_server = await asyncio.start_server(self._serve_health, self.health_host, self.health_port)
+            self.health_port = self._health_server.sockets[0].getsockname()[1]
+            logger.info(f"Health endpoint on http://{self.health_host}:{self.health_port}/health")
+
+        bot_task = asyncio.create_task(self.bot.serve())
+        stop_task = asyncio.create_task(self._stop.wait())
+        try:
+            while not bot_task.done() and not self._stop.is_set():
+                self._write_health()
+                await asyncio.wait({bot_task, stop_task}, timeout=self.HEALTH_INTERVAL, return_when=asyncio.FIRST_COMPLETED)
+            crashed = bot_task.done()
+            await self._shutdown(bot_task)
+        finally:
+            stop_task.cancel()
+            if self._health_server is not None:
+                self._health_server.close()
+                await self._health_server.wait_closed()
+        if crashed and bot_task.exception() is not None:
+            logger.error(f"Discord bot stopped: {bot_task.exception()}")
+        return 1 if crashed else 0
+
+    async def _shutdown(self, bot_task):
+        self.state = "draining"
+        self._write_health()
+        remaining = await self.bot.drain(self.drain_timeout)
+        if remaining:
+            logger.warning(f"Drain timed out after {self.drain_timeout:.0f}s, cancelling {remaining} messages")
+            self.llm_manager.cancel(reason="shutdown")
+        await self.bot.close()
+        await asyncio.wait({bot_task}, timeout=5.0)
+        self.state = "stopped"
+        self._write_health()
+        logger.info(f"Discord service stopped after {self.bot.handled} messages")
+
+    def _write_health(self):
+        if not self.health_file:
+            return
+        try:
+            partial = self.health_file + ".partial"
+            with open(partial, "wb") as f:
+                f.write(msgspec.json.encode(self.status()))
+            os.replace(partial, self.health_file)
+        except OSError as e:
+            logger.warning(f"Could not write health file {self.health_file}: {e}")
+
+    async def _serve_health(self, reader, writer):
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=5.0)
+            while (await asyncio.wait_for(reader.readline(), timeout=5.0)).strip():
+                pass
+            parts = request_line.decode("latin-1").split()
+            if len(parts) >= 2 and parts[1].split("?")[0] in ("/", "/health"):
+                report = self.status()
+                status = 200 if report["status"] == "ready" else 503
+                body = msgspec.json.encode(report)
+            else:
+                status, body = 404, b'{"error": "not found"}'
+            reason = {200: "OK", 404: "Not Found", 503: "Service Unavailable"}[status]
+            writer.write(
+                f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m local_vision.discord_service",
+        description="Run the Local Vision Discord bot without the desktop application."
+    )
+    parser.add_argument("--config", default="config.ini", help="Config file (default: config.ini).")
+    parser.add_argument("--model", help="LM Studio model identifier (default: ModelIdentifier).")
+    parser.add_argument("--base-url", help="LM Studio server URL (default: http://localhost:1234/v1).")
+    parser.add_argument("--concurrency", type=int, help="Model predictions allowed to run at once (default: 1).")
+    parser.add_argument("--health-file", help="JSON file rewritten with the service status.")
+    parser.add_argument("--health-port", type=int, help="Port of the HTTP health endpoint.")
+    parser.add_argument("--health-host", default="127.0.0.1", help="Address of the HTTP health endpoint.")
+    parser.add_argument("--drain-timeout", type=float, help="Seconds to finish in-flight descriptions on SIGTERM (default: 60).")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    config = read_config(args.config)
+    configure_logging_from_config(config)
+
+    token = config.get('Settings', 'DiscordToken', fallback='').strip()
+    if not token:
+        build_parser().error("no Discord token: set DiscordToken in the config file or LOCAL_VISION_DISCORD_TOKEN")
+    service_config = config['DiscordService'] if config.has_section('DiscordService') else {}
+
+    def setting(value, option, convert, default):
+        """Returns the command line value, else the [DiscordService] option, else the default."""
+        if value is not None:
+            return value
+        configured = service_config.get(option, '').strip()
+        return convert(configured) if configured else default
+
+    try:
+        llm_manager = LLM_Manager(
+            model_identifier=args.model or config.get('Settings', 'ModelIdentifier', fallback='local-model'),
+            base_url=setting(args.base_url, 'BaseUrl', str, "http://localhost:1234/v1"),
+            max_concurrent_requests=setting(args.concurrency, 'Concurrency', int, 1),
+            routes=LLM_Manager.read_routes(config),
+            profiles=read_profiles(config),
+            default_profile=config.get('Settings', 'ResponseProfile', fallback=None)
+        )
+    except Exception as e:
+        # A service manager restarts the service; exit instead of serving without a model.
+        logger.error(f"Could not connect to LM Studio: {e}")
+        return 1
+    model_supervisor = ModelSupervisor(
+        llm_manager, keep_alive_interval=config.getfloat('Settings', 'ModelKeepAliveSeconds', fallback=240.0)
+    )
+    model_supervisor.start()
+    bot = DiscordBot(
+        token,
+        llm_manager,
+        batch_attachments=config.getboolean('Settings', 'DiscordBatchAttachments', fallback=False),
+        streaming_replies=config.getboolean('Settings', 'DiscordStreamingReplies', fallback=False),
+        channel_profiles=parse_channel_profiles(config.get('Settings', 'DiscordChannelProfiles', fallback=''))
+    )
+    service = DiscordService(
+        bot,
+        llm_manager,
+        health_file=setting(args.health_file, 'HealthFile', str, None),
+        health_port=setting(args.health_port, 'HealthPort', int, None),
+        health_host=args.health_host,
+        drain_timeout=setting(args.drain_timeout, 'DrainTimeout', float, 60.0)
+    )
+    try:
+        return asyncio.run(service.run())
+    finally:
+        model_supervisor.stop(timeout=0)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
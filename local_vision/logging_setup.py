@@ -0,0 +1,204 @@
+"""
+Asynchronous, structured logging for every entry point.
+
+Records are put on an in-memory queue by a QueueHandler, which never blocks, and
+a QueueListener thread formats and writes them to the console and a rotating
+JSON-lines file. The Tk, TTS and request threads therefore never wait on disk
+I/O. Subsystems log through named loggers ("local_vision.logic.tts_manager",
+"local_vision.ui.main_window", ...), so each can get its own level, and
+high-frequency events can be rate limited with extra={"sample_key": ...}.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+
+CONSOLE_FORMAT = '%(asctime)s - %(levelname)s - %(name)s - %(message)s'
+
+_STANDARD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listeners = []
+_listeners_lock = threading.Lock()
+
+
+class JSONFormatter(logging.Formatter):
+    """Formats a record as one JSON object per line, including its extra fields."""
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRIBUTES and key not in entry:
+                entry[key] = value if isinstance(value, (str, int, float, bool, type(None))) else repr(value)
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Rate limits records that carry a sample_key.
+
+    At most `burst` records per key pass every `interval` seconds; the next record
+    that passes reports how many were dropped in its "suppressed" field. Records
+    without a sample_key always pass.
+    """
+    def __init__(self, burst=5, interval=10.0, clock=time.monotonic):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._windows = {}
+
+    def filter(self, record):
+        key = getattr(record, "sample_key", None)
+        if key is None:
+            return True
+        now = self.clock()
+        with self._lock:
+            start, passed, suppressed = self._windows.get(key, (now, 0, 0))
+            if now - start >= self.interval:
+                start, passed = now, 0
+            if passed >= self.burst:
+                self._windows[key] = (start, passed, suppressed + 1)
+                return False
+            self._windows[key] = (start, passed + 1, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+def parse_levels(spec):
+    """
+    Parses per-subsystem levels written as "logger=LEVEL, other.logger=LEVEL".
+
+    Returns:
+        dict: Logger name -> level name.
+    """
+    levels = {}
+    for item in (spec or "").split(","):
+        name, _, level = item.partition("=")
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def start_queue_listener(*handlers):
+    """
+    Moves handlers to a background listener thread.
+
+    Returns:
+        logging.handlers.QueueHandler: The handler to attach to loggers instead.
+    """
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    with _listeners_lock:
+        _listeners.append(listener)
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.listener = listener
+    return queue_handler
+
+
+def stop_queue_listener(queue_handler):
+    """Flushes and stops the listener behind a handler from start_queue_listener(); closes any other handler."""
+    listener = getattr(queue_handler, "listener", None)
+    if listener is None:
+        queue_handler.close()
+        return
+    with _listeners_lock:
+        if listener not in _listeners:
+            return
+        _listeners.remove(listener)
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+
+
+def configure_logging(level="INFO", log_file=None, levels=None, max_bytes=5 * 1024 * 1024, backup_count=3,
+                      console=True, sampling=None):
+    """
+    Replaces the root logger's handlers with the asynchronous pipeline.
+
+    Args:
+        level (str): Root level.
+        log_file (str, optional): Rotating JSON-lines log file; None disables file logging.
+        levels (dict, optional): Per-subsystem levels, logger name -> level name.
+        max_bytes (int): Size at which the log file is rotated.
+        backup_count (int): Number of rotated files to keep.
+        console (bool): Also log human-readable lines to stderr.
+        sampling (SamplingFilter, optional): Rate limiter for records with a sample_key.
+
+    Returns:
+        logging.handlers.QueueHandler: The handler installed on the root logger.
+    """
+    handlers = []
+    if console:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(logging.Formatter(CONSOLE_FORMAT, datefmt='%H:%M:%S'))
+        handlers.append(console_handler)
+    if log_file:
+        os.makedirs(os.path.dirname(os.path.abspath(log_file)), exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+        )
+        file_handler.setFormatter(JSONFormatter())
+        handlers.append(file_handler)
+
+    queue_handler = start_queue_listener(*handlers)
+    queue_handler.addFilter(sampling or SamplingFilter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        if getattr(handler, "listener", None) is not None:
+            stop_queue_listener(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+    for name, subsystem_level in (levels or {}).items():
+        logging.getLogger(name).setLevel(subsystem_level)
+    return queue_handler
+
+
+def configure_logging_from_config(config, default_level="INFO", console=True):
+    """
+    Configures logging from the [Logging] section of a ConfigParser.
+
+    Returns:
+        logging.handlers.QueueHandler: The handler installed on the root logger.
+    """
+    return configure_logging(
+        level=config.get('Logging', 'Level', fallback=default_level),
+        log_file=config.get('Logging', 'File', fallback='').strip() or None,
+        levels=parse_levels(config.get('Logging', 'Levels', fallback='')),
+        max_bytes=config.getint('Logging', 'MaxBytes', fallback=5 * 1024 * 1024),
+        backup_count=config.getint('Logging', 'BackupCount', fallback=3),
+        console=console,
+        sampling=SamplingFilter(
+            burst=config.getint('Logging', 'SampleBurst', fallback=5),
+            interval=config.getfloat('Logging', 'SampleIntervalSeconds', fallback=10.0)
+        )
+    )
+
+
+def shutdown_logging():
+    """Flushes queued records and stops every listener thread."""
+    with _listeners_lock:
+        listeners = list(_listeners)
+        _listeners.clear()
+    for listener in listeners:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+
+atexit.register(shutdown_logging)
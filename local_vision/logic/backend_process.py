@@ -0,0 +1,765 @@
+import configparser
+import itertools
+import logging
+import logging.handlers
+import multiprocessing
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from multiprocessing import shared_memory
+
+from PIL import Image
+
+from local_vision.logging_setup import parse_levels
+from local_vision.logic.image_processor import ImageProcessor
+from local_vision.logic.llm_manager import LLM_Manager
+from local_vision.logic.model_supervisor import ModelSupervisor
+from local_vision.logic.request_handle import RequestCancelled, RequestHandle
+from local_vision.records import LLMResult
+from local_vision.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+# Pixel formats copied through shared memory as they are; others are converted to RGBA.
+TRANSFER_MODES = ("L", "RGB", "RGBA")
+
+
+class BackendError(Exception):
+    """An error raised by a call in the backend process."""
+
+
+class BackendUnavailable(BackendError):
+    """Raised when the backend process could not start or has exited."""
+
+
+def write_image(buffer, image):
+    """
+    Copies the pixels of a PIL image into a shared-memory buffer.
+
+    Returns:
+        tuple: (mode, size) to read the image back with, or None if it does not fit.
+    """
+    if image.mode not in TRANSFER_MODES:
+        image = image.convert("RGBA")
+    data = image.tobytes()
+    if len(data) > len(buffer):
+        return None
+    buffer[:len(data)] = data
+    return image.mode, image.size
+
+
+def read_image(buffer, mode, size):
+    """Returns a copy of an image written by write_image, independent of the buffer."""
+    view = buffer[:size[0] * size[1] * len(mode)]
+    try:
+        return Image.frombuffer(mode, size, view, "raw", mode, 0, 1).copy()
+    finally:
+        view.release()
+
+
+def _attach(name):
+    """Attaches to a shared-memory block created by the other process."""
+    # The spawned backend shares the UI process's resource tracker, which already
+    # tracks the block; the creating process unlinks it.
+    return shared_memory.SharedMemory(name=name)
+
+
+class SharedImageSlots:
+    """
+    A fixed pool of shared-memory blocks that carry decoded images between the processes.
+
+    The UI process creates the blocks and the backend attaches to them by name.
+    The backend writes the pixels of a thumbnail into a slot and the UI copies
+    them into a PIL image once, instead of pickling them through the pipe.
+    """
+    def __init__(self, count=4, slot_size=1 << 20, names=None):
+        """
+        Initializes the SharedImageSlots.
+
+        Args:
+            count (int): Number of slots, i.e. images in transit at the same time.
+            slot_size (int): Bytes per slot; 1 MiB holds a 400x400 RGBA thumbnail.
+            names (list, optional): Attach to the blocks with these names instead of creating them.
+        """
+        self._owner = names is None
+        if self._owner:
+            self.blocks = [shared_memory.SharedMemory(create=True, size=slot_size) for _ in range(count)]
+        else:
+            self.blocks = [_attach(name) for name in names]
+        self._free = queue.Queue()
+        for index in range(len(self.blocks)):
+            self._free.put(index)
+
+    @property
+    def names(self):
+        return [block.name for block in self.blocks]
+
+    def acquire(self, timeout=None):
+        """Returns the index of a free slot, waiting for one if all are in use."""
+        return self._free.get(timeout=timeout)
+
+    def release(self, index):
+        self._free.put(index)
+
+    def write(self, index, image):
+        return write_image(self.blocks[index].buf, image)
+
+    def read(self, index, mode, size):
+        return read_image(self.blocks[index].buf, mode, size)
+
+    def close(self):
+        """Detaches from the blocks; the creating process also frees them."""
+        for block in self.blocks:
+            block.close()
+            if self._owner:
+                block.unlink()
+
+
+class _PipeQueue:
+    """Stands in for a queue of the other process: put() sends the item through the pipe."""
+    def __init__(self, backend, kind, token=None):
+        self.backend = backend
+        self.kind = kind
+        self.token = token
+
+    def put(self, item, block=True, timeout=None):
+        self.backend.send((self.kind, self.token, item))
+
+    put_nowait = put
+
+
+class _Backend:
+    """
+    The objects hosted in the backend process and the calls the UI process can make on them.
+
+    Calls that return at once run on the thread reading the pipe, in the order they
+    were sent; the others (BLOCKING) run on a thread pool and reply when done.
+    """
+    CALLS = (
+        "configure", "start_request", "cancel", "cancel_request", "describe_image", "prefetch_image",
+        "summarize_history", "embed", "set_default_profile", "get_routing_stats", "get_profile_stats",
+        "get_prompt_cache_stats", "get_resilience_stats", "supervisor_status", "load_thumbnail",
+        "perceptual_hash", "save_image", "start_discord", "stop_discord",
+    )
+    BLOCKING = (
+        "configure", "describe_image", "prefetch_image", "summarize_history", "embed", "load_thumbnail",
+        "perceptual_hash", "save_image", "start_discord", "stop_discord",
+    )
+
+    def __init__(self, conn, slot_names, keep_alive_interval, llm_factory):
+        self.conn = conn
+        self.keep_alive_interval = keep_alive_interval
+        self.llm_factory = llm_factory
+        self.slots = SharedImageSlots(names=slot_names)
+        self.llm_manager = None
+        self.model_supervisor = None
+        self.discord_bot = None
+        # request_id -> RequestHandle of the running describe_image calls, for cancel_request
+        self._handles = {}
+        self._send_lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="backend-call")
+
+    def send(self, message):
+        with self._send_lock:
+            try:
+                self.conn.send(message)
+            except (OSError, ValueError):
+                # The UI process is gone; serve() stops on the next recv.
+                pass
+
+    def serve(self):
+        """Answers calls until the UI process sends "stop" or closes the pipe."""
+        while True:
+            try:
+                message = self.conn.recv()
+            except (EOFError, OSError):
+                break
+            if message[0] == "stop":
+                break
+            _, call_id, method, args, kwargs = message
+            if method in self.BLOCKING:
+                self._pool.submit(self._call, call_id, method, args, kwargs)
+            else:
+                self._call(call_id, method, args, kwargs)
+        self.shutdown()
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        if self.discord_bot:
+            self.discord_bot.stop_bot()
+        if self.model_supervisor:
+            self.model_supervisor.stop(timeout=0)
+        if self.llm_manager:
+            self.llm_manager.cancel(reason="closed")
+        for handle in list(self._handles.values()):
+            handle.cancel("closed")
+        self.slots.close()
+
+    def _call(self, call_id, method, args, kwargs):
+        try:
+            if method not in self.CALLS:
+                raise AttributeError(f"unknown backend call {method}")
+            reply = (True, getattr(self, method)(*args, **kwargs))
+        except RequestCancelled as e:
+            reply = (False, ("cancelled", e.reason))
+        except Exception as e:
+            logger.debug(f"Backend call {method} failed: {e}", exc_info=True)
+            reply = (False, ("error", f"{e}"))
+        self.send(("reply", call_id, reply))
+
+    def configure(self, llm_settings):
+        """
+        Creates the LLM_Manager (again, when the model changes) and its ModelSupervisor.
+
+        Returns:
+            dict: The settings the UI reads from the manager.
+        """
+        llm_manager = self.llm_factory(**llm_settings)
+        if self.model_supervisor:
+            self.model_supervisor.stop(timeout=0)
+            self.model_supervisor = None
+        self.llm_manager = llm_manager
+        if self.discord_bot:
+            self.discord_bot.llm_manager = llm_manager
+        if self.keep_alive_interval is not None:
+            self.model_supervisor = ModelSupervisor(
+                llm_manager, keep_alive_interval=self.keep_alive_interval,
+                on_state_change=lambda status: self.send(("event", "model_state", status))
+            )
+            self.model_supervisor.start()
+        return {
+            "model_identifier": llm_manager.model_identifier,
+            "routes": dict(llm_manager.routes),
+            "embedding_identifier": llm_manager.embedding_identifier,
+            "default_profile": llm_manager.default_profile,
+        }
+
+    def start_request(self, method, token, request_id, args, kwargs):
+        """Starts an LLM_Manager get_* request whose messages are sent to the UI's result queue token."""
+        with tracer.request(request_id):
+            getattr(self.llm_manager, method)(*args, result_queue=_PipeQueue(self, "queue", token), **kwargs)
+
+    def cancel(self, supersede_key=None, reason="cancelled"):
+        return self.llm_manager.cancel(supersede_key, reason=reason)
+
+    def cancel_request(self, request_id, reason="cancelled"):
+        handle = self._handles.get(request_id)
+        return bool(handle and handle.cancel(reason))
+
+    def describe_image(self, image_path, request_id, profile=None):
+        handle = RequestHandle(request_id)
+        self._handles[request_id] = handle
+        try:
+            with tracer.request(request_id):
+                return self.llm_manager.describe_image(image_path, handle=handle, profile=profile)
+        finally:
+            self._handles.pop(request_id, None)
+
+    def prefetch_image(self, image_path, profile=None):
+        # The upload stays in this process; the UI only waits for it.
+        self.llm_manager.prefetch_image(image_path, profile).result()
+
+    def summarize_history(self, interactions, previous_summary=None):
+        return self.llm_manager.summarize_history(interactions, previous_summary)
+
+    def embed(self, texts):
+        return self.llm_manager.embed(texts)
+
+    def set_default_profile(self, name):
+        self.llm_manager.default_profile = name
+
+    def get_routing_stats(self):
+        return self.llm_manager.get_routing_stats()
+
+    def get_profile_stats(self):
+        return self.llm_manager.get_profile_stats()
+
+    def get_prompt_cache_stats(self):
+        return self.llm_manager.get_prompt_cache_stats()
+
+    def get_resilience_stats(self):
+        return self.llm_manager.get_resilience_stats()
+
+    def supervisor_status(self):
+        return self.model_supervisor.status() if self.model_supervisor else None
+
+    def load_thumbnail(self, filepath, slot, max_size=(400, 400)):
+        image = ImageProcessor.load_thumbnail(filepath, max_size)
+        return self.slots.write(slot, image) if image is not None else None
+
+    def perceptual_hash(self, filepath, hash_size=8):
+        return ImageProcessor.perceptual_hash(filepath, hash_size)
+
+    def save_image(self, name, mode, size, path, image_format="PNG"):
+        block = _attach(name)
+        try:
+            read_image(block.buf, mode, size).save(path, image_format)
+        finally:
+            block.close()
+
+    def start_discord(self, token, options):
+        from local_vision.logic.discord_bot import DiscordBot
+        self.stop_discord()
+        self.discord_bot = DiscordBot(token, self.llm_manager, **options)
+        self.discord_bot.start_bot()
+
+    def stop_discord(self):
+        if self.discord_bot:
+            self.discord_bot.stop_bot()
+            self.discord_bot = None
+
+
+def run_backend(conn, llm_settings, slot_names, keep_alive_interval, llm_factory=LLM_Manager):
+    """Entry point of the backend process."""
+    backend = _Backend(conn, slot_names, keep_alive_interval, llm_factory)
+    # Log records go to the UI process, whose handlers write them, so both
+    # processes share the console and the rotating log file safely.
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(_PipeQueue(backend, "log")))
+    root.setLevel(config.get('Logging', 'Level', fallback='INFO').upper())
+    for name, level in parse_levels(config.get('Logging', 'Levels', fallback='')).items():
+        logging.getLogger(name).setLevel(level)
+
+    try:
+        info = backend.configure(llm_settings)
+    except Exception as e:
+        backend.send(("failed", None, f"{e}"))
+        backend.shutdown()
+        return
+    backend.send(("ready", None, info))
+    backend.serve()
+
+
+class BackendProcess:
+    """
+    Runs the LLM_Manager, the ModelSupervisor, image decoding and the Discord bot in a separate process.
+
+    In one process, the model calls, the SDK's websocket thread, PIL decoding and
+    the Discord loop compete with Tk for the GIL, and the UI stutters under load.
+    Here the UI process keeps only Tk: it talks to the backend over a
+    multiprocessing pipe, through llm_manager (a RemoteLLMManager), model_supervisor
+    and discord_bot(). Decoded thumbnails and pasted images cross through shared
+    memory. load_thumbnail and perceptual_hash match ImageProcessor, so the backend
+    can stand in for it in ImageQueue.
+
+    The process is started with the "spawn" method, so the entry script must
+    guard the application start with if __name__ == "__main__".
+    """
+    START_TIMEOUT = 60.0
+    CALL_TIMEOUT = 5.0
+
+    def __init__(self, keep_alive_interval=240.0, on_event=None, thumbnail_slots=4, llm_factory=LLM_Manager):
+        """
+        Initializes the BackendProcess.
+
+        Args:
+            keep_alive_interval (float): Passed to the ModelSupervisor of the backend;
+                None runs no supervisor.
+            on_event (callable, optional): Called from the reader thread with (name, payload)
+                for events of the backend, such as ("model_state", status).
+            thumbnail_slots (int): Thumbnails decoded at the same time.
+            llm_factory (callable): Creates the manager in the backend from the LLM settings;
+                must be importable by the backend process.
+        """
+        self.keep_alive_interval = keep_alive_interval
+        self.llm_factory = llm_factory
+        self.on_event = on_event
+        self.thumbnail_slots = thumbnail_slots
+        self.process = None
+        self.slots = None
+        self.llm_manager = None
+        self.model_supervisor = RemoteModelSupervisor(self)
+        self._conn = None
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        # call_id -> Future of the calls awaiting a reply
+        self._calls = {}
+        # token -> (result queue, request_id) of the requests still producing messages
+        self._queues = {}
+
+    @property
+    def is_running(self):
+        return self.process is not None and self.process.is_alive()
+
+    def start(self, llm_settings):
+        """
+        Starts the backend process and creates its LLM_Manager.
+
+        Args:
+            llm_settings (dict): Keyword arguments of LLM_Manager.
+
+        Raises:
+            BackendUnavailable: If the process did not start or the LLM_Manager failed
+                (for example because LM Studio is not running).
+        """
+        context = multiprocessing.get_context("spawn")
+        self.slots = SharedImageSlots(self.thumbnail_slots)
+        self._conn, child = context.Pipe()
+        self.process = context.Process(
+            target=run_backend,
+            args=(child, llm_settings, self.slots.names, self.keep_alive_interval, self.llm_factory),
+            name="local-vision-backend", daemon=True
+        )
+        self.process.start()
+        child.close()
+        while True:
+            if not self._conn.poll(self.START_TIMEOUT):
+                self.close()
+                raise BackendUnavailable("The backend process did not start in time.")
+            try:
+                kind, _, content = self._conn.recv()
+            except (EOFError, OSError):
+                self.close()
+                raise BackendUnavailable("The backend process exited during startup.")
+            if kind == "log":
+                self._log(content)
+            elif kind == "failed":
+                self.close()
+                raise BackendUnavailable(content)
+            elif kind == "ready":
+                break
+        self.llm_manager = RemoteLLMManager(self, content)
+        threading.Thread(target=self._read, name="backend-reader", daemon=True).start()
+        logger.info(f"Backend process {self.process.pid} started")
+
+    def reconfigure(self, llm_settings):
+        """Replaces the LLM_Manager of the backend, e.g. after a model change."""
+        self.llm_manager._update(self.call("configure", llm_settings).result())
+
+    def call(self, method, *args, **kwargs):
+        """
+        Calls a method of the backend.
+
+        Returns:
+            Future: Resolves to the result, or raises RequestCancelled, BackendError
+            or BackendUnavailable.
+        """
+        future = Future()
+        call_id = next(self._ids)
+        with self._lock:
+            self._calls[call_id] = future
+        try:
+            self._send(("call", call_id, method, args, kwargs))
+        except BackendUnavailable as e:
+            with self._lock:
+                self._calls.pop(call_id, None)
+            future.set_exception(e)
+        return future
+
+    def request(self, method, *args, timeout=CALL_TIMEOUT, **kwargs):
+        """Calls a method of the backend and waits for its result."""
+        try:
+            return self.call(method, *args, **kwargs).result(timeout)
+        except FutureTimeoutError:
+            raise BackendUnavailable(f"The backend did not answer {method} in {timeout:.0f}s.") from None
+
+    def register_queue(self, result_queue, request_id):
+        """Returns the token under which the backend sends the messages of a request to result_queue."""
+        token = next(self._ids)
+        with self._lock:
+            self._queues[token] = (result_queue, request_id)
+        return token
+
+    def drop_queue(self, token):
+        """
+        Forgets a result queue whose request will send nothing more.
+
+        Returns:
+            bool: False if it was already gone, i.e. its final message was delivered.
+        """
+        with self._lock:
+            return self._queues.pop(token, None) is not None
+
+    def _send(self, message):
+        with self._send_lock:
+            try:
+                self._conn.send(message)
+            except (OSError, ValueError, AttributeError):
+                raise BackendUnavailable("The backend process is not running.") from None
+
+    def _read(self):
+        """Delivers replies, result messages, log records and events from the backend."""
+        conn = self._conn
+        while True:
+            try:
+                kind, key, content = conn.recv()
+            except (EOFError, OSError):
+                break
+            try:
+                if kind == "reply":
+                    self._reply(key, content)
+                elif kind == "queue":
+                    self._deliver(key, content)
+                elif kind == "log":
+                    self._log(content)
+                elif kind == "event":
+                    self._event(key, content)
+            except Exception as e:
+                logger.error(f"Backend message {kind} failed: {e}", exc_info=True)
+        self._fail_pending()
+
+    def _reply(self, call_id, content):
+        ok, value = content
+        with self._lock:
+            future = self._calls.pop(call_id, None)
+        if future is None:
+            return
+        if ok:
+            future.set_result(value)
+        elif value[0] == "cancelled":
+            future.set_exception(RequestCancelled(value[1]))
+        else:
+            future.set_exception(BackendError(value[1]))
+
+    def _deliver(self, token, message):
+        with self._lock:
+            result_queue, _ = self._queues.get(token, (None, None))
+            if isinstance(message, LLMResult):
+                self._queues.pop(token, None)
+        if result_queue is not None:
+            result_queue.put(message)
+
+    @staticmethod
+    def _log(record):
+        record_logger = logging.getLogger(record.name)
+        if record_logger.isEnabledFor(record.levelno):
+            record_logger.handle(record)
+
+    def _event(self, name, payload):
+        if name == "model_state":
+            self.model_supervisor.last_status = payload
+        if self.on_event:
+            self.on_event(name, payload)
+
+    def _fail_pending(self):
+        """Fails the calls and requests left unanswered by a backend that exited."""
+        with self._lock:
+            calls, self._calls = self._calls, {}
+            queues, self._queues = self._queues, {}
+        if calls or queues:
+            logger.error(f"Backend process exited with {len(calls)} calls and {len(queues)} requests pending")
+        for future in calls.values():
+            future.set_exception(BackendUnavailable("The backend process exited."))
+        for result_queue, request_id in queues.values():
+            result_queue.put(LLMResult("error", "Error: The backend process exited.", request_id))
+
+    def load_thumbnail(self, filepath, max_size=(400, 400)):
+        """
+        Decodes a thumbnail in the backend, like ImageProcessor.load_thumbnail.
+
+        Returns:
+            Image: The PIL thumbnail, or None on error.
+        """
+        index = self.slots.acquire()
+        try:
+            shape = self.call("load_thumbnail", filepath, index, max_size).result()
+            return self.slots.read(index, *shape) if shape else None
+        except BackendError as e:
+            logger.warning(f"Error processing image {filepath}: {e}")
+            return None
+        finally:
+            self.slots.release(index)
+
+    def perceptual_hash(self, filepath, hash_size=8):
+        """Computes the dHash of an image in the backend, like ImageProcessor.perceptual_hash."""
+        try:
+            return self.call("perceptual_hash", filepath, hash_size).result()
+        except BackendError as e:
+            logger.warning(f"Error hashing image {filepath}: {e}")
+            return None
+
+    def save_image(self, image, path, image_format="PNG"):
+        """
+        Encodes and writes a PIL image in the backend.
+
+        Only the raw pixels are copied here, into a shared-memory block; the
+        (slow) encoding runs in the backend.
+
+        Returns:
+            Future: Resolves once the file is written.
+        """
+        if image.mode not in TRANSFER_MODES:
+            image = image.convert("RGBA")
+        block = shared_memory.SharedMemory(create=True, size=max(1, image.size[0] * image.size[1] * len(image.mode)))
+        write_image(block.buf, image)
+        future = self.call("save_image", block.name, image.mode, image.size, path, image_format)
+
+        def release(_):
+            block.close()
+            block.unlink()
+
+        future.add_done_callback(release)
+        return future
+
+    def discord_bot(self, token, **options):
+        """Returns a RemoteDiscordBot running in the backend, with DiscordBot's options."""
+        return RemoteDiscordBot(self, token, options)
+
+    def close(self, timeout=2.0):
+        """Stops the backend process and frees the shared memory."""
+        if self.process is None:
+            return
+        try:
+            self._send(("stop", None, None, None, None))
+        except BackendUnavailable:
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            logger.warning("Backend process did not stop, terminating it")
+            self.process.terminate()
+            self.process.join(1.0)
+        self._conn.close()
+        self.slots.close()
+        self.process = None
+
+
+class RemoteLLMManager:
+    """
+    Stands in for the LLM_Manager of a BackendProcess, with the methods the UI process uses.
+
+    The get_* requests run in the backend and their messages arrive on the
+    caller's result queue as usual; the handles they return only carry the
+    request_id, so cancel them with cancel(). The other methods wait for the
+    backend's answer.
+    """
+    def __init__(self, backend, info):
+        """
+        Initializes the RemoteLLMManager.
+
+        Args:
+            backend (BackendProcess): The process hosting the LLM_Manager.
+            info (dict): The settings of the manager, as returned by the backend.
+        """
+        self.backend = backend
+        self._update(info)
+
+    def _update(self, info):
+        self.model_identifier = info["model_identifier"]
+        self.routes = info["routes"]
+        self.embedding_identifier = info["embedding_identifier"]
+        self._default_profile = info["default_profile"]
+
+    @property
+    def default_profile(self):
+        return self._default_profile
+
+    @default_profile.setter
+    def default_profile(self, name):
+        self._default_profile = name
+        self.backend.call("set_default_profile", name)
+
+    def _start(self, method, args, kwargs, result_queue, supersede_key):
+        handle = RequestHandle(tracer.current_request_id() or tracer.new_request_id(), supersede_key)
+        token = self.backend.register_queue(result_queue, handle.request_id)
+        kwargs["supersede_key"] = supersede_key
+        future = self.backend.call("start_request", method, token, handle.request_id, args, kwargs)
+        future.add_done_callback(lambda started: self._check_started(started, token, result_queue, handle.request_id))
+        return handle
+
+    def _check_started(self, started, token, result_queue, request_id):
+        """Queues an error result for a request the backend could not start, so the caller is not left waiting."""
+        error = started.exception()
+        if error is not None and self.backend.drop_queue(token):
+            logger.error(f"Backend could not start request {request_id}: {error}")
+            result_queue.put(LLMResult("error", f"Error: {error}", request_id))
+
+    def get_image_description(self, image_path, result_queue, stream=False, supersede_key=None, profile=None):
+        return self._start(
+            "get_image_description", (image_path,), {"stream": stream, "profile": profile}, result_queue, supersede_key
+        )
+
+    def get_images_description(self, image_paths, result_queue, max_images_per_request=None, supersede_key=None,
+                               profile=None):
+        return self._start(
+            "get_images_description", (list(image_paths),),
+            {"max_images_per_request": max_images_per_request, "profile": profile}, result_queue, supersede_key
+        )
+
+    def get_text_response(self, message, conversation_history, result_queue, stream=False, supersede_key=None,
+                          conversation_key=None, profile=None):
+        return self._start(
+            "get_text_response", (message, list(conversation_history)),
+            {"stream": stream, "conversation_key": conversation_key, "profile": profile}, result_queue, supersede_key
+        )
+
+    def cancel(self, supersede_key=None, reason="cancelled"):
+        try:
+            return self.backend.request("cancel", supersede_key, reason)
+        except BackendError as e:
+            logger.warning(f"Could not cancel requests in the backend: {e}")
+            return 0
+
+    def describe_image(self, image_path, handle=None, profile=None):
+        """Describes an image, waiting for the result; cancelling the handle cancels the backend's request."""
+        request_id = handle.request_id if handle else tracer.current_request_id() or tracer.new_request_id()
+        future = self.backend.call("describe_image", image_path, request_id, profile)
+        cancel_sent = False
+        while True:
+            try:
+                return future.result(timeout=0.1)
+            except FutureTimeoutError:
+                if handle and handle.is_cancelled() and not cancel_sent:
+                    self.backend.call("cancel_request", request_id, handle.reason)
+                    cancel_sent = True
+
+    def prefetch_image(self, image_path, profile=None):
+        return self.backend.call("prefetch_image", image_path, profile)
+
+    def summarize_history(self, interactions, previous_summary=None):
+        return self.backend.call("summarize_history", list(interactions), previous_summary).result()
+
+    def embed(self, texts):
+        return self.backend.call("embed", list(texts)).result()
+
+    def get_routing_stats(self):
+        return self.backend.request("get_routing_stats")
+
+    def get_profile_stats(self):
+        return self.backend.request("get_profile_stats")
+
+    def get_prompt_cache_stats(self):
+        return self.backend.request("get_prompt_cache_stats")
+
+    def get_resilience_stats(self):
+        return self.backend.request("get_resilience_stats")
+
+
+class RemoteModelSupervisor:
+    """The ModelSupervisor of a BackendProcess, as seen from the UI process."""
+    def __init__(self, backend):
+        self.backend = backend
+        # The last "model_state" event of the backend.
+        self.last_status = None
+
+    def is_loading(self):
+        return bool(self.last_status) and self.last_status["state"] == ModelSupervisor.LOADING
+
+    def status(self):
+        return self.backend.request("supervisor_status")
+
+    def stop(self, timeout=None):
+        # Runs as long as the backend process.
+        pass
+
+
+class RemoteDiscordBot:
+    """A DiscordBot running in a BackendProcess, with the start/stop interface of DiscordBot."""
+    def __init__(self, backend, token, options):
+        self.backend = backend
+        self.token = token
+        self.options = options
+        self.is_running = False
+
+    def start_bot(self):
+        self.backend.request("start_discord", self.token, self.options)
+        self.is_running = True
+
+    def stop_bot(self):
+        if self.is_running:
+            self.is_running = False
+            self.backend.request("stop_discord")
@@ -1,25 +1,41 @@
 import discord
 import threading
 import asyncio
+import hashlib
 import os
 import tempfile
+import time
 import logging
 from local_vision.logic.llm_manager import LLM_Manager
 
+logger = logging.getLogger(__name__)
+
 class DiscordBot(discord.Client):
     """
     A simple Discord bot that listens for images and replies with descriptions.
     """
-    def __init__(self, token, llm_manager: LLM_Manager):
+    MESSAGE_LIMIT = 2000
+    EDIT_INTERVAL = 1.5
+
+    def __init__(self, token, llm_manager: LLM_Manager, batch_attachments=False, streaming_replies=False,
+                 channel_profiles=None):
         intents = discord.Intents.default()
         intents.message_content = True
         super().__init__(intents=intents)
         
         self.token = token
         self.llm_manager = llm_manager
+        self.batch_attachments = batch_attachments
+        self.streaming_replies = streaming_replies
+        # Discord channel ID -> response profile name; other channels use the default profile.
+        self.channel_profiles = channel_profiles or {}
         self.loop = asyncio.new_event_loop()
         self.thread = threading.Thread(target=self._run_loop, daemon=True)
         self.is_running = False
+        # Cleared by drain(): new messages are ignored while the ones in flight finish.
+        self.accepting = True
+        self.in_flight = 0
+        self.handled = 0
 
     def start_bot(self):
         """Starts the bot in a separate thread."""
@@ -34,27 +50,67 @@ class DiscordBot(discord.Client):
             asyncio.run_coroutine_threadsafe(self.close(), self.loop)
             self.thread.join(timeout=2.0)
 
+    async def serve(self):
+        """Runs the bot on the running event loop, instead of the thread of start_bot, until it is closed."""
+        # The loop created for start_bot is not used.
+        self.loop.close()
+        self.loop = asyncio.get_running_loop()
+        self.is_running = True
+        try:
+            await self.start(self.token)
+        finally:
+            self.is_running = False
+
+    async def drain(self, timeout=60.0):
+        """
+        Stops accepting messages and waits for the descriptions in flight to be replied.
+
+        Returns:
+            int: The number of messages still in flight when the timeout expired.
+        """
+        self.accepting = False
+        deadline = time.monotonic() + timeout
+        while self.in_flight and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        return self.in_flight
+
     def _run_loop(self):
         """Runs the asyncio loop for the bot."""
         asyncio.set_event_loop(self.loop)
         try:
             self.loop.run_until_complete(self.start(self.token))
         except Exception as e:
-            logging.error(f"Discord Bot Error: {e}")
+            logger.error(f"Discord Bot Error: {e}")
         finally:
             self.loop.close()
 
     async def on_ready(self):
-        logging.info(f'Discord Bot connected as {self.user}')
+        logger.info(f'Discord Bot connected as {self.user}')
 
     async def on_message(self, message):
-        if message.author == self.user:
+        if message.author == self.user or not self.accepting:
             return
 
-        if message.attachments:
-            for attachment in message.attachments:
-                if attachment.content_type and attachment.content_type.startswith('image/'):
+        images = [
+            attachment for attachment in message.attachments
+            if attachment.content_type and attachment.content_type.startswith('image/')
+        ]
+        if not images:
+            return
+        self.in_flight += 1
+        try:
+            if self.batch_attachments and len(images) > 1:
+                await self._process_images(message, images)
+            else:
+                for attachment in images:
                     await self._process_image(message, attachment)
+        finally:
+            self.in_flight -= 1
+            self.handled += 1
+
+    def _profile_for(self, message):
+        """Returns the response profile configured for the channel of a message, or None for the default."""
+        return self.channel_profiles.get(getattr(message.channel, "id", None))
 
     async def _process_image(self, message, attachment):
         """Downloads image, gets description, and replies."""
@@ -66,18 +122,162 @@ class DiscordBot(discord.Client):
             import queue
             temp_queue = queue.Queue()
             
-            self.llm_manager.get_image_description(temp_path, temp_queue)
-            
-            response = await self.loop.run_in_executor(None, temp_queue.get)
-            
-            if response['type'] == 'description':
-                await message.reply(f"**Análise da Imagem:**\n{response['content']}")
+            if self.streaming_replies:
+                self.llm_manager.get_image_description(
+                    temp_path, temp_queue, stream=True, profile=self._profile_for(message)
+                )
+                await self._stream_reply(message, temp_queue)
             else:
-                await message.reply(f"Erro ao analisar imagem: {response.get('content')}")
+                self.llm_manager.get_image_description(temp_path, temp_queue, profile=self._profile_for(message))
+
+                response = await self.loop.run_in_executor(None, temp_queue.get)
+
+                if response['type'] == 'description':
+                    await self._send_reply(message, f"**Análise da Imagem:**\n{response['content']}")
+                else:
+                    await message.reply(f"Erro ao analisar imagem: {response.get('content')}")
 
             if os.path.exists(temp_path):
                 os.remove(temp_path)
 
         except Exception as e:
-            logging.error(f"Error processing Discord image: {e}")
+            logger.error(f"Error processing Discord image: {e}")
             await message.reply("Ocorreu um erro ao processar sua imagem.")
+
+    async def _process_images(self, message, attachments):
+        """Downloads all images of a message, describes them in one model call and replies once."""
+        temp_paths = []
+        try:
+            unique_paths = []
+            # Hash -> (attachment position, image number in the description) of its first occurrence.
+            first_by_hash = {}
+            duplicates = []
+            for index, attachment in enumerate(attachments, start=1):
+                with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as temp_file:
+                    await attachment.save(temp_file.name)
+                    temp_path = temp_file.name
+                temp_paths.append(temp_path)
+
+                digest = await self.loop.run_in_executor(None, self._file_sha256, temp_path)
+                if digest in first_by_hash:
+                    duplicates.append((index, *first_by_hash[digest]))
+                    continue
+                first_by_hash[digest] = (index, len(unique_paths) + 1)
+                unique_paths.append(temp_path)
+
+            import queue
+            temp_queue = queue.Queue()
+
+            self.llm_manager.get_images_description(unique_paths, temp_queue, profile=self._profile_for(message))
+
+            response = await self.loop.run_in_executor(None, temp_queue.get)
+
+            if response['type'] == 'description':
+                reply = f"**Análise das Imagens:**\n{response['content']}"
+                for index, original, image_number in duplicates:
+                    reply += f"\n\nAnexo {index} é idêntico ao Anexo {original} (Imagem {image_number})."
+                await self._send_reply(message, reply)
+            else:
+                await message.reply(f"Erro ao analisar imagens: {response.get('content')}")
+
+        except Exception as e:
+            logger.error(f"Error processing Discord images: {e}")
+            await message.reply("Ocorreu um erro ao processar suas imagens.")
+        finally:
+            for temp_path in temp_paths:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+
+    async def _stream_reply(self, message, result_queue):
+        """
+        Posts a placeholder reply and progressively edits it with the streamed text.
+
+        Edits are throttled to EDIT_INTERVAL seconds to stay within Discord's edit
+        rate limits, and text beyond MESSAGE_LIMIT continues in follow-up replies.
+        """
+        header = "**Análise da Imagem:**\n"
+        placeholder = await message.reply("Analisando imagem...")
+        sent = [[placeholder, "Analisando imagem..."]]
+        text = ""
+        last_edit = 0.0
+
+        while True:
+            responses = [await self.loop.run_in_executor(None, result_queue.get)]
+            while not result_queue.empty():
+                responses.append(result_queue.get_nowait())
+
+            final = None
+            for response in responses:
+                if response['type'] == 'stream_start':
+                    text = ""
+                elif response['type'] == 'fragment':
+                    text += response['content']
+                else:
+                    final = response
+
+            if final is not None:
+                break
+
+            now = self.loop.time()
+            if text and now - last_edit >= self.EDIT_INTERVAL:
+                await self._render_chunks(sent, header + text)
+                last_edit = now
+
+        if final['type'] == 'description':
+            await self._render_chunks(sent, header + final['content'])
+        else:
+            await self._render_chunks(sent, f"Erro ao analisar imagem: {final.get('content')}")
+
+    async def _render_chunks(self, sent, text):
+        """
+        Makes the bot's reply chain show the given text, editing messages that changed,
+        adding follow-up replies for overflow and deleting replies no longer needed.
+        """
+        chunks = self._split_message(text)
+        for index, chunk in enumerate(chunks):
+            if index < len(sent):
+                reply, shown = sent[index]
+                if chunk != shown:
+                    await reply.edit(content=chunk)
+                    sent[index][1] = chunk
+            else:
+                reply = await sent[-1][0].reply(chunk)
+                sent.append([reply, chunk])
+
+        while len(sent) > len(chunks):
+            reply, _ = sent.pop()
+            await reply.delete()
+
+    async def _send_reply(self, message, text):
+        """Replies with the text, continuing in follow-up replies past the Discord length limit."""
+        reply = message
+        for chunk in self._split_message(text):
+            reply = await reply.reply(chunk)
+
+    @classmethod
+    def _split_message(cls, text, limit=None):
+        """
+        Splits text into chunks no longer than the Discord message limit,
+        preferring to break at a newline in the second half of the chunk, then at a space.
+        """
+        limit = limit or cls.MESSAGE_LIMIT
+        chunks = []
+        while len(text) > limit:
+            cut = text.rfind("\n", 0, limit + 1)
+            if cut < limit // 2:
+                cut = text.rfind(" ", 0, limit + 1)
+            if cut <= 0:
+                cut = limit
+            chunks.append(text[:cut])
+            text = text[cut:].lstrip("\n ")
+        chunks.append(text)
+        return chunks
+
+    @staticmethod
+    def _file_sha256(path):
+        """Returns the SHA-256 hex digest of a file's contents."""
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
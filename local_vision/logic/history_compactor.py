@@ -0,0 +1,83 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class HistoryCompactor:
+    """
+    Summarizes older turns of long conversations into checkpoints in the background.
+
+    Context for a new turn is built from the latest checkpoint plus the interactions
+    after it (HistoryManager.get_context). Once more than compact_after interactions
+    follow the checkpoint, all but the keep_recent most recent ones are folded into
+    a new checkpoint, so both the rows read per turn and the prompt stay bounded.
+    """
+    def __init__(self, llm_manager, history_manager, compact_after=24, keep_recent=8):
+        """
+        Initializes the HistoryCompactor.
+
+        Args:
+            llm_manager (LLM_Manager): Used to write the summaries.
+            history_manager (HistoryManager): Where checkpoints are read and stored.
+            compact_after (int): Interactions after the checkpoint that trigger a compaction;
+                0 disables compaction.
+            keep_recent (int): Most recent interactions left out of the summary.
+        """
+        self.llm_manager = llm_manager
+        self.history_manager = history_manager
+        self.compact_after = compact_after
+        self.keep_recent = keep_recent
+        self._lock = threading.Lock()
+        self._running = set()
+        self.compactions = 0
+
+    def context_limit(self):
+        """Returns how many interactions after the checkpoint to read for a turn."""
+        return self.compact_after + self.keep_recent if self.compact_after else None
+
+    def maybe_compact(self, conversation_id):
+        """Starts a background compaction of the conversation unless one is already running."""
+        if not self.compact_after:
+            return
+        with self._lock:
+            if conversation_id in self._running:
+                return
+            self._running.add(conversation_id)
+
+        def worker():
+            try:
+                self.compact(conversation_id)
+            except Exception as e:
+                logger.warning(f"HistoryCompactor: Compaction of conversation {conversation_id} failed: {e}")
+            finally:
+                with self._lock:
+                    self._running.discard(conversation_id)
+
+        thread = threading.Thread(target=worker, name="history-compactor", daemon=True)
+        thread.start()
+
+    def compact(self, conversation_id):
+        """
+        Writes a new checkpoint for the conversation if it has grown enough.
+
+        Returns:
+            int: The ID of the new checkpoint, or None if nothing was compacted.
+        """
+        checkpoint = self.history_manager.get_latest_checkpoint(conversation_id)
+        upto = checkpoint["upto_interaction_id"] if checkpoint else 0
+        interactions = self.history_manager.get_interactions_after(conversation_id, upto)
+        if len(interactions) <= self.compact_after:
+            return None
+
+        older = interactions[:len(interactions) - self.keep_recent]
+        summary = self.llm_manager.summarize_history(older, checkpoint["summary"] if checkpoint else None)
+        if not summary:
+            return None
+        checkpoint_id = self.history_manager.save_checkpoint(conversation_id, older[-1]["interaction_id"], summary)
+        self.compactions += 1
+        logger.info(
+            f"HistoryCompactor: Conversation {conversation_id} compacted up to interaction "
+            f"{older[-1]['interaction_id']} ({len(older)} interactions, {len(summary)} characters)"
+        )
+        return checkpoint_id
@@ -1,5 +1,10 @@
+import logging
+
 from PIL import Image
 import customtkinter as ctk
+from local_vision.tracing import tracer
+
+logger = logging.getLogger(__name__)
 
 class ImageProcessor:
     """
@@ -17,12 +22,66 @@ class ImageProcessor:
         Returns:
             CTkImage: A CustomTkinter-compatible image object, or None on error.
         """
+        image = ImageProcessor.load_thumbnail(filepath, max_size)
+        if image is None:
+            return None
+        return ctk.CTkImage(light_image=image, dark_image=image, size=image.size)
+
+    @staticmethod
+    def load_thumbnail(filepath, max_size=(400, 400)):
+        """
+        Decodes an image scaled down to fit max_size.
+
+        Unlike process_and_resize this creates no Tk objects, so it can run in a
+        background thread.
+
+        Args:
+            filepath (str): The path to the image file.
+            max_size (tuple): The maximum width and height for the image.
+
+        Returns:
+            Image: The PIL thumbnail, or None on error.
+        """
         try:
-            image = Image.open(filepath)
-            image.thumbnail(max_size)
+            with tracer.span("image.thumbnail"):
+                image = Image.open(filepath)
+                image.thumbnail(max_size)
+            return image
+        except Exception as e:
+            logger.warning(f"Error processing image {filepath}: {e}")
+            return None
+
+    @staticmethod
+    def perceptual_hash(filepath, hash_size=8):
+        """
+        Computes the difference hash (dHash) of an image.
+
+        The image is reduced to a (hash_size + 1) x hash_size grayscale grid and each
+        bit records whether a pixel is brighter than its right neighbour. Re-encoded,
+        resized or slightly edited copies of an image get hashes that differ in only
+        a few bits, unlike a hash of the file bytes.
 
-            ctk_image = ctk.CTkImage(light_image=image, dark_image=image, size=image.size)
-            return ctk_image
+        Args:
+            filepath (str): The path to the image file.
+            hash_size (int): Grid height; the hash has hash_size * hash_size bits.
+
+        Returns:
+            int: The hash, or None if the image cannot be read.
+        """
+        try:
+            with tracer.span("image.hash"):
+                with Image.open(filepath) as image:
+                    # Lets the JPEG decoder scale down while decoding instead of
+                    # decoding the full-size image first.
+                    image.draft("L", (hash_size * 8, hash_size * 8))
+                    small = image.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.BILINEAR)
+                pixels = small.tobytes()
+            value = 0
+            for row in range(hash_size):
+                offset = row * (hash_size + 1)
+                for col in range(hash_size):
+                    value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+            return value
         except Exception as e:
-            print(f"Error processing image: {e}")
+            logger.warning(f"Error hashing image {filepath}: {e}")
             return None
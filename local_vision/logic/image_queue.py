@@ -0,0 +1,243 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from local_vision.logic.image_processor import ImageProcessor
+from local_vision.logic.request_handle import RequestCancelled, RequestHandle
+from local_vision.records import LLMResult
+from local_vision.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+
+def expand_image_paths(paths):
+    """
+    Expands dropped or selected paths into the image files they name.
+
+    Folders are walked recursively and their images added in path order.
+
+    Returns:
+        tuple: (image paths, paths skipped for an unsupported format)
+    """
+    images, skipped = [], []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                images += [os.path.join(root, name) for name in sorted(files) if name.lower().endswith(IMAGE_EXTENSIONS)]
+        elif path.lower().endswith(IMAGE_EXTENSIONS):
+            images.append(path)
+        elif path:
+            skipped.append(path)
+    return images, skipped
+
+
+class ImageQueueItem:
+    """
+    One image travelling through the ImageQueue.
+
+    stage is one of ImageQueue.STAGES; the result of the item is reported with
+    its request_id, like the results of LLM_Manager requests.
+    """
+    def __init__(self, filepath, request_id, conversation_id=None, interaction_id=None, profile=None):
+        """
+        Initializes the ImageQueueItem.
+
+        Args:
+            filepath (str): The image file.
+            request_id (str): The id carried by the result message of the item.
+            conversation_id (int, optional): The conversation the image was sent to.
+            interaction_id (int, optional): The stored image interaction, to index its hash.
+            profile (str, optional): The response profile of the description.
+        """
+        self.filepath = filepath
+        self.conversation_id = conversation_id
+        self.interaction_id = interaction_id
+        self.profile = profile
+        self.handle = RequestHandle(request_id, conversation_id)
+        self.stage = "queued"
+
+    @property
+    def request_id(self):
+        return self.handle.request_id
+
+    @property
+    def name(self):
+        return os.path.basename(self.filepath)
+
+    @property
+    def finished(self):
+        return self.stage in ImageQueue.FINAL_STAGES
+
+    def progress(self):
+        """Returns the fraction of the pipeline the item has gone through, from 0 to 1."""
+        if self.stage in ImageQueue.FINAL_STAGES:
+            return 1.0
+        return ImageQueue.STAGES.index(self.stage) / (len(ImageQueue.STAGES) - 1)
+
+
+class ImageQueue:
+    """
+    Pipelines images through hashing, thumbnailing, upload and description.
+
+    A prepare thread hashes each image (indexing the hash and looking for a
+    near-duplicate description to reuse), decodes its thumbnail and starts its
+    upload; describe threads then wait for the upload and run the description.
+    So while one image is described, the next ones are already hashed and
+    uploaded. The descriptions also pass through the LLM_Manager scheduler, which
+    bounds the predictions of every caller.
+
+    Progress is reported on result_queue as {"type": "queue_progress", "item": item,
+    "stage": stage} messages, thumbnails as {"type": "queue_thumbnail", "item": item,
+    "content": image} (a PIL image or None), and the outcome with the usual result
+    messages ("description", "error" or "cancelled") carrying the item's request_id.
+    """
+    STAGES = ("queued", "hash", "thumbnail", "upload", "describe", "done")
+    FINAL_STAGES = ("done", "failed", "cancelled")
+
+    def __init__(self, llm_manager, result_queue, image_index=None, reuse_distance=None, concurrency=2,
+                 image_processor=ImageProcessor):
+        """
+        Initializes the ImageQueue.
+
+        Args:
+            llm_manager (LLM_Manager): Uploads and describes the images; None reports an error per image.
+            result_queue (queue.Queue): Where progress and results are put.
+            image_index (ImageHashIndex, optional): Indexes the perceptual hashes of the images.
+            reuse_distance (int, optional): When set, an image within this many bits of an
+                already described one reuses its description.
+            concurrency (int): Images described at the same time.
+            image_processor: Provides perceptual_hash and load_thumbnail, like ImageProcessor
+                (the default) or a BackendProcess.
+        """
+        self.llm_manager = llm_manager
+        self.result_queue = result_queue
+        self.image_index = image_index
+        self.reuse_distance = reuse_distance
+        self.image_processor = image_processor
+        self.completed = 0
+        self._items = {}
+        self._lock = threading.Lock()
+        self._prepare = ThreadPoolExecutor(max_workers=1, thread_name_prefix="image-prepare")
+        self._describe = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="image-describe")
+
+    def add(self, filepath, conversation_id=None, interaction_id=None, profile=None, request_id=None):
+        """
+        Queues an image for description.
+
+        Returns:
+            ImageQueueItem: The queued item.
+        """
+        item = ImageQueueItem(filepath, request_id or tracer.new_request_id(), conversation_id, interaction_id, profile)
+        with self._lock:
+            self._items[item.request_id] = item
+        self._prepare.submit(self._prepare_item, item)
+        return item
+
+    def pending(self):
+        """Returns the unfinished items, in the order they were queued."""
+        with self._lock:
+            return list(self._items.values())
+
+    def cancel(self, request_id=None, conversation_id=None, reason="cancelled"):
+        """
+        Cancels unfinished items; a running description is aborted.
+
+        Args:
+            request_id (str, optional): Only cancel this item.
+            conversation_id (int, optional): Only cancel the items of this conversation.
+            reason (str): Reported as the content of the "cancelled" result message.
+
+        Returns:
+            int: The number of items that were cancelled.
+        """
+        items = [
+            item for item in self.pending()
+            if (request_id is None or item.request_id == request_id)
+            and (conversation_id is None or item.conversation_id == conversation_id)
+        ]
+        return sum(item.handle.cancel(reason) for item in items)
+
+    def shutdown(self):
+        """Cancels every item and stops the worker threads."""
+        self.cancel(reason="closed")
+        self._prepare.shutdown(wait=False, cancel_futures=True)
+        self._describe.shutdown(wait=False, cancel_futures=True)
+
+    def _advance(self, item, stage):
+        item.stage = stage
+        self.result_queue.put({"type": "queue_progress", "item": item, "stage": stage})
+
+    def _finish(self, item, result_type, content):
+        with self._lock:
+            self._items.pop(item.request_id, None)
+            if result_type == "description":
+                self.completed += 1
+        self._advance(item, {"description": "done", "cancelled": "cancelled"}.get(result_type, "failed"))
+        self.result_queue.put(LLMResult(result_type, content, item.request_id, time.perf_counter()))
+
+    def _prepare_item(self, item):
+        with tracer.request(item.request_id):
+            try:
+                item.handle.check()
+                self._advance(item, "hash")
+                with tracer.span("queue.hash"):
+                    image_hash = self.image_processor.perceptual_hash(item.filepath)
+                reused = None
+                if image_hash is not None and self.image_index is not None:
+                    if item.interaction_id:
+                        self.image_index.add(item.interaction_id, item.conversation_id, image_hash)
+                    if self.reuse_distance is not None:
+                        reused = self.image_index.find_description(image_hash, self.reuse_distance)
+
+                item.handle.check()
+                self._advance(item, "thumbnail")
+                with tracer.span("queue.thumbnail"):
+                    thumbnail = self.image_processor.load_thumbnail(item.filepath)
+                self.result_queue.put({"type": "queue_thumbnail", "item": item, "content": thumbnail})
+                if thumbnail is None:
+                    self._finish(item, "error", "Falha ao carregar a imagem. Tente novamente.")
+                    return
+
+                if reused is not None:
+                    logger.info(
+                        f"Reusing the description of image {reused['interaction_id']} (distance {reused['distance']})"
+                    )
+                    self._finish(item, "description", reused["description"])
+                    return
+                if self.llm_manager is None:
+                    self._finish(item, "error", "Error: LLM not connected. Cannot process image.")
+                    return
+
+                item.handle.check()
+                self._advance(item, "upload")
+                upload = self.llm_manager.prefetch_image(item.filepath, item.profile)
+                self._describe.submit(self._describe_item, item, upload)
+            except RequestCancelled as e:
+                self._finish(item, "cancelled", e.reason)
+            except Exception as e:
+                logger.error(f"ImageQueue: Preparing {item.filepath} failed: {e}", exc_info=True)
+                self._finish(item, "error", f"An unexpected error occurred: {e}")
+
+    def _describe_item(self, item, upload):
+        with tracer.request(item.request_id), tracer.span("llm.request", kind="queued_image"):
+            try:
+                item.handle.check()
+                try:
+                    with tracer.span("queue.upload_wait"):
+                        upload.result()
+                except Exception as e:
+                    # describe_image uploads the image again, with retries.
+                    logger.debug(f"ImageQueue: Upload of {item.filepath} failed, retrying with the description: {e}")
+                item.handle.check()
+                self._advance(item, "describe")
+                description = self.llm_manager.describe_image(item.filepath, handle=item.handle, profile=item.profile)
+                self._finish(item, "description", description)
+            except RequestCancelled as e:
+                self._finish(item, "cancelled", e.reason)
+            except Exception as e:
+                self._finish(item, "error", f"An unexpected error occurred: {e}")
@@ -2,125 +2,803 @@ import lmstudio as lms
 import threading
 import queue
 import logging
+import hashlib
+import io
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from PIL import Image
+from local_vision.logic.prompt_cache import PromptPrefixCache
+from local_vision.logic.request_handle import RequestCancelled, RequestHandle
+from local_vision.logic.request_scheduler import RequestScheduler
+from local_vision.logic.resilience import RetryExecutor
+from local_vision.logic.response_profiles import DEFAULT_PROFILE, DEFAULT_PROFILES, ResponseProfile
+from local_vision.logic.text_normalizer import MarkdownStreamStripper, strip_markdown
+from local_vision.records import LLMResult
+from local_vision.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+
+def _sdk_error_types(*names):
+    """Returns the lmstudio exception classes with the given names that exist in the installed SDK."""
+    return tuple(t for t in (getattr(lms, name, None) for name in names) if isinstance(t, type))
+
 
 class LLM_Manager:
     """
     Manages interactions with the LM Studio local server using the native lmstudio SDK.
     """
-    def __init__(self, model_identifier="local-model", base_url="http://localhost:1234/v1"):
+    MAX_IMAGES_PER_REQUEST = 4
+    RECONNECT_INTERVAL = 2.0
+    HANDLE_CACHE_SIZE = 64
+    IMAGE_SYSTEM_PROMPT = "You are an image analysis assistant."
+    TEXT_SYSTEM_PROMPT = "You are a helpful AI assistant."
+    SUMMARY_SYSTEM_PROMPT = (
+        "You summarize conversations between a user and an AI assistant. Keep every fact, name, "
+        "decision and open question the assistant needs to continue the conversation, including "
+        "what the images showed. Answer with the summary only, in the language of the conversation."
+    )
+
+    # A turn is routed by its content: it carries an image, it is text with images
+    # earlier in the conversation, or it is text only.
+    ROUTES = ("image", "text_with_images", "text")
+    # config.ini [Routing] keys; image turns always use the vision model (ModelIdentifier).
+    ROUTE_CONFIG_KEYS = {"text_with_images": "TextWithImagesTurns", "text": "TextTurns"}
+
+    def __init__(self, model_identifier="local-model", base_url="http://localhost:1234/v1", max_concurrent_requests=None,
+                 request_timeout=120.0, routes=None, embedding_model=None, profiles=None, default_profile=None):
         """
         Initializes the LLM_Manager.
+
+        model_identifier is the vision model. routes maps "text_with_images" and
+        "text" turns to other model identifiers (for example a small, fast text
+        model); routes that are missing or empty use the vision model.
+        max_concurrent_requests bounds how many predictions run at once across every
+        caller sharing this manager (UI, Discord bot, batch jobs); None means unbounded.
+        request_timeout is the deadline after which no further retry is started.
+        embedding_model is the LM Studio embedding model used by embed(), if any.
+        profiles maps names to ResponseProfiles (see response_profiles.read_profiles);
+        requests that name none use default_profile.
         """
+        self.scheduler = RequestScheduler(max_concurrent_requests)
+        self.request_timeout = request_timeout
+        self.retry = RetryExecutor(is_transient=self._is_transient_error)
+        self._reconnect_lock = threading.Lock()
+        self._last_reconnect = 0.0
+        self.last_activity = time.monotonic()
+        self._requests_lock = threading.Lock()
+        self._requests = {}
+
+        self.routes = {route: (routes or {}).get(route) or model_identifier for route in self.ROUTES}
+        self.routes["image"] = model_identifier
+        self._routed_models = {}
+        self._routing_lock = threading.Lock()
+        self.routing_stats = {}
+        self.prompt_cache = PromptPrefixCache()
+        self.profiles = dict(profiles or DEFAULT_PROFILES)
+        default_profile = (default_profile or "").strip().lower()
+        if default_profile and default_profile not in self.profiles:
+            logger.warning(f"LLM_Manager: Unknown response profile {default_profile}, using {DEFAULT_PROFILE}")
+            default_profile = None
+        self.default_profile = default_profile or DEFAULT_PROFILE
+        self.profile_stats = {}
+        self.embedding_identifier = embedding_model
+        self._embedding_model = None
+
+        self._uploads = ThreadPoolExecutor(max_workers=2, thread_name_prefix="image-upload")
+        self._uploads_lock = threading.Lock()
+        self._pending_uploads = OrderedDict()
+        self._handles = OrderedDict()
+        self._upload_generation = 0
+        self.upload_stats = {"uploads": 0, "handle_hits": 0, "content_hits": 0}
+
         host_port = base_url.replace("http://", "").replace("https://", "").replace("/v1", "").strip()
         
-        logging.debug(f"LLM_Manager: Connecting to {host_port}")
+        logger.debug(f"LLM_Manager: Connecting to {host_port}")
+        self.api_host = host_port
         self.client = lms.Client(api_host=host_port)
         
-        logging.debug(f"LLM_Manager: Getting model {model_identifier}")
+        logger.debug(f"LLM_Manager: Getting model {model_identifier}")
+        self.model_identifier = model_identifier
         self.model = self.client.llm.model(model_identifier)
 
     def _execute_with_retry(self, func, *args, **kwargs):
         """
-        Executes a function with retry logic for connection errors.
+        Executes a function with exponential backoff for transient connection errors.
+
+        Calls share one circuit breaker, so while LM Studio is down queued requests
+        fail fast instead of each repeating the full retry cycle.
         """
-        max_retries = 3
-        import time
-        
-        for attempt in range(max_retries):
+        deadline = time.monotonic() + self.request_timeout
+        return self.retry.call(lambda: func(*args, **kwargs), deadline=deadline, on_retry=self._reconnect)
+
+    @staticmethod
+    def _is_transient_error(error):
+        """Classifies an exception as a transient connectivity failure worth retrying."""
+        fatal = _sdk_error_types("LMStudioCancelledError", "LMStudioModelNotFoundError")
+        if fatal and isinstance(error, fatal):
+            return False
+        transient = _sdk_error_types("LMStudioWebsocketError", "LMStudioTimeoutError", "LMStudioChannelClosedError")
+        return isinstance(error, (ConnectionError, TimeoutError) + transient)
+
+    def _reconnect(self, error):
+        """Rebuilds the SDK client after a connection error, at most once per RECONNECT_INTERVAL."""
+        with self._reconnect_lock:
+            if time.monotonic() - self._last_reconnect < self.RECONNECT_INTERVAL:
+                return
+            self._last_reconnect = time.monotonic()
             try:
-                return func(*args, **kwargs)
+                self.client = lms.Client(api_host=self.api_host)
+                self.model = self.client.llm.model(self.model_identifier)
+                self._embedding_model = None
+                with self._routing_lock:
+                    self._routed_models.clear()
+                self._forget_uploads()
+                self.prompt_cache.clear()
+                logger.info(f"LLM_Manager: Reconnected to {self.api_host}")
             except Exception as e:
-                error_str = str(e).lower()
-                if "econnreset" in error_str or "connection" in error_str or "timeout" in error_str:
-                    logging.warning(f"Connection error (attempt {attempt+1}/{max_retries}): {e}")
-                    if attempt < max_retries - 1:
-                        time.sleep(1 * (attempt + 1))
-                        try:
-                            host_port = self.client.api_host
-                            self.client = lms.Client(api_host=host_port)
-                            self.model = self.client.llm.model(self.model.identifier)
-                        except:
-                            pass
-                        continue
-                raise e
+                logger.warning(f"LLM_Manager: Reconnect failed: {e}")
+
+    @classmethod
+    def read_routes(cls, config):
+        """
+        Reads the route table from the [Routing] section of a ConfigParser.
+
+        Returns:
+            dict: Route name -> model identifier, for the routes that are set.
+        """
+        return {
+            route: config.get('Routing', key, fallback='').strip()
+            for route, key in cls.ROUTE_CONFIG_KEYS.items()
+            if config.get('Routing', key, fallback='').strip()
+        }
+
+    def _model_for(self, route):
+        """Returns (identifier, model handle) of the model that serves a route."""
+        identifier = self.routes.get(route) or self.model_identifier
+        if identifier == self.model_identifier:
+            return identifier, self.model
+        with self._routing_lock:
+            model = self._routed_models.get(identifier)
+        if model is None:
+            model = self.client.llm.model(identifier)
+            with self._routing_lock:
+                self._routed_models[identifier] = model
+        return identifier, model
+
+    def _record_route(self, route, identifier, seconds):
+        logger.info(f"LLM_Manager: {route} turn served by {identifier} in {seconds:.2f}s")
+        with self._routing_lock:
+            stats = self.routing_stats.setdefault(identifier, {"requests": 0, "seconds": 0.0})
+            stats["requests"] += 1
+            stats["seconds"] += seconds
+
+    def get_routing_stats(self):
+        """
+        Returns the route table and per-model prediction latency.
+
+        Returns:
+            dict: "routes" (route -> model identifier) and "models"
+                (model identifier -> requests and avg_ms).
+        """
+        with self._routing_lock:
+            models = {
+                identifier: {"requests": stats["requests"], "avg_ms": round(stats["seconds"] / stats["requests"] * 1000, 1)}
+                for identifier, stats in self.routing_stats.items()
+            }
+        return {"routes": dict(self.routes), "models": models}
+
+    def get_profile(self, profile=None):
+        """
+        Resolves a response profile.
+
+        Args:
+            profile (str or ResponseProfile, optional): A profile or profile name;
+                None is the default profile.
+
+        Returns:
+            ResponseProfile: The profile.
+
+        Raises:
+            ValueError: If there is no profile with that name.
+        """
+        if isinstance(profile, ResponseProfile):
+            return profile
+        name = (profile or self.default_profile).lower()
+        if name not in self.profiles:
+            raise ValueError(f"Unknown response profile: {profile}")
+        return self.profiles[name]
+
+    def _record_profile(self, profile, seconds, result):
+        predicted = getattr(getattr(result, "stats", None), "predicted_tokens_count", None)
+        with self._routing_lock:
+            stats = self.profile_stats.setdefault(profile.name, {"requests": 0, "seconds": 0.0, "tokens": 0})
+            stats["requests"] += 1
+            stats["seconds"] += seconds
+            stats["tokens"] += predicted if isinstance(predicted, int) else 0
+
+    def get_profile_stats(self):
+        """
+        Returns the prediction latency per response profile, to tune their defaults.
+
+        Returns:
+            dict: Profile name -> requests, avg_ms and avg_tokens (generated tokens).
+        """
+        with self._routing_lock:
+            return {
+                name: {
+                    "requests": stats["requests"],
+                    "avg_ms": round(stats["seconds"] / stats["requests"] * 1000, 1),
+                    "avg_tokens": round(stats["tokens"] / stats["requests"], 1),
+                }
+                for name, stats in self.profile_stats.items()
+            }
+
+    def get_prompt_cache_stats(self):
+        """
+        Returns prompt prefix reuse counters of conversation turns.
+
+        Returns:
+            dict: See PromptPrefixCache.get_stats.
+        """
+        return self.prompt_cache.get_stats()
+
+    def get_resilience_stats(self):
+        """
+        Returns retry and circuit breaker counters.
+
+        Returns:
+            dict: Flat counters prefixed with retry_ and breaker_.
+        """
+        return self.retry.stats()
 
     def _strip_markdown(self, text):
         """
         Removes Markdown formatting from the text to make it cleaner for the UI.
         """
-        import re
-        text = re.sub(r'(\*\*|__)(.*?)\1', r'\2', text)
-        text = re.sub(r'(\*|_)(.*?)\1', r'\2', text)
-        
-        text = re.sub(r'```.*?```', '', text, flags=re.DOTALL)
-        text = re.sub(r'`(.*?)`', r'\1', text)
-        
-        text = re.sub(r'^#+\s+', '', text, flags=re.MULTILINE)
-        
-        text = re.sub(r'\[([^\]]+)\]\([^\)]+\)', r'\1', text)
-        
-        return text.strip()
+        with tracer.span("text.strip_markdown"):
+            return strip_markdown(text)
 
-    def get_image_description(self, image_path, result_queue):
+    def _respond(self, chat, result_queue, stream=False, handle=None, route="image", conversation_key=None,
+                 prefix_reused=False, profile=None):
         """
-        Generates a description for an image in a separate thread.
+        Runs a prediction for the chat and returns the final result.
+
+        In streaming mode a "stream_start" message is queued at the start of every
+        attempt (so consumers can discard partial text from a retried attempt),
+        followed by "fragment" messages carrying the generated text with Markdown
+        already stripped; together they add up to the final stripped content.
+
+        With a handle the prediction is attached to it, so cancelling the handle
+        aborts the generation in LM Studio and raises RequestCancelled here.
+        The prediction runs on the model the route table assigns to route, with the
+        output limits of the profile, if any. Its prompt reuse is recorded in the
+        prompt cache and logged for conversation turns.
         """
-        def worker():
-            try:
-                def _task():
-                    chat = lms.Chat("You are an image analysis assistant.")
-                    image_handle = self.client.prepare_image(src=image_path)
-                    chat.add_user_message([
-                        "Descreva esta imagem detalhadamente em português. Seja preciso e inclua detalhes visuais importantes.",
-                        image_handle
-                    ])
-                    return self.model.respond(chat)
+        identifier, model = self._model_for(route)
+        prediction_config = profile.prediction_config() if profile else None
+        options = {"config": prediction_config} if prediction_config else {}
+        start = time.perf_counter()
+        self.last_activity = time.monotonic()
+        with tracer.span("llm.predict", stream=stream, route=route):
+            first_token = None
+            if not stream and handle is None:
+                result = model.respond(chat, **options)
+            else:
+                if stream:
+                    result_queue.put({"type": "stream_start"})
+                prediction = model.respond_stream(chat, **options)
+                if handle is not None:
+                    handle.attach(prediction)
+                try:
+                    stripper = MarkdownStreamStripper()
+                    for fragment in prediction:
+                        if first_token is None:
+                            first_token = time.perf_counter() - start
+                        if not stream:
+                            continue
+                        text = stripper.feed(fragment.content)
+                        if text:
+                            result_queue.put({"type": "fragment", "content": text})
+                    if handle is not None:
+                        handle.check()
+                    if stream:
+                        text = stripper.flush()
+                        if text:
+                            result_queue.put({"type": "fragment", "content": text})
+                    result = prediction.result()
+                except Exception as e:
+                    if handle is not None and handle.is_cancelled() and not isinstance(e, RequestCancelled):
+                        raise RequestCancelled(handle.reason) from e
+                    raise
+                finally:
+                    if handle is not None:
+                        handle.detach()
 
-                result = self._execute_with_retry(_task)
-                description = self._strip_markdown(result.content)
-                result_queue.put({"type": "description", "content": description})
-            except Exception as e:
-                result_queue.put({"type": "error", "content": f"An unexpected error occurred: {e}"})
+        total = time.perf_counter() - start
+        self._record_route(route, identifier, total)
+        if profile:
+            self._record_profile(profile, total, result)
+        reuse = self.prompt_cache.record_turn(conversation_key, identifier, prefix_reused, getattr(result, "stats", None))
+        if conversation_key is not None:
+            logger.info(
+                f"LLM_Manager: Conversation {conversation_key} turn: {reuse['prompt_tokens']} prompt tokens, "
+                f"~{reuse['cached_tokens']} cached, prefix {'reused' if prefix_reused else 'rebuilt'}"
+            )
+        if tracer.enabled:
+            self._record_prediction_spans(result, first_token, total, reuse["cached_tokens"])
+        return result
+
+    def _record_prediction_spans(self, result, first_token, total, cached_tokens=0):
+        """Splits a prediction into prefill and generation spans using SDK stats when available."""
+        stats = getattr(result, "stats", None)
+        server_first_token = getattr(stats, "time_to_first_token_sec", None)
+        if isinstance(server_first_token, (int, float)):
+            first_token = server_first_token
+        if first_token is None:
+            return
+
+        attrs = {}
+        for key in ("prompt_tokens_count", "predicted_tokens_count"):
+            value = getattr(stats, key, None)
+            if isinstance(value, int):
+                attrs[key] = value
+        if cached_tokens:
+            attrs["cached_tokens"] = cached_tokens
+        tracer.record("llm.prefill", first_token, **attrs)
+        tracer.record("llm.generation", max(0.0, total - first_token), **attrs)
+
+    def prefetch_image(self, image_path, profile=None):
+        """
+        Starts hashing and uploading an image in the background.
+
+        Call this as soon as the user picks an image so the upload overlaps with
+        thumbnail rendering and database writes. The handle is kept and reused by
+        describe_image and by later conversation turns that reference the same file
+        with a profile of the same image size.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the LM Studio file handle.
+        """
+        max_edge = self.get_profile(profile).image_max_edge
+        future, is_new = self._claim_upload(image_path, max_edge)
+        if is_new:
+            self._uploads.submit(self._fulfil_upload, future, image_path, max_edge)
+        return future
+
+    def _claim_upload(self, image_path, max_edge=None):
+        """
+        Returns the upload future for a path and whether the caller must perform it.
+
+        An upload is reused while the file is unchanged; a file deleted after its
+        upload (e.g. a pasted temporary image) keeps its handle.
+        """
+        try:
+            stat = os.stat(image_path)
+            version = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            version = None
+
+        key = (image_path, max_edge)
+        with self._uploads_lock:
+            pending = self._pending_uploads.get(key)
+            if pending is not None:
+                future, pending_version = pending
+                failed = future.done() and future.exception() is not None
+                if not failed and (version is None or version == pending_version):
+                    self._pending_uploads.move_to_end(key)
+                    self.upload_stats["handle_hits"] += 1
+                    return future, False
+
+            future = Future()
+            self._pending_uploads[key] = (future, version)
+            while len(self._pending_uploads) > self.HANDLE_CACHE_SIZE:
+                self._pending_uploads.popitem(last=False)
+        return future, True
+
+    def _fulfil_upload(self, future, image_path, max_edge=None):
+        try:
+            future.set_result(self._upload_image(image_path, max_edge))
+        except Exception as e:
+            future.set_exception(e)
+
+    def _upload_image(self, image_path, max_edge=None):
+        """Reads, hashes, scales and uploads an image, reusing the handle of identical content."""
+        with self._uploads_lock:
+            generation = self._upload_generation
+        client = self.client
+        with open(image_path, "rb") as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+        if max_edge:
+            digest += f":{max_edge}"
+
+        with self._uploads_lock:
+            handle = self._handles.get(digest)
+            if handle is not None:
+                self._handles.move_to_end(digest)
+                self.upload_stats["content_hits"] += 1
+                return handle
+
+        if max_edge:
+            data = self._fit_image(data, max_edge)
+        handle = client.prepare_image(data, name=os.path.basename(image_path))
+        with self._uploads_lock:
+            if generation != self._upload_generation:
+                # The connection was rebuilt meanwhile; don't cache a handle from the old one.
+                return handle
+            self._handles[digest] = handle
+            while len(self._handles) > self.HANDLE_CACHE_SIZE:
+                self._handles.popitem(last=False)
+            self.upload_stats["uploads"] += 1
+        return handle
+
+    @staticmethod
+    def _fit_image(data, max_edge):
+        """
+        Scales encoded image bytes down to a longest edge of max_edge pixels.
+
+        Fewer pixels mean fewer image tokens for the model to prefill. Returns the
+        data unchanged if the image already fits or cannot be decoded.
+        """
+        try:
+            with tracer.span("image.fit", max_edge=max_edge):
+                with Image.open(io.BytesIO(data)) as image:
+                    if max(image.size) <= max_edge:
+                        return data
+                    image.thumbnail((max_edge, max_edge))
+                    output = io.BytesIO()
+                    if image.mode in ("RGBA", "LA", "P"):
+                        image.save(output, "PNG")
+                    else:
+                        image.convert("RGB").save(output, "JPEG", quality=90)
+                return output.getvalue()
+        except Exception as e:
+            logger.warning(f"LLM_Manager: Sending the image at full size, it could not be scaled: {e}")
+            return data
+
+    def _forget_uploads(self):
+        """Drops cached file handles, which do not survive a new connection."""
+        with self._uploads_lock:
+            self._upload_generation += 1
+            self._pending_uploads.clear()
+            self._handles.clear()
+
+    def _prepare_image(self, image_path, max_edge=None):
+        """Returns the LM Studio file handle of an image, uploading it on this thread if needed."""
+        with tracer.span("image.prepare"):
+            future, is_new = self._claim_upload(image_path, max_edge)
+            if is_new:
+                self._fulfil_upload(future, image_path, max_edge)
+            return future.result()
+
+    @staticmethod
+    def _result(result_type, content, request_id):
+        """Builds a result queue message; queued_at lets the consumer measure queue wait."""
+        return LLMResult(result_type, content, request_id, time.perf_counter())
+
+    def _open_request(self, supersede_key=None):
+        """
+        Registers a cancellable request. The newest request wins: an unfinished
+        request with the same supersede_key is cancelled.
+
+        Returns:
+            RequestHandle: The handle of the new request.
+        """
+        handle = RequestHandle(tracer.current_request_id() or tracer.new_request_id(), supersede_key)
+        with self._requests_lock:
+            superseded = [] if supersede_key is None else [
+                other for other in self._requests.values() if other.supersede_key == supersede_key
+            ]
+            self._requests[handle.request_id] = handle
+        for other in superseded:
+            if other.cancel("superseded"):
+                logger.info(f"LLM_Manager: Request {other.request_id} superseded by {handle.request_id}")
+        return handle
+
+    def _close_request(self, handle):
+        with self._requests_lock:
+            if self._requests.get(handle.request_id) is handle:
+                del self._requests[handle.request_id]
+
+    def cancel(self, supersede_key=None, reason="cancelled"):
+        """
+        Cancels unfinished requests started by the get_* methods.
+
+        Args:
+            supersede_key (hashable, optional): Only cancel requests with this key;
+                None cancels every request.
+            reason (str): Reported as the content of the "cancelled" result message.
+
+        Returns:
+            int: The number of requests that were cancelled.
+        """
+        with self._requests_lock:
+            handles = [
+                handle for handle in self._requests.values()
+                if supersede_key is None or handle.supersede_key == supersede_key
+            ]
+        return sum(handle.cancel(reason) for handle in handles)
+
+    def _run_request(self, handle, kind, result_type, func, result_queue):
+        """
+        Runs func(handle) in a separate thread and queues its result.
+
+        A cancelled request queues a "cancelled" message whose content is the reason.
+        """
+        def worker():
+            with tracer.request(handle.request_id), tracer.span("llm.request", kind=kind):
+                try:
+                    content = func(handle)
+                    result_queue.put(self._result(result_type, content, handle.request_id))
+                except RequestCancelled as e:
+                    result_queue.put(self._result("cancelled", e.reason, handle.request_id))
+                except Exception as e:
+                    result_queue.put(self._result("error", f"An unexpected error occurred: {e}", handle.request_id))
+                finally:
+                    self._close_request(handle)
 
         thread = threading.Thread(target=worker)
         thread.start()
+        return handle
 
-    def get_text_response(self, message, conversation_history, result_queue):
+    def describe_image(self, image_path, result_queue=None, stream=False, handle=None, profile=None):
         """
-        Generates a contextual text response based on the conversation history.
+        Generates a description for an image on the calling thread and returns it.
+
+        When stream is True, the raw generated text is also queued fragment by
+        fragment on result_queue while it is generated. Cancelling the optional
+        handle stops the request with RequestCancelled. profile selects the
+        response profile (see get_profile).
         """
-        def worker():
-            try:
-                def _task():
-                    chat = lms.Chat("You are a helpful AI assistant.")
-
-                    for interaction in conversation_history:
-                        actor = interaction['actor']
-                        content = interaction['content']
-
-                        if actor == 'user':
-                            if interaction['type'] == 'image':
-                                try:
-                                    image_handle = self.client.prepare_image(src=interaction['image_path'])
-                                    prompt = content if isinstance(content, str) and content else "Here is the image again."
-                                    chat.add_user_message([prompt, image_handle])
-                                except:
-                                    chat.add_user_message("[Image missing] " + str(content))
-                            else:
-                                chat.add_user_message(content)
-                        elif actor == 'assistant':
-                            if interaction['type'] == 'description' or interaction['type'] == 'text_response':
-                                 chat.add_assistant_response(content)
-
-                    chat.add_user_message(message)
-
-                    return self.model.respond(chat)
+        profile = self.get_profile(profile)
+
+        def _task():
+            chat = lms.Chat(self.IMAGE_SYSTEM_PROMPT)
+            image_handle = self._prepare_image(image_path, profile.image_max_edge)
+            chat.add_user_message([profile.image_prompt(), image_handle])
+            return self._respond(chat, result_queue, stream, handle, profile=profile)
 
+        with self.scheduler.slot():
+            if handle is not None:
+                handle.check()
+            result = self._execute_with_retry(_task)
+        return self._strip_markdown(result.content)
+
+    def get_image_description(self, image_path, result_queue, stream=False, supersede_key=None, profile=None):
+        """
+        Generates a description for an image in a separate thread.
+
+        When stream is True, the raw generated text is also queued fragment by
+        fragment before the final "description" message.
+
+        Returns:
+            RequestHandle: Cancels the request; a newer request with the same
+                supersede_key cancels it too.
+        """
+        handle = self._open_request(supersede_key)
+        return self._run_request(
+            handle, "description", "description",
+            lambda handle: self.describe_image(image_path, result_queue, stream, handle, profile), result_queue
+        )
+
+    def describe_images(self, image_paths, max_images_per_request=None, handle=None, profile=None):
+        """
+        Generates a single combined description for several images on the calling thread.
+
+        All images are sent in one multi-image chat turn. When there are more images
+        than the model accepts per request, they are split into consecutive batches
+        and the partial descriptions are joined in order.
+        """
+        batch_size = max(1, max_images_per_request or self.MAX_IMAGES_PER_REQUEST)
+        profile = self.get_profile(profile)
+
+        descriptions = []
+        for start in range(0, len(image_paths), batch_size):
+            batch = image_paths[start:start + batch_size]
+
+            def _task():
+                chat = lms.Chat(self.IMAGE_SYSTEM_PROMPT)
+                image_handles = [self._prepare_image(path, profile.image_max_edge) for path in batch]
+                if len(image_paths) == 1:
+                    prompt = profile.image_prompt()
+                else:
+                    prompt = profile.image_prompt(len(batch), start + 1)
+                chat.add_user_message([prompt, *image_handles])
+                return self._respond(chat, None, False, handle, profile=profile)
+
+            with self.scheduler.slot():
+                if handle is not None:
+                    handle.check()
                 result = self._execute_with_retry(_task)
-                response = self._strip_markdown(result.content)
-                result_queue.put({"type": "text_response", "content": response})
-            except Exception as e:
-                result_queue.put({"type": "error", "content": f"An unexpected error occurred: {e}"})
+            descriptions.append(self._strip_markdown(result.content))
 
-        thread = threading.Thread(target=worker)
-        thread.start()
+        return "\n\n".join(descriptions)
+
+    def get_images_description(self, image_paths, result_queue, max_images_per_request=None, supersede_key=None,
+                               profile=None):
+        """
+        Generates a single combined description for several images in a separate thread.
+
+        Returns:
+            RequestHandle: Cancels the request, see get_image_description.
+        """
+        handle = self._open_request(supersede_key)
+        return self._run_request(
+            handle, "descriptions", "description",
+            lambda handle: self.describe_images(image_paths, max_images_per_request, handle, profile), result_queue
+        )
+
+    @staticmethod
+    def _add_interaction(chat, interaction, prepare_image, send_images=True):
+        """Appends one stored history interaction to a chat."""
+        actor = interaction['actor']
+        content = interaction['content']
+
+        if actor == 'user':
+            if interaction['type'] == 'image' and not send_images:
+                chat.add_user_message(f"[Image] {content}" if isinstance(content, str) and content else "[Image]")
+            elif interaction['type'] == 'image':
+                try:
+                    image_handle = prepare_image(interaction['image_path'])
+                    prompt = content if isinstance(content, str) and content else "Here is the image again."
+                    chat.add_user_message([prompt, image_handle])
+                except:
+                    chat.add_user_message("[Image missing] " + str(content))
+            else:
+                chat.add_user_message(content)
+        elif actor in ('assistant', 'system'):
+            # The UI and the API store model answers with the 'system' actor.
+            if interaction['type'] in ('description', 'text', 'text_response'):
+                 chat.add_assistant_response(content)
+
+    def respond_to_text(self, message, conversation_history, result_queue=None, stream=False, handle=None,
+                        conversation_key=None, profile=None):
+        """
+        Generates a contextual text response on the calling thread and returns it.
+
+        When stream is True, the raw generated text is also queued fragment by
+        fragment on result_queue while it is generated. Cancelling the optional
+        handle stops the request with RequestCancelled.
+
+        The turn goes to the "text_with_images" route if the conversation contains
+        images and to the "text" route otherwise. Earlier images are only attached
+        when that route is served by the vision model; a text model sees their
+        descriptions, which are already part of the history.
+
+        With a conversation_key the chat of the previous turn is reused and only the
+        interactions stored since then are appended, so LM Studio can reuse its
+        cached prompt instead of prefilling the whole conversation again.
+        conversation_history must not contain message itself; it may start with a
+        'summary' interaction (see HistoryManager.get_context), which becomes part of
+        the system prompt.
+
+        The response profile limits the output, the image size and how many recent
+        interactions are sent; the prompt prefix is cached per conversation and profile.
+        """
+        profile = self.get_profile(profile)
+        conversation_history = profile.trim_history(conversation_history)
+        cache_key = None if conversation_key is None else (conversation_key, profile.name)
+        has_images = any(i['actor'] == 'user' and i['type'] == 'image' for i in conversation_history)
+        route = "text_with_images" if has_images else "text"
+        identifier = self.routes.get(route) or self.model_identifier
+        send_images = identifier == self.model_identifier
+        fingerprints = [PromptPrefixCache.fingerprint(interaction) for interaction in conversation_history]
+
+        def _task():
+            chat, reused = None, 0
+            if conversation_key is not None:
+                chat, reused = self.prompt_cache.lookup(cache_key, identifier, fingerprints)
+            prefix_reused = chat is not None
+            history = conversation_history
+            if chat is None:
+                system_prompt = profile.system_prompt(self.TEXT_SYSTEM_PROMPT)
+                if history and history[0]['type'] == 'summary':
+                    system_prompt += "\n\nSummary of the earlier conversation:\n" + history[0]['content']
+                    reused = 1
+                chat = lms.Chat(system_prompt)
+
+            def prepare_image(path):
+                return self._prepare_image(path, profile.image_max_edge)
+
+            for interaction in history[reused:]:
+                self._add_interaction(chat, interaction, prepare_image, send_images)
+
+            chat.add_user_message(message)
+
+            result = self._respond(chat, result_queue, stream, handle, route, conversation_key, prefix_reused, profile)
+            return chat, result
+
+        with self.scheduler.slot():
+            if handle is not None:
+                handle.check()
+            chat, result = self._execute_with_retry(_task)
+        response = self._strip_markdown(result.content)
+
+        if conversation_key is not None:
+            # The raw reply keeps the chat identical to the prompt the model has cached.
+            chat.add_assistant_response(result.content)
+            self.prompt_cache.store(cache_key, identifier, chat, fingerprints + [
+                PromptPrefixCache.fingerprint({'actor': 'user', 'type': 'text', 'content': message, 'image_path': None}),
+                PromptPrefixCache.reply_fingerprint(response),
+            ])
+        return response
+
+    def summarize_history(self, interactions, previous_summary=None):
+        """
+        Summarizes conversation interactions on the calling thread, for compaction.
+
+        The summary runs on the "text" route and folds in the previous summary, so
+        a new checkpoint covers the whole conversation up to its last interaction.
+
+        Returns:
+            str: The summary text.
+        """
+        lines = []
+        if previous_summary:
+            lines.append(f"Summary of the conversation before this part:\n{previous_summary}\n")
+        for interaction in interactions:
+            content = interaction['content'] if isinstance(interaction['content'], str) else ""
+            if interaction['actor'] == 'user':
+                lines.append(f"User: [image] {content}".rstrip() if interaction['type'] == 'image' else f"User: {content}")
+            elif interaction['type'] in ('description', 'text', 'text_response'):
+                lines.append(f"Assistant: {content}")
+        transcript = "\n".join(lines)
+
+        def _task():
+            chat = lms.Chat(self.SUMMARY_SYSTEM_PROMPT)
+            chat.add_user_message(f"Summarize this conversation:\n\n{transcript}")
+            return self._respond(chat, None, False, None, "text")
+
+        with tracer.span("llm.summarize", interactions=len(interactions)):
+            with self.scheduler.slot():
+                result = self._execute_with_retry(_task)
+        return self._strip_markdown(result.content)
+
+    def embed(self, texts):
+        """
+        Computes embedding vectors with the configured embedding model, on the calling thread.
+
+        Embedding models are small and fast, so this does not take a scheduler slot
+        from the predictions; it does go through the retry policy.
+
+        Args:
+            texts (list): The strings to embed.
+
+        Returns:
+            list: One vector (list of floats) per text.
+        """
+        if not self.embedding_identifier:
+            raise ValueError("No embedding model configured.")
+
+        def _task():
+            if self._embedding_model is None:
+                self._embedding_model = self.client.embedding.model(self.embedding_identifier)
+            return self._embedding_model.embed(list(texts))
+
+        with tracer.span("llm.embed", count=len(texts)):
+            vectors = self._execute_with_retry(_task)
+        return [list(vector) for vector in vectors]
+
+    def get_text_response(self, message, conversation_history, result_queue, stream=False, supersede_key=None,
+                          conversation_key=None, profile=None):
+        """
+        Generates a contextual text response based on the conversation history.
+
+        When stream is True, the raw generated text is also queued fragment by
+        fragment before the final "text_response" message. conversation_key enables
+        prompt prefix reuse, see respond_to_text.
+
+        Returns:
+            RequestHandle: Cancels the request, see get_image_description.
+        """
+        handle = self._open_request(supersede_key)
+        return self._run_request(
+            handle, "text", "text_response",
+            lambda handle: self.respond_to_text(
+                message, conversation_history, result_queue, stream, handle, conversation_key, profile
+            ),
+            result_queue
+        )
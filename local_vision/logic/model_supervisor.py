@@ -0,0 +1,176 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ModelSupervisor:
+    """
+    Keeps the configured LM Studio model resident and reports its load state.
+
+    A background thread warms the model up with a one-token prompt as soon as it
+    starts, so the first real request does not pay for loading it, and then pings
+    it whenever the manager has been idle for keep_alive_interval seconds.
+    """
+    UNKNOWN = "unknown"
+    LOADING = "loading"
+    READY = "ready"
+    UNAVAILABLE = "unavailable"
+
+    WARMUP_PROMPT = "Hi"
+
+    def __init__(self, llm_manager, keep_alive_interval=240.0, on_state_change=None, clock=time.monotonic):
+        """
+        Initializes the ModelSupervisor.
+
+        Args:
+            llm_manager (LLM_Manager): The manager whose model is supervised.
+            keep_alive_interval (float): Idle seconds before a keep-alive ping; 0 disables pings.
+            on_state_change (callable, optional): Called from the supervisor thread with
+                the status dict whenever the load state changes.
+            clock (callable): Monotonic time source, injectable for tests.
+        """
+        self.llm_manager = llm_manager
+        self.keep_alive_interval = keep_alive_interval
+        self.on_state_change = on_state_change
+        self.clock = clock
+
+        self.state = self.UNKNOWN
+        self.loaded = None
+        self.context_length = None
+        self.last_error = None
+        self.warmup_seconds = None
+        self.pings = 0
+
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Starts the supervisor thread (warm-up followed by keep-alive pings)."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="model-supervisor", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Stops the supervisor thread."""
+        self._stop_event.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    def is_loading(self):
+        """Returns True while the model is being loaded or warmed up."""
+        return self.state == self.LOADING
+
+    def status(self):
+        """
+        Returns the current load state of the model.
+
+        Returns:
+            dict: state, model_identifier, loaded, context_length, warmup_ms, pings and error.
+        """
+        with self._lock:
+            return {
+                "state": self.state,
+                "model_identifier": self.llm_manager.model_identifier,
+                "loaded": self.loaded,
+                "context_length": self.context_length,
+                "warmup_ms": None if self.warmup_seconds is None else round(self.warmup_seconds * 1000, 1),
+                "pings": self.pings,
+                "error": self.last_error,
+            }
+
+    def _set_state(self, state, error=None):
+        with self._lock:
+            changed = state != self.state
+            self.state = state
+            self.last_error = error
+        if changed:
+            logger.info(f"ModelSupervisor: {self.llm_manager.model_identifier} is {state}")
+            if self.on_state_change:
+                self.on_state_change(self.status())
+
+    def _run(self):
+        self.warm_up()
+        if not self.keep_alive_interval:
+            return
+        while not self._stop_event.wait(min(self.keep_alive_interval, 30.0)):
+            if self.clock() - self.llm_manager.last_activity >= self.keep_alive_interval:
+                self.ping()
+
+    def _is_resident(self):
+        """Returns whether LM Studio lists the model as loaded, or None if that cannot be checked."""
+        try:
+            loaded = self.llm_manager.client.llm.list_loaded()
+            wanted = self.llm_manager.model_identifier
+            return any(wanted in (model.identifier, getattr(model, "model_key", None)) for model in loaded)
+        except Exception as e:
+            logger.debug(f"ModelSupervisor: Could not list loaded models: {e}")
+            return None
+
+    def _predict(self):
+        """
+        Runs the one-token prediction like any other request: it waits for a scheduler
+        slot and goes through the manager's retry policy and circuit breaker.
+
+        Returns:
+            int: The context length of the model.
+        """
+        def _task():
+            model = self.llm_manager.model
+            model.respond(self.WARMUP_PROMPT, config={"maxTokens": 1})
+            return model.get_context_length()
+
+        with self.llm_manager.scheduler.slot():
+            return self.llm_manager._execute_with_retry(_task)
+
+    def warm_up(self):
+        """
+        Loads the model if needed and runs a one-token prediction.
+
+        Returns:
+            bool: True if the model answered.
+        """
+        resident = self._is_resident()
+        with self._lock:
+            self.loaded = resident
+        if resident is not True:
+            self._set_state(self.LOADING)
+
+        start = self.clock()
+        try:
+            context_length = self._predict()
+        except Exception as e:
+            logger.warning(f"ModelSupervisor: Warm-up of {self.llm_manager.model_identifier} failed: {e}")
+            self._set_state(self.UNAVAILABLE, str(e))
+            return False
+
+        with self._lock:
+            self.warmup_seconds = self.clock() - start
+            self.context_length = context_length
+            self.loaded = True
+        self.llm_manager.last_activity = self.clock()
+        self._set_state(self.READY)
+        return True
+
+    def ping(self):
+        """Sends a keep-alive prediction so LM Studio does not unload an idle model."""
+        if self.llm_manager.scheduler.stats()["running"]:
+            return
+        if self._is_resident() is False:
+            self.warm_up()
+            return
+        try:
+            self._predict()
+        except Exception as e:
+            logger.warning(f"ModelSupervisor: Keep-alive ping failed: {e}")
+            self._set_state(self.UNAVAILABLE, str(e))
+            return
+        with self._lock:
+            self.pings += 1
+        self.llm_manager.last_activity = self.clock()
+        if self.state != self.READY:
+            self._set_state(self.READY)
@@ -0,0 +1,135 @@
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def _token_count(stats, name):
+    value = getattr(stats, name, None)
+    return value if isinstance(value, int) else None
+
+
+class PromptPrefixCache:
+    """
+    Keeps an append-only chat per conversation so follow-up turns reuse the prompt prefix.
+
+    LM Studio keeps the KV cache of the last prompt a model processed and only
+    prefills the part of the next prompt that differs from it. A conversation turn
+    therefore only pays for its new messages if the chat sent to the model starts
+    with exactly the messages of the previous turn, including the raw (not
+    Markdown-stripped) reply the model generated. This cache keeps that chat and
+    the fingerprints of the history interactions it already contains; when the
+    stored history still starts with them, only the new interactions are appended.
+
+    It also tracks which conversation last used each model, to report how many
+    prompt tokens a turn could take from the server's cache.
+    """
+    def __init__(self, max_conversations=16):
+        """
+        Initializes the PromptPrefixCache.
+
+        Args:
+            max_conversations (int): Number of conversations whose chat is kept (LRU).
+        """
+        self.max_conversations = max_conversations
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._model_owner = {}
+        self.stats = {"turns": 0, "prefix_hits": 0, "cache_hits": 0, "prompt_tokens": 0, "cached_tokens": 0}
+
+    @staticmethod
+    def fingerprint(interaction):
+        """Identifies a history interaction by what it contributes to the prompt."""
+        if interaction['actor'] == 'user':
+            return ('user', interaction['type'], interaction['content'], interaction.get('image_path'))
+        if interaction['type'] == 'summary':
+            return ('summary', interaction['content'])
+        return ('assistant', interaction['content'])
+
+    @staticmethod
+    def reply_fingerprint(content):
+        """The fingerprint the stored (Markdown-stripped) reply of a turn will have."""
+        return ('assistant', content)
+
+    def lookup(self, key, identifier, fingerprints):
+        """
+        Returns a copy of the cached chat of a conversation if it is still a prefix.
+
+        Returns:
+            tuple: (chat or None, number of leading interactions already in the chat).
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, 0
+            chat, cached_fingerprints, cached_identifier = entry
+            if cached_identifier != identifier or fingerprints[:len(cached_fingerprints)] != cached_fingerprints:
+                del self._entries[key]
+                return None, 0
+            self._entries.move_to_end(key)
+            return chat.copy(), len(cached_fingerprints)
+
+    def store(self, key, identifier, chat, fingerprints):
+        """Remembers the chat of a finished turn, including its reply."""
+        with self._lock:
+            self._entries[key] = (chat, list(fingerprints), identifier)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_conversations:
+                self._entries.popitem(last=False)
+
+    def record_turn(self, key, identifier, prefix_reused, prediction_stats):
+        """
+        Records a finished prediction on a model and reports its prompt reuse.
+
+        Predictions outside a conversation (key None) also count, because they
+        replace the model's cached prompt.
+
+        Returns:
+            dict: prompt_tokens, cached_tokens (estimated from the previous turn that
+                left its prompt in the model's cache), prefill_tokens and prefix_reused.
+        """
+        prompt_tokens = _token_count(prediction_stats, "prompt_tokens_count")
+        predicted_tokens = _token_count(prediction_stats, "predicted_tokens_count") or 0
+        with self._lock:
+            owner = self._model_owner.get(identifier)
+            cached_tokens = 0
+            if key is not None and prefix_reused and owner and owner[0] == key:
+                cached_tokens = owner[1]
+            if prompt_tokens is not None:
+                cached_tokens = min(cached_tokens, prompt_tokens)
+            self._model_owner[identifier] = (key, (prompt_tokens or 0) + predicted_tokens)
+
+            if key is not None:
+                self.stats["turns"] += 1
+                self.stats["prefix_hits"] += int(prefix_reused)
+                self.stats["cache_hits"] += int(cached_tokens > 0)
+                self.stats["prompt_tokens"] += prompt_tokens or 0
+                self.stats["cached_tokens"] += cached_tokens
+
+        return {
+            "prompt_tokens": prompt_tokens,
+            "cached_tokens": cached_tokens,
+            "prefill_tokens": None if prompt_tokens is None else prompt_tokens - cached_tokens,
+            "prefix_reused": prefix_reused,
+        }
+
+    def clear(self):
+        """Drops every cached chat, e.g. after a reconnect invalidated their image handles."""
+        with self._lock:
+            self._entries.clear()
+            self._model_owner.clear()
+        logger.debug("PromptPrefixCache: Cleared")
+
+    def get_stats(self):
+        """
+        Returns the conversation turn counters.
+
+        Returns:
+            dict: turns, prefix_hits, cache_hits, prompt_tokens, cached_tokens and
+                cache_hit_rate (share of turns that could reuse cached tokens).
+        """
+        with self._lock:
+            stats = dict(self.stats)
+        stats["cache_hit_rate"] = round(stats["cache_hits"] / stats["turns"], 3) if stats["turns"] else 0.0
+        return stats
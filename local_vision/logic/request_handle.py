@@ -0,0 +1,82 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class RequestCancelled(Exception):
+    """Raised inside a model request whose handle was cancelled."""
+    def __init__(self, reason="cancelled"):
+        super().__init__(f"Request {reason}.")
+        self.reason = reason
+
+
+class RequestHandle:
+    """
+    Lets another thread stop a model request that is queued or running.
+
+    The prediction that is generating for the request is attached to the handle,
+    so cancel() aborts it in LM Studio instead of letting it run to completion and
+    keep the model busy.
+    """
+    def __init__(self, request_id, supersede_key=None):
+        """
+        Initializes the RequestHandle.
+
+        Args:
+            request_id (str): The id carried by every result queue message of the request.
+            supersede_key (hashable, optional): Requests sharing a key supersede each
+                other (for example all requests of one conversation).
+        """
+        self.request_id = request_id
+        self.supersede_key = supersede_key
+        self.reason = None
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+        self._prediction = None
+
+    def cancel(self, reason="cancelled"):
+        """
+        Cancels the request, aborting its prediction if one is running.
+
+        Returns:
+            bool: False if the request was already cancelled.
+        """
+        with self._lock:
+            if self._cancelled.is_set():
+                return False
+            self.reason = reason
+            self._cancelled.set()
+            prediction = self._prediction
+        if prediction is not None:
+            self._abort(prediction)
+        return True
+
+    def is_cancelled(self):
+        """Returns True once cancel() has been called."""
+        return self._cancelled.is_set()
+
+    def check(self):
+        """Raises RequestCancelled if the request was cancelled."""
+        if self._cancelled.is_set():
+            raise RequestCancelled(self.reason)
+
+    def attach(self, prediction):
+        """Registers the running prediction so cancel() can abort it."""
+        with self._lock:
+            self._prediction = prediction
+            cancelled = self._cancelled.is_set()
+        if cancelled:
+            self._abort(prediction)
+            raise RequestCancelled(self.reason)
+
+    def detach(self):
+        """Forgets the prediction once it has finished."""
+        with self._lock:
+            self._prediction = None
+
+    def _abort(self, prediction):
+        try:
+            prediction.cancel()
+        except Exception as e:
+            logger.debug(f"RequestHandle: Could not cancel prediction of {self.request_id}: {e}")
@@ -0,0 +1,69 @@
+import threading
+import time
+from contextlib import contextmanager
+from local_vision.tracing import tracer
+
+
+class RequestScheduler:
+    """
+    Bounds how many model predictions run at the same time and keeps queueing statistics.
+    """
+    def __init__(self, max_concurrent=None):
+        """
+        Initializes the RequestScheduler.
+
+        Args:
+            max_concurrent (int, optional): Maximum number of simultaneous predictions.
+                None means requests are never queued.
+        """
+        self.max_concurrent = max_concurrent
+        self._semaphore = threading.BoundedSemaphore(max_concurrent) if max_concurrent else None
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+
+    @contextmanager
+    def slot(self):
+        """Waits for a free prediction slot and holds it for the duration of the block."""
+        with self._lock:
+            self.waiting += 1
+        if self._semaphore:
+            wait_start = time.perf_counter()
+            self._semaphore.acquire()
+            tracer.record("scheduler.wait", time.perf_counter() - wait_start)
+        with self._lock:
+            self.waiting -= 1
+            self.running += 1
+
+        try:
+            yield
+        except BaseException:
+            with self._lock:
+                self.failed += 1
+            raise
+        else:
+            with self._lock:
+                self.completed += 1
+        finally:
+            with self._lock:
+                self.running -= 1
+            if self._semaphore:
+                self._semaphore.release()
+
+    def stats(self):
+        """
+        Returns a snapshot of the scheduler counters.
+
+        Returns:
+            dict: The waiting, running, completed and failed request counts.
+        """
+        with self._lock:
+            return {
+                "max_concurrent": self.max_concurrent,
+                "waiting": self.waiting,
+                "running": self.running,
+                "completed": self.completed,
+                "failed": self.failed,
+            }
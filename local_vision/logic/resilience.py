@@ -0,0 +1,191 @@
+import logging
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the circuit breaker is open."""
+    def __init__(self, retry_in):
+        super().__init__(f"LM Studio is unavailable; not retrying for another {retry_in:.0f}s.")
+        self.retry_in = retry_in
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter.
+
+    The n-th retry waits a random time between 0 and min(max_delay, base_delay * 2**n).
+    """
+    def __init__(self, max_attempts=3, base_delay=0.5, max_delay=8.0, rng=None):
+        """
+        Initializes the RetryPolicy.
+
+        Args:
+            max_attempts (int): Total attempts, including the first one.
+            base_delay (float): Backoff ceiling for the first retry, in seconds.
+            max_delay (float): Upper bound for any single backoff, in seconds.
+            rng (random.Random, optional): Source of jitter, injectable for tests.
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.rng = rng or random.Random()
+
+    def delay(self, retry_number):
+        """Returns the backoff before the given retry (0 for the first retry)."""
+        ceiling = min(self.max_delay, self.base_delay * (2 ** retry_number))
+        return self.rng.uniform(0, ceiling)
+
+
+class CircuitBreaker:
+    """
+    Fails fast while the server is down and probes recovery with a single request.
+
+    After failure_threshold consecutive transient failures the breaker opens and
+    rejects calls for reset_timeout seconds. Then exactly one caller is let through
+    as a probe (half-open); its success closes the breaker, its failure reopens it.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=3, reset_timeout=15.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        self.counters = {"opened": 0, "rejected": 0, "probes": 0, "successes": 0, "failures": 0}
+
+    def before_call(self):
+        """
+        Reserves permission to call the server.
+
+        Raises:
+            CircuitOpenError: If the breaker is open or a probe is already in flight.
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.OPEN:
+                remaining = self._opened_at + self.reset_timeout - self.clock()
+                if remaining > 0:
+                    self.counters["rejected"] += 1
+                    raise CircuitOpenError(remaining)
+                self.state = self.HALF_OPEN
+            if self._probe_in_flight:
+                self.counters["rejected"] += 1
+                raise CircuitOpenError(0)
+            self._probe_in_flight = True
+            self.counters["probes"] += 1
+
+    def record_success(self):
+        with self._lock:
+            self.counters["successes"] += 1
+            self._consecutive_failures = 0
+            self._probe_in_flight = False
+            if self.state != self.CLOSED:
+                logger.info("Circuit breaker closed: LM Studio is reachable again")
+            self.state = self.CLOSED
+
+    def record_failure(self):
+        """Records a transient (server unreachable) failure."""
+        with self._lock:
+            self.counters["failures"] += 1
+            self._consecutive_failures += 1
+            was_probe = self._probe_in_flight
+            self._probe_in_flight = False
+            if was_probe or self._consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.counters["opened"] += 1
+                    logger.warning(f"Circuit breaker opened for {self.reset_timeout:.0f}s after {self._consecutive_failures} failures")
+                self.state = self.OPEN
+                self._opened_at = self.clock()
+
+    def release(self):
+        """Releases a probe slot after a call that failed for a non-transient reason."""
+        with self._lock:
+            if self._probe_in_flight:
+                self._probe_in_flight = False
+                self.state = self.CLOSED
+                self._consecutive_failures = 0
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, state=self.state, consecutive_failures=self._consecutive_failures)
+
+
+class RetryExecutor:
+    """
+    Runs calls under a RetryPolicy and a shared CircuitBreaker.
+
+    Only errors the classifier marks as transient are retried and counted against
+    the breaker. Retries never sleep past the call's deadline.
+    """
+    def __init__(self, policy=None, breaker=None, is_transient=None, sleep=time.sleep, clock=time.monotonic):
+        self.policy = policy or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker(clock=clock)
+        self.is_transient = is_transient or (lambda e: isinstance(e, (ConnectionError, TimeoutError)))
+        self.sleep = sleep
+        self.clock = clock
+        self._lock = threading.Lock()
+        self.counters = {"calls": 0, "attempts": 0, "retries": 0, "transient_errors": 0, "fatal_errors": 0, "deadline_exceeded": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def call(self, func, deadline=None, on_retry=None):
+        """
+        Calls func(), retrying transient failures with backoff.
+
+        Args:
+            func (callable): The operation to run.
+            deadline (float, optional): Absolute clock() time after which no retry is started.
+            on_retry (callable, optional): Called with the exception before each retry
+                (for example to rebuild a broken connection).
+        """
+        self._count("calls")
+        for attempt in range(self.policy.max_attempts):
+            self.breaker.before_call()
+            self._count("attempts")
+            try:
+                result = func()
+            except Exception as e:
+                if not self.is_transient(e):
+                    self._count("fatal_errors")
+                    self.breaker.release()
+                    raise
+
+                self._count("transient_errors")
+                self.breaker.record_failure()
+                if attempt == self.policy.max_attempts - 1:
+                    raise
+
+                delay = self.policy.delay(attempt)
+                if deadline is not None and self.clock() + delay >= deadline:
+                    self._count("deadline_exceeded")
+                    raise
+
+                logger.warning(f"Transient error (attempt {attempt + 1}/{self.policy.max_attempts}), retrying in {delay:.2f}s: {e}")
+                self._count("retries")
+                self.sleep(delay)
+                if on_retry:
+                    on_retry(e)
+                continue
+
+            self.breaker.record_success()
+            return result
+
+    def stats(self):
+        """Returns retry counters merged with the breaker state."""
+        with self._lock:
+            stats = {f"retry_{name}": value for name, value in self.counters.items()}
+        stats.update({f"breaker_{name}": value for name, value in self.breaker.stats().items()})
+        return stats
@@ -0,0 +1,172 @@
+class ResponseProfile:
+    """
+    A named bundle of generation settings: prompts, output limits, image size and context.
+
+    Profiles trade detail for latency. A request picks one by name; the settings
+    left at None keep the model's (or the conversation's) defaults.
+    """
+    def __init__(self, name, description_prompt, multi_description_prompt, text_instruction="", max_tokens=None,
+                 temperature=None, image_max_edge=None, context_budget=None):
+        """
+        Initializes the ResponseProfile.
+
+        Args:
+            name (str): The profile name.
+            description_prompt (str): Prompt sent with a single image.
+            multi_description_prompt (str): Prompt sent with several images; may use
+                {count} (images in the request) and {first} (number of the first image).
+            text_instruction (str): Appended to the system prompt of text turns.
+            max_tokens (int, optional): Maximum number of generated tokens.
+            temperature (float, optional): Sampling temperature.
+            image_max_edge (int, optional): Images are scaled down to this longest edge, in pixels, before upload.
+            context_budget (int, optional): Maximum number of earlier interactions sent with a text turn.
+        """
+        self.name = name
+        self.description_prompt = description_prompt
+        self.multi_description_prompt = multi_description_prompt
+        self.text_instruction = text_instruction
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.image_max_edge = image_max_edge
+        self.context_budget = context_budget
+
+    def image_prompt(self, count=1, first=1):
+        """Returns the prompt for a request carrying count images, numbered from first."""
+        if count == 1 and first == 1:
+            return self.description_prompt
+        return self.multi_description_prompt.format(count=count, first=first)
+
+    def system_prompt(self, base):
+        """Returns a system prompt with the text instruction of the profile appended."""
+        return f"{base} {self.text_instruction}" if self.text_instruction else base
+
+    def prediction_config(self):
+        """
+        Returns the LM Studio prediction config of the profile.
+
+        Returns:
+            dict: maxTokens and temperature when set, or None for the model defaults.
+        """
+        config = {}
+        if self.max_tokens:
+            config["maxTokens"] = self.max_tokens
+        if self.temperature is not None:
+            config["temperature"] = self.temperature
+        return config or None
+
+    def trim_history(self, history):
+        """
+        Keeps at most the last context_budget interactions of a history, and its leading summary.
+
+        Older interactions are dropped in blocks of half the budget, rounded up to
+        whole user/reply pairs, instead of one per turn: the kept part starts at the
+        same interaction for several turns, so the prompt prefix cached for the
+        conversation stays valid in between.
+
+        Returns:
+            list: The interactions to send with the turn.
+        """
+        if not self.context_budget:
+            return history
+        summary = history[:1] if history and history[0]['type'] == 'summary' else []
+        rest = history[len(summary):]
+        if len(rest) <= self.context_budget:
+            return history
+        block = min(self.context_budget, (self.context_budget + 3) // 4 * 2)
+        start = -(-(len(rest) - self.context_budget) // block) * block
+        return summary + rest[start:]
+
+    def to_dict(self):
+        """Returns the settings of the profile, for logs and API responses."""
+        return {
+            "name": self.name,
+            "max_tokens": self.max_tokens,
+            "temperature": self.temperature,
+            "image_max_edge": self.image_max_edge,
+            "context_budget": self.context_budget,
+        }
+
+
+_DETAILED_PROMPT = "Descreva esta imagem detalhadamente em português. Seja preciso e inclua detalhes visuais importantes."
+_DETAILED_MULTI_PROMPT = (
+    "Descreva estas {count} imagens detalhadamente em português, uma de cada vez e na ordem em que foram enviadas. "
+    "Numere-as a partir de \"Imagem {first}\". Seja preciso e inclua detalhes visuais importantes."
+)
+
+# "detailed" is the behaviour from before profiles existed: full-size images, no limits.
+DEFAULT_PROFILES = {
+    "fast": ResponseProfile(
+        "fast",
+        "Descreva esta imagem em uma frase curta em português.",
+        "Descreva estas {count} imagens em português, uma frase curta para cada, na ordem em que foram enviadas, "
+        "numeradas a partir de \"Imagem {first}\".",
+        text_instruction="Answer briefly, in one or two sentences.",
+        max_tokens=80, temperature=0.2, image_max_edge=512, context_budget=6,
+    ),
+    "balanced": ResponseProfile(
+        "balanced",
+        "Descreva esta imagem em português em um parágrafo, com os elementos principais e os detalhes relevantes.",
+        "Descreva estas {count} imagens em português, um parágrafo para cada, na ordem em que foram enviadas, "
+        "numeradas a partir de \"Imagem {first}\".",
+        text_instruction="Keep answers focused.",
+        max_tokens=400, temperature=0.5, image_max_edge=1024, context_budget=20,
+    ),
+    "detailed": ResponseProfile("detailed", _DETAILED_PROMPT, _DETAILED_MULTI_PROMPT),
+}
+DEFAULT_PROFILE = "detailed"
+
+# config.ini [Profile <name>] keys, by attribute.
+PROFILE_CONFIG_KEYS = {
+    "description_prompt": "DescriptionPrompt",
+    "multi_description_prompt": "MultiDescriptionPrompt",
+    "text_instruction": "TextInstruction",
+    "max_tokens": "MaxTokens",
+    "temperature": "Temperature",
+    "image_max_edge": "ImageMaxEdge",
+    "context_budget": "ContextBudget",
+}
+_NUMERIC = {"max_tokens": int, "temperature": float, "image_max_edge": int, "context_budget": int}
+
+
+def read_profiles(config):
+    """
+    Reads the response profiles from a ConfigParser.
+
+    Each [Profile <name>] section overrides the keys it sets on the built-in
+    profile of that name; a new name starts from "balanced". An empty numeric
+    value removes the limit.
+
+    Returns:
+        dict: Profile name -> ResponseProfile.
+    """
+    profiles = {name: ResponseProfile(**vars(profile)) for name, profile in DEFAULT_PROFILES.items()}
+    for section in config.sections():
+        if not section.lower().startswith("profile "):
+            continue
+        name = section[len("profile "):].strip().lower()
+        base = profiles.get(name) or DEFAULT_PROFILES["balanced"]
+        settings = dict(vars(base), name=name)
+        for attribute, key in PROFILE_CONFIG_KEYS.items():
+            if not config.has_option(section, key):
+                continue
+            value = config.get(section, key).strip()
+            if attribute in _NUMERIC:
+                value = _NUMERIC[attribute](value) if value else None
+            settings[attribute] = value
+        profiles[name] = ResponseProfile(**settings)
+    return profiles
+
+
+def parse_channel_profiles(value):
+    """
+    Parses "channel_id=profile, ..." into a dict; malformed entries are ignored.
+
+    Returns:
+        dict: Discord channel ID (int) -> profile name.
+    """
+    channels = {}
+    for entry in (value or "").split(","):
+        channel, _, profile = entry.partition("=")
+        if channel.strip().isdigit() and profile.strip():
+            channels[int(channel.strip())] = profile.strip().lower()
+    return channels
@@ -0,0 +1,148 @@
+import logging
+import threading
+
+from local_vision.logic.vector_index import VectorIndex, normalize, pack_vector, unpack_vector
+from local_vision.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticIndexer:
+    """
+    Embeds text and description interactions in the background and searches them by meaning.
+
+    A worker thread loads the stored embeddings into a VectorIndex, then embeds
+    every interaction that has none yet, oldest first and in batches. It walks the
+    interactions with a cursor, so backfilling an existing history and indexing new
+    interactions are the same incremental loop: notify() after saving an
+    interaction wakes it up.
+    """
+    MAX_CHARS = 2000
+
+    def __init__(self, llm_manager, history_manager, batch_size=32, ann_threshold=20000, idle_interval=30.0):
+        """
+        Initializes the SemanticIndexer.
+
+        Args:
+            llm_manager (LLM_Manager): Computes the embeddings (its embedding model must be set).
+            history_manager (HistoryManager): Source of the interactions and store of the vectors.
+            batch_size (int): Interactions embedded per request.
+            ann_threshold (int): Index size from which searches are approximate, see VectorIndex.
+            idle_interval (float): Seconds between checks for new interactions without notify().
+        """
+        self.llm_manager = llm_manager
+        self.history_manager = history_manager
+        self.model = llm_manager.embedding_identifier
+        self.batch_size = batch_size
+        self.idle_interval = idle_interval
+        self.index = VectorIndex(ann_threshold=ann_threshold)
+        self.embedded = 0
+        self.last_error = None
+
+        self._conversations = {}
+        self._cursor = 0
+        self._load_lock = threading.Lock()
+        self._loaded = False
+        self._wake = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Starts the background indexing thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="semantic-indexer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Stops the background indexing thread."""
+        self._stop_event.set()
+        self._wake.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    def notify(self):
+        """Signals that new interactions were saved."""
+        self._wake.set()
+
+    def _run(self):
+        self.load()
+        while not self._stop_event.is_set():
+            self._wake.clear()
+            try:
+                self.index_pending()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                logger.warning(f"SemanticIndexer: Embedding failed, will retry: {e}")
+            self._wake.wait(self.idle_interval)
+
+    def load(self):
+        """Loads the stored embeddings of the model into the index."""
+        with self._load_lock:
+            if self._loaded:
+                return
+            with tracer.span("search.load"):
+                for interaction_id, conversation_id, vector in self.history_manager.get_embeddings(self.model):
+                    self.index.add(interaction_id, unpack_vector(vector))
+                    self._conversations[interaction_id] = conversation_id
+            self._loaded = True
+        logger.info(f"SemanticIndexer: Loaded {len(self.index)} embeddings of {self.model}")
+
+    def index_pending(self):
+        """
+        Embeds interactions that have no embedding yet, until none are left.
+
+        Returns:
+            int: Number of interactions embedded.
+        """
+        count = 0
+        while not self._stop_event.is_set():
+            rows = self.history_manager.get_unembedded_interactions(self.model, self._cursor, self.batch_size)
+            if not rows:
+                break
+            vectors = self.llm_manager.embed([content[:self.MAX_CHARS] for _, _, content in rows])
+            for (interaction_id, conversation_id, _), vector in zip(rows, vectors):
+                vector = normalize(vector)
+                self.history_manager.save_embedding(interaction_id, conversation_id, self.model, pack_vector(vector))
+                self.index.add(interaction_id, vector)
+                self._conversations[interaction_id] = conversation_id
+            self._cursor = rows[-1][0]
+            count += len(rows)
+        if count:
+            self.embedded += count
+            logger.debug(f"SemanticIndexer: Embedded {count} interactions ({len(self.index)} indexed)")
+        return count
+
+    def search(self, query, k=10):
+        """
+        Finds the interactions closest in meaning to a query, on the calling thread.
+
+        Returns:
+            list: Interaction dictionaries with an added "score", best match first.
+        """
+        self.load()
+        with tracer.span("search.query"):
+            vector = self.llm_manager.embed([query])[0]
+            hits = self.index.search(vector, k)
+        scores = {interaction_id: score for score, interaction_id in hits}
+        interactions = self.history_manager.get_interactions([interaction_id for _, interaction_id in hits])
+        return [
+            dict(interaction.to_dict(), score=round(scores[interaction.interaction_id], 4)) for interaction in interactions
+        ]
+
+    def remove_conversation(self, conversation_id):
+        """Drops the vectors of a deleted conversation from the index."""
+        for interaction_id in [i for i, c in list(self._conversations.items()) if c == conversation_id]:
+            self.index.remove(interaction_id)
+            self._conversations.pop(interaction_id, None)
+
+    def stats(self):
+        """
+        Returns the indexing counters.
+
+        Returns:
+            dict: model, indexed, embedded (this session) and error.
+        """
+        return {"model": self.model, "indexed": len(self.index), "embedded": self.embedded, "error": self.last_error}
@@ -0,0 +1,235 @@
+"""
+Markdown-to-plain-text rendering for model responses.
+
+All inline constructs are recognised by one precompiled alternation, so a response
+is scanned once. strip_markdown() produces the text shown in the UI and sent to
+Discord, MarkdownStreamStripper does the same incrementally for streamed
+fragments, and render_for_speech() produces a version suited to text-to-speech.
+"""
+import re
+
+# Every construct starts with one of a few lead characters, so the regex engine can
+# skip plain text with a fast character-set search. Text is scanned with a "\n"
+# prepended so that headings and fences at the very start are found too.
+_MARKDOWN = re.compile(r"""
+    [\n!\[`*_:]
+    (?:
+      (?<=\n)(?P<fence>[ \t]*```[^\n]*(?:\n.*?)??(?:\n[ \t]*```[^\n]*|\Z))
+    | (?<=\n)(?P<heading>[ \t]{0,3}\#{1,6}[ \t]+)
+    | (?<=!)\[(?P<image_text>[^\[\]\n]*)\]\([^()\s]*(?:[ \t]+"[^"\n]*")?\)
+    | (?<=\[)(?P<link_text>[^\[\]\n]*)\]\([^()\s]*(?:[ \t]+"[^"\n]*")?\)
+    | (?:(?<=https:)|(?<=http:))(?P<url>//[^\s<>()\[\]]+[^\s<>()\[\].,;:!?'"])
+    | (?<=`)(?P<tick>`*)(?!`)(?P<code_text>[^\n]+?)(?<!`)`(?P=tick)(?!`)
+    | (?<=\*)\*\*(?=\S)(?P<strong_em_text>[^\n*]+?)(?<=\S)\*\*\*
+    | (?<=\*)\*(?=\S)(?P<strong_text>(?:[^\n*]|\*(?!\*))+?)(?<=\S)\*\*
+    | (?<=_)(?<!\w_)_(?=\S)(?P<strong_u_text>(?:[^\n_]|_(?!_))+?)(?<=\S)__(?!\w)
+    | (?<=\*)(?=[^\s*]|\*\*\S)(?P<em_text>(?:[^\n*]|\*\*(?=\S)[^\n*]+?(?<=\S)\*\*)+?)(?<=\S)\*
+    | (?<=_)(?<!\w_)(?=[^\s_])(?P<em_u_text>[^\n_]+?)(?<=\S)_(?!\w)
+    )
+""", re.VERBOSE | re.DOTALL)
+
+_FENCE_LINE = re.compile(r"[ \t]*```")
+_HOLD_LINE_START = re.compile(r"\n[ \t]*(?:\#{1,6}|`{1,2})?$")
+_MARKER_CHARS = frozenset("*_`[!:")
+_URL_END = frozenset(" \t\n<>()[]")
+_URL_PREFIX = re.compile(r"/{0,2}\Z|//[^\s<>()\[\]]*\Z")
+_HAS_MARKER = re.compile(r"[*_`\[!]").search
+_INLINE_GROUPS = frozenset(("strong_em_text", "strong_text", "strong_u_text", "em_text", "em_u_text"))
+
+_LIST_ITEM = re.compile(r"^[ \t]*(?:[-*+]|\d{1,3}[.)])[ \t]+")
+_HEADING_LINE = re.compile(r"^[ \t]{0,3}\#{1,6}[ \t]+")
+_QUOTE = re.compile(r"^[ \t]*(?:>[ \t]?)+")
+_RULE = re.compile(r"^[ \t]*(?:[-*_][ \t]*){3,}$")
+_TABLE_SEPARATOR = re.compile(r"^[ \t]*\|?[ \t]*:?-{3,}:?[ \t]*(?:\|[ \t]*:?-{3,}:?[ \t]*)*\|?[ \t]*$")
+_SPEECH_URL = re.compile(r"https?://(?:www\.)?([^/\s:?#<>()\[\]]+)[^\s<>()\[\]]*[^\s<>()\[\].,;:!?'\"]")
+_SENTENCE_END = (".", "!", "?", ":", ";")
+
+
+def _render(text, pos=0):
+    """Renders text[pos:] to plain text in a single scan."""
+    if pos == 0:
+        return _MARKDOWN.sub(_replacement, text)
+    parts = []
+    last = pos
+    for match in _MARKDOWN.finditer(text, pos):
+        parts.append(text[last:match.start()])
+        parts.append(_replacement(match))
+        last = match.end()
+    parts.append(text[last:])
+    return "".join(parts)
+
+
+def _replacement(match):
+    kind = match.lastgroup
+    if kind in _INLINE_GROUPS:
+        inner = match.group(kind)
+        return _MARKDOWN.sub(_replacement, inner) if _HAS_MARKER(inner) else inner
+    if kind == "code_text":
+        return match.group(kind).strip()
+    if kind == "heading":
+        return "\n"
+    if kind == "fence":
+        return ""
+    if kind == "url":
+        return match.group()
+    return match.group(kind)
+
+
+def _first_marker(text, start, end):
+    """Returns the index of the first character in text[start:end] that may open a construct."""
+    for index in range(start, end):
+        c = text[index]
+        if c not in _MARKER_CHARS:
+            continue
+        if c == "_" and index > 0 and (text[index - 1].isalnum() or text[index - 1] == "_"):
+            continue
+        if c == "!" and index + 1 < len(text) and text[index + 1] != "[":
+            continue
+        if c == ":" and not (text.endswith(("http", "https"), 0, index) and _URL_PREFIX.match(text, index + 1)):
+            continue
+        return index
+    return None
+
+
+def strip_markdown(text):
+    """
+    Removes Markdown formatting, keeping the readable text.
+
+    Fenced code blocks are dropped (an unclosed fence drops the rest of the text),
+    inline code, links and emphasis keep their content, headings lose their marks
+    and list markers are kept. Underscores inside words and URLs are left alone.
+    """
+    return _render("\n" + text).strip()
+
+
+def render_for_speech(text):
+    """
+    Renders a response for text-to-speech.
+
+    Besides stripping Markdown, list markers, quotes, rules and table pipes are
+    removed, headings and list items end with a pause, URLs are read as their host
+    name and code blocks are announced instead of read out.
+    """
+    lines = []
+    in_fence = False
+    for line in text.split("\n"):
+        if _FENCE_LINE.match(line):
+            if not in_fence:
+                lines.append("Code block omitted.")
+            in_fence = not in_fence
+            continue
+        if in_fence or _RULE.match(line) or _TABLE_SEPARATOR.match(line):
+            continue
+
+        line = _QUOTE.sub("", line, count=1)
+        marker = _HEADING_LINE.match(line) or _LIST_ITEM.match(line)
+        if marker:
+            line = line[marker.end():]
+        if "|" in line:
+            line = ", ".join(cell.strip() for cell in line.strip().strip("|").split("|"))
+
+        line = _SPEECH_URL.sub(r"link to \1", _render("\n" + line)).strip()
+        if not line:
+            continue
+        if marker and not line.endswith(_SENTENCE_END):
+            line += "."
+        lines.append(line)
+    return "\n".join(lines)
+
+
+class MarkdownStreamStripper:
+    """
+    Incremental strip_markdown() for streamed fragments.
+
+    feed() returns only text that can no longer change, holding back a possibly
+    unfinished construct (such as "**bo" or a marker split across fragments) until
+    it is closed or its line ends. Concatenating every feed() result and flush()
+    gives the same text as strip_markdown() on the whole response.
+    """
+    def __init__(self):
+        self._line = "\n"
+        self._emitted_upto = 0
+        self._in_fence = False
+        self._started = False
+        self._pending_space = ""
+
+    def feed(self, chunk):
+        """Adds a fragment and returns the newly finalised plain text."""
+        out = []
+        self._line += chunk
+        while True:
+            # Lines are kept with their leading newline, which is where block constructs start.
+            newline = self._line.find("\n", 1)
+            if newline < 0:
+                break
+            out.append(self._finish_line(self._line[:newline]))
+            self._line = self._line[newline:]
+            self._emitted_upto = 0
+
+        if not self._in_fence and not (self._emitted_upto == 0 and (
+            _HOLD_LINE_START.match(self._line) or _FENCE_LINE.match(self._line, 1)
+        )):
+            text, self._emitted_upto = self._render_settled(self._line, self._emitted_upto)
+            out.append(text)
+        return self._emit("".join(out))
+
+    def flush(self):
+        """Returns the remaining text at the end of the stream."""
+        text = self._finish_line(self._line)
+        self._line = "\n"
+        self._emitted_upto = 0
+        return self._emit(text, final=True)
+
+    def _finish_line(self, line):
+        if _FENCE_LINE.match(line, 1) and self._emitted_upto == 0:
+            self._in_fence = not self._in_fence
+            return ""
+        if self._in_fence:
+            return ""
+        return _render(line, self._emitted_upto)
+
+    @staticmethod
+    def _render_settled(line, pos):
+        """
+        Renders the part of an unfinished line that later text cannot change.
+
+        Returns:
+            tuple: (rendered text, index in line up to which it was rendered).
+        """
+        parts = []
+        cut = pos
+        for match in _MARKDOWN.finditer(line, pos):
+            marker = _first_marker(line, cut, match.start())
+            if marker is not None:
+                parts.append(line[cut:marker])
+                return "".join(parts), marker
+            parts.append(line[cut:match.start()])
+            if match.end() >= len(line) or (match.lastgroup == "url" and line[match.end()] not in _URL_END):
+                # Lookaheads at the end of a match may still fail, and a URL may still
+                # grow, once more text arrives.
+                return "".join(parts), match.start()
+            parts.append(_replacement(match))
+            cut = match.end()
+
+        end = _first_marker(line, cut, len(line))
+        if end is None:
+            # Hold back the last word: it may still grow into a URL.
+            end = max(cut, line.rfind(" ", cut) + 1, line.rfind("\t", cut) + 1)
+        parts.append(line[cut:end])
+        return "".join(parts), end
+
+    def _emit(self, text, final=False):
+        """Drops leading and trailing whitespace of the whole stream, like str.strip()."""
+        if not self._started:
+            text = text.lstrip()
+            if not text:
+                return ""
+            self._started = True
+        body = text.rstrip()
+        if not body:
+            if not final:
+                self._pending_space += text
+            return ""
+        result = self._pending_space + body
+        self._pending_space = "" if final else text[len(body):]
+        return result
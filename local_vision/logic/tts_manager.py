@@ -3,6 +3,8 @@ import threading
 import queue
 import logging
 
+logger = logging.getLogger(__name__)
+
 class TTSManager:
     _instance = None
     _lock = threading.Lock()
@@ -25,33 +27,33 @@ class TTSManager:
         self.enabled = True  # Default to enabled
         self.thread = threading.Thread(target=self._run_loop, daemon=True)
         self.thread.start()
-        logging.info("TTSManager initialized")
+        logger.info("TTSManager initialized")
 
     def _run_loop(self):
         """Background thread loop for TTS engine."""
-        logging.info("TTS: _run_loop started")
+        logger.info("TTS: _run_loop started")
         try:
             # Initialize COM for this thread (required for SAPI5 on Windows)
             try:
                 import pythoncom
                 pythoncom.CoInitialize()
-                logging.debug("TTS: CoInitialize successful")
+                logger.debug("TTS: CoInitialize successful")
             except ImportError:
-                logging.warning("TTS: pythoncom not found, skipping CoInitialize")
+                logger.warning("TTS: pythoncom not found, skipping CoInitialize")
             except Exception as e:
-                logging.error(f"TTS: Error in CoInitialize: {e}")
+                logger.error(f"TTS: Error in CoInitialize: {e}")
 
-            logging.info("TTS: Initializing pyttsx3 engine...")
+            logger.info("TTS: Initializing pyttsx3 engine...")
             
             try:
                 self.engine = pyttsx3.init()
                 self.engine.setProperty('rate', 170)
-                logging.info("TTS: Engine initialized successfully")
+                logger.info("TTS: Engine initialized successfully")
                 
                 self.engine.startLoop(False)
                 
             except Exception as e:
-                logging.critical(f"TTS: Failed to initialize engine: {e}")
+                logger.critical(f"TTS: Failed to initialize engine: {e}")
                 return
 
             while self.is_running:
@@ -61,17 +63,15 @@ class TTSManager:
                     try:
                         text, interrupt = self.queue.get(block=False)
                         
-                        logging.info(f"TTS: Processing '{text}' (interrupt={interrupt})")
-                        
                         if interrupt:
                             try:
                                 if self.engine.isBusy():
-                                    logging.debug("TTS: Stopping current speech")
+                                    logger.debug("TTS: Stopping current speech")
                                     self.engine.stop()
                             except Exception as e:
-                                logging.warning(f"TTS: Error stopping engine: {e}")
+                                logger.warning(f"TTS: Error stopping engine: {e}")
                         
-                        logging.info(f"TTS: Speaking: {text}")
+                        logger.debug("TTS: Speaking %d chars", len(text), extra={"sample_key": "tts.speak"})
                         self.engine.say(text)
                         
                     except queue.Empty:
@@ -80,24 +80,24 @@ class TTSManager:
                         continue
                         
                 except Exception as e:
-                    logging.error(f"TTS: Error in loop: {e}", exc_info=True)
+                    logger.error(f"TTS: Error in loop: {e}", exc_info=True)
                     try:
-                        logging.warning("TTS: Attempting to re-initialize engine...")
+                        logger.warning("TTS: Attempting to re-initialize engine...")
                         if self.engine:
                             self.engine.endLoop()
                         self.engine = pyttsx3.init()
                         self.engine.setProperty('rate', 170)
                         self.engine.startLoop(False)
-                        logging.info("TTS: Engine re-initialized")
+                        logger.info("TTS: Engine re-initialized")
                     except Exception as re_init_error:
-                        logging.error(f"TTS: Failed to re-initialize TTS: {re_init_error}")
+                        logger.error(f"TTS: Failed to re-initialize TTS: {re_init_error}")
                         import time
                         time.sleep(1) # Prevent tight loop on failure
                     
         except Exception as e:
-            logging.critical(f"TTS: Fatal error in TTS thread: {e}", exc_info=True)
+            logger.critical(f"TTS: Fatal error in TTS thread: {e}", exc_info=True)
         finally:
-            logging.info("TTS: Thread ending")
+            logger.info("TTS: Thread ending")
             if self.engine:
                 try:
                     self.engine.endLoop()
@@ -118,15 +118,15 @@ class TTSManager:
             return
         
         if not self.thread.is_alive():
-            logging.critical("TTS: Thread is DEAD! Attempting to restart...")
+            logger.critical("TTS: Thread is DEAD! Attempting to restart...")
             try:
                 self.is_running = True
                 self.thread = threading.Thread(target=self._run_loop, daemon=True)
                 self.thread.start()
             except Exception as e:
-                logging.error(f"TTS: Failed to restart thread: {e}")
+                logger.error(f"TTS: Failed to restart thread: {e}")
 
-        logging.info(f"TTS.speak() called with: '{text}' (interrupt={interrupt})")
+        logger.debug("TTS: Queued %.40r (interrupt=%s)", text, interrupt, extra={"sample_key": "tts.queue"})
         
         if interrupt:
             with self.queue.mutex:
@@ -146,7 +146,7 @@ class TTSManager:
 
     def shutdown(self):
         """Shutdown the TTS manager."""
-        logging.info("TTS: Shutdown requested")
+        logger.info("TTS: Shutdown requested")
         self.is_running = False
         if self.thread.is_alive():
             self.thread.join(timeout=2.0)
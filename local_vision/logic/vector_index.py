@@ -0,0 +1,188 @@
+"""
+In-memory cosine similarity search over embedding vectors.
+
+Vectors are normalized and kept as float16, the same compact form they are stored
+in SQLite. With NumPy installed a search is a blocked matrix product, and once the
+index holds ann_threshold vectors an inverted-file (IVF) index is built: the
+vectors are clustered with k-means and a query only scores the vectors of the
+clusters closest to it. Without NumPy the search is brute force in pure Python,
+which is fine for a few thousand vectors.
+"""
+import heapq
+import math
+import operator
+import struct
+import threading
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional.
+    np = None
+
+
+def normalize(vector):
+    """Scales a vector to unit length so cosine similarity is a dot product."""
+    if np is not None:
+        vector = np.asarray(vector, dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+    norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+    return [value / norm for value in vector]
+
+
+def pack_vector(vector):
+    """Encodes a vector as little-endian float16 bytes."""
+    if np is not None:
+        return np.asarray(vector, dtype="<f2").tobytes()
+    return struct.pack(f"<{len(vector)}e", *vector)
+
+
+def unpack_vector(blob):
+    """Decodes a vector packed by pack_vector."""
+    if np is not None:
+        return np.frombuffer(blob, dtype="<f2")
+    return struct.unpack(f"<{len(blob) // 2}e", blob)
+
+
+class VectorIndex:
+    """
+    Top-k cosine similarity search, exact (brute force) or approximate (IVF).
+    """
+    BLOCK_ROWS = 16384
+    KMEANS_ITERATIONS = 8
+
+    def __init__(self, ann_threshold=20000, probes=8):
+        """
+        Initializes the VectorIndex.
+
+        Args:
+            ann_threshold (int): Number of vectors from which searches use the IVF
+                index (NumPy only); 0 always searches exhaustively.
+            probes (int): Clusters scored per IVF search.
+        """
+        self.ann_threshold = ann_threshold
+        self.probes = probes
+        self._lock = threading.Lock()
+        self._items = []
+        self._rows = {}
+        self._removed = set()
+        # NumPy: float16 bytes not yet appended to the matrix. Pure Python: every vector.
+        self._pending = []
+        self._matrix = None
+        self._ivf = None
+
+    def __len__(self):
+        return len(self._rows)
+
+    def add(self, item, vector):
+        """Adds (or replaces) the vector of an item; the vector is normalized here."""
+        vector = normalize(vector)
+        with self._lock:
+            if item in self._rows:
+                self._removed.add(self._rows[item])
+            self._rows[item] = len(self._items)
+            self._items.append(item)
+            self._pending.append(pack_vector(vector) if np is not None else tuple(vector))
+
+    def remove(self, item):
+        """Removes an item; unknown items are ignored."""
+        with self._lock:
+            row = self._rows.pop(item, None)
+            if row is not None:
+                self._removed.add(row)
+
+    def search(self, query, k=10):
+        """
+        Finds the items most similar to a query vector.
+
+        Returns:
+            list: (score, item) tuples, most similar first.
+        """
+        query = normalize(query)
+        with self._lock:
+            if np is None:
+                return self._search_python(query, k)
+            self._consolidate()
+            if self._matrix is None or not len(self._rows):
+                return []
+            q = np.asarray(query, dtype=np.float32)
+            if self.ann_threshold and len(self._rows) >= self.ann_threshold:
+                rows, scores = self._search_ivf(q, k)
+            else:
+                rows, scores = self._search_exact(q)
+            return self._top(rows, scores, k)
+
+    def _search_python(self, query, k):
+        scored = (
+            (sum(map(operator.mul, query, vector)), row)
+            for row, vector in enumerate(self._pending) if row not in self._removed
+        )
+        return [(score, self._items[row]) for score, row in heapq.nlargest(k, scored)]
+
+    def _consolidate(self):
+        """Appends pending vectors to the matrix, dropping removed rows once they pile up."""
+        if self._pending:
+            block = np.frombuffer(b"".join(self._pending), dtype="<f2").reshape(len(self._pending), -1)
+            self._matrix = block if self._matrix is None else np.concatenate([self._matrix, block])
+            self._pending = []
+        if self._removed and len(self._removed) > len(self._items) // 4:
+            keep = np.array([row for row in range(len(self._items)) if row not in self._removed], dtype=np.int64)
+            self._matrix = self._matrix[keep]
+            self._items = [self._items[row] for row in keep]
+            self._rows = {item: row for row, item in enumerate(self._items)}
+            self._removed = set()
+            self._ivf = None
+
+    def _search_exact(self, q):
+        """Scores every row in blocks, so float16 rows are widened a block at a time."""
+        count = len(self._matrix)
+        scores = np.empty(count, dtype=np.float32)
+        for block in range(0, count, self.BLOCK_ROWS):
+            end = min(block + self.BLOCK_ROWS, count)
+            scores[block:end] = self._matrix[block:end].astype(np.float32) @ q
+        return np.arange(count), scores
+
+    def _build_ivf(self):
+        """Clusters the matrix with spherical k-means on a sample and files every row under its centroid."""
+        count = len(self._matrix)
+        clusters = max(1, int(math.sqrt(count)))
+        rng = np.random.default_rng(0)
+        sample = self._matrix[rng.choice(count, min(count, clusters * 32), replace=False)].astype(np.float32)
+        centroids = sample[rng.choice(len(sample), clusters, replace=False)]
+        for _ in range(self.KMEANS_ITERATIONS):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-12), centroids)
+
+        assignment = np.empty(count, dtype=np.int64)
+        for block in range(0, count, self.BLOCK_ROWS):
+            end = min(block + self.BLOCK_ROWS, count)
+            assignment[block:end] = np.argmax(self._matrix[block:end].astype(np.float32) @ centroids.T, axis=1)
+        order = np.argsort(assignment, kind="stable")
+        bounds = np.searchsorted(assignment[order], np.arange(clusters + 1))
+        self._ivf = (centroids, order, bounds, count)
+
+    def _search_ivf(self, q, k):
+        # Rows added after the clustering are scored exhaustively until they make up
+        # a tenth of the index, then the clustering is rebuilt.
+        if self._ivf is None or len(self._matrix) - self._ivf[3] > self._ivf[3] // 10:
+            self._build_ivf()
+        centroids, order, bounds, covered = self._ivf
+        nearest = np.argsort(centroids @ q)[::-1][:self.probes]
+        rows = np.concatenate([order[bounds[c]:bounds[c + 1]] for c in nearest] + [np.arange(covered, len(self._matrix))])
+        scores = np.empty(len(rows), dtype=np.float32)
+        for block in range(0, len(rows), self.BLOCK_ROWS):
+            chunk = rows[block:block + self.BLOCK_ROWS]
+            scores[block:block + len(chunk)] = self._matrix[chunk].astype(np.float32) @ q
+        return rows, scores
+
+    def _top(self, rows, scores, k):
+        if self._removed:
+            live = ~np.isin(rows, np.fromiter(self._removed, dtype=np.int64, count=len(self._removed)))
+            rows, scores = rows[live], scores[live]
+        if len(rows) > k:
+            best = np.argpartition(-scores, k)[:k]
+            rows, scores = rows[best], scores[best]
+        ranked = np.argsort(-scores, kind="stable")
+        return [(float(scores[i]), self._items[rows[i]]) for i in ranked]
@@ -0,0 +1,259 @@
+import cProfile
+import collections
+import datetime
+import logging
+import os
+import pstats
+import sys
+import sysconfig
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+from local_vision.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+# Frames in these directories belong to Python or installed packages (tkinter,
+# customtkinter, ...), not to the handler that blocked.
+_LIBRARY_DIRS = tuple(
+    os.path.normcase(os.path.abspath(path)) + os.sep
+    for path in {sysconfig.get_paths()["stdlib"], sysconfig.get_paths()["purelib"], sysconfig.get_paths()["platlib"]}
+)
+
+
+def _is_library(filename):
+    return os.path.normcase(os.path.abspath(filename)).startswith(_LIBRARY_DIRS)
+
+
+def _frame_stack(frame):
+    """Returns a frame's stack as (filename, lineno, function) tuples, outermost first."""
+    stack = []
+    while frame is not None:
+        stack.append((frame.f_code.co_filename, frame.f_lineno, frame.f_code.co_name))
+        frame = frame.f_back
+    stack.reverse()
+    return tuple(stack)
+
+
+def _describe(entry):
+    filename, lineno, function = entry
+    return f"{function} ({os.path.basename(filename)}:{lineno})"
+
+
+def blocking_handler(stack):
+    """
+    Names the event handler and the innermost application frame of a sampled stack.
+
+    Tk enters Python through tkinter's CallWrapper.__call__; the handler is the
+    first frame after the innermost such entry that is not library code.
+
+    Returns:
+        tuple: (handler, location) descriptions; either may be None.
+    """
+    start = 0
+    for index, (filename, _, function) in enumerate(stack):
+        if function == "__call__" and os.path.basename(os.path.dirname(filename)) == "tkinter":
+            start = index + 1
+    application = [entry for entry in stack[start:] if not _is_library(entry[0])]
+    if not application:
+        return None, _describe(stack[-1]) if stack else None
+    return _describe(application[0]), _describe(application[-1])
+
+
+class LagMonitor:
+    """
+    Measures how late the Tk event loop runs its scheduled callbacks.
+
+    The UI calls tick() from an after() loop every `interval` seconds; the lag is
+    how much later than scheduled the tick ran. A watchdog thread notices when a
+    tick is overdue by more than `threshold` and, until the loop catches up,
+    samples the main thread's stack with sys._current_frames(). The stall is then
+    recorded with the handler that was running and its most frequent stacks.
+    """
+    def __init__(self, interval=0.1, threshold=0.2, sample_interval=0.01, max_stalls=50, clock=time.perf_counter):
+        """
+        Initializes the LagMonitor.
+
+        Args:
+            interval (float): Seconds between ticks.
+            threshold (float): Lag in seconds from which a tick counts as a stall.
+            sample_interval (float): Seconds between stack samples during a stall.
+            max_stalls (int): Number of recent stalls kept.
+            clock (callable): Monotonic clock, in seconds.
+        """
+        self.interval = interval
+        self.threshold = threshold
+        self.sample_interval = sample_interval
+        self.clock = clock
+        self.ticks = 0
+        self.stall_count = 0
+        self.max_lag = 0.0
+
+        self._stalls = deque(maxlen=max_stalls)
+        self._samples = []
+        self._lock = threading.Lock()
+        self._expected = None
+        self._thread_id = None
+        self._stop_event = threading.Event()
+        self._watchdog = None
+
+    def start(self):
+        """Starts monitoring the calling thread, which must be the one running the event loop."""
+        self._thread_id = threading.get_ident()
+        self._expected = self.clock() + self.interval
+        self._stop_event.clear()
+        if self._watchdog is None or not self._watchdog.is_alive():
+            self._watchdog = threading.Thread(target=self._watch, name="lag-monitor", daemon=True)
+            self._watchdog.start()
+
+    def stop(self):
+        """Stops the watchdog thread."""
+        self._stop_event.set()
+
+    def _watch(self):
+        while not self._stop_event.wait(self.sample_interval):
+            expected = self._expected
+            if expected is None or self.clock() - expected < self.threshold:
+                continue
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is not None:
+                stack = _frame_stack(frame)
+                with self._lock:
+                    self._samples.append(stack)
+
+    def tick(self):
+        """
+        Records the lag of the current tick; call it from the scheduled callback.
+
+        Returns:
+            float: The lag in seconds.
+        """
+        now = self.clock()
+        lag = max(0.0, now - self._expected) if self._expected is not None else 0.0
+        self._expected = now + self.interval
+        with self._lock:
+            samples, self._samples = self._samples, []
+        self.ticks += 1
+        self.max_lag = max(self.max_lag, lag)
+        if lag >= self.threshold:
+            self._record_stall(lag, samples)
+        return lag
+
+    def _record_stall(self, lag, samples):
+        counts = collections.Counter(samples)
+        handler = location = None
+        if counts:
+            handler, location = blocking_handler(counts.most_common(1)[0][0])
+        stall = {
+            "time": datetime.datetime.now().isoformat(timespec="seconds"),
+            "lag_ms": round(lag * 1000, 1),
+            "handler": handler,
+            "location": location,
+            "samples": len(samples),
+            "stacks": [
+                {"count": count, "frames": [_describe(entry) for entry in stack if not _is_library(entry[0])]}
+                for stack, count in counts.most_common(3)
+            ],
+        }
+        self.stall_count += 1
+        self._stalls.append(stall)
+        tracer.record("ui.stall", lag, handler=handler)
+        logger.warning(
+            "Event loop stalled for %.0f ms in %s (%s)", lag * 1000, handler or "unknown handler", location,
+            extra={"sample_key": "ui.stall", "stall": stall}
+        )
+
+    def stalls(self):
+        """Returns the recent stalls, oldest first."""
+        return list(self._stalls)
+
+    def stats(self):
+        """
+        Returns the monitor counters.
+
+        Returns:
+            dict: ticks, stalls, max_lag_ms and last_stall (or None).
+        """
+        return {
+            "ticks": self.ticks,
+            "stalls": self.stall_count,
+            "max_lag_ms": round(self.max_lag * 1000, 1),
+            "last_stall": self._stalls[-1] if self._stalls else None,
+        }
+
+
+class ProfileCapture:
+    """
+    Time-boxed cProfile and tracemalloc capture for offline analysis.
+
+    cProfile only sees the thread that called start(), so start and stop it on the
+    Tk thread to profile the UI. tracemalloc covers every thread. stop() writes
+    `<stamp>.prof` (open with pstats or snakeviz), `<stamp>.tracemalloc` (a
+    tracemalloc.Snapshot dump) and `<stamp>.txt` with the top entries of both.
+    """
+    TOP_ENTRIES = 30
+
+    def __init__(self, output_dir="profiles"):
+        """
+        Initializes the ProfileCapture.
+
+        Args:
+            output_dir (str): Directory the captures are written to.
+        """
+        self.output_dir = output_dir
+        self._profiler = None
+        self._started_tracemalloc = False
+        self._started_at = None
+
+    @property
+    def running(self):
+        return self._profiler is not None
+
+    def start(self):
+        """Starts profiling the calling thread and tracing allocations."""
+        if self.running:
+            return
+        self._started_at = time.perf_counter()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+            self._started_tracemalloc = True
+        self._profiler = cProfile.Profile()
+        self._profiler.enable()
+        logger.info("Profile capture started")
+
+    def stop(self):
+        """
+        Stops the capture and writes it to output_dir.
+
+        Returns:
+            list: Paths of the written files, empty if no capture was running.
+        """
+        if not self.running:
+            return []
+        profiler, self._profiler = self._profiler, None
+        profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+        seconds = time.perf_counter() - self._started_at
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, datetime.datetime.now().strftime("profile-%Y%m%d-%H%M%S"))
+        paths = [base + ".prof", base + ".tracemalloc", base + ".txt"]
+        profiler.dump_stats(paths[0])
+        snapshot.dump(paths[1])
+        self._write_summary(paths[2], paths[0], snapshot, seconds)
+        logger.info(f"Profile capture of {seconds:.1f}s written to {base}.*")
+        return paths
+
+    def _write_summary(self, path, stats_path, snapshot, seconds):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"Capture of {seconds:.1f}s\n\n")
+            stats = pstats.Stats(stats_path, stream=f)
+            stats.sort_stats("cumulative").print_stats(self.TOP_ENTRIES)
+            f.write("\nTop allocations by line:\n")
+            for stat in snapshot.statistics("lineno")[:self.TOP_ENTRIES]:
+                f.write(f"{stat}\n")
@@ -0,0 +1,111 @@
+from itertools import starmap
+from typing import Any, Optional
+
+import msgspec
+
+
+class Record(msgspec.Struct, gc=False):
+    """
+    Base of the compact records that replace per-row dictionaries.
+
+    Records are msgspec structs: fixed fields, no per-instance __dict__, and not
+    tracked by the garbage collector (their fields are scalars; see LLMResult for
+    the exception). They also read like dictionaries (record["content"], record.get("image_path"), "content" in
+    record), so code written for the former dictionaries and callers that still
+    pass plain dictionaries work alike.
+    """
+    def __getitem__(self, key):
+        if key not in self.__struct_fields__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key):
+        return key in self.__struct_fields__
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.__struct_fields__ else default
+
+    def to_dict(self):
+        """Returns the fields as a new dictionary."""
+        return msgspec.structs.asdict(self)
+
+
+class Conversation(Record):
+    """A row of the conversations table."""
+    conversation_id: int
+    start_timestamp: str
+    user_nickname: str
+
+
+class Interaction(Record):
+    """A row of the interactions table; summaries of compacted history have no interaction_id."""
+    interaction_id: Optional[int]
+    conversation_id: int
+    timestamp: str
+    actor: str
+    type: str
+    content: Optional[str] = None
+    image_path: Optional[str] = None
+
+
+class LLMResult(Record, gc=True):
+    """
+    The final result message of a model request, as put on a result queue.
+
+    Tracked by the garbage collector: content may hold lists or dictionaries
+    (batch results, stream chunks) that can take part in reference cycles.
+    """
+    type: str
+    content: Any
+    request_id: Optional[str] = None
+    # time.perf_counter() when queued, so the consumer can measure queue wait
+    queued_at: float = 0.0
+
+
+def to_records(record_type, rows):
+    """
+    Converts database rows to records, passing the columns positionally.
+
+    Returns:
+        list: One record per row; rows must select the columns in field order.
+    """
+    return list(starmap(record_type, rows or ()))
+
+
+_encoder = msgspec.msgpack.Encoder()
+_decoders = {}
+
+
+def encode_records(records, buffer=None):
+    """
+    Serializes records (or a list of them) to MessagePack.
+
+    Args:
+        records: A record, or a list of records.
+        buffer (bytearray, optional): Reused as the output, to avoid allocating
+            a new bytes object per message.
+
+    Returns:
+        bytes or bytearray: The encoded data (buffer itself when given).
+    """
+    if buffer is None:
+        return _encoder.encode(records)
+    _encoder.encode_into(records, buffer)
+    return buffer
+
+
+def decode_records(data, record_type, many=True):
+    """
+    Deserializes records encoded by encode_records.
+
+    data may be any buffer (bytes, bytearray, memoryview, e.g. over shared memory);
+    it is read in place, without copying it first.
+
+    Returns:
+        list or Record: The records, or a single record when many is False.
+    """
+    key = (record_type, many)
+    decoder = _decoders.get(key)
+    if decoder is None:
+        decoder = _decoders[key] = msgspec.msgpack.Decoder(list[record_type] if many else record_type)
+    return decoder.decode(data)
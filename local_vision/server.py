@@ -0,0 +1,602 @@
+"""
+Local HTTP API exposing the vision and chat pipeline to other tools.
+
+Usage:
+    python -m local_vision.server --port 8765
+
+Endpoints:
+    GET    /health
+    GET    /metrics                               Prometheus text format
+    POST   /v1/describe                           {"image_path" | "image_base64", "stream", "profile"}
+    GET    /v1/conversations
+    POST   /v1/conversations                      {"nickname"}
+    GET    /v1/conversations/<id>/history
+    POST   /v1/conversations/<id>/messages        {"message", "stream", "profile"}
+    DELETE /v1/conversations/<id>
+    GET    /v1/search?q=<text>&k=<count>          semantic search (needs [Search] EmbeddingModel)
+
+Streaming requests ("stream": true) answer with Server-Sent Events over a chunked
+response. Model calls go through the LLM_Manager request scheduler, so the server
+shares the same concurrency limit as every other caller. "profile" picks a response
+profile (fast, balanced, detailed, ...); the default comes from config.ini. Runs
+without a display.
+"""
+import argparse
+import asyncio
+import base64
+import configparser
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+import time
+from urllib.parse import urlsplit, parse_qs
+
+import msgspec
+
+from local_vision.data.database_manager import DatabaseManager
+from local_vision.data.history_manager import HistoryManager
+from local_vision.logging_setup import configure_logging_from_config
+from local_vision.logic.history_compactor import HistoryCompactor
+from local_vision.logic.llm_manager import LLM_Manager
+from local_vision.logic.model_supervisor import ModelSupervisor
+from local_vision.logic.response_profiles import read_profiles
+from local_vision.logic.semantic_search import SemanticIndexer
+
+logger = logging.getLogger(__name__)
+
+REASONS = {
+    200: "OK", 201: "Created", 204: "No Content", 400: "Bad Request", 404: "Not Found",
+    405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+class HTTPError(Exception):
+    """An error that maps directly to an HTTP status code."""
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class HTTPRequest:
+    """
+    A parsed HTTP/1.1 request.
+    """
+    def __init__(self, method, target, version, headers, body):
+        self.method = method
+        self.version = version
+        self.headers = headers
+        self.body = body
+        parts = urlsplit(target)
+        self.path = parts.path
+        self.query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+
+    @property
+    def keep_alive(self):
+        connection = self.headers.get("connection", "").lower()
+        if self.version == "HTTP/1.0":
+            return connection == "keep-alive"
+        return connection != "close"
+
+    def json(self):
+        """Returns the JSON request body as a dict."""
+        if not self.body:
+            return {}
+        try:
+            data = json.loads(self.body)
+        except ValueError:
+            raise HTTPError(400, "Request body is not valid JSON.")
+        if not isinstance(data, dict):
+            raise HTTPError(400, "Request body must be a JSON object.")
+        return data
+
+
+class _AsyncQueueBridge:
+    """
+    Lets LLM worker threads feed an asyncio.Queue through the queue.Queue put() API.
+    """
+    def __init__(self, loop):
+        self.loop = loop
+        self.queue = asyncio.Queue()
+
+    def put(self, item):
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, item)
+
+
+class ServerMetrics:
+    """
+    Request counters and latency totals rendered in Prometheus text format.
+    """
+    def __init__(self):
+        self.requests = {}
+        self.latency_sum = {}
+        self.open_connections = 0
+        self.active_streams = 0
+        self.rejected = 0
+
+    def observe(self, route, status, duration):
+        key = (route, status)
+        self.requests[key] = self.requests.get(key, 0) + 1
+        self.latency_sum[route] = self.latency_sum.get(route, 0.0) + duration
+
+    def render(self, scheduler_stats, resilience_stats=None, routing_stats=None, prompt_cache_stats=None,
+               profile_stats=None):
+        lines = [
+            "# TYPE local_vision_http_requests_total counter",
+        ]
+        for (route, status), count in sorted(self.requests.items()):
+            lines.append(f'local_vision_http_requests_total{{route="{route}",status="{status}"}} {count}')
+        lines.append("# TYPE local_vision_http_request_seconds_sum counter")
+        for route, total in sorted(self.latency_sum.items()):
+            lines.append(f'local_vision_http_request_seconds_sum{{route="{route}"}} {total:.6f}')
+        lines += [
+            "# TYPE local_vision_http_open_connections gauge",
+            f"local_vision_http_open_connections {self.open_connections}",
+            "# TYPE local_vision_http_active_streams gauge",
+            f"local_vision_http_active_streams {self.active_streams}",
+            "# TYPE local_vision_http_rejected_total counter",
+            f"local_vision_http_rejected_total {self.rejected}",
+        ]
+        for name in ("waiting", "running", "completed", "failed"):
+            lines.append(f"# TYPE local_vision_llm_requests_{name} gauge")
+            lines.append(f"local_vision_llm_requests_{name} {scheduler_stats[name]}")
+        if resilience_stats:
+            for name in ("retry_retries", "retry_transient_errors", "retry_deadline_exceeded", "breaker_opened", "breaker_rejected"):
+                lines.append(f"# TYPE local_vision_llm_{name}_total counter")
+                lines.append(f"local_vision_llm_{name}_total {resilience_stats[name]}")
+            lines.append("# TYPE local_vision_llm_breaker_open gauge")
+            lines.append(f"local_vision_llm_breaker_open {int(resilience_stats['breaker_state'] != 'closed')}")
+        if routing_stats and routing_stats["models"]:
+            lines.append("# TYPE local_vision_llm_model_requests_total counter")
+            for model, stats in sorted(routing_stats["models"].items()):
+                lines.append(f'local_vision_llm_model_requests_total{{model="{model}"}} {stats["requests"]}')
+            lines.append("# TYPE local_vision_llm_model_latency_avg_ms gauge")
+            for model, stats in sorted(routing_stats["models"].items()):
+                lines.append(f'local_vision_llm_model_latency_avg_ms{{model="{model}"}} {stats["avg_ms"]}')
+        if profile_stats:
+            lines.append("# TYPE local_vision_llm_profile_requests_total counter")
+            for profile, stats in sorted(profile_stats.items()):
+                lines.append(f'local_vision_llm_profile_requests_total{{profile="{profile}"}} {stats["requests"]}')
+            lines.append("# TYPE local_vision_llm_profile_latency_avg_ms gauge")
+            for profile, stats in sorted(profile_stats.items()):
+                lines.append(f'local_vision_llm_profile_latency_avg_ms{{profile="{profile}"}} {stats["avg_ms"]}')
+            lines.append("# TYPE local_vision_llm_profile_tokens_avg gauge")
+            for profile, stats in sorted(profile_stats.items()):
+                lines.append(f'local_vision_llm_profile_tokens_avg{{profile="{profile}"}} {stats["avg_tokens"]}')
+        if prompt_cache_stats:
+            for name in ("turns", "prefix_hits", "cache_hits", "prompt_tokens", "cached_tokens"):
+                lines.append(f"# TYPE local_vision_llm_prompt_cache_{name}_total counter")
+                lines.append(f"local_vision_llm_prompt_cache_{name}_total {prompt_cache_stats[name]}")
+        return "\n".join(lines) + "\n"
+
+
+class APIServer:
+    """
+    A small asyncio HTTP/1.1 server with keep-alive and chunked streaming responses.
+    """
+    MAX_BODY_SIZE = 32 * 1024 * 1024
+    KEEP_ALIVE_TIMEOUT = 15.0
+
+    def __init__(self, llm_manager, history_manager: HistoryManager, host="127.0.0.1", port=8765, max_queued_requests=16,
+                 model_supervisor=None, history_compactor=None, semantic_indexer=None):
+        """
+        Initializes the APIServer.
+
+        Args:
+            llm_manager (LLM_Manager): The shared LLM manager.
+            history_manager (HistoryManager): The history manager used for conversations.
+            host (str): Interface to bind to.
+            port (int): Port to listen on (0 picks a free port).
+            max_queued_requests (int): Model requests allowed to wait for the scheduler
+                before new ones are rejected with 503.
+            model_supervisor (ModelSupervisor, optional): Reports the model load state in /health.
+            history_compactor (HistoryCompactor, optional): Summarizes long conversations
+                after each answer; context is then read from the latest checkpoint.
+            semantic_indexer (SemanticIndexer, optional): Embeds new interactions and
+                answers /v1/search.
+        """
+        self.llm_manager = llm_manager
+        self.model_supervisor = model_supervisor
+        self.history_compactor = history_compactor
+        self.semantic_indexer = semantic_indexer
+        self.history_manager = history_manager
+        self.host = host
+        self.port = port
+        self.max_queued_requests = max_queued_requests
+        self.metrics = ServerMetrics()
+        self._server = None
+        self._routes = [
+            ("GET", re.compile(r"^/health$"), self._handle_health, "/health"),
+            ("GET", re.compile(r"^/metrics$"), self._handle_metrics, "/metrics"),
+            ("POST", re.compile(r"^/v1/describe$"), self._handle_describe, "/v1/describe"),
+            ("GET", re.compile(r"^/v1/conversations$"), self._handle_list_conversations, "/v1/conversations"),
+            ("POST", re.compile(r"^/v1/conversations$"), self._handle_create_conversation, "/v1/conversations"),
+            ("GET", re.compile(r"^/v1/conversations/(\d+)/history$"), self._handle_history, "/v1/conversations/{id}/history"),
+            ("POST", re.compile(r"^/v1/conversations/(\d+)/messages$"), self._handle_message, "/v1/conversations/{id}/messages"),
+            ("DELETE", re.compile(r"^/v1/conversations/(\d+)$"), self._handle_delete_conversation, "/v1/conversations/{id}"),
+            ("GET", re.compile(r"^/v1/search$"), self._handle_search, "/v1/search"),
+        ]
+
+    async def start(self):
+        """Starts listening; returns once the socket is bound."""
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"API server listening on http://{self.host}:{self.port}")
+
+    async def serve_forever(self):
+        if not self._server:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _read_request(self, reader):
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.KEEP_ALIVE_TIMEOUT)
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+            return None
+        except asyncio.LimitOverrunError:
+            raise HTTPError(400, "Request headers too large.")
+
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ", 2)
+        except ValueError:
+            raise HTTPError(400, "Malformed request line.")
+
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+
+        length = headers.get("content-length", "0") or "0"
+        if not length.isdigit():
+            raise HTTPError(400, "Invalid Content-Length.")
+        length = int(length)
+        if length > self.MAX_BODY_SIZE:
+            raise HTTPError(413, "Request body too large.")
+        body = await reader.readexactly(length) if length else b""
+        return HTTPRequest(method.upper(), target, version, headers, body)
+
+    async def _handle_connection(self, reader, writer):
+        self.metrics.open_connections += 1
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except HTTPError as e:
+                    await self._send_json(writer, e.status, {"error": e.message}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+
+                keep_alive = await self._dispatch(request, writer)
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            self.metrics.open_connections -= 1
+            writer.close()
+
+    async def _dispatch(self, request, writer):
+        """Routes a request to its handler; returns whether the connection stays open."""
+        start = time.perf_counter()
+        route_name = "unmatched"
+        status = 500
+        keep_alive = request.keep_alive
+        try:
+            handler, args, route_name = self._match(request)
+            status, payload = await handler(request, writer, *args)
+            if payload is not None:
+                if isinstance(payload, str):
+                    await self._send(writer, status, payload.encode("utf-8"), "text/plain; version=0.0.4", keep_alive)
+                else:
+                    await self._send_json(writer, status, payload, keep_alive)
+        except HTTPError as e:
+            status = e.status
+            await self._send_json(writer, status, {"error": e.message}, keep_alive)
+        except ConnectionError:
+            keep_alive = False
+        except Exception as e:
+            logger.error(f"API server error on {request.method} {request.path}: {e}", exc_info=True)
+            status = 500
+            await self._send_json(writer, status, {"error": str(e)}, keep_alive)
+        self.metrics.observe(route_name, status, time.perf_counter() - start)
+        return keep_alive
+
+    def _match(self, request):
+        path_matched = False
+        for method, pattern, handler, name in self._routes:
+            match = pattern.match(request.path)
+            if match:
+                path_matched = True
+                if method == request.method:
+                    return handler, [int(group) for group in match.groups()], name
+        if path_matched:
+            raise HTTPError(405, "Method not allowed.")
+        raise HTTPError(404, "Not found.")
+
+    async def _send(self, writer, status, body, content_type, keep_alive):
+        head = (
+            f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    async def _send_json(self, writer, status, payload, keep_alive):
+        # msgspec encodes the history records directly, without building a dict per interaction.
+        body = msgspec.json.encode(payload)
+        await self._send(writer, status, body, "application/json; charset=utf-8", keep_alive)
+
+    async def _stream_events(self, request, writer, run, final_type):
+        """
+        Runs a streaming LLM call in a worker thread and relays its queue messages as SSE.
+
+        Returns:
+            str: The final text, or None if the call failed.
+        """
+        loop = asyncio.get_running_loop()
+        bridge = _AsyncQueueBridge(loop)
+
+        head = (
+            "HTTP/1.1 200 OK\r\n"
+            "Content-Type: text/event-stream; charset=utf-8\r\n"
+            "Cache-Control: no-cache\r\n"
+            "Transfer-Encoding: chunked\r\n"
+            f"Connection: {'keep-alive' if request.keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1"))
+
+        async def send_event(event, data):
+            payload = f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+            writer.write(f"{len(payload):x}\r\n".encode("latin-1") + payload + b"\r\n")
+            await writer.drain()
+
+        def worker():
+            try:
+                bridge.put({"type": final_type, "content": run(bridge)})
+            except Exception as e:
+                bridge.put({"type": "error", "content": str(e)})
+
+        self.metrics.active_streams += 1
+        future = loop.run_in_executor(None, worker)
+        final_text = None
+        try:
+            while True:
+                item = await bridge.queue.get()
+                if item["type"] == "stream_start":
+                    await send_event("reset", {})
+                elif item["type"] == "fragment":
+                    await send_event("fragment", {"content": item["content"]})
+                elif item["type"] == "error":
+                    await send_event("error", {"error": item["content"]})
+                    break
+                else:
+                    final_text = item["content"]
+                    await send_event("done", {"content": final_text})
+                    break
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        finally:
+            self.metrics.active_streams -= 1
+            await future
+        return final_text
+
+    def _check_capacity(self):
+        stats = self.llm_manager.scheduler.stats()
+        if stats["waiting"] >= self.max_queued_requests:
+            self.metrics.rejected += 1
+            raise HTTPError(503, "Too many queued model requests, try again later.")
+
+    async def _handle_health(self, request, writer):
+        if self.model_supervisor:
+            return 200, {"status": "ok", "model": self.model_supervisor.status()}
+        return 200, {"status": "ok"}
+
+    async def _handle_metrics(self, request, writer):
+        return 200, self.metrics.render(
+            self.llm_manager.scheduler.stats(),
+            self.llm_manager.get_resilience_stats(),
+            self.llm_manager.get_routing_stats(),
+            self.llm_manager.get_prompt_cache_stats(),
+            self.llm_manager.get_profile_stats()
+        )
+
+    def _profile(self, data):
+        """Returns the response profile requested in a JSON body, validated."""
+        try:
+            return self.llm_manager.get_profile(data.get("profile"))
+        except (ValueError, AttributeError):
+            names = ", ".join(sorted(self.llm_manager.profiles))
+            raise HTTPError(400, f"profile must be one of: {names}.")
+
+    async def _handle_describe(self, request, writer):
+        data = request.json()
+        profile = self._profile(data)
+        image_path = data.get("image_path")
+        temp_path = None
+        if data.get("image_base64"):
+            try:
+                image_bytes = base64.b64decode(data["image_base64"], validate=True)
+            except ValueError:
+                raise HTTPError(400, "image_base64 is not valid base64.")
+            with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as temp_file:
+                temp_file.write(image_bytes)
+                temp_path = image_path = temp_file.name
+        if not image_path:
+            raise HTTPError(400, "Provide image_path or image_base64.")
+        if not os.path.exists(image_path):
+            raise HTTPError(400, f"Image not found: {image_path}")
+
+        self._check_capacity()
+        try:
+            if data.get("stream"):
+                await self._stream_events(
+                    request, writer,
+                    lambda bridge: self.llm_manager.describe_image(image_path, bridge, stream=True, profile=profile),
+                    "description"
+                )
+                return 200, None
+
+            loop = asyncio.get_running_loop()
+            description = await loop.run_in_executor(
+                None, lambda: self.llm_manager.describe_image(image_path, profile=profile)
+            )
+            return 200, {"description": description}
+        finally:
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    async def _handle_list_conversations(self, request, writer):
+        conversations = self.history_manager.get_conversations() or []
+        return 200, {"conversations": [
+            conversation.to_dict() for conversation in conversations
+        ]}
+
+    async def _handle_create_conversation(self, request, writer):
+        nickname = request.json().get("nickname") or "api"
+        conversation_id = self.history_manager.create_conversation(nickname)
+        return 201, {"conversation_id": conversation_id}
+
+    async def _handle_history(self, request, writer, conversation_id):
+        history = self.history_manager.get_conversation_history(conversation_id, as_dict=True) or []
+        limit = request.query.get("limit")
+        if limit:
+            if not limit.isdigit() or int(limit) == 0:
+                raise HTTPError(400, "limit must be a positive integer.")
+            history = history[-int(limit):]
+        return 200, {"conversation_id": conversation_id, "interactions": history}
+
+    async def _handle_message(self, request, writer, conversation_id):
+        data = request.json()
+        message = (data.get("message") or "").strip()
+        if not message:
+            raise HTTPError(400, "message must not be empty.")
+        profile = self._profile(data)
+
+        self._check_capacity()
+        limit = self.history_compactor.context_limit() if self.history_compactor else None
+        history = self.history_manager.get_context(conversation_id, limit)
+        self.history_manager.save_interaction(conversation_id, "user", "text", content=message)
+
+        if data.get("stream"):
+            response = await self._stream_events(
+                request, writer,
+                lambda bridge: self.llm_manager.respond_to_text(
+                    message, history, bridge, stream=True, conversation_key=conversation_id, profile=profile
+                ),
+                "text_response"
+            )
+            if response is not None:
+                self.history_manager.save_interaction(conversation_id, "system", "text", content=response)
+                self._compact(conversation_id)
+            return 200, None
+
+        loop = asyncio.get_running_loop()
+        response = await loop.run_in_executor(
+            None, lambda: self.llm_manager.respond_to_text(
+                message, history, conversation_key=conversation_id, profile=profile
+            )
+        )
+        self.history_manager.save_interaction(conversation_id, "system", "text", content=response)
+        self._compact(conversation_id)
+        return 200, {"conversation_id": conversation_id, "response": response}
+
+    def _compact(self, conversation_id):
+        if self.semantic_indexer:
+            self.semantic_indexer.notify()
+        if self.history_compactor:
+            self.history_compactor.maybe_compact(conversation_id)
+
+    async def _handle_delete_conversation(self, request, writer, conversation_id):
+        self.history_manager.delete_conversation(conversation_id)
+        if self.semantic_indexer:
+            self.semantic_indexer.remove_conversation(conversation_id)
+        return 200, {"deleted": conversation_id}
+
+    async def _handle_search(self, request, writer):
+        if not self.semantic_indexer:
+            raise HTTPError(503, "Semantic search is disabled; set [Search] EmbeddingModel.")
+        query = (request.query.get("q") or "").strip()
+        if not query:
+            raise HTTPError(400, "q must not be empty.")
+        k = request.query.get("k") or "10"
+        if not k.isdigit() or not 0 < int(k) <= 100:
+            raise HTTPError(400, "k must be an integer between 1 and 100.")
+        loop = asyncio.get_running_loop()
+        results = await loop.run_in_executor(None, self.semantic_indexer.search, query, int(k))
+        return 200, {"query": query, "results": results}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m local_vision.server", description="Local Vision HTTP API server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--db", default="local_vision.db", help="SQLite database file.")
+    parser.add_argument("--model", help="LM Studio model identifier (default: ModelIdentifier from config.ini).")
+    parser.add_argument("--base-url", default="http://localhost:1234/v1", help="LM Studio server URL.")
+    parser.add_argument("--concurrency", type=int, default=1, help="Model predictions allowed to run at once.")
+    parser.add_argument("--max-queued", type=int, default=16, help="Queued model requests before answering 503.")
+    args = parser.parse_args(argv)
+
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+    configure_logging_from_config(config)
+    model_identifier = args.model or config.get('Settings', 'ModelIdentifier', fallback='local-model')
+
+    db_manager = DatabaseManager(args.db)
+    db_manager.connect()
+    db_manager.create_tables()
+    history_manager = HistoryManager(db_manager)
+    llm_manager = LLM_Manager(
+        model_identifier=model_identifier,
+        base_url=args.base_url,
+        max_concurrent_requests=args.concurrency,
+        routes=LLM_Manager.read_routes(config),
+        embedding_model=config.get('Search', 'EmbeddingModel', fallback='').strip() or None,
+        profiles=read_profiles(config),
+        default_profile=config.get('Settings', 'ResponseProfile', fallback=None)
+    )
+    model_supervisor = ModelSupervisor(
+        llm_manager, keep_alive_interval=config.getfloat('Settings', 'ModelKeepAliveSeconds', fallback=240.0)
+    )
+    model_supervisor.start()
+    history_compactor = HistoryCompactor(
+        llm_manager, history_manager,
+        compact_after=config.getint('Settings', 'CompactAfterInteractions', fallback=24),
+        keep_recent=config.getint('Settings', 'KeepRecentInteractions', fallback=8)
+    )
+
+    semantic_indexer = None
+    if llm_manager.embedding_identifier:
+        semantic_indexer = SemanticIndexer(
+            llm_manager, history_manager, ann_threshold=config.getint('Search', 'AnnThreshold', fallback=20000)
+        )
+        semantic_indexer.start()
+
+    server = APIServer(
+        llm_manager, history_manager, args.host, args.port, args.max_queued, model_supervisor, history_compactor,
+        semantic_indexer
+    )
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
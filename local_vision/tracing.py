@@ -0,0 +1,188 @@
+import contextvars
+import itertools
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+from collections import deque
+
+from local_vision.logging_setup import start_queue_listener, stop_queue_listener
+
+_current_request = contextvars.ContextVar("local_vision_request_id", default=None)
+
+
+class _NullSpan:
+    """Shared no-op span returned while tracing is disabled."""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    """Times a block and reports it to the tracer on exit."""
+    __slots__ = ("tracer", "name", "request_id", "attrs", "start")
+
+    def __init__(self, tracer, name, request_id, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.request_id = request_id
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self.tracer.record(self.name, time.perf_counter() - self.start, self.request_id, **self.attrs)
+        return False
+
+
+class _RequestScope:
+    """Binds a request ID to the current thread/context for the duration of a block."""
+    def __init__(self, request_id):
+        self.request_id = request_id
+        self.token = None
+
+    def __enter__(self):
+        self.token = _current_request.set(self.request_id)
+        return self.request_id
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_request.reset(self.token)
+        return False
+
+
+class Tracer:
+    """
+    Lightweight per-request tracing.
+
+    Spans are kept in bounded in-process histograms (for p50/p95/p99) and, when a
+    trace file is configured, appended as JSON lines to a size-rotated file. While
+    disabled, span() returns a shared no-op object so instrumented code pays only
+    an attribute check. Use the shared module-level `tracer` instance.
+    """
+    HISTOGRAM_SIZE = 2048
+
+    def __init__(self):
+        self.enabled = False
+        self._ids = itertools.count(1)
+        self._samples = {}
+        self._samples_lock = threading.Lock()
+        self._file_logger = None
+
+    def configure(self, enabled, trace_file=None, max_bytes=5 * 1024 * 1024, backup_count=3):
+        """
+        Enables or disables tracing and sets the rolling JSONL output.
+
+        Args:
+            enabled (bool): Whether spans are recorded.
+            trace_file (str, optional): Path of the JSONL trace file; None keeps only histograms.
+            max_bytes (int): Size at which the trace file is rotated.
+            backup_count (int): Number of rotated files kept.
+        """
+        if self._file_logger:
+            for handler in list(self._file_logger.handlers):
+                self._file_logger.removeHandler(handler)
+                stop_queue_listener(handler)
+            self._file_logger = None
+
+        if enabled and trace_file:
+            directory = os.path.dirname(os.path.abspath(trace_file))
+            os.makedirs(directory, exist_ok=True)
+            handler = logging.handlers.RotatingFileHandler(
+                trace_file, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._file_logger = logging.getLogger("local_vision.trace")
+            self._file_logger.setLevel(logging.INFO)
+            self._file_logger.propagate = False
+            # Spans end on the Tk and request threads; the file is written from a listener thread.
+            self._file_logger.addHandler(start_queue_listener(handler))
+
+        self.enabled = enabled
+
+    def new_request_id(self):
+        """Returns a new process-unique request ID."""
+        return f"{os.getpid():x}-{next(self._ids)}"
+
+    def current_request_id(self):
+        """Returns the request ID bound to the current context, if any."""
+        return _current_request.get()
+
+    def request(self, request_id=None):
+        """
+        Binds a request ID (a new one if not given) for the duration of a with-block.
+        Worker threads do not inherit it, so pass the ID along and bind it again there.
+        """
+        return _RequestScope(request_id or self.new_request_id())
+
+    def span(self, name, **attrs):
+        """Returns a context manager timing the block as a span of the current request."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, _current_request.get(), attrs)
+
+    def record(self, name, duration, request_id=None, **attrs):
+        """Records an externally measured span duration in seconds."""
+        if not self.enabled:
+            return
+
+        with self._samples_lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.HISTOGRAM_SIZE)
+            samples.append(duration)
+
+        if self._file_logger:
+            entry = {
+                "ts": time.time(),
+                "request_id": request_id or _current_request.get(),
+                "span": name,
+                "ms": round(duration * 1000, 3),
+            }
+            if attrs:
+                entry.update(attrs)
+            self._file_logger.info(json.dumps(entry, default=str))
+
+    def percentiles(self):
+        """
+        Returns latency percentiles for every span name.
+
+        Returns:
+            dict: {span name: {"count", "p50_ms", "p95_ms", "p99_ms"}}.
+        """
+        with self._samples_lock:
+            snapshot = {name: sorted(samples) for name, samples in self._samples.items()}
+
+        result = {}
+        for name, ordered in sorted(snapshot.items()):
+            if not ordered:
+                continue
+
+            def pick(p):
+                return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1000
+
+            result[name] = {
+                "count": len(ordered),
+                "p50_ms": pick(50),
+                "p95_ms": pick(95),
+                "p99_ms": pick(99),
+            }
+        return result
+
+    def reset(self):
+        """Clears the in-process histograms."""
+        with self._samples_lock:
+            self._samples.clear()
+
+
+tracer = Tracer()
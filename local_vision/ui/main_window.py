@@ -1,18 +1,35 @@
 import customtkinter as ctk
 from tkinter import filedialog
 from PIL import Image
+import logging
 import queue
 import configparser
 import os
 import pyperclipimg
 import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from tkinterdnd2 import DND_FILES, TkinterDnD
 
 
+from local_vision.backup import OnlineBackup, export_history, import_history
+from local_vision.logic.backend_process import BackendError, BackendProcess
 from local_vision.logic.llm_manager import LLM_Manager
+from local_vision.logic.history_compactor import HistoryCompactor
+from local_vision.logic.image_queue import ImageQueue, expand_image_paths
+from local_vision.logic.model_supervisor import ModelSupervisor
+from local_vision.logic.response_profiles import parse_channel_profiles, read_profiles
+from local_vision.logic.semantic_search import SemanticIndexer
+from local_vision.logic.text_normalizer import render_for_speech
 from local_vision.data.history_manager import HistoryManager
+from local_vision.data.image_index import ImageHashIndex
 from local_vision.logic.image_processor import ImageProcessor
 from local_vision.logic.tts_manager import TTSManager
+from local_vision.profiling import LagMonitor, ProfileCapture
+from local_vision.tracing import tracer
+
+logger = logging.getLogger(__name__)
 
 
 # Apply the theme as soon as the app starts
@@ -67,7 +84,7 @@ def make_accessible(widget, text, tts_manager=None):
             widget.bind("<space>", invoke_command, add="+")
         
     except Exception as e:
-        print(f"Error making widget accessible: {e}")
+        logger.warning(f"Error making widget accessible: {e}")
 
 
 class LoginWindow(ctk.CTkToplevel):
@@ -179,29 +196,57 @@ class HistoryWindow(ctk.CTkToplevel):
         self.label = ctk.CTkLabel(self, text="Select a conversation:")
         self.label.pack(pady=10)
 
+        if self.main_app.semantic_indexer:
+            search_frame = ctk.CTkFrame(self)
+            search_frame.pack(fill="x", padx=10)
+            self.search_entry = ctk.CTkEntry(search_frame, placeholder_text="Search descriptions and messages...")
+            self.search_entry.pack(side="left", fill="x", expand=True, padx=(0, 5))
+            self.search_entry.bind("<Return>", self.search_conversations)
+            make_accessible(self.search_entry, "Search history field", self.main_app.tts)
+            search_button = ctk.CTkButton(search_frame, text="Search", width=80, command=self.search_conversations)
+            search_button.pack(side="right")
+            make_accessible(search_button, "Search history button", self.main_app.tts)
+
         self.conversation_list = ctk.CTkScrollableFrame(self)
         self.conversation_list.pack(fill="both", expand=True, padx=10, pady=5)
 
         self.load_conversations()
 
-    def load_conversations(self):
-        """Fetches and displays the list of conversations with delete buttons."""
+    def load_conversations(self, only_ids=None, title="Conversations with similar images:", notes=None):
+        """
+        Fetches and displays the list of conversations with delete buttons.
+
+        Args:
+            only_ids (list, optional): Show only these conversations, in this order.
+            title (str): Heading shown with only_ids.
+            notes (dict, optional): Conversation ID -> text shown under its button.
+        """
         for widget in self.conversation_list.winfo_children():
             widget.destroy()
 
         conversations = self.history_manager.get_conversations()
+        if only_ids is not None:
+            by_id = {conv.conversation_id: conv for conv in conversations or []}
+            conversations = [by_id[conv_id] for conv_id in only_ids if conv_id in by_id]
+            self.label.configure(text=title)
+        else:
+            self.label.configure(text="Select a conversation:")
         if not conversations:
             label = ctk.CTkLabel(self.conversation_list, text="No history found.")
             label.pack()
+            if only_ids is not None:
+                self._add_show_all_button()
             return
 
         for conv in conversations:
-            conv_id, timestamp, nickname = conv
+            conv_id, timestamp, nickname = conv.conversation_id, conv.start_timestamp, conv.user_nickname
 
             frame = ctk.CTkFrame(self.conversation_list)
             frame.pack(fill="x", pady=2)
 
             btn_text = f"{nickname} - {timestamp}"
+            if notes and conv_id in notes:
+                btn_text += f"\n{notes[conv_id]}"
             button = ctk.CTkButton(
                 frame,
                 text=btn_text,
@@ -217,6 +262,62 @@ class HistoryWindow(ctk.CTkToplevel):
             delete_button.pack(side="right")
             make_accessible(delete_button, "Delete conversation button", self.main_app.tts)
 
+            similar_button = ctk.CTkButton(
+                frame, text="Similar", width=80,
+                command=lambda c=conv_id: self.show_similar_conversations(c)
+            )
+            similar_button.pack(side="right", padx=(0, 5))
+            make_accessible(similar_button, "Find conversations with similar images button", self.main_app.tts)
+
+        if only_ids is not None:
+            self._add_show_all_button()
+
+    def _add_show_all_button(self):
+        show_all = ctk.CTkButton(self.conversation_list, text="Show all", command=self.load_conversations)
+        show_all.pack(pady=5)
+        make_accessible(show_all, "Show all conversations button", self.main_app.tts)
+
+    def show_similar_conversations(self, conversation_id):
+        """Lists the conversations whose images look like those of a conversation."""
+        similar = self.main_app.image_index.find_similar_conversations(
+            conversation_id, self.main_app.similar_image_distance
+        )
+        self.load_conversations(only_ids=similar)
+        self.main_app.tts.speak(f"{len(similar)} conversations with similar images")
+
+    def search_conversations(self, event=None):
+        """Searches the history by meaning in a background thread."""
+        query = self.search_entry.get().strip()
+        if not query:
+            self.load_conversations()
+            return
+        self.label.configure(text="Searching...")
+        indexer = self.main_app.semantic_indexer
+        result_queue = self.main_app.result_queue
+
+        def worker():
+            try:
+                results = indexer.search(query, k=20)
+            except Exception as e:
+                logger.warning(f"History search failed: {e}")
+                results = []
+            result_queue.put({"type": "search_results", "content": results, "window": self})
+
+        threading.Thread(target=worker, name="history-search", daemon=True).start()
+
+    def show_search_results(self, results):
+        """Lists the conversations of the search results, best match first, with the matching text."""
+        order = []
+        notes = {}
+        for interaction in results:
+            conversation_id = interaction["conversation_id"]
+            if conversation_id not in notes:
+                order.append(conversation_id)
+                text = " ".join(interaction["content"].split())
+                notes[conversation_id] = text if len(text) <= 80 else text[:77] + "..."
+        self.load_conversations(only_ids=order, title="Search results:", notes=notes)
+        self.main_app.tts.speak(f"{len(order)} conversations found")
+
     def load_selected_conversation(self, conversation_id):
         """Tells the main app to load the selected conversation."""
         self.main_app.load_conversation_history(conversation_id)
@@ -227,6 +328,9 @@ class HistoryWindow(ctk.CTkToplevel):
         dialog = ConfirmationDialog(self, message="Delete this conversation permanently?")
         if dialog.get_result():
             self.history_manager.delete_conversation(conversation_id)
+            self.main_app.image_index.remove_conversation(conversation_id)
+            if self.main_app.semantic_indexer:
+                self.main_app.semantic_indexer.remove_conversation(conversation_id)
             self.load_conversations()
 
 class SettingsWindow(ctk.CTkToplevel):
@@ -236,7 +340,7 @@ class SettingsWindow(ctk.CTkToplevel):
     def __init__(self, master):
         super().__init__(master)
         self.title("Settings")
-        self.geometry("500x400")
+        self.geometry("500x650")
         self.transient(master)
         self.grab_set()
 
@@ -245,23 +349,45 @@ class SettingsWindow(ctk.CTkToplevel):
         self.model_frame = ctk.CTkFrame(self)
         self.model_frame.pack(fill="x", padx=10, pady=10)
 
-        self.model_label = ctk.CTkLabel(self.model_frame, text="LLM Model Management")
+        self.model_label = ctk.CTkLabel(self.model_frame, text="LLM Model Routing")
         self.model_label.pack()
 
-        self.current_model_label = ctk.CTkLabel(self.model_frame, text=f"Current Model: {self.main_app.model_identifier}", wraplength=480)
+        self.current_model_label = ctk.CTkLabel(self.model_frame, text=self._routes_summary(), wraplength=480)
         self.current_model_label.pack(pady=5)
 
-        self.model_entry_frame = ctk.CTkFrame(self.model_frame)
-        self.model_entry_frame.pack(pady=10, fill="x", padx=10)
-
-        self.model_entry = ctk.CTkEntry(self.model_entry_frame, placeholder_text="Enter model identifier (e.g., org/repo)")
-        self.model_entry.insert(0, self.main_app.model_identifier)
-        self.model_entry.pack(side="left", fill="x", expand=True, padx=(0, 10))
-        make_accessible(self.model_entry, "Model identifier input", self.main_app.tts)
-
-        self.save_model_button = ctk.CTkButton(self.model_entry_frame, text="Save", width=80, command=self.save_model_identifier)
-        self.save_model_button.pack(side="left")
-        make_accessible(self.save_model_button, "Save model button", self.main_app.tts)
+        # One row per route; an empty text route falls back to the vision model.
+        self.route_table = ctk.CTkFrame(self.model_frame)
+        self.route_table.pack(pady=5, fill="x", padx=10)
+        self.route_table.grid_columnconfigure(1, weight=1)
+        self.route_entries = {}
+        rows = [
+            ("image", "Image turns (vision model)", "Enter model identifier (e.g., org/repo)"),
+            ("text_with_images", "Text, images in context", "Empty: use the vision model"),
+            ("text", "Text-only turns", "Empty: use the vision model"),
+        ]
+        for row, (route, label, placeholder) in enumerate(rows):
+            ctk.CTkLabel(self.route_table, text=label, anchor="w").grid(row=row, column=0, sticky="w", padx=5, pady=2)
+            entry = ctk.CTkEntry(self.route_table, placeholder_text=placeholder)
+            value = self.main_app.model_identifier if route == "image" else self.main_app.model_routes.get(route, "")
+            if value:
+                entry.insert(0, value)
+            entry.grid(row=row, column=1, sticky="ew", padx=5, pady=2)
+            make_accessible(entry, f"{label} model input", self.main_app.tts)
+            self.route_entries[route] = entry
+
+        self.save_model_button = ctk.CTkButton(self.model_frame, text="Save Routes", width=100, command=self.save_model_routes)
+        self.save_model_button.pack(pady=5)
+        make_accessible(self.save_model_button, "Save model routes button", self.main_app.tts)
+
+        self.profile_frame = ctk.CTkFrame(self.model_frame, fg_color="transparent")
+        self.profile_frame.pack(pady=5)
+        ctk.CTkLabel(self.profile_frame, text="Response profile:").pack(side="left", padx=5)
+        self.profile_menu = ctk.CTkOptionMenu(
+            self.profile_frame, values=list(self.main_app.response_profiles), command=self.change_response_profile
+        )
+        self.profile_menu.set(self.main_app.response_profile)
+        self.profile_menu.pack(side="left")
+        make_accessible(self.profile_menu, "Response profile selection menu", self.main_app.tts)
 
         self.accessibility_frame = ctk.CTkFrame(self)
         self.accessibility_frame.pack(fill="x", padx=10, pady=10)
@@ -330,6 +456,174 @@ class SettingsWindow(ctk.CTkToplevel):
         
         make_accessible(self.toggle_bot_button, "Toggle Discord Bot Button", self.main_app.tts)
 
+        self.data_frame = ctk.CTkFrame(self)
+        self.data_frame.pack(fill="x", padx=10, pady=10)
+
+        self.data_label = ctk.CTkLabel(self.data_frame, text="History Data")
+        self.data_label.pack()
+
+        self.data_button_frame = ctk.CTkFrame(self.data_frame, fg_color="transparent")
+        self.data_button_frame.pack(fill="x", pady=5)
+
+        self.backup_button = ctk.CTkButton(self.data_button_frame, text="Back up", width=80, command=self.backup_history)
+        self.backup_button.pack(side="left", padx=5)
+        make_accessible(self.backup_button, "Back up history button", self.main_app.tts)
+
+        self.export_button = ctk.CTkButton(self.data_button_frame, text="Export", width=80, command=self.export_history)
+        self.export_button.pack(side="left", padx=5)
+        make_accessible(self.export_button, "Export history button", self.main_app.tts)
+
+        self.import_button = ctk.CTkButton(self.data_button_frame, text="Import", width=80, command=self.import_history)
+        self.import_button.pack(side="left", padx=5)
+        make_accessible(self.import_button, "Import history button", self.main_app.tts)
+
+        self.diagnostics_frame = ctk.CTkFrame(self)
+        self.diagnostics_frame.pack(fill="both", expand=True, padx=10, pady=10)
+
+        self.diagnostics_label = ctk.CTkLabel(self.diagnostics_frame, text="Diagnostics")
+        self.diagnostics_label.pack()
+
+        self.tracing_switch = ctk.CTkSwitch(self.diagnostics_frame, text="Enable request tracing", command=self.toggle_tracing)
+        if tracer.enabled:
+            self.tracing_switch.select()
+        self.tracing_switch.pack(pady=5)
+        make_accessible(self.tracing_switch, "Request tracing toggle switch", self.main_app.tts)
+
+        self.profile_button = ctk.CTkButton(self.diagnostics_frame, command=self.toggle_profile_capture)
+        self._update_profile_button()
+        self.profile_button.pack(pady=5)
+        make_accessible(self.profile_button, "Profile capture button", self.main_app.tts)
+
+        self.latency_box = ctk.CTkTextbox(self.diagnostics_frame, height=140, font=("Courier", 11))
+        self.latency_box.pack(fill="both", expand=True, padx=5, pady=5)
+        make_accessible(self.latency_box, "Latency statistics", self.main_app.tts)
+
+        self._diagnostics_job = None
+        # Latest model statistics, collected off the Tk thread by _collect_model_diagnostics
+        self._model_diagnostics_text = ""
+        self._model_diagnostics_pending = False
+        self._refresh_diagnostics()
+
+    def _refresh_diagnostics(self):
+        """
+        Shows live p50/p95/p99 latencies per traced stage, refreshed every second.
+
+        The model statistics shown are the latest snapshot collected in the background.
+        """
+        if not self.winfo_exists():
+            return
+
+        if not tracer.enabled:
+            text = "Tracing is disabled."
+        else:
+            stats = tracer.percentiles()
+            lines = [f"{'stage':24} {'n':>6} {'p50':>8} {'p95':>8} {'p99':>8}"]
+            for name, values in stats.items():
+                lines.append(
+                    f"{name:24} {values['count']:>6} {values['p50_ms']:>7.1f}ms {values['p95_ms']:>6.1f}ms {values['p99_ms']:>6.1f}ms"
+                )
+            text = "\n".join(lines) if stats else "No requests traced yet."
+
+        lag = self.main_app.lag_monitor.stats()
+        lines = [f"Event loop: max lag {lag['max_lag_ms']:.0f}ms, {lag['stalls']} stalls"]
+        if lag["last_stall"]:
+            stall = lag["last_stall"]
+            lines.append(f"Last stall: {stall['lag_ms']:.0f}ms at {stall['time']} in {stall['handler'] or '?'}")
+            if stall["location"]:
+                lines.append(f"  blocked at {stall['location']}")
+        text = "\n".join(lines) + "\n\n" + text
+        self._update_profile_button()
+
+        self._collect_model_diagnostics()
+        text = self._model_diagnostics_text + text
+
+        self.latency_box.configure(state="normal")
+        self.latency_box.delete("1.0", "end")
+        self.latency_box.insert("1.0", text)
+        self.latency_box.configure(state="disabled")
+        self._diagnostics_job = self.after(1000, self._refresh_diagnostics)
+
+    def _collect_model_diagnostics(self):
+        """
+        Refreshes the model statistics snapshot in a background thread.
+
+        With BackendProcess enabled each statistic is a round trip to the backend,
+        which must not block the Tk thread; one collection runs at a time.
+        """
+        if self._model_diagnostics_pending:
+            return
+        self._model_diagnostics_pending = True
+
+        def worker():
+            try:
+                text = self._model_diagnostics()
+            except BackendError as e:
+                text = f"Backend unavailable: {e}\n\n"
+            except Exception as e:
+                logger.warning(f"Could not collect model diagnostics: {e}")
+                text = ""
+            self._model_diagnostics_text = text
+            self._model_diagnostics_pending = False
+
+        threading.Thread(target=worker, name="model-diagnostics", daemon=True).start()
+
+    def _model_diagnostics(self):
+        """Returns the model state and the per-model, per-profile and prompt cache statistics."""
+        text = ""
+        supervisor = self.main_app.model_supervisor
+        if supervisor:
+            status = supervisor.status()
+            context = status["context_length"] or "?"
+            text = f"Model: {status['state']}, context {context} tokens, {status['pings']} keep-alive pings\n\n"
+
+        llm_manager = self.main_app.llm_manager
+        if llm_manager:
+            lines = [
+                f"{identifier}: {stats['requests']} requests, avg {stats['avg_ms']:.0f}ms"
+                for identifier, stats in llm_manager.get_routing_stats()["models"].items()
+            ]
+            lines += [
+                f"Profile {name}: {stats['requests']} requests, avg {stats['avg_ms']:.0f}ms, {stats['avg_tokens']:.0f} tokens"
+                for name, stats in sorted(llm_manager.get_profile_stats().items())
+            ]
+            cache = llm_manager.get_prompt_cache_stats()
+            if cache["turns"]:
+                lines.append(
+                    f"Prompt cache: {cache['cache_hit_rate']:.0%} of {cache['turns']} turns, "
+                    f"{cache['cached_tokens']}/{cache['prompt_tokens']} prompt tokens reused"
+                )
+            if lines:
+                text = "\n".join(lines) + "\n\n" + text
+        return text
+
+    def destroy(self):
+        if getattr(self, "_diagnostics_job", None):
+            self.after_cancel(self._diagnostics_job)
+            self._diagnostics_job = None
+        super().destroy()
+
+    def toggle_tracing(self):
+        """Toggles request tracing."""
+        enabled = bool(self.tracing_switch.get())
+        self.main_app.set_tracing_enabled(enabled)
+        self.main_app.tts.speak("Tracing enabled" if enabled else "Tracing disabled")
+
+    def toggle_profile_capture(self):
+        """Starts a time-boxed profile capture, or ends the running one early."""
+        if self.main_app.profile_capture.running:
+            self.main_app.stop_profile_capture()
+        else:
+            self.main_app.start_profile_capture()
+        self._update_profile_button()
+
+    def _update_profile_button(self):
+        if self.main_app.profile_capture.running:
+            self.profile_button.configure(text="Stop profile capture", fg_color="red")
+        else:
+            self.profile_button.configure(
+                text=f"Capture profile ({self.main_app.profile_seconds:.0f}s)", fg_color=["#3B8ED0", "#1F6AA5"]
+            )
+
     def save_discord_token(self):
         token = self.token_entry.get().strip()
         if token:
@@ -352,6 +646,32 @@ class SettingsWindow(ctk.CTkToplevel):
             self.toggle_bot_button.configure(text="Stop Bot", fg_color="red")
             self.main_app.tts.speak("Discord bot started")
 
+    def backup_history(self):
+        """Asks where to write a copy of the history database and starts the backup."""
+        path = filedialog.asksaveasfilename(
+            parent=self, title="Back up history", defaultextension=".db",
+            initialfile=f"local_vision-{time.strftime('%Y%m%d-%H%M%S')}.db", filetypes=[("SQLite database", "*.db")]
+        )
+        if path:
+            self.main_app.run_data_task("backup", path)
+
+    def export_history(self):
+        """Asks where to export the history and its images, and starts the export."""
+        path = filedialog.asksaveasfilename(
+            parent=self, title="Export history", defaultextension=".jsonl.gz",
+            initialfile="history.jsonl.gz", filetypes=[("Local Vision export", "*.jsonl.gz")]
+        )
+        if path:
+            self.main_app.run_data_task("export", path)
+
+    def import_history(self):
+        """Asks for an export file and adds its conversations to the history."""
+        path = filedialog.askopenfilename(
+            parent=self, title="Import history", filetypes=[("Local Vision export", "*.jsonl.gz")]
+        )
+        if path:
+            self.main_app.run_data_task("import", path)
+
     def toggle_voice(self):
         """Toggles the TTS engine."""
         from local_vision.logic.tts_manager import TTSManager
@@ -363,31 +683,53 @@ class SettingsWindow(ctk.CTkToplevel):
             tts.speak("Voice disabled")
             tts.enabled = False 
 
-    def save_model_identifier(self):
-        """Saves the new model identifier from the entry field."""
-        new_identifier = self.model_entry.get().strip()
-        if new_identifier:
-            self.main_app.update_model_identifier(new_identifier)
-            self.current_model_label.configure(text=f"Current Model: {new_identifier}")
+    def _routes_summary(self):
+        vision = self.main_app.model_identifier
+        text_with_images = self.main_app.model_routes.get("text_with_images") or vision
+        text = self.main_app.model_routes.get("text") or vision
+        return f"Images: {vision} | Text with images: {text_with_images} | Text: {text}"
+
+    def save_model_routes(self):
+        """Saves the route table from the entry fields."""
+        new_identifier = self.route_entries["image"].get().strip()
+        if not new_identifier:
+            self.main_app.tts.speak("The vision model cannot be empty")
+            return
+        routes = {
+            route: self.route_entries[route].get().strip()
+            for route in ("text_with_images", "text")
+            if self.route_entries[route].get().strip()
+        }
+        self.main_app.update_model_routes(new_identifier, routes)
+        self.current_model_label.configure(text=self._routes_summary())
+
+    def change_response_profile(self, name):
+        """Switches the profile used for new descriptions and replies."""
+        self.main_app.set_response_profile(name)
+        self.main_app.tts.speak(f"Response profile {name}")
 
     def change_theme(self, new_theme):
         """Changes the application theme."""
         self.main_app.update_theme(new_theme.lower())
 
 
-import logging
-
-# Configure logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    datefmt='%H:%M:%S'
-)
-
 class InterfaceGrafica(ctk.CTk, TkinterDnD.DnDWrapper):
     """
     The main graphical interface for the Local Vision application.
     """
+    # Restoring a conversation: interactions read per query, rendered per after()
+    # callback, and rendered before asking the user to load earlier ones.
+    RESTORE_PAGE_SIZE = 50
+    RESTORE_CHUNK_SIZE = 10
+    RESTORE_AUTO_INTERACTIONS = 200
+    # Results handled per queue check, so a burst of thumbnails is not drained at one per tick.
+    QUEUE_BATCH = 20
+    # How the image queue panel names the stages of ImageQueue.STAGES.
+    QUEUE_STAGE_LABELS = {
+        "queued": "waiting", "hash": "hashing", "thumbnail": "loading", "upload": "uploading",
+        "describe": "describing", "done": "done", "failed": "failed", "cancelled": "cancelled",
+    }
+
     def __init__(self, history_manager: HistoryManager):
         super().__init__()
         self.TkdndVersion = TkinterDnD._require(self)
@@ -396,91 +738,208 @@ class InterfaceGrafica(ctk.CTk, TkinterDnD.DnDWrapper):
         self.geometry("800x600")
 
         self.history_manager = history_manager
+        self.image_index = ImageHashIndex(history_manager)
         self.conversation_id = None
         
         self.tts = TTSManager()
 
         self._load_config()
+        self.lag_monitor = LagMonitor(threshold=self.lag_threshold_ms / 1000)
+        self.profile_capture = ProfileCapture(self.profile_dir)
+        self._profile_job = None
 
         self.drop_target_register(DND_FILES)
         self.dnd_bind('<<Drop>>', self._on_drop)
 
-        logging.info("Starting initialization...")
+        logger.info("Starting initialization...")
         self.withdraw()
 
-        logging.debug("Prompting for nickname...")
+        logger.debug("Prompting for nickname...")
         self.nickname = self._prompt_for_nickname()
         if not self.nickname:
-            logging.info("No nickname provided, exiting...")
+            logger.info("No nickname provided, exiting...")
             return
 
-        logging.info(f"Got nickname: {self.nickname}")
+        logger.info(f"Got nickname: {self.nickname}")
         self._start_new_conversation()
 
-        logging.debug("Creating widgets...")
+        logger.debug("Creating widgets...")
         try:
             self._create_widgets()
-            logging.debug("Widgets created successfully")
+            logger.debug("Widgets created successfully")
         except Exception as e:
-            logging.error(f"Error creating widgets: {e}", exc_info=True)
+            logger.error(f"Error creating widgets: {e}", exc_info=True)
             raise
         
-        logging.debug("Showing window...")
+        logger.debug("Showing window...")
         self.deiconify()
         self.title(f"Local Vision Chat - {self.nickname}")
 
         self.result_queue = queue.Queue()
+        # request_id -> (placeholder label, conversation id) of requests awaiting a result
+        self._pending_requests = {}
+        # request_id -> image interaction id of pending descriptions, to index the result
+        self._pending_image_descriptions = {}
+        # Bumped by every restore, so the chunks of a superseded restore stop rendering
+        self._restore_generation = 0
+        # Oldest widget of the restored conversation; older interactions are packed before it
+        self._restore_top = None
+        self._thumbnails = ThreadPoolExecutor(max_workers=1, thread_name_prefix="thumbnail")
         
         # LLM Manager - initialize after UI is ready to display errors
         self.llm_manager = None
-        logging.info("Initializing LLM Manager...")
+        self.model_supervisor = None
+        self.semantic_indexer = None
+        self.backend = None
+        # Decodes thumbnails and hashes images: here, or in the backend process.
+        self.image_processor = ImageProcessor
+        self.history_compactor = HistoryCompactor(
+            None, self.history_manager, compact_after=self.compact_after, keep_recent=self.keep_recent
+        )
+        logger.info("Initializing LLM Manager...")
         try:
-            self.llm_manager = LLM_Manager(model_identifier=self.model_identifier)
-            logging.info("LLM Manager initialized successfully")
+            self._connect_llm()
+            self.history_compactor.llm_manager = self.llm_manager
+            logger.info("LLM Manager initialized successfully")
+            self._start_semantic_indexer()
         except Exception as e:
             error_msg = f"Failed to connect to LM Studio: {e}\n\nPlease ensure LM Studio is running and a model is loaded."
             self._add_message(f"System Error: {error_msg}", is_system=True)
-            logging.error(f"LLM initialization error: {e}", exc_info=True)
+            logger.error(f"LLM initialization error: {e}", exc_info=True)
+
+        self.image_queue = ImageQueue(
+            self.llm_manager, self.result_queue, self.image_index,
+            reuse_distance=self.similar_image_distance if self.reuse_similar_descriptions else None,
+            concurrency=self.image_queue_concurrency, image_processor=self.image_processor
+        )
+        # request_id -> (row, label, progress bar) of the items in the image queue panel
+        self._queue_rows = {}
+        # request_id -> image placeholder in the chat, until the queue delivers its thumbnail
+        self._queue_images = {}
+        # request_id -> pasted temporary file, removed when its item leaves the queue
+        self._temp_files = {}
 
         self.discord_bot = None
         self.discord_token = self.config.get('Settings', 'DiscordToken', fallback=None)
+        self.discord_batch_attachments = self.config.getboolean('Settings', 'DiscordBatchAttachments', fallback=False)
+        self.discord_streaming_replies = self.config.getboolean('Settings', 'DiscordStreamingReplies', fallback=False)
+        self.discord_channel_profiles = parse_channel_profiles(
+            self.config.get('Settings', 'DiscordChannelProfiles', fallback='')
+        )
         if self.discord_token:
-             logging.info("Discord token found in config.")
+             logger.info("Discord token found in config.")
 
-        logging.debug("Starting queue check...")
+        logger.debug("Starting queue check...")
         self.after(100, self._check_queue)
-        logging.debug("Updating fonts...")
+        logger.debug("Updating fonts...")
         self.update_all_fonts()
-        logging.info("Initialization complete!")
+        logger.info("Initialization complete!")
         
         self.protocol("WM_DELETE_WINDOW", self._on_window_close)
         
-        # Start heartbeat to verify mainloop is running
+        # Start heartbeat to verify mainloop is running and measure its lag
         self._heartbeat_count = 0
-        self.after(1000, self._heartbeat)
+        self._heartbeat_ms = int(self.lag_monitor.interval * 1000)
+        self.lag_monitor.start()
+        self.after(self._heartbeat_ms, self._heartbeat)
         
     def _heartbeat(self):
-        """Periodic heartbeat to verify mainloop is running."""
+        """
+        Periodic heartbeat: measures the event-loop lag every tick (see LagMonitor)
+        and checks the window state once a second.
+        """
+        self.lag_monitor.tick()
         self._heartbeat_count += 1
         
-        
-        # Only log if window is NOT normal or every 60 seconds
-        state = self.state()
-        if state != 'normal' or self._heartbeat_count % 60 == 0:
-            logging.debug(f"Heartbeat {self._heartbeat_count} - Window state: {state}, Visible: {self.winfo_viewable()}")
-        
-        if state == 'withdrawn':
-            logging.warning("Window is withdrawn! Attempting to show...")
-            self.deiconify()
+        if self._heartbeat_count % (1000 // self._heartbeat_ms) == 0:
+            seconds = self._heartbeat_count * self._heartbeat_ms // 1000
+            # Only log if window is NOT normal or every 60 seconds
+            state = self.state()
+            if state != 'normal' or seconds % 60 == 0:
+                logger.debug("Heartbeat %d - Window state: %s", seconds, state,
+                             extra={"sample_key": "ui.heartbeat"})
+
+            if state == 'withdrawn':
+                logger.warning("Window is withdrawn! Attempting to show...")
+                self.deiconify()
         
         try:
-            self.after(1000, self._heartbeat)
+            self.after(self._heartbeat_ms, self._heartbeat)
         except Exception as e:
-            logging.error(f"Heartbeat failed: {e}")
-        
+            logger.error(f"Heartbeat failed: {e}")
+
+    def start_profile_capture(self):
+        """Profiles the UI thread and traces allocations for ProfileSeconds, then writes the capture."""
+        if self.profile_capture.running:
+            return
+        self.profile_capture.start()
+        self._profile_job = self.after(int(self.profile_seconds * 1000), self.stop_profile_capture)
+        self.tts.speak("Profile capture started")
+
+    def stop_profile_capture(self):
+        """Ends the running profile capture and reports where it was written."""
+        if self._profile_job:
+            self.after_cancel(self._profile_job)
+            self._profile_job = None
+        try:
+            paths = self.profile_capture.stop()
+        except Exception as e:
+            logger.error(f"Profile capture failed: {e}", exc_info=True)
+            self._add_message(f"System Error: Profile capture failed: {e}", is_system=True)
+            return
+        if paths:
+            self._add_message(f"System: Profile written to {os.path.splitext(paths[0])[0]}.*", is_system=True)
+            self.tts.speak("Profile capture saved")
+
+    def run_data_task(self, action, path):
+        """
+        Backs up, exports or imports the history on a background thread.
+
+        The backup API copies a few pages at a time, so the UI keeps reading and
+        writing the database meanwhile; the outcome is reported as a system message.
+
+        Args:
+            action (str): "backup", "export" or "import".
+            path (str): The file written (backup, export) or read (import).
+        """
+        db_manager = self.history_manager.db_manager
+
+        def worker():
+            try:
+                if action == "backup":
+                    OnlineBackup(db_manager).run(path)
+                    message = f"System: History backed up to {path}"
+                elif action == "export":
+                    counts = export_history(db_manager, path)
+                    message = f"System: Exported {counts['conversations']} conversations to {path}"
+                else:
+                    images_dir = os.path.join(os.path.dirname(os.path.abspath(db_manager.db_file)), "imported_images")
+                    counts = import_history(db_manager, path, images_dir)
+                    message = f"System: Imported {counts['conversations']} conversations from {path}"
+            except Exception as e:
+                logger.error(f"History {action} failed: {e}", exc_info=True)
+                message = f"System Error: History {action} failed: {e}"
+            self.result_queue.put({"type": "data_task", "content": message})
+
+        threading.Thread(target=worker, name=f"history-{action}", daemon=True).start()
+        self.tts.speak(f"History {action} started")
+
     def _on_window_close(self):
         """Handle window close event."""
-        logging.info("Window close requested")
+        logger.info("Window close requested")
+        if self.llm_manager:
+            self.llm_manager.cancel(reason="closed")
+        if self.model_supervisor:
+            self.model_supervisor.stop(timeout=0)
+        if self.semantic_indexer:
+            self.semantic_indexer.stop(timeout=0)
+        self.image_queue.shutdown()
+        self._thumbnails.shutdown(wait=False, cancel_futures=True)
+        if self.backend:
+            self.backend.close()
+        self.lag_monitor.stop()
+        if self.profile_capture.running:
+            self.stop_profile_capture()
         self.destroy()
 
 
@@ -492,8 +951,21 @@ class InterfaceGrafica(ctk.CTk, TkinterDnD.DnDWrapper):
         self.history_frame = ctk.CTkScrollableFrame(self)
         self.history_frame.grid(row=0, column=0, columnspan=3, sticky="nsew", padx=10, pady=10)
 
+        # Images waiting for a description; shown only while the queue has items.
+        self.queue_frame = ctk.CTkFrame(self)
+        self.queue_frame.grid(row=1, column=0, columnspan=3, sticky="ew", padx=10)
+        self.queue_frame.grid_columnconfigure(0, weight=1)
+        self.queue_label = ctk.CTkLabel(self.queue_frame, text="", anchor="w")
+        self.queue_label.grid(row=0, column=0, sticky="w", padx=5)
+        self.cancel_queue_button = ctk.CTkButton(self.queue_frame, text="Cancel all", width=80, command=self._on_cancel_queue)
+        self.cancel_queue_button.grid(row=0, column=1, padx=5, pady=5)
+        make_accessible(self.cancel_queue_button, "Cancel all queued images button", self.tts)
+        self.queue_list = ctk.CTkScrollableFrame(self.queue_frame, height=90)
+        self.queue_list.grid(row=1, column=0, columnspan=2, sticky="ew", padx=5, pady=(0, 5))
+        self.queue_frame.grid_remove()
+
         self.input_frame = ctk.CTkFrame(self)
-        self.input_frame.grid(row=1, column=0, columnspan=3, sticky="ew", padx=10, pady=10)
+        self.input_frame.grid(row=2, column=0, columnspan=3, sticky="ew", padx=10, pady=10)
         self.input_frame.grid_columnconfigure(1, weight=1)
 
         self.menu_frame = ctk.CTkFrame(self.input_frame)
@@ -507,6 +979,9 @@ class InterfaceGrafica(ctk.CTk, TkinterDnD.DnDWrapper):
         self.settings_button.pack(side="left")
         make_accessible(self.settings_button, "Settings button", self.tts)
 
+        self.model_status_label = ctk.CTkLabel(self.menu_frame, text="", text_color="gray", width=90)
+        self.model_status_label.pack(side="left", padx=(5, 0))
+
         self.attach_button = ctk.CTkButton(self.input_frame, text="Attach Image", width=120, command=self._on_attach_click)
         self.attach_button.grid(row=0, column=1, padx=5, pady=5, sticky="w")
         make_accessible(self.attach_button, "Attach Image button", self.tts)
@@ -526,17 +1001,42 @@ class InterfaceGrafica(ctk.CTk, TkinterDnD.DnDWrapper):
         self.send_button.grid(row=0, column=2, padx=5, pady=5)
         make_accessible(self.send_button, "Send button", self.tts)
 
+        self.stop_button = ctk.CTkButton(self.input_frame, text="Stop", width=60, command=self._on_stop)
+        self.stop_button.grid(row=0, column=3, padx=(0, 5), pady=5)
+        make_accessible(self.stop_button, "Stop button", self.tts)
+
     def _load_config(self):
         """Loads settings from config.ini."""
         self.config = configparser.ConfigParser()
         self.config.read('config.ini')
         self.model_identifier = self.config.get('Settings', 'ModelIdentifier', fallback='local-model')
+        self.model_routes = LLM_Manager.read_routes(self.config)
+        self.model_keep_alive = self.config.getfloat('Settings', 'ModelKeepAliveSeconds', fallback=240.0)
+        self.compact_after = self.config.getint('Settings', 'CompactAfterInteractions', fallback=24)
+        self.keep_recent = self.config.getint('Settings', 'KeepRecentInteractions', fallback=8)
+        self.reuse_similar_descriptions = self.config.getboolean('Settings', 'ReuseSimilarImageDescriptions', fallback=False)
+        self.similar_image_distance = self.config.getint('Settings', 'SimilarImageMaxDistance', fallback=6)
+        self.image_queue_concurrency = self.config.getint('Settings', 'ImageQueueConcurrency', fallback=2)
+        self.use_backend_process = self.config.getboolean('Settings', 'BackendProcess', fallback=False)
+        self.response_profiles = read_profiles(self.config)
+        self.response_profile = self.config.get('Settings', 'ResponseProfile', fallback='detailed').strip().lower()
+        if self.response_profile not in self.response_profiles:
+            logger.warning(f"Unknown response profile {self.response_profile}, using detailed")
+            self.response_profile = 'detailed'
+        self.embedding_model = self.config.get('Search', 'EmbeddingModel', fallback='').strip() or None
+        self.ann_threshold = self.config.getint('Search', 'AnnThreshold', fallback=20000)
         self.theme = self.config.get('Accessibility', 'Theme', fallback='system')
         self.font_size = self.config.getint('Accessibility', 'FontSize', fallback=12)
         
         voice_enabled = self.config.getboolean('Accessibility', 'VoiceEnabled', fallback=True)
         self.tts.enabled = voice_enabled
 
+        self.trace_file = self.config.get('Diagnostics', 'TraceFile', fallback='traces.jsonl')
+        tracer.configure(self.config.getboolean('Diagnostics', 'TracingEnabled', fallback=False), self.trace_file)
+        self.lag_threshold_ms = self.config.getfloat('Diagnostics', 'LagThresholdMs', fallback=200.0)
+        self.profile_seconds = self.config.getfloat('Diagnostics', 'ProfileSeconds', fallback=30.0)
+        self.profile_dir = self.config.get('Diagnostics', 'ProfileDir', fallback='profiles')
+
         ctk.set_appearance_mode(self.theme)
 
 
@@ -546,33 +1046,146 @@ class InterfaceGrafica(ctk.CTk, TkinterDnD.DnDWrapper):
             self.config['Settings'] = {}
         if 'Accessibility' not in self.config:
             self.config['Accessibility'] = {}
+        if 'Diagnostics' not in self.config:
+            self.config['Diagnostics'] = {}
+        if 'Routing' not in self.config:
+            self.config['Routing'] = {}
+        if 'Search' not in self.config:
+            self.config['Search'] = {}
 
         self.config['Settings']['ModelIdentifier'] = self.model_identifier
+        for route, key in LLM_Manager.ROUTE_CONFIG_KEYS.items():
+            self.config['Routing'][key] = self.model_routes.get(route, "")
+        self.config['Settings']['ModelKeepAliveSeconds'] = str(self.model_keep_alive)
+        self.config['Settings']['CompactAfterInteractions'] = str(self.compact_after)
+        self.config['Settings']['KeepRecentInteractions'] = str(self.keep_recent)
+        self.config['Settings']['ReuseSimilarImageDescriptions'] = str(self.reuse_similar_descriptions)
+        self.config['Settings']['SimilarImageMaxDistance'] = str(self.similar_image_distance)
+        self.config['Settings']['ImageQueueConcurrency'] = str(self.image_queue_concurrency)
+        self.config['Settings']['BackendProcess'] = str(self.use_backend_process)
+        self.config['Settings']['ResponseProfile'] = self.response_profile
+        self.config['Search']['EmbeddingModel'] = self.embedding_model or ""
+        self.config['Search']['AnnThreshold'] = str(self.ann_threshold)
         if self.discord_token:
             self.config['Settings']['DiscordToken'] = self.discord_token
+        self.config['Settings']['DiscordBatchAttachments'] = str(self.discord_batch_attachments)
+        self.config['Settings']['DiscordStreamingReplies'] = str(self.discord_streaming_replies)
+        self.config['Settings']['DiscordChannelProfiles'] = ", ".join(
+            f"{channel}={profile}" for channel, profile in self.discord_channel_profiles.items()
+        )
         self.config['Accessibility']['Theme'] = self.theme
         self.config['Accessibility']['FontSize'] = str(self.font_size)
         self.config['Accessibility']['VoiceEnabled'] = str(self.tts.enabled)
+        self.config['Diagnostics']['TracingEnabled'] = str(tracer.enabled)
+        self.config['Diagnostics']['TraceFile'] = self.trace_file
+        self.config['Diagnostics']['LagThresholdMs'] = str(self.lag_threshold_ms)
+        self.config['Diagnostics']['ProfileSeconds'] = str(self.profile_seconds)
+        self.config['Diagnostics']['ProfileDir'] = self.profile_dir
 
 
         with open('config.ini', 'w') as configfile:
             self.config.write(configfile)
 
-    def update_model_identifier(self, new_identifier):
-        """Updates the model identifier and saves it."""
+    def update_model_routes(self, new_identifier, routes):
+        """Updates the vision model and the text routes and saves them."""
         self.model_identifier = new_identifier
+        self.model_routes = routes
         self._save_config()
+        if self.model_supervisor:
+            self.model_supervisor.stop(timeout=0)
+            self.model_supervisor = None
         try:
-            self.llm_manager = LLM_Manager(model_identifier=self.model_identifier)
-            logging.info(f"Model updated to: {self.model_identifier}")
+            self._connect_llm()
+            self.history_compactor.llm_manager = self.llm_manager
+            if self.semantic_indexer:
+                self.semantic_indexer.llm_manager = self.llm_manager
+            logger.info(f"Model routes updated: {self.llm_manager.routes}")
             self._add_message(f"System: Model updated successfully to {self.model_identifier}", is_system=True)
             self.tts.speak("Model updated successfully")
         except Exception as e:
             self.llm_manager = None
             error_msg = f"Failed to connect with new model: {e}"
             self._add_message(f"System Error: {error_msg}", is_system=True)
-            logging.error(f"Model update error: {e}")
+            logger.error(f"Model update error: {e}")
             self.tts.speak("Failed to update model")
+        self.image_queue.llm_manager = self.llm_manager
+        self.image_queue.image_processor = self.image_processor
+
+    def _connect_llm(self):
+        """
+        Creates the LLM_Manager and its ModelSupervisor for the current model settings.
+
+        With BackendProcess enabled they run in the backend process (started on first
+        use) together with image decoding and the Discord bot, and llm_manager is its proxy.
+        """
+        settings = dict(
+            model_identifier=self.model_identifier, routes=self.model_routes, embedding_model=self.embedding_model,
+            profiles=self.response_profiles, default_profile=self.response_profile
+        )
+        if not self.use_backend_process:
+            self.llm_manager = LLM_Manager(**settings)
+            self._start_model_supervisor()
+            return
+        if self.backend and self.backend.is_running:
+            self.backend.reconfigure(settings)
+        else:
+            self.backend = BackendProcess(
+                keep_alive_interval=self.model_keep_alive,
+                on_event=lambda name, payload: self.result_queue.put({"type": name, "content": payload})
+            )
+            self.backend.start(settings)
+            self.image_processor = self.backend
+        self.llm_manager = self.backend.llm_manager
+        self.model_supervisor = self.backend.model_supervisor
+
+    def _start_semantic_indexer(self):
+        """Starts embedding the history in the background when an embedding model is configured."""
+        if not self.embedding_model:
+            return
+        self.semantic_indexer = SemanticIndexer(self.llm_manager, self.history_manager, ann_threshold=self.ann_threshold)
+        self.semantic_indexer.start()
+
+    def _start_model_supervisor(self):
+        """Warms up the current model in the background and keeps it loaded."""
+        self.model_supervisor = ModelSupervisor(
+            self.llm_manager,
+            keep_alive_interval=self.model_keep_alive,
+            on_state_change=lambda status: self.result_queue.put({"type": "model_state", "content": status})
+        )
+        self.model_supervisor.start()
+
+    def _on_model_state(self, status):
+        """Shows the model load state next to the menu buttons."""
+        if not self.model_supervisor or status["model_identifier"] != self.model_identifier:
+            return
+        labels = {
+            ModelSupervisor.LOADING: ("Model loading...", "orange"),
+            ModelSupervisor.READY: ("Model ready", "gray"),
+            ModelSupervisor.UNAVAILABLE: ("Model unavailable", "orange"),
+        }
+        text, color = labels.get(status["state"], ("", "gray"))
+        self.model_status_label.configure(text=text, text_color=color)
+        if status["state"] == ModelSupervisor.LOADING:
+            self.tts.speak("Model loading")
+
+    def _processing_message(self):
+        """Returns the placeholder shown while a request is pending."""
+        if self.model_supervisor and self.model_supervisor.is_loading():
+            return "System: Model loading, the first answer may take a while..."
+        return "System: Processing..."
+
+    def set_response_profile(self, name):
+        """Makes a response profile the default of new requests and saves it."""
+        self.response_profile = name
+        if self.llm_manager:
+            self.llm_manager.default_profile = name
+        self._save_config()
+        logger.info(f"Response profile set to {name}")
+
+    def set_tracing_enabled(self, enabled):
+        """Turns request tracing on or off and saves the choice."""
+        tracer.configure(enabled, self.trace_file)
+        self._save_config()
 
     def update_discord_token(self, token):
         self.discord_token = token
@@ -587,8 +1200,16 @@ class InterfaceGrafica(ctk.CTk, TkinterDnD.DnDWrapper):
             return
 
         try:
-            from local_vision.logic.discord_bot import DiscordBot
-            self.discord_bot = DiscordBot(self.discord_token, self.llm_manager)
+            options = dict(
+                batch_attachments=self.discord_batch_attachments,
+                streaming_replies=self.discord_streaming_replies,
+                channel_profiles=self.discord_channel_profiles
+            )
+            if self.backend:
+                self.discord_bot = self.backend.discord_bot(self.discord_token, **options)
+            else:
+                from local_vision.logic.discord_bot import DiscordBot
+                self.discord_bot = DiscordBot(self.discord_token, self.llm_manager, **options)
             self.discord_bot.start_bot()
             self._add_message("System: Discord Bot started.", is_system=True)
         except Exception as e:
@@ -619,7 +1240,7 @@ class InterfaceGrafica(ctk.CTk, TkinterDnD.DnDWrapper):
     def update_all_fonts(self):
         """Iterates through all widgets and updates their font size."""
         try:
-            logging.debug(f"Updating fonts to size {self.font_size}")
+            logger.debug(f"Updating fonts to size {self.font_size}")
             new_font = (None, self.font_size)
             ctk.CTkFont(size=self.font_size)
 
@@ -629,10 +1250,10 @@ class InterfaceGrafica(ctk.CTk, TkinterDnD.DnDWrapper):
                 try:
                     self._update_widget_font(widget, new_font)
                 except Exception as e:
-                    logging.debug(f"Error updating font for widget {widget}: {e}")
-            logging.debug("Fonts updated successfully")
+                    logger.debug(f"Error updating font for widget {widget}: {e}")
+            logger.debug("Fonts updated successfully")
         except Exception as e:
-            logging.error(f"Error in update_all_fonts: {e}", exc_info=True)
+            logger.error(f"Error in update_all_fonts: {e}", exc_info=True)
 
     def _update_widget_font(self, widget, font):
         """Recursively update font for a widget and its children."""
@@ -650,7 +1271,7 @@ class InterfaceGrafica(ctk.CTk, TkinterDnD.DnDWrapper):
             for child in children:
                 self._update_widget_font(child, font)
         except Exception as e:
-            logging.debug(f"Error iterating widget children: {e}")
+            logger.debug(f"Error iterating widget children: {e}")
 
 
     def _prompt_for_nickname(self):
@@ -659,120 +1280,374 @@ class InterfaceGrafica(ctk.CTk, TkinterDnD.DnDWrapper):
         return login_win.get_nickname()
 
     def _start_new_conversation(self):
-        """Creates a new conversation in the database."""
+        """Creates a new conversation in the database, cancelling what the previous one still had running."""
+        if self.conversation_id is not None:
+            self._cancel_conversation_requests(self.conversation_id, "superseded")
         self.conversation_id = self.history_manager.create_conversation(self.nickname)
 
+    def _cancel_conversation_requests(self, conversation_id, reason):
+        """
+        Cancels the queued images and the text requests of a conversation.
+
+        Returns:
+            int: The number of requests that were cancelled.
+        """
+        cancelled = self.image_queue.cancel(conversation_id=conversation_id, reason=reason)
+        if self.llm_manager:
+            cancelled += self.llm_manager.cancel((conversation_id, "text"), reason=reason)
+        return cancelled
+
     def _on_send_text(self, event=None):
         """Handles sending a text message."""
         message = self.text_input.get().strip()
         if not message:
             return
 
-        self._add_message(f"{self.nickname}: {message}")
-        self.history_manager.save_interaction(self.conversation_id, "user", "text", content=message)
-        self.text_input.delete(0, "end")
+        with tracer.request(), tracer.span("ui.submit_text"):
+            self._add_message(f"{self.nickname}: {message}")
+            # Read the context before storing the message; the manager appends the message itself.
+            history = self.history_manager.get_context(self.conversation_id, self.history_compactor.context_limit())
+            self.history_manager.save_interaction(self.conversation_id, "user", "text", content=message)
+            self.text_input.delete(0, "end")
+            if self.semantic_indexer:
+                self.semantic_indexer.notify()
+
+            if self.llm_manager:
+                placeholder = self._add_message(self._processing_message(), is_system=True)
+                handle = self.llm_manager.get_text_response(
+                    message, history, self.result_queue,
+                    supersede_key=(self.conversation_id, "text"), conversation_key=self.conversation_id
+                )
+                self._pending_requests[handle.request_id] = (placeholder, self.conversation_id)
+            else:
+                self._add_message("System Error: LLM not connected. Please check LM Studio.", is_system=True)
 
-        if self.llm_manager:
-            history = self.history_manager.get_conversation_history(self.conversation_id, as_dict=True)
-            self.llm_manager.get_text_response(message, history, self.result_queue)
-            self._add_message("System: Processing...", is_system=True)
-        else:
-            self._add_message("System Error: LLM not connected. Please check LM Studio.", is_system=True)
 
+    def _on_stop(self):
+        """Stops the requests and queued images of the current conversation that are still running."""
+        if not self._cancel_conversation_requests(self.conversation_id, "stopped"):
+            self.tts.speak("Nothing to stop")
+
+    def _on_cancel_queue(self):
+        """Cancels every image in the queue."""
+        if self.image_queue.cancel():
+            self.tts.speak("Image queue cancelled")
 
     def _on_attach_click(self):
         """Handles the attach image button click."""
-        filepath = filedialog.askopenfilename(
-            title="Select an image",
+        filepaths = filedialog.askopenfilenames(
+            title="Select images",
             filetypes=(("Image files", "*.png *.jpg *.jpeg"), ("All files", "*.*"))
         )
-        if filepath:
-            self._process_image_submission(filepath)
+        if filepaths:
+            self._submit_images(self.tk.splitlist(filepaths))
 
     def _on_drop(self, event):
-        """Handles a file being dropped on the window."""
+        """Handles files or folders being dropped on the window."""
         # The event data is a string of file paths, potentially with spaces and braces
-        filepath = self.tk.splitlist(event.data)[0]
-        if filepath:
-            self._process_image_submission(filepath)
+        self._submit_images(self.tk.splitlist(event.data))
 
     def _on_paste(self):
         """Handles pasting an image from the clipboard."""
         temp_path = None
+        item = None
         try:
             img = pyperclipimg.paste()
-            if img:
+            if img and self.backend:
+                # PNG encoding of a large screenshot takes long; the backend does it.
+                with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as temp_file:
+                    path = temp_file.name
+                self.backend.save_image(img, path).add_done_callback(
+                    lambda future: self.result_queue.put({"type": "pasted_image", "content": path, "future": future})
+                )
+            elif img:
                 with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as temp_file:
                     img.save(temp_file, "PNG")
                     temp_path = temp_file.name
 
-                self._process_image_submission(temp_path)
+                item = self._enqueue_image(temp_path)
             else:
                 self._add_message("System: No image found on clipboard.", is_system=True)
         except Exception as e:
             self._add_message(f"System: Error pasting image: {e}", is_system=True)
         finally:
-            if temp_path and os.path.exists(temp_path):
-                os.remove(temp_path)
+            if temp_path and item is not None:
+                # The queue still reads the file; it is removed when the item leaves the queue.
+                self._temp_files[item.request_id] = temp_path
+            elif temp_path:
+                self._remove_temp_file(temp_path)
+
+    def _on_pasted_image(self, temp_path, future):
+        """Queues a pasted image once the backend has written it."""
+        if future.exception() is not None:
+            self._add_message(f"System: Error pasting image: {future.exception()}", is_system=True)
+            self._remove_temp_file(temp_path)
+            return
+        self._temp_files[self._enqueue_image(temp_path).request_id] = temp_path
+
+    @staticmethod
+    def _remove_temp_file(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
 
-    def _process_image_submission(self, filepath):
-        """Shared logic for processing an image from any source."""
-        supported_formats = ('.png', '.jpg', '.jpeg')
-        if not filepath.lower().endswith(supported_formats):
+    def _submit_images(self, paths):
+        """Queues the images named by selected or dropped paths; folders add the images they contain."""
+        images, skipped = expand_image_paths(paths)
+        if skipped:
             self._add_message("System: Formato de arquivo não suportado. Use JPEG, PNG, etc.", is_system=True)
-            return
+        elif not images:
+            self._add_message("System: No images found.", is_system=True)
+        for filepath in images:
+            self._enqueue_image(filepath)
+        if len(images) > 1:
+            self.tts.speak(f"{len(images)} images queued")
+
+    def _enqueue_image(self, filepath):
+        """
+        Adds an image to the conversation and to the image queue.
 
-        self._add_message(f"{self.nickname} (image):")
-        self.history_manager.save_interaction(self.conversation_id, "user", "image", image_path=filepath)
+        The interaction is stored and the placeholders shown right away, so a batch
+        keeps its order in the chat; the thumbnail and the description arrive
+        through the result queue.
 
-        if not self._add_image(filepath):
+        Returns:
+            ImageQueueItem: The queued item.
+        """
+        with tracer.request() as request_id, tracer.span("ui.submit_image"):
+            self._add_message(f"{self.nickname} (image):")
+            interaction_id = self.history_manager.save_interaction(
+                self.conversation_id, "user", "image", image_path=filepath
+            )
+            self._queue_images[request_id] = self._add_image_placeholder()
+            placeholder = self._add_message(self._processing_message(), is_system=True)
+            self._pending_requests[request_id] = (placeholder, self.conversation_id)
+            if interaction_id:
+                self._pending_image_descriptions[request_id] = interaction_id
+            item = self.image_queue.add(filepath, self.conversation_id, interaction_id, request_id=request_id)
+            self._add_queue_row(item)
+        return item
+
+    def _add_queue_row(self, item):
+        """Adds a queued image to the queue panel, with its progress and a cancel button."""
+        row = ctk.CTkFrame(self.queue_list, fg_color="transparent")
+        row.pack(fill="x")
+        row.grid_columnconfigure(1, weight=1)
+        label = ctk.CTkLabel(row, text=f"{item.name}: {self.QUEUE_STAGE_LABELS[item.stage]}", anchor="w", width=220)
+        label.grid(row=0, column=0, sticky="w", padx=5)
+        progress = ctk.CTkProgressBar(row)
+        progress.set(item.progress())
+        progress.grid(row=0, column=1, sticky="ew", padx=5)
+        cancel_button = ctk.CTkButton(
+            row, text="Cancel", width=60, command=lambda: self.image_queue.cancel(request_id=item.request_id)
+        )
+        cancel_button.grid(row=0, column=2, padx=5)
+        make_accessible(cancel_button, f"Cancel {item.name} button", self.tts)
+        self._queue_rows[item.request_id] = (row, label, progress)
+        self._update_queue_summary()
+
+    def _update_queue_row(self, item):
+        """Shows the stage of a queued image; finished images leave the queue panel."""
+        if not item.finished:
+            row = self._queue_rows.get(item.request_id)
+            if row:
+                row[1].configure(text=f"{item.name}: {self.QUEUE_STAGE_LABELS[item.stage]}")
+                row[2].set(item.progress())
             return
 
-        if self.llm_manager:
-            self._add_message("System: Processing...", is_system=True)
-            self.llm_manager.get_image_description(filepath, self.result_queue)
-        else:
-            self._add_message("System Error: LLM not connected. Cannot process image.", is_system=True)
+        row = self._queue_rows.pop(item.request_id, None)
+        if row:
+            row[0].destroy()
+        img_button = self._queue_images.pop(item.request_id, None)
+        if img_button is not None:
+            # Cancelled before its thumbnail was decoded.
+            self._load_thumbnail(img_button, item.filepath)
+        temp_path = self._temp_files.pop(item.request_id, None)
+        if temp_path:
+            self._remove_temp_file(temp_path)
+        self._update_queue_summary()
+
+    def _update_queue_summary(self):
+        """Shows the queue panel with the number of queued images, or hides it when the queue is empty."""
+        if not self._queue_rows:
+            self.queue_frame.grid_remove()
+            return
+        self.queue_label.configure(text=f"Images in queue: {len(self._queue_rows)}")
+        self.queue_frame.grid()
 
 
     def _check_queue(self):
         """Checks the result queue for new messages and updates the UI."""
         try:
-            response = self.result_queue.get_nowait()
-            response_type = response.get("type")
-            content = response.get("content", "No content received.")
-
-            children = self.history_frame.winfo_children()
-            if children:
-                children[-1].destroy()
-
-            self._add_message(f"System: {content}", is_system=True)
-            
-            self.tts.speak(content)
-
-            if response_type == "description":
-                self.history_manager.save_interaction(self.conversation_id, "system", "description", content=content)
-            elif response_type == "text_response":
-                self.history_manager.save_interaction(self.conversation_id, "system", "text", content=content)
-            elif response_type == "error":
-                 pass
+            for _ in range(self.QUEUE_BATCH):
+                response = self.result_queue.get_nowait()
+                response_type = response.get("type")
+                content = response.get("content", "No content received.")
+
+                if response_type == "model_state":
+                    self._on_model_state(content)
+                elif response_type == "search_results":
+                    if response["window"].winfo_exists():
+                        response["window"].show_search_results(content)
+                elif response_type == "thumbnail":
+                    self._show_thumbnail(response["widget"], content)
+                elif response_type == "queue_thumbnail":
+                    img_button = self._queue_images.pop(response["item"].request_id, None)
+                    if img_button is not None:
+                        self._show_thumbnail(img_button, content)
+                elif response_type == "queue_progress":
+                    self._update_queue_row(response["item"])
+                elif response_type == "pasted_image":
+                    self._on_pasted_image(content, response["future"])
+                elif response_type == "data_task":
+                    self._add_message(content, is_system=True)
+                    self.tts.speak(content.split(": ", 1)[-1])
+                else:
+                    self._render_response(response_type, content, response)
 
         except queue.Empty:
             pass # No message yet
         except Exception as e:
-            logging.error(f"Error in _check_queue: {e}", exc_info=True)
+            logger.error(f"Error in _check_queue: {e}", exc_info=True)
 
         # Always reschedule the next check
         try:
             self.after(100, self._check_queue)
         except Exception as e:
-            logging.error(f"Error scheduling next queue check: {e}")
+            logger.error(f"Error scheduling next queue check: {e}")
+
+    def _render_response(self, response_type, content, response):
+        """Replaces the placeholder of the request that produced a model response and records it."""
+        request_id = response.get("request_id")
+        pending = self._pending_requests.pop(request_id, None)
+        image_interaction_id = self._pending_image_descriptions.pop(request_id, None)
+        if pending is None:
+            logger.debug(f"Ignoring {response_type} for unknown request {request_id}")
+            return
+        placeholder, conversation_id = pending
+
+        with tracer.request(request_id):
+            if tracer.enabled and "queued_at" in response:
+                tracer.record("ui.queue_wait", time.perf_counter() - response["queued_at"])
+
+            if response_type == "cancelled":
+                if placeholder.winfo_exists():
+                    placeholder.configure(text=f"System: Request {content}.")
+                return
+
+            with tracer.span("ui.render_response"):
+                if placeholder.winfo_exists():
+                    placeholder.destroy()
+                if conversation_id == self.conversation_id:
+                    self._add_message(f"System: {content}", is_system=True)
+
+            if conversation_id == self.conversation_id:
+                self.tts.speak(render_for_speech(content) if response_type != "error" else content)
+
+            if response_type == "description":
+                self.history_manager.save_interaction(conversation_id, "system", "description", content=content)
+                if image_interaction_id:
+                    self.image_index.set_description(image_interaction_id, content)
+            elif response_type == "text_response":
+                self.history_manager.save_interaction(conversation_id, "system", "text", content=content)
+            elif response_type == "error":
+                 return
+            if self.semantic_indexer:
+                self.semantic_indexer.notify()
+            if self.llm_manager:
+                self.history_compactor.maybe_compact(conversation_id)
+
+    def load_conversation_history(self, conversation_id):
+        """
+        Switches the chat to a stored conversation.
+
+        The conversation is read a page at a time, newest first, and rendered a few
+        interactions per after() callback, each chunk above the previous one, so the
+        latest messages show up at once and the window stays responsive while older
+        ones fill in. Thumbnails are decoded in a background thread. Past
+        RESTORE_AUTO_INTERACTIONS a button loads earlier messages on request.
+        Images and text requests still running for the conversation being left
+        are cancelled, so their results are not saved to it.
+
+        The model context is not rebuilt from these rows: each turn reads it with
+        get_context (latest checkpoint plus the interactions after it), and a
+        background compaction is started in case the conversation outgrew it.
+
+        Args:
+            conversation_id (int): The ID of the conversation to restore.
+        """
+        logger.info(f"Restoring conversation {conversation_id}")
+        self._restore_generation += 1
+        if conversation_id != self.conversation_id:
+            self._cancel_conversation_requests(self.conversation_id, "superseded")
+        self.conversation_id = conversation_id
+        for widget in self.history_frame.winfo_children():
+            widget.destroy()
+        self._restore_top = None
+        with tracer.request(), tracer.span("ui.restore_conversation"):
+            self._restore_page(self._restore_generation, None, 0)
+        if self.llm_manager:
+            self.history_compactor.maybe_compact(conversation_id)
+        self.tts.speak("Conversation loaded")
+
+    def _restore_page(self, generation, before_id, rendered):
+        """Reads the page of interactions older than before_id and renders its first chunk."""
+        if generation != self._restore_generation:
+            return
+        page = self.history_manager.get_interactions_before(self.conversation_id, before_id, self.RESTORE_PAGE_SIZE)
+        if page:
+            self._restore_chunk(generation, page, rendered, len(page) == self.RESTORE_PAGE_SIZE)
+
+    def _restore_chunk(self, generation, page, rendered, more):
+        """Renders the next interactions of a page above those already shown and schedules the rest."""
+        if generation != self._restore_generation:
+            return
+        chunk, rest = page[:self.RESTORE_CHUNK_SIZE], page[self.RESTORE_CHUNK_SIZE:]
+        with tracer.span("ui.restore_chunk", interactions=len(chunk)):
+            for interaction in chunk:
+                self._restore_top = self._add_restored_interaction(interaction, before=self._restore_top)
+        rendered += len(chunk)
+        oldest_id = chunk[-1]["interaction_id"]
+
+        if rest:
+            self.after(1, self._restore_chunk, generation, rest, rendered, more)
+        elif more and rendered < self.RESTORE_AUTO_INTERACTIONS:
+            self.after(1, self._restore_page, generation, oldest_id, rendered)
+        elif more:
+            self._add_load_earlier_button(generation, oldest_id)
+
+    def _add_restored_interaction(self, interaction, before=None):
+        """Adds the widgets of a stored interaction and returns the topmost one."""
+        content = interaction["content"]
+        if interaction["type"] == "image":
+            image_button = self._add_lazy_image(interaction["image_path"], before=before)
+            return self._add_message(f"{self.nickname} (image):", before=image_button)
+        if interaction["actor"] == "user":
+            return self._add_message(f"{self.nickname}: {content}", before=before)
+        return self._add_message(f"System: {content}", is_system=True, before=before)
+
+    def _add_load_earlier_button(self, generation, before_id):
+        """Adds a button above the restored messages that renders the next pages."""
+        def load_earlier():
+            button.destroy()
+            self._restore_page(generation, before_id, 0)
+
+        button = ctk.CTkButton(self.history_frame, text="Load earlier messages", command=load_earlier)
+        button.pack(pady=5, before=self._restore_top)
+        make_accessible(button, "Load earlier messages button", self.tts)
 
     def _open_history(self):
         """Opens the conversation history window."""
         HistoryWindow(self, self.history_manager)
 
     def _open_settings(self):
+        """Opens the settings window."""
+        SettingsWindow(self)
+
+    def _add_message(self, message, is_system=False, before=None):
+        """Adds a message label to the chat history frame and returns it; `before` packs it above a widget."""
+        text_color = None
         if is_system:
             text_color = "orange" if "Error" in message else "gray"
         
@@ -786,48 +1661,71 @@ class InterfaceGrafica(ctk.CTk, TkinterDnD.DnDWrapper):
             text_color=text_color,
             # fg_color="transparent" # Default is transparent
         )
-        msg_label.pack(fill="x", padx=5, pady=5)
+        msg_label.pack(fill="x", padx=5, pady=5, before=before)
         
         # Bind focus event to read the message
         make_accessible(msg_label, message, self.tts)
         
         # Add click event to speak message (since Label doesn't have command)
         msg_label.bind("<Button-1>", lambda e: self.tts.speak(message))
+        return msg_label
+
+    def _add_image_placeholder(self, before=None):
+        """Adds a "Loading image..." button to the chat; _show_thumbnail later puts the image on it."""
+        img_button = ctk.CTkButton(
+            self.history_frame,
+            text="Loading image...",
+            fg_color="transparent",
+            hover_color="gray20",
+            command=lambda: self.tts.speak("Image sent")
+        )
+        img_button.pack(padx=5, pady=5, before=before)
+        make_accessible(img_button, "Image sent", self.tts)
+        return img_button
 
-    def _add_image(self, filepath):
+    def _add_lazy_image(self, filepath, before=None):
         """
-        Adds an image to the history frame. Returns True on success, False on failure.
+        Adds a placeholder for a stored image and decodes its thumbnail in the background.
+
+        The thumbnail comes back through the result queue and _show_thumbnail puts it
+        on the placeholder; decoding is skipped if another conversation was restored
+        in the meantime.
         """
-        ctk_image = ImageProcessor.process_and_resize(filepath)
-        if ctk_image:
-            # Use CTkButton for accessibility
-            img_button = ctk.CTkButton(
-                self.history_frame, 
-                image=ctk_image, 
-                text="",
-                fg_color="transparent",
-                hover_color="gray20",
-                height=ctk_image.cget("size")[1] + 10,
-                command=lambda: self.tts.speak("Image sent")
-            )
-            img_button.pack(padx=5, pady=5)
-            make_accessible(img_button, "Image sent", self.tts)
-            return True
-        else:
-            # As per the sequence diagram for "falha no carregamento"
-            self._add_message("System: Falha ao carregar a imagem. Tente novamente.", is_system=True)
-            return False
+        img_button = self._add_image_placeholder(before)
+        self._load_thumbnail(img_button, filepath, self._restore_generation)
+        return img_button
+
+    def _load_thumbnail(self, img_button, filepath, generation=None):
+        """Decodes the thumbnail of an image placeholder in the background, unless a newer restore started."""
+        result_queue = self.result_queue
 
+        def decode():
+            if generation is not None and generation != self._restore_generation:
+                return
+            image = self.image_processor.load_thumbnail(filepath) if filepath else None
+            result_queue.put({"type": "thumbnail", "content": image, "widget": img_button})
+
+        self._thumbnails.submit(decode)
+
+    def _show_thumbnail(self, img_button, image):
+        """Replaces an image placeholder with its decoded thumbnail."""
+        if not img_button.winfo_exists():
+            return
+        if image is None:
+            img_button.configure(text="Image unavailable")
+            return
+        ctk_image = ctk.CTkImage(light_image=image, dark_image=image, size=image.size)
+        img_button.configure(image=ctk_image, text="", height=image.size[1] + 10)
 
     def run(self):
         """Starts the main application loop."""
         if self.nickname:
             try:
-                logging.info("Starting mainloop...")
+                logger.info("Starting mainloop...")
                 self.mainloop()
-                logging.info("Mainloop exited normally")
+                logger.info("Mainloop exited normally")
             except Exception as e:
-                logging.critical(f"FATAL ERROR in mainloop: {e}", exc_info=True)
+                logger.critical(f"FATAL ERROR in mainloop: {e}", exc_info=True)
                 input("Press Enter to close...")
         else:
-            logging.info("No nickname, not starting mainloop")
+            logger.info("No nickname, not starting mainloop")
@@ -1,8 +1,15 @@
+import configparser
+
+from local_vision.logging_setup import configure_logging_from_config
 from local_vision.ui.main_window import InterfaceGrafica
 from local_vision.data.database_manager import DatabaseManager
 from local_vision.data.history_manager import HistoryManager
 
 if __name__ == "__main__":
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+    configure_logging_from_config(config)
+
     db_manager = DatabaseManager()
     db_manager.connect()
     db_manager.create_tables()
@@ -0,0 +1,151 @@
+import unittest
+import logging
+import os
+import queue
+import sys
+import tempfile
+import threading
+import time
+
+from PIL import Image
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from local_vision.logic.backend_process import BackendProcess, BackendUnavailable
+from local_vision.logic.image_processor import ImageProcessor
+from local_vision.logic.request_handle import RequestCancelled, RequestHandle
+from local_vision.records import Interaction, LLMResult
+from local_vision.tracing import tracer
+
+
+class FakeLLMManager:
+    """Runs in the backend process in place of LLM_Manager."""
+    def __init__(self, model_identifier="local-model", routes=None, embedding_model=None, profiles=None,
+                 default_profile=None):
+        if model_identifier == "missing":
+            raise RuntimeError("LM Studio is not reachable")
+        self.model_identifier = model_identifier
+        self.routes = {"image": model_identifier, "text": model_identifier}
+        self.embedding_identifier = embedding_model
+        self.default_profile = default_profile
+
+    def get_text_response(self, message, conversation_history, result_queue, stream=False, supersede_key=None,
+                          conversation_key=None, profile=None):
+        request_id = tracer.current_request_id()
+        logging.getLogger("local_vision.fake").info(f"Answering {message}")
+        if message == "hang":
+            return
+        if stream:
+            result_queue.put({"type": "fragment", "content": message[:2], "request_id": request_id})
+        content = f"{len(conversation_history)}:{message.upper()}:{self.default_profile}"
+        threading.Thread(target=lambda: result_queue.put(LLMResult("text_response", content, request_id))).start()
+
+    def describe_image(self, image_path, handle=None, profile=None):
+        deadline = time.monotonic() + 5.0
+        while image_path == "slow" and time.monotonic() < deadline:
+            handle.check()
+            time.sleep(0.01)
+        return f"described {os.path.basename(image_path)}"
+
+    def embed(self, texts):
+        return [[float(len(text))] for text in texts]
+
+    def cancel(self, supersede_key=None, reason="cancelled"):
+        return 1 if supersede_key == 7 else 0
+
+
+class TestBackendProcess(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.backend = BackendProcess(keep_alive_interval=None, llm_factory=FakeLLMManager)
+        cls.backend.start({"model_identifier": "vision-model", "default_profile": "detailed"})
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.backend.close()
+
+    def test_requests_and_calls_round_trip(self):
+        llm_manager = self.backend.llm_manager
+        self.assertEqual(llm_manager.model_identifier, "vision-model")
+        result_queue = queue.Queue()
+        history = [Interaction(1, 1, "t", "user", "text", "earlier")]
+
+        with self.assertLogs("local_vision.fake", level="INFO") as logs:
+            handle = llm_manager.get_text_response("hello", history, result_queue, stream=True, supersede_key=7)
+            fragment = result_queue.get(timeout=5)
+            result = result_queue.get(timeout=5)
+        self.assertEqual(fragment, {"type": "fragment", "content": "he", "request_id": handle.request_id})
+        self.assertEqual(result, LLMResult("text_response", "1:HELLO:detailed", handle.request_id, result.queued_at))
+        self.assertIn("Answering hello", logs.output[0])
+
+        llm_manager.default_profile = "fast"
+        llm_manager.get_text_response("again", [], result_queue)
+        self.assertEqual(result_queue.get(timeout=5).content, "0:AGAIN:fast")
+        self.assertEqual(llm_manager.embed(["abc", "de"]), [[3.0], [2.0]])
+        self.assertEqual(llm_manager.cancel(7), 1)
+        self.assertEqual(llm_manager.describe_image("/photos/cat.png", handle=RequestHandle("r1")), "described cat.png")
+
+        # The fake has no get_images_description: the request fails to start in the backend.
+        handle = llm_manager.get_images_description(["a.png"], result_queue)
+        result = result_queue.get(timeout=5)
+        self.assertEqual((result.type, result.request_id), ("error", handle.request_id))
+        self.assertIn("get_images_description", result.content)
+
+    def test_images_cross_through_shared_memory(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            photo = os.path.join(temp_dir, "photo.png")
+            Image.radial_gradient("L").resize((800, 600)).convert("RGB").save(photo)
+            palette = os.path.join(temp_dir, "palette.png")
+            Image.new("RGB", (50, 40), (200, 10, 10)).convert("P").save(palette)
+
+            thumbnail = self.backend.load_thumbnail(photo)
+            local = ImageProcessor.load_thumbnail(photo)
+            self.assertEqual((thumbnail.mode, thumbnail.size), ("RGB", (400, 300)))
+            self.assertEqual(thumbnail.tobytes(), local.tobytes())
+            self.assertEqual(self.backend.load_thumbnail(palette).tobytes(), ImageProcessor.load_thumbnail(palette).convert("RGBA").tobytes())
+            self.assertIsNone(self.backend.load_thumbnail(os.path.join(temp_dir, "missing.png")))
+            self.assertEqual(self.backend.perceptual_hash(photo), ImageProcessor.perceptual_hash(photo))
+
+            pasted = os.path.join(temp_dir, "pasted.png")
+            screenshot = Image.new("RGBA", (1920, 1080), (10, 20, 30, 255))
+            self.backend.save_image(screenshot, pasted).result(timeout=10)
+            with Image.open(pasted) as image:
+                self.assertEqual(image.size, (1920, 1080))
+                self.assertEqual(image.getpixel((5, 5)), (10, 20, 30, 255))
+
+
+class TestBackendProcessLifecycle(unittest.TestCase):
+    def test_startup_failure_is_reported(self):
+        backend = BackendProcess(keep_alive_interval=None, llm_factory=FakeLLMManager)
+        with self.assertRaisesRegex(BackendUnavailable, "LM Studio is not reachable"):
+            backend.start({"model_identifier": "missing"})
+        self.assertIsNone(backend.process)
+
+    def test_cancelled_description_and_backend_exit(self):
+        backend = BackendProcess(keep_alive_interval=None, llm_factory=FakeLLMManager)
+        backend.start({})
+        try:
+            handle = RequestHandle("r1")
+            threading.Timer(0.2, handle.cancel, args=("stopped",)).start()
+            with self.assertRaises(RequestCancelled) as cancelled:
+                backend.llm_manager.describe_image("slow", handle=handle)
+            self.assertEqual(cancelled.exception.reason, "stopped")
+
+            result_queue = queue.Queue()
+            handle = backend.llm_manager.get_text_response("hang", [], result_queue)
+            pending = backend.call("describe_image", "slow", "r2")
+            backend.process.kill()
+
+            result = result_queue.get(timeout=5)
+            self.assertEqual((result.type, result.request_id), ("error", handle.request_id))
+            with self.assertRaises(BackendUnavailable):
+                pending.result(timeout=5)
+
+            handle = backend.llm_manager.get_text_response("too late", [], result_queue)
+            result = result_queue.get(timeout=5)
+            self.assertEqual((result.type, result.request_id), ("error", handle.request_id))
+        finally:
+            backend.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,177 @@
+import unittest
+import gzip
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from local_vision.backup import OnlineBackup, export_history, import_history
+from local_vision.data.database_manager import DatabaseManager
+
+
+class TestBackup(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_manager = self._database("source.db")
+
+    def tearDown(self):
+        self.db_manager.conn.close()
+        self.temp_dir.cleanup()
+
+    def _path(self, name):
+        return os.path.join(self.temp_dir.name, name)
+
+    def _database(self, name):
+        db_manager = DatabaseManager(self._path(name))
+        db_manager.connect()
+        db_manager.create_tables()
+        return db_manager
+
+    def _add_conversation(self, db_manager, nickname, image_path=None, messages=3):
+        conversation_id = db_manager.execute_crud_query(
+            "INSERT INTO conversations (start_timestamp, user_nickname) VALUES (?, ?)", ("2024-01-01T00:00:00", nickname)
+        )
+        ids = []
+        if image_path:
+            ids.append(db_manager.execute_crud_query(
+                "INSERT INTO interactions (conversation_id, timestamp, actor, type, image_path) VALUES (?, ?, ?, ?, ?)",
+                (conversation_id, "2024-01-01T00:00:01", "user", "image", image_path)
+            ))
+            db_manager.execute_crud_query(
+                "INSERT INTO image_hashes (interaction_id, conversation_id, dhash, description) VALUES (?, ?, ?, ?)",
+                (ids[-1], conversation_id, 1234, "A cat")
+            )
+        db_manager.execute_many(
+            "INSERT INTO interactions (conversation_id, timestamp, actor, type, content) VALUES (?, ?, ?, ?, ?)",
+            [(conversation_id, f"2024-01-01T00:01:{i:02d}", "assistant", "text", f"{nickname} {i}") for i in range(messages)]
+        )
+        ids += [row[0] for row in db_manager.execute_crud_query(
+            "SELECT interaction_id FROM interactions WHERE conversation_id = ? AND type = 'text' ORDER BY interaction_id",
+            (conversation_id,)
+        )]
+        db_manager.execute_crud_query(
+            "INSERT INTO checkpoints (conversation_id, timestamp, upto_interaction_id, summary) VALUES (?, ?, ?, ?)",
+            (conversation_id, "2024-01-01T00:02:00", ids[-2], f"Summary of {nickname}")
+        )
+        return conversation_id
+
+    def test_backup_copies_the_database_in_steps(self):
+        for i in range(20):
+            self._add_conversation(self.db_manager, f"user{i}", messages=50)
+        backup = OnlineBackup(self.db_manager, pages=2, sleep=0)
+        target = self._path("backups/copy.db")
+
+        self.assertEqual(backup.run(target), target)
+
+        self.assertGreater(backup.total, 2)
+        self.assertEqual(backup.remaining, 0)
+        self.assertFalse(os.path.exists(target + ".partial"))
+        copy = sqlite3.connect(target)
+        try:
+            self.assertEqual(copy.execute("PRAGMA integrity_check").fetchone()[0], "ok")
+            self.assertEqual(copy.execute("SELECT COUNT(*) FROM interactions").fetchone()[0], 1000)
+        finally:
+            copy.close()
+
+    def test_backup_steps_share_the_connection_with_writers(self):
+        conversation_id = self._add_conversation(self.db_manager, "alice", messages=500)
+        backup = OnlineBackup(self.db_manager, pages=1, sleep=0.001)
+        done = threading.Event()
+        errors = []
+        moved_while_locked = []
+
+        def write():
+            try:
+                while not done.is_set():
+                    with self.db_manager._lock:
+                        remaining = backup.remaining
+                        self.db_manager.execute_crud_query(
+                            "INSERT INTO interactions (conversation_id, timestamp, actor, type, content) VALUES (?, ?, ?, ?, ?)",
+                            (conversation_id, "2024-01-01T00:03:00", "user", "text", "during backup")
+                        )
+                        time.sleep(0.001)
+                        if backup.remaining != remaining:
+                            moved_while_locked.append(remaining)
+            except Exception as e:
+                errors.append(e)
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        try:
+            backup.run(self._path("copy.db"))
+        finally:
+            done.set()
+            writer.join()
+
+        self.assertEqual((errors, moved_while_locked), ([], []))
+        copy = sqlite3.connect(self._path("copy.db"))
+        try:
+            self.assertEqual(copy.execute("PRAGMA integrity_check").fetchone()[0], "ok")
+            self.assertGreaterEqual(copy.execute("SELECT COUNT(*) FROM interactions").fetchone()[0], 500)
+        finally:
+            copy.close()
+
+    def test_export_and_import_round_trip_into_a_database_with_history(self):
+        image_path = self._path("cat.png")
+        with open(image_path, "wb") as f:
+            f.write(b"\x89PNG not really an image")
+        self._add_conversation(self.db_manager, "alice", image_path)
+        self._add_conversation(self.db_manager, "bob", image_path)
+        export_path = self._path("history.jsonl.gz")
+
+        counts = export_history(self.db_manager, export_path, batch_size=2)
+
+        self.assertEqual(counts, {"conversations": 2, "interactions": 8, "images": 1})
+        with gzip.open(export_path, "rb") as f:
+            self.assertEqual(sum(b'"kind":"image"' in line for line in f), 1)
+
+        target = self._database("target.db")
+        try:
+            self._add_conversation(target, "existing", messages=5)
+            images_dir = self._path("imported")
+            counts = import_history(target, export_path, images_dir, batch_size=2)
+
+            self.assertEqual(counts, {"conversations": 2, "interactions": 8, "images": 1})
+            conversations = target.execute_crud_query(
+                "SELECT conversation_id, user_nickname FROM conversations ORDER BY conversation_id"
+            )
+            self.assertEqual([row[1] for row in conversations], ["existing", "alice", "bob"])
+            alice_id = conversations[1][0]
+            rows = target.execute_crud_query(
+                "SELECT interaction_id, type, content, image_path FROM interactions WHERE conversation_id = ? "
+                "ORDER BY interaction_id", (alice_id,)
+            )
+            self.assertEqual([row[2] for row in rows], [None, "alice 0", "alice 1", "alice 2"])
+            with open(rows[0][3], "rb") as f:
+                self.assertEqual(f.read(), b"\x89PNG not really an image")
+            self.assertEqual(os.path.dirname(rows[0][3]), os.path.abspath(images_dir))
+
+            checkpoint = target.execute_crud_query(
+                "SELECT upto_interaction_id, summary FROM checkpoints WHERE conversation_id = ?", (alice_id,)
+            )
+            self.assertEqual(checkpoint, [(rows[2][0], "Summary of alice")])
+            image_hash = target.execute_crud_query(
+                "SELECT interaction_id, dhash, description FROM image_hashes WHERE conversation_id = ?", (alice_id,)
+            )
+            self.assertEqual(image_hash, [(rows[0][0], 1234, "A cat")])
+        finally:
+            target.conn.close()
+
+    def test_import_rejects_a_file_that_is_not_an_export(self):
+        path = self._path("other.jsonl.gz")
+        with gzip.open(path, "wb") as f:
+            f.write(b'{"kind": "header", "format": "something-else"}\n')
+        with self.assertRaises(ValueError):
+            import_history(self.db_manager, path, self._path("imported"))
+
+        with gzip.open(path, "wb") as f:
+            f.write(b'{"kind": "header", "format": "local_vision-history", "version": 1}\n{"kind": "interaction"}\n')
+        with self.assertRaisesRegex(ValueError, "line 2"):
+            import_history(self.db_manager, path, self._path("imported"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+import unittest
+from unittest.mock import MagicMock
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from local_vision.batch import Manifest, ResultWriter, ProgressReporter, iter_image_paths, run_batch
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = self.temp_dir.name
+        os.makedirs(os.path.join(self.root, "sub"))
+        self.images = []
+        for name, data in [("a.png", b"aaa"), ("b.jpg", b"bbb"), (os.path.join("sub", "c.png"), b"aaa")]:
+            path = os.path.join(self.root, name)
+            with open(path, "wb") as f:
+                f.write(data)
+            self.images.append(path)
+        with open(os.path.join(self.root, "notes.txt"), "w") as f:
+            f.write("not an image")
+
+        self.output = os.path.join(self.root, "out.jsonl")
+        self.llm_manager = MagicMock()
+        self.llm_manager.describe_image.side_effect = lambda path: f"desc of {os.path.basename(path)}"
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _run(self):
+        manifest = Manifest(self.output + ".manifest.json")
+        writer = ResultWriter(self.output, "jsonl")
+        reporter = ProgressReporter(3, stream=io.StringIO())
+        try:
+            run_batch(self.llm_manager, sorted(self.images), writer, manifest, concurrency=2, reporter=reporter)
+        finally:
+            writer.close()
+        return reporter
+
+    def test_iter_image_paths(self):
+        paths = list(iter_image_paths([self.root]))
+        self.assertEqual(sorted(paths), sorted(self.images))
+        shallow = list(iter_image_paths([self.root], recursive=False))
+        self.assertEqual(len(shallow), 2)
+
+    def test_run_batch_reuses_identical_content(self):
+        reporter = self._run()
+        self.assertEqual(self.llm_manager.describe_image.call_count, 2)
+        with open(self.output) as f:
+            rows = [json.loads(line) for line in f]
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(sum(row["cached"] for row in rows), 1)
+        self.assertEqual((reporter.described, reporter.cached, reporter.failed), (2, 1, 0))
+
+    def test_run_batch_resumes_from_manifest(self):
+        self._run()
+        self.llm_manager.describe_image.reset_mock()
+        reporter = self._run()
+        self.llm_manager.describe_image.assert_not_called()
+        self.assertEqual(reporter.skipped, 3)
+        with open(self.output) as f:
+            self.assertEqual(len(f.readlines()), 3)
+
+    def test_resume_after_kill_skips_rows_already_written(self):
+        # A killed run: every row was written, the manifest was never saved and the last row is torn.
+        self._run()
+        os.remove(self.output + ".manifest.json")
+        with open(self.output, "rb+") as f:
+            f.truncate(os.path.getsize(self.output) - 10)
+        self.llm_manager.describe_image.reset_mock()
+
+        reporter = self._run()
+        with open(self.output) as f:
+            rows = [json.loads(line) for line in f]
+        self.assertEqual(sorted(row["path"] for row in rows), sorted(self.images))
+        self.assertEqual(reporter.skipped, 2)
+        self.assertEqual(reporter.described + reporter.cached, 1)
+
+        csv_output = os.path.join(self.root, "out.csv")
+        with open(csv_output, "w", encoding="utf-8", newline="") as f:
+            f.write('path,sha256,description,cached\r\na.png,aaa,"line one\nline two",False\r\nb.png,bbb,"torn')
+        writer = ResultWriter(csv_output, "csv")
+        writer.close()
+        self.assertEqual(list(writer.existing_rows), ["a.png"])
+        self.assertEqual(writer.existing_rows["a.png"]["description"], "line one\nline two")
+        reopened = ResultWriter(csv_output, "csv")
+        reopened.close()
+        self.assertEqual(reopened.existing_rows, writer.existing_rows)
+
+    def test_failures_are_reported_and_retried(self):
+        self.llm_manager.describe_image.side_effect = Exception("LM Studio down")
+        reporter = self._run()
+        self.assertEqual(reporter.failed, 3)
+        self.assertEqual(sorted(path for path, _ in reporter.failures), sorted(self.images))
+        self.assertEqual(Manifest(self.output + ".manifest.json").files, {})
+
+        self.llm_manager.describe_image.side_effect = lambda path: f"desc of {os.path.basename(path)}"
+        reporter = self._run()
+        self.assertEqual(reporter.failed, 0)
+        with open(self.output) as f:
+            rows = [json.loads(line) for line in f]
+        self.assertEqual(sorted(row["path"] for row in rows), sorted(self.images))
+        self.assertTrue(all("error" not in row for row in rows))
+
+    def test_csv_output(self):
+        csv_output = os.path.join(self.root, "out.csv")
+        writer = ResultWriter(csv_output, "csv")
+        writer.write({"path": "a.png", "description": "desc, with comma"})
+        writer.close()
+        with open(csv_output) as f:
+            lines = f.read().splitlines()
+        self.assertEqual(lines[0], "path,sha256,description,cached")
+        self.assertIn('"desc, with comma"', lines[1])
+
+    def test_does_not_import_tkinter(self):
+        code = "import sys, local_vision.batch; sys.exit('tkinter' in sys.modules or 'customtkinter' in sys.modules)"
+        root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+        result = subprocess.run([sys.executable, "-c", code], cwd=root)
+        self.assertEqual(result.returncode, 0)
+
+if __name__ == '__main__':
+    unittest.main()
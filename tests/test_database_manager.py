@@ -2,6 +2,7 @@ import unittest
 import os
 import sys
 import sqlite3
+import threading
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
@@ -45,5 +46,27 @@ class TestDatabaseManager(unittest.TestCase):
         self.assertEqual(len(result), 1)
         self.assertEqual(result[0][2], "TestUser")
 
+    def test_execute_crud_query_from_background_thread(self):
+        query = "INSERT INTO conversations (start_timestamp, user_nickname) VALUES (?, ?)"
+        results = []
+        worker = threading.Thread(
+            target=lambda: results.append(self.db_manager.execute_crud_query(query, ("2023-01-01T00:00:00", "Worker")))
+        )
+        worker.start()
+        worker.join()
+        self.assertEqual(results, [1])
+        rows = self.db_manager.execute_crud_query("SELECT user_nickname FROM conversations")
+        self.assertEqual(rows, [("Worker",)])
+
+    def test_execute_many_inserts_all_rows_or_none(self):
+        query = "INSERT INTO conversations (conversation_id, start_timestamp, user_nickname) VALUES (?, ?, ?)"
+        rows = [(i, "2023-01-01T00:00:00", f"User{i}") for i in range(1, 4)]
+        self.assertEqual(self.db_manager.execute_many(query, rows), 3)
+
+        with self.assertRaises(sqlite3.IntegrityError):
+            self.db_manager.execute_many(query, [(4, "2023-01-01T00:00:00", "User4"), rows[0]])
+        count = self.db_manager.execute_crud_query("SELECT COUNT(*) FROM conversations")
+        self.assertEqual(count, [(3,)])
+
 if __name__ == '__main__':
     unittest.main()
@@ -40,6 +40,8 @@ class TestDiscordBot(unittest.TestCase):
         async def run_test():
             mock_message = MagicMock()
             mock_message.reply = AsyncMock()
+            mock_message.channel.id = 42
+            self.bot.channel_profiles = {42: "fast"}
             mock_attachment = MagicMock()
             mock_attachment.save = AsyncMock()
             
@@ -55,10 +57,122 @@ class TestDiscordBot(unittest.TestCase):
             await self.bot._process_image(mock_message, mock_attachment)
             
             self.mock_llm_manager.get_image_description.assert_called()
+            self.assertEqual(self.mock_llm_manager.get_image_description.call_args.kwargs["profile"], "fast")
             mock_message.reply.assert_called_with("**Análise da Imagem:**\nA cat")
             mock_remove.assert_called_with("temp.png")
 
         asyncio.run(run_test())
 
+    def test_on_message_batches_attachments(self):
+        async def run_test():
+            self.bot.batch_attachments = True
+            self.bot._process_images = AsyncMock()
+            self.bot._process_image = AsyncMock()
+
+            images = [MagicMock(content_type='image/png'), MagicMock(content_type='image/jpeg')]
+            mock_message = MagicMock()
+            mock_message.attachments = images + [MagicMock(content_type='text/plain')]
+
+            await self.bot.on_message(mock_message)
+
+            self.bot._process_images.assert_called_once_with(mock_message, images)
+            self.bot._process_image.assert_not_called()
+
+        asyncio.run(run_test())
+
+    @patch('local_vision.logic.discord_bot.tempfile.NamedTemporaryFile')
+    @patch('os.remove')
+    @patch('os.path.exists')
+    def test_process_images_deduplicates_by_hash(self, mock_exists, mock_remove, mock_tempfile):
+        async def run_test():
+            mock_message = MagicMock()
+            mock_message.reply = AsyncMock()
+            attachments = [MagicMock(save=AsyncMock()) for _ in range(4)]
+
+            temps = [MagicMock() for _ in range(4)]
+            for i, temp in enumerate(temps):
+                temp.name = f"temp{i}.png"
+            mock_tempfile.return_value.__enter__.side_effect = temps
+            mock_exists.return_value = True
+
+            hashes = {"temp0.png": "aaa", "temp1.png": "aaa", "temp2.png": "bbb", "temp3.png": "bbb"}
+            self.bot.loop = MagicMock()
+            self.bot.loop.run_in_executor = AsyncMock(
+                side_effect=lambda executor, func, *args: hashes[args[0]] if args else {'type': 'description', 'content': 'Duas fotos'}
+            )
+
+            await self.bot._process_images(mock_message, attachments)
+
+            self.mock_llm_manager.get_images_description.assert_called_once()
+            paths = self.mock_llm_manager.get_images_description.call_args[0][0]
+            self.assertEqual(paths, ["temp0.png", "temp2.png"])
+            mock_message.reply.assert_called_once_with(
+                "**Análise das Imagens:**\nDuas fotos"
+                "\n\nAnexo 2 é idêntico ao Anexo 1 (Imagem 1)."
+                "\n\nAnexo 4 é idêntico ao Anexo 3 (Imagem 2)."
+            )
+            self.assertEqual(mock_remove.call_count, 4)
+
+        asyncio.run(run_test())
+
+    def test_split_message_respects_limit(self):
+        text = "linha um, dois\n" + "palavra " * 10
+        chunks = DiscordBot._split_message(text, limit=20)
+        self.assertTrue(all(len(chunk) <= 20 for chunk in chunks))
+        self.assertEqual(chunks[0], "linha um, dois")
+        self.assertEqual(" ".join(chunks[1:]).split(), ["palavra"] * 10)
+
+    def test_stream_reply_edits_placeholder(self):
+        async def run_test():
+            placeholder = MagicMock()
+            placeholder.edit = AsyncMock()
+            mock_message = MagicMock()
+            mock_message.reply = AsyncMock(return_value=placeholder)
+
+            import queue
+            result_queue = queue.Queue()
+            for item in [
+                {'type': 'stream_start'},
+                {'type': 'fragment', 'content': 'Um '},
+                {'type': 'fragment', 'content': 'gato'},
+                {'type': 'description', 'content': 'Um gato'},
+            ]:
+                result_queue.put(item)
+
+            self.bot.loop = MagicMock()
+            self.bot.loop.time.return_value = 100.0
+            self.bot.loop.run_in_executor = AsyncMock(side_effect=lambda executor, func: func())
+
+            await self.bot._stream_reply(mock_message, result_queue)
+
+            mock_message.reply.assert_called_once_with("Analisando imagem...")
+            placeholder.edit.assert_called_with(content="**Análise da Imagem:**\nUm gato")
+
+        asyncio.run(run_test())
+
+    def test_stream_reply_overflows_into_follow_up(self):
+        async def run_test():
+            follow_up = MagicMock()
+            placeholder = MagicMock()
+            placeholder.edit = AsyncMock()
+            placeholder.reply = AsyncMock(return_value=follow_up)
+            mock_message = MagicMock()
+            mock_message.reply = AsyncMock(return_value=placeholder)
+
+            import queue
+            result_queue = queue.Queue()
+            result_queue.put({'type': 'description', 'content': "a " * 1200})
+
+            self.bot.loop = MagicMock()
+            self.bot.loop.run_in_executor = AsyncMock(side_effect=lambda executor, func: func())
+
+            await self.bot._stream_reply(mock_message, result_queue)
+
+            placeholder.edit.assert_called_once()
+            placeholder.reply.assert_called_once()
+            self.assertLessEqual(len(placeholder.edit.call_args.kwargs['content']), DiscordBot.MESSAGE_LIMIT)
+
+        asyncio.run(run_test())
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,130 @@
+import unittest
+from unittest.mock import MagicMock, AsyncMock
+import asyncio
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from local_vision.discord_service import DiscordService, read_config
+from local_vision.logic.discord_bot import DiscordBot
+
+
+class TestDiscordService(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.health_file = os.path.join(self.temp_dir.name, "health.json")
+        self.llm_manager = MagicMock()
+        self.bot = DiscordBot("fake_token", self.llm_manager)
+        self.release = None
+
+    def tearDown(self):
+        self.bot.loop.close()
+        self.temp_dir.cleanup()
+
+    def _fake_connection(self):
+        """Replaces the Discord connection: serve() runs until close(), and image descriptions wait for release."""
+        closed = asyncio.Event()
+        self.release = asyncio.Event()
+
+        async def serve():
+            await closed.wait()
+
+        async def process_image(message, attachment):
+            await self.release.wait()
+
+        self.bot.serve = serve
+        self.bot.close = AsyncMock(side_effect=lambda: closed.set())
+        self.bot.is_ready = lambda: True
+        self.bot._process_image = AsyncMock(side_effect=process_image)
+
+    @staticmethod
+    def _image_message():
+        message = MagicMock()
+        message.attachments = [MagicMock(content_type='image/png')]
+        return message
+
+    @staticmethod
+    async def _get_health(port):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b"GET /health HTTP/1.1\r\nHost: localhost\r\n\r\n")
+        response = await reader.read()
+        writer.close()
+        head, _, body = response.partition(b"\r\n\r\n")
+        return int(head.split()[1]), json.loads(body)
+
+    def test_sigterm_drains_in_flight_descriptions(self):
+        async def run_test():
+            self._fake_connection()
+            service = DiscordService(self.bot, self.llm_manager, self.health_file, health_port=0, drain_timeout=5.0)
+            run = asyncio.create_task(service.run())
+            await asyncio.sleep(0.05)
+
+            status, report = await self._get_health(service.health_port)
+            self.assertEqual((status, report["status"]), (200, "ready"))
+            with open(self.health_file) as f:
+                self.assertEqual(json.load(f)["status"], "ready")
+
+            in_flight = asyncio.create_task(self.bot.on_message(self._image_message()))
+            await asyncio.sleep(0.05)
+            self.assertEqual(self.bot.in_flight, 1)
+
+            service.request_stop(signal.SIGTERM)
+            await asyncio.sleep(0.2)
+            status, report = await self._get_health(service.health_port)
+            self.assertEqual((status, report["status"], report["in_flight"]), (503, "draining", 1))
+            await self.bot.on_message(self._image_message())
+            self.assertEqual(self.bot._process_image.call_count, 1)
+            self.assertFalse(run.done())
+
+            self.release.set()
+            self.assertEqual(await run, 0)
+            await in_flight
+            self.bot.close.assert_awaited_once()
+            self.llm_manager.cancel.assert_not_called()
+
+        asyncio.run(run_test())
+        with open(self.health_file) as f:
+            report = json.load(f)
+        self.assertEqual((report["status"], report["in_flight"], report["handled"]), ("stopped", 0, 1))
+
+    def test_drain_timeout_cancels_remaining_requests(self):
+        async def run_test():
+            self._fake_connection()
+            service = DiscordService(self.bot, self.llm_manager, drain_timeout=0.2)
+            run = asyncio.create_task(service.run())
+            in_flight = asyncio.create_task(self.bot.on_message(self._image_message()))
+            await asyncio.sleep(0.05)
+
+            service.request_stop()
+            self.assertEqual(await run, 0)
+            self.llm_manager.cancel.assert_called_once_with(reason="shutdown")
+            in_flight.cancel()
+
+        asyncio.run(run_test())
+
+    def test_environment_overrides_config_file(self):
+        config_path = os.path.join(self.temp_dir.name, "config.ini")
+        with open(config_path, "w") as f:
+            f.write("[Settings]\nDiscordToken = from-file\nModelIdentifier = file-model\n")
+        config = read_config(config_path, {"LOCAL_VISION_DISCORD_TOKEN": "from-env", "LOCAL_VISION_HEALTH_PORT": "9000"})
+        self.assertEqual(config.get("Settings", "DiscordToken"), "from-env")
+        self.assertEqual(config.get("Settings", "ModelIdentifier"), "file-model")
+        self.assertEqual(config.getint("DiscordService", "HealthPort"), 9000)
+
+    def test_service_does_not_import_the_desktop_application(self):
+        code = (
+            "import sys, local_vision.discord_service, local_vision.logic.discord_bot; "
+            "print(sorted(m for m in sys.modules if m.split('.')[0] in "
+            "('tkinter', '_tkinter', 'customtkinter', 'tkinterdnd2', 'pyttsx3', 'pyperclipimg') or m.startswith('local_vision.ui')))"
+        )
+        root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+        output = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True)
+        self.assertEqual(output.stdout.strip(), "[]")
+
+if __name__ == '__main__':
+    unittest.main()
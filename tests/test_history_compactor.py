@@ -0,0 +1,77 @@
+import unittest
+from unittest.mock import MagicMock
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from local_vision.data.database_manager import DatabaseManager
+from local_vision.data.history_manager import HistoryManager
+from local_vision.logic.history_compactor import HistoryCompactor
+
+
+class TestHistoryCompactor(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_manager = DatabaseManager(os.path.join(self.temp_dir.name, "test.db"))
+        self.db_manager.connect()
+        self.db_manager.create_tables()
+        self.history_manager = HistoryManager(self.db_manager)
+        self.conversation_id = self.history_manager.create_conversation("tester")
+
+        self.llm_manager = MagicMock()
+        self.llm_manager.summarize_history.side_effect = lambda interactions, previous: f"summary of {len(interactions)}"
+        self.compactor = HistoryCompactor(self.llm_manager, self.history_manager, compact_after=6, keep_recent=2)
+
+    def tearDown(self):
+        self.db_manager.conn.close()
+        self.temp_dir.cleanup()
+
+    def add_turns(self, count):
+        for index in range(count):
+            self.history_manager.save_interaction(self.conversation_id, "user", "text", content=f"question {index}")
+            self.history_manager.save_interaction(self.conversation_id, "system", "text", content=f"answer {index}")
+
+    def test_short_conversation_is_not_compacted(self):
+        self.add_turns(3)
+        self.assertIsNone(self.compactor.compact(self.conversation_id))
+        self.llm_manager.summarize_history.assert_not_called()
+        self.assertEqual(len(self.history_manager.get_context(self.conversation_id)), 6)
+
+    def test_context_starts_from_latest_checkpoint(self):
+        self.add_turns(4)
+        self.assertIsNotNone(self.compactor.compact(self.conversation_id))
+
+        context = self.history_manager.get_context(self.conversation_id)
+        self.assertEqual(context[0]["type"], "summary")
+        self.assertEqual(context[0]["content"], "summary of 6")
+        self.assertEqual([i["content"] for i in context[1:]], ["question 3", "answer 3"])
+
+    def test_later_compaction_folds_in_previous_summary(self):
+        self.add_turns(4)
+        self.compactor.compact(self.conversation_id)
+        self.add_turns(3)
+        self.compactor.compact(self.conversation_id)
+
+        interactions, previous = self.llm_manager.summarize_history.call_args[0]
+        self.assertEqual(previous, "summary of 6")
+        self.assertEqual(len(interactions), 6)
+        self.assertEqual(len(self.history_manager.get_context(self.conversation_id)), 3)
+        self.assertEqual(self.compactor.compactions, 2)
+
+    def test_context_limit_bounds_rows_read(self):
+        self.add_turns(10)
+        context = self.history_manager.get_context(self.conversation_id, limit=self.compactor.context_limit())
+        self.assertEqual(len(context), 8)
+        self.assertEqual(context[-1]["content"], "answer 9")
+
+    def test_delete_conversation_removes_checkpoints(self):
+        self.add_turns(4)
+        self.compactor.compact(self.conversation_id)
+        self.history_manager.delete_conversation(self.conversation_id)
+        self.assertIsNone(self.history_manager.get_latest_checkpoint(self.conversation_id))
+
+
+if __name__ == '__main__':
+    unittest.main()
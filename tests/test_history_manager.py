@@ -50,9 +50,26 @@ class TestHistoryManager(unittest.TestCase):
         self.assertEqual(len(dict_history), 1)
         self.assertEqual(dict_history[0]['content'], "Hello")
 
+    def test_get_interactions_before(self):
+        self.mock_db_manager.execute_crud_query.return_value = [
+            (9, 1, "2023-01-02", "system", "text", "Newer", None),
+            (8, 1, "2023-01-01", "user", "text", "Older", None)
+        ]
+        page = self.history_manager.get_interactions_before(1, limit=2)
+        self.assertEqual([row["interaction_id"] for row in page], [9, 8])
+        args, _ = self.mock_db_manager.execute_crud_query.call_args
+        self.assertIn("ORDER BY interaction_id DESC LIMIT ?", args[0])
+        self.assertNotIn("interaction_id < ?", args[0])
+        self.assertEqual(args[1], (1, 2))
+
+        self.history_manager.get_interactions_before(1, 8, limit=2)
+        args, _ = self.mock_db_manager.execute_crud_query.call_args
+        self.assertIn("interaction_id < ?", args[0])
+        self.assertEqual(args[1], (1, 8, 2))
+
     def test_delete_conversation(self):
         self.history_manager.delete_conversation(1)
-        self.assertEqual(self.mock_db_manager.execute_crud_query.call_count, 2)
+        self.assertEqual(self.mock_db_manager.execute_crud_query.call_count, 5)
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+import os
+import random
+import sys
+import tempfile
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from local_vision.data.database_manager import DatabaseManager
+from local_vision.data.history_manager import HistoryManager
+from local_vision.data.image_index import HashBuckets, ImageHashIndex, hamming_distance
+
+
+class TestHashBuckets(unittest.TestCase):
+    def test_search_matches_brute_force(self):
+        rng = random.Random(7)
+        hashes = [rng.getrandbits(64) for _ in range(500)]
+        # Near-duplicates of the first hashes, a few bits flipped.
+        hashes += [h ^ (1 << rng.randrange(64)) ^ (1 << rng.randrange(64)) for h in hashes[:50]]
+        buckets = HashBuckets()
+        for index, value in enumerate(hashes):
+            buckets.add(value, index)
+        buckets.remove(3)
+        buckets.remove(3)
+
+        for max_distance in (4, 7, 12):
+            for query in hashes[:20] + [rng.getrandbits(64) for _ in range(5)]:
+                expected = sorted(
+                    (hamming_distance(query, value), index) for index, value in enumerate(hashes)
+                    if hamming_distance(query, value) <= max_distance and index != 3
+                )
+                self.assertEqual(sorted(buckets.search(query, max_distance)), expected)
+        self.assertEqual(len(buckets), len(hashes) - 1)
+
+
+class TestImageHashIndex(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_manager = DatabaseManager(os.path.join(self.temp_dir.name, "test.db"))
+        self.db_manager.connect()
+        self.db_manager.create_tables()
+        self.history_manager = HistoryManager(self.db_manager)
+        self.index = ImageHashIndex(self.history_manager)
+
+    def tearDown(self):
+        self.db_manager.conn.close()
+        self.temp_dir.cleanup()
+
+    def add_image(self, conversation_id, image_hash):
+        interaction_id = self.history_manager.save_interaction(conversation_id, "user", "image", image_path="x.png")
+        self.index.add(interaction_id, conversation_id, image_hash)
+        return interaction_id
+
+    def test_near_duplicate_reuses_description_after_reload(self):
+        conversation_id = self.history_manager.create_conversation("tester")
+        image_hash = 0xF0F0_F0F0_F0F0_F0F0  # Above 2**63, stored as a negative SQLite integer.
+        interaction_id = self.add_image(conversation_id, image_hash)
+        self.assertIsNone(self.index.find_description(image_hash, 6))
+        self.index.set_description(interaction_id, "A checkerboard.")
+
+        reloaded = ImageHashIndex(self.history_manager)
+        match = reloaded.find_description(image_hash ^ 0b101, 6)
+        self.assertEqual(match["description"], "A checkerboard.")
+        self.assertEqual(match["distance"], 2)
+        self.assertEqual(match["interaction_id"], interaction_id)
+        self.assertIsNone(reloaded.find_description(image_hash ^ 0xFF, 6))
+
+    def test_find_similar_conversations(self):
+        first = self.history_manager.create_conversation("a")
+        second = self.history_manager.create_conversation("b")
+        third = self.history_manager.create_conversation("c")
+        self.add_image(first, 0x1234)
+        self.add_image(second, 0x1234 ^ 0b11)
+        self.add_image(third, 0x1234 ^ 0b1)
+        self.add_image(third, 0xFFFF_0000)
+
+        self.assertEqual(self.index.find_similar_conversations(first, 4), [third, second])
+
+        self.history_manager.delete_conversation(third)
+        self.index.remove_conversation(third)
+        self.assertEqual(self.index.find_similar_conversations(first, 4), [second])
+        self.assertEqual(ImageHashIndex(self.history_manager).find_similar_conversations(first, 4), [second])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,9 +2,12 @@ import unittest
 from unittest.mock import MagicMock, patch
 import os
 import sys
+import tempfile
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+from PIL import Image
+
 from local_vision.logic.image_processor import ImageProcessor
 
 class TestImageProcessor(unittest.TestCase):
@@ -30,5 +33,35 @@ class TestImageProcessor(unittest.TestCase):
         
         self.assertIsNone(result)
 
+    def test_load_thumbnail_fits_max_size(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "large.jpg")
+            Image.new("RGB", (1600, 1200), "blue").save(path)
+            thumbnail = ImageProcessor.load_thumbnail(path, (400, 400))
+        self.assertEqual(thumbnail.size, (400, 300))
+        self.assertIsNone(ImageProcessor.load_thumbnail("missing.png"))
+
+    def test_perceptual_hash_survives_reencoding_and_resizing(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            original = Image.new("RGB", (640, 480))
+            original.putdata([((x * 7) % 256, (y * 3) % 256, (x + y) % 256) for y in range(480) for x in range(640)])
+            original_path = os.path.join(temp_dir, "original.png")
+            original.save(original_path)
+            copy_path = os.path.join(temp_dir, "copy.jpg")
+            original.resize((320, 240)).save(copy_path, quality=60)
+            other_path = os.path.join(temp_dir, "other.png")
+            original.transpose(Image.Transpose.FLIP_LEFT_RIGHT).save(other_path)
+
+            original_hash = ImageProcessor.perceptual_hash(original_path)
+            copy_hash = ImageProcessor.perceptual_hash(copy_path)
+            other_hash = ImageProcessor.perceptual_hash(other_path)
+
+        self.assertLessEqual((original_hash ^ copy_hash).bit_count(), 6)
+        self.assertGreater((original_hash ^ other_hash).bit_count(), 20)
+        self.assertLess(original_hash, 1 << 64)
+
+    def test_perceptual_hash_of_unreadable_file(self):
+        self.assertIsNone(ImageProcessor.perceptual_hash("missing.png"))
+
 if __name__ == '__main__':
     unittest.main()
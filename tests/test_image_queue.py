@@ -0,0 +1,119 @@
+import unittest
+import os
+import queue
+import sys
+import tempfile
+import threading
+from concurrent.futures import Future
+from unittest.mock import MagicMock
+
+from PIL import Image
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from local_vision.logic.image_queue import ImageQueue, expand_image_paths
+from local_vision.logic.request_handle import RequestCancelled
+
+
+class TestImageQueue(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.llm_manager = MagicMock()
+        self.llm_manager.prefetch_image.side_effect = lambda path, profile=None: self.done_future()
+        self.image_index = MagicMock()
+        self.result_queue = queue.Queue()
+        self.image_queue = ImageQueue(self.llm_manager, self.result_queue, self.image_index, concurrency=2)
+
+    def tearDown(self):
+        self.image_queue.shutdown()
+        self.temp_dir.cleanup()
+
+    @staticmethod
+    def done_future():
+        future = Future()
+        future.set_result("handle")
+        return future
+
+    def make_image(self, name, color="red"):
+        path = os.path.join(self.temp_dir.name, name)
+        Image.new("RGB", (64, 48), color).save(path)
+        return path
+
+    def results(self, count):
+        """Collects messages until count results have arrived; returns (results by request_id, progress)."""
+        results, progress = {}, []
+        while len(results) < count:
+            message = self.result_queue.get(timeout=5)
+            if message["type"] == "queue_progress":
+                progress.append((message["item"].request_id, message["stage"]))
+            elif message["type"] != "queue_thumbnail":
+                results[message["request_id"]] = message
+        return results, progress
+
+    def test_images_go_through_every_stage(self):
+        self.llm_manager.describe_image.side_effect = lambda path, handle=None, profile=None: f"About {os.path.basename(path)}"
+        items = [
+            self.image_queue.add(self.make_image(f"{i}.png"), conversation_id=1, interaction_id=10 + i, profile="fast")
+            for i in range(3)
+        ]
+
+        results, progress = self.results(3)
+        for i, item in enumerate(items):
+            self.assertEqual(results[item.request_id]["type"], "description")
+            self.assertEqual(results[item.request_id]["content"], f"About {i}.png")
+            stages = [stage for request_id, stage in progress if request_id == item.request_id]
+            self.assertEqual(stages, ["hash", "thumbnail", "upload", "describe", "done"])
+        self.assertEqual(self.image_index.add.call_count, 3)
+        self.llm_manager.prefetch_image.assert_any_call(items[0].filepath, "fast")
+        self.assertEqual(self.image_queue.pending(), [])
+        self.assertEqual(self.image_queue.completed, 3)
+
+    def test_near_duplicate_reuses_description(self):
+        image_queue = ImageQueue(self.llm_manager, self.result_queue, self.image_index, reuse_distance=6)
+        self.image_index.find_description.return_value = {"interaction_id": 3, "distance": 2, "description": "A red card."}
+        item = image_queue.add(self.make_image("copy.png"), conversation_id=1, interaction_id=4)
+
+        results, _ = self.results(1)
+        image_queue.shutdown()
+        self.assertEqual(results[item.request_id]["content"], "A red card.")
+        self.llm_manager.prefetch_image.assert_not_called()
+        self.llm_manager.describe_image.assert_not_called()
+
+    def test_cancel_aborts_running_and_queued_items(self):
+        started = threading.Event()
+
+        def describe(path, handle=None, profile=None):
+            started.set()
+            while not handle.is_cancelled():
+                threading.Event().wait(0.01)
+            raise RequestCancelled(handle.reason)
+
+        self.llm_manager.describe_image.side_effect = describe
+        image_queue = ImageQueue(self.llm_manager, self.result_queue, concurrency=1)
+        running = image_queue.add(self.make_image("a.png"), conversation_id=1)
+        waiting = image_queue.add(self.make_image("b.png"), conversation_id=1)
+        self.assertTrue(started.wait(5))
+
+        self.assertEqual(image_queue.cancel(conversation_id=1, reason="stopped"), 2)
+        results, _ = self.results(2)
+        image_queue.shutdown()
+        self.assertEqual(results[running.request_id]["type"], "cancelled")
+        self.assertEqual(results[waiting.request_id]["content"], "stopped")
+        self.assertEqual(self.llm_manager.describe_image.call_count, 1)
+
+    def test_expand_image_paths_walks_folders(self):
+        folder = os.path.join(self.temp_dir.name, "album")
+        os.makedirs(os.path.join(folder, "sub"))
+        for name in ("b.JPG", "a.png", "notes.txt", os.path.join("sub", "c.jpeg")):
+            open(os.path.join(folder, name), "wb").close()
+        single = self.make_image("single.png")
+
+        images, skipped = expand_image_paths([single, folder, "document.pdf"])
+        self.assertEqual(
+            [os.path.relpath(path, self.temp_dir.name) for path in images],
+            ["single.png", os.path.join("album", "a.png"), os.path.join("album", "b.JPG"), os.path.join("album", "sub", "c.jpeg")]
+        )
+        self.assertEqual(skipped, ["document.pdf"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,12 +1,15 @@
 import unittest
 from unittest.mock import patch, MagicMock
+import io
 import queue
 import os
 import sys
+import tempfile
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from local_vision.logic.llm_manager import LLM_Manager
+from local_vision.logic.request_handle import RequestCancelled, RequestHandle
 
 class TestLLMManager(unittest.TestCase):
     def setUp(self):
@@ -23,8 +26,23 @@ class TestLLMManager(unittest.TestCase):
         self.mock_chat = MagicMock()
         self.mock_lms.Chat.return_value = self.mock_chat
 
+        self.temp_dir = tempfile.TemporaryDirectory()
+
     def tearDown(self):
         self.lms_patcher.stop()
+        self.temp_dir.cleanup()
+
+    def make_image(self, name, data=b"\x89PNG fake image"):
+        path = os.path.join(self.temp_dir.name, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def make_prediction(self, content, fragments=()):
+        prediction = MagicMock()
+        prediction.__iter__.return_value = iter([MagicMock(content=text) for text in fragments])
+        prediction.result.return_value = MagicMock(content=content)
+        return prediction
 
     def test_get_text_response_formats_messages_correctly(self):
         conversation_history = [
@@ -34,9 +52,7 @@ class TestLLMManager(unittest.TestCase):
         user_message = "What's the weather like?"
         result_queue = queue.Queue()
 
-        mock_response = MagicMock()
-        mock_response.content = "It's sunny."
-        self.llm_manager.model.respond.return_value = mock_response
+        self.llm_manager.model.respond_stream.return_value = self.make_prediction("It's sunny.")
 
         with patch('threading.Thread') as mock_thread:
             mock_thread.side_effect = lambda target: MagicMock(start=lambda: target())
@@ -48,15 +64,13 @@ class TestLLMManager(unittest.TestCase):
             
         self.assertEqual(result['type'], 'text_response')
         self.assertEqual(result['content'], "It's sunny.")
-        self.llm_manager.model.respond.assert_called_once()
+        self.llm_manager.model.respond_stream.assert_called_once()
 
     def test_get_image_description(self):
-        image_path = "test_image.png"
+        image_path = self.make_image("test_image.png")
         result_queue = queue.Queue()
 
-        mock_response = MagicMock()
-        mock_response.content = "A beautiful landscape."
-        self.llm_manager.model.respond.return_value = mock_response
+        self.llm_manager.model.respond_stream.return_value = self.make_prediction("A beautiful landscape.")
 
         with patch('threading.Thread') as mock_thread:
             mock_thread.side_effect = lambda target: MagicMock(start=lambda: target())
@@ -70,11 +84,69 @@ class TestLLMManager(unittest.TestCase):
 
         self.assertEqual(result['type'], 'description')
         self.assertEqual(result['content'], "A beautiful landscape.")
-        self.llm_manager.client.prepare_image.assert_called_with(src=image_path)
+        self.llm_manager.client.prepare_image.assert_called_with(b"\x89PNG fake image", name="test_image.png")
+
+    def test_get_images_description_splits_batches(self):
+        image_paths = [self.make_image(name, name.encode()) for name in ("a.png", "b.png", "c.png")]
+        result_queue = queue.Queue()
+
+        self.llm_manager.model.respond_stream.side_effect = [
+            self.make_prediction("Imagem 1 e Imagem 2."), self.make_prediction("Imagem 3.")
+        ]
+
+        with patch('threading.Thread') as mock_thread:
+            mock_thread.side_effect = lambda target: MagicMock(start=lambda: target())
+            self.llm_manager.get_images_description(image_paths, result_queue, max_images_per_request=2)
+
+        result = result_queue.get()
+        self.assertEqual(result['type'], 'description')
+        self.assertEqual(result['content'], "Imagem 1 e Imagem 2.\n\nImagem 3.")
+        self.assertEqual(self.llm_manager.model.respond_stream.call_count, 2)
+        self.assertEqual(self.llm_manager.client.prepare_image.call_count, 3)
+
+    def test_get_image_description_streams_fragments(self):
+        result_queue = queue.Queue()
+
+        fragments = [MagicMock(content="A "), MagicMock(content="cat.")]
+        mock_stream = MagicMock()
+        mock_stream.__iter__.return_value = iter(fragments)
+        mock_stream.result.return_value = MagicMock(content="A cat.")
+        self.llm_manager.model.respond_stream.return_value = mock_stream
+
+        with patch('threading.Thread') as mock_thread:
+            mock_thread.side_effect = lambda target: MagicMock(start=lambda: target())
+            self.llm_manager.get_image_description(self.make_image("test_image.png"), result_queue, stream=True)
+
+        messages = [result_queue.get() for _ in range(4)]
+        self.assertEqual([m['type'] for m in messages], ['stream_start', 'fragment', 'fragment', 'description'])
+        self.assertEqual(messages[-1]['content'], "A cat.")
+        self.llm_manager.model.respond.assert_not_called()
+
+    def test_tracing_records_pipeline_spans(self):
+        from local_vision.tracing import tracer
+        tracer.configure(True)
+        tracer.reset()
+        self.addCleanup(tracer.configure, False)
+
+        prediction = self.make_prediction("A cat.")
+        prediction.result.return_value.stats.time_to_first_token_sec = 0.0
+        self.llm_manager.model.respond_stream.return_value = prediction
+        result_queue = queue.Queue()
+
+        with patch('threading.Thread') as mock_thread:
+            mock_thread.side_effect = lambda target: MagicMock(start=lambda: target())
+            with tracer.request("req-42"):
+                self.llm_manager.get_image_description(self.make_image("test_image.png"), result_queue)
+
+        result = result_queue.get()
+        self.assertEqual(result['request_id'], "req-42")
+        spans = tracer.percentiles()
+        for name in ("image.prepare", "llm.predict", "llm.prefill", "llm.generation", "text.strip_markdown", "llm.request"):
+            self.assertIn(name, spans)
 
     def test_error_handling(self):
         result_queue = queue.Queue()
-        self.llm_manager.model.respond.side_effect = Exception("API Error")
+        self.llm_manager.model.respond_stream.side_effect = Exception("API Error")
 
         with patch('threading.Thread') as mock_thread:
             mock_thread.side_effect = lambda target: MagicMock(start=lambda: target())
@@ -84,5 +156,250 @@ class TestLLMManager(unittest.TestCase):
         self.assertEqual(result['type'], 'error')
         self.assertIn("API Error", result['content'])
 
+    def test_cancel_aborts_running_prediction(self):
+        handle = RequestHandle("req-1")
+
+        def fragments():
+            yield MagicMock(content="A ")
+            handle.cancel()
+            yield MagicMock(content="cat.")
+
+        prediction = self.make_prediction("A cat.")
+        prediction.__iter__.return_value = fragments()
+        self.llm_manager.model.respond_stream.return_value = prediction
+
+        with self.assertRaises(RequestCancelled):
+            self.llm_manager.respond_to_text("Hi", [], handle=handle)
+        prediction.cancel.assert_called_once()
+
+    def test_cancelled_request_queues_cancelled_result(self):
+        result_queue = queue.Queue()
+
+        def fragments():
+            yield MagicMock(content="It's ")
+            self.assertEqual(self.llm_manager.cancel(supersede_key="conv-1", reason="stopped"), 1)
+            yield MagicMock(content="sunny.")
+
+        prediction = self.make_prediction("It's sunny.")
+        prediction.__iter__.return_value = fragments()
+        self.llm_manager.model.respond_stream.return_value = prediction
+
+        with patch('threading.Thread') as mock_thread:
+            mock_thread.side_effect = lambda target: MagicMock(start=lambda: target())
+            handle = self.llm_manager.get_text_response("Hi", [], result_queue, supersede_key="conv-1")
+
+        result = result_queue.get()
+        self.assertEqual((result['type'], result['content']), ('cancelled', 'stopped'))
+        self.assertEqual(result['request_id'], handle.request_id)
+        self.assertEqual(self.llm_manager.cancel(), 0)
+
+    def test_newest_request_supersedes_older_one_with_same_key(self):
+        first = self.llm_manager._open_request("conv-1")
+        other = self.llm_manager._open_request("conv-2")
+        second = self.llm_manager._open_request("conv-1")
+
+        self.assertTrue(first.is_cancelled())
+        self.assertEqual(first.reason, "superseded")
+        self.assertFalse(other.is_cancelled())
+        self.assertFalse(second.is_cancelled())
+
+    def test_text_turns_are_routed_to_text_model(self):
+        text_model = MagicMock()
+        text_model.respond.return_value = MagicMock(content="Fast answer.")
+        self.mock_client.llm.model.side_effect = lambda identifier: text_model if identifier == "small-text" else MagicMock()
+        self.llm_manager.routes["text"] = "small-text"
+        self.llm_manager.model.respond.return_value = MagicMock(content="Vision answer.")
+
+        self.assertEqual(self.llm_manager.respond_to_text("Hi", []), "Fast answer.")
+        image_history = [{'actor': 'user', 'type': 'image', 'content': None, 'image_path': self.make_image("a.png")}]
+        self.assertEqual(self.llm_manager.respond_to_text("And now?", image_history), "Vision answer.")
+
+        stats = self.llm_manager.get_routing_stats()
+        self.assertEqual(stats["routes"]["text_with_images"], self.llm_manager.model_identifier)
+        self.assertEqual(stats["models"]["small-text"]["requests"], 1)
+        self.assertEqual(stats["models"][self.llm_manager.model_identifier]["requests"], 1)
+
+    def test_text_model_gets_no_images_from_context(self):
+        self.llm_manager.routes["text_with_images"] = "small-text"
+        self.mock_client.llm.model.return_value.respond.return_value = MagicMock(content="Ok.")
+        history = [{'actor': 'user', 'type': 'image', 'content': None, 'image_path': self.make_image("a.png")}]
+
+        self.llm_manager.respond_to_text("What was it?", history)
+
+        self.mock_client.prepare_image.assert_not_called()
+        self.mock_chat.add_user_message.assert_any_call("[Image]")
+        self.llm_manager.model.respond.assert_not_called()
+
+    def test_follow_up_turn_reuses_prompt_prefix(self):
+        first = MagicMock(content="**Hello**!")
+        first.stats.prompt_tokens_count = 100
+        first.stats.predicted_tokens_count = 20
+        second = MagicMock(content="Fine.")
+        second.stats.prompt_tokens_count = 130
+        second.stats.predicted_tokens_count = 5
+        self.llm_manager.model.respond.side_effect = [first, second]
+        cached_chat = self.mock_chat.copy.return_value
+
+        history = [{'actor': 'user', 'type': 'text', 'content': 'Earlier', 'image_path': None}]
+        self.assertEqual(self.llm_manager.respond_to_text("Hi", history, conversation_key=7), "Hello!")
+        self.mock_chat.add_assistant_response.assert_called_with("**Hello**!")
+
+        history += [
+            {'actor': 'user', 'type': 'text', 'content': 'Hi', 'image_path': None},
+            {'actor': 'system', 'type': 'text', 'content': 'Hello!', 'image_path': None},
+        ]
+        self.llm_manager.respond_to_text("How are you?", history, conversation_key=7)
+
+        self.assertEqual(self.mock_lms.Chat.call_count, 1)
+        cached_chat.add_user_message.assert_called_once_with("How are you?")
+        stats = self.llm_manager.get_prompt_cache_stats()
+        self.assertEqual((stats["turns"], stats["prefix_hits"], stats["cache_hits"]), (2, 1, 1))
+        self.assertEqual(stats["cached_tokens"], 120)
+
+    def test_prompt_prefix_is_reused_past_the_context_budget(self):
+        self.llm_manager.model.respond.side_effect = lambda chat, **kwargs: MagicMock(content=f"Reply {len(history)}")
+        history = []
+        for turn in range(12):
+            message = f"Message {turn}"
+            reply = self.llm_manager.respond_to_text(message, history, conversation_key=7, profile="fast")
+            history += [
+                {'actor': 'user', 'type': 'text', 'content': message, 'image_path': None},
+                {'actor': 'system', 'type': 'text', 'content': reply, 'image_path': None},
+            ]
+
+        # Past the fast budget of 6 interactions the window moves every other turn, not every turn:
+        # turns 1-3 and 5, 7, 9 and 11 reuse the prefix.
+        stats = self.llm_manager.get_prompt_cache_stats()
+        self.assertEqual((stats["turns"], stats["prefix_hits"]), (12, 7))
+        self.assertEqual(self.mock_lms.Chat.call_count, 5)
+
+    def test_changed_history_rebuilds_prompt(self):
+        self.llm_manager.model.respond.return_value = MagicMock(content="Ok.")
+        history = [{'actor': 'user', 'type': 'text', 'content': 'First', 'image_path': None}]
+        self.llm_manager.respond_to_text("Hi", history, conversation_key=7)
+
+        edited = [{'actor': 'user', 'type': 'text', 'content': 'Edited', 'image_path': None}]
+        self.llm_manager.respond_to_text("Hi", edited, conversation_key=7)
+
+        self.assertEqual(self.mock_lms.Chat.call_count, 2)
+        self.assertEqual(self.llm_manager.get_prompt_cache_stats()["prefix_hits"], 0)
+
+    def test_summary_checkpoint_becomes_part_of_system_prompt(self):
+        self.llm_manager.model.respond.return_value = MagicMock(content="Ok.")
+        history = [
+            {'actor': 'system', 'type': 'summary', 'content': 'They talked about cats.', 'image_path': None},
+            {'actor': 'user', 'type': 'text', 'content': 'And dogs?', 'image_path': None},
+        ]
+
+        self.llm_manager.respond_to_text("Hi", history)
+
+        system_prompt = self.mock_lms.Chat.call_args[0][0]
+        self.assertIn("They talked about cats.", system_prompt)
+        self.mock_chat.add_assistant_response.assert_not_called()
+
+    def test_read_routes_from_config(self):
+        import configparser
+        config = configparser.ConfigParser()
+        config.read_string("[Routing]\nTextTurns = small-text\nTextWithImagesTurns =\n")
+        self.assertEqual(LLM_Manager.read_routes(config), {"text": "small-text"})
+
+    def test_connection_errors_are_retried(self):
+        self.llm_manager.retry.sleep = lambda seconds: None
+        self.llm_manager.model.respond.side_effect = ConnectionError("reset")
+        reconnected_model = self.mock_client.llm.model.return_value
+        reconnected_model.respond.return_value = MagicMock(content="Recovered")
+
+        self.assertEqual(self.llm_manager.respond_to_text("Hi", []), "Recovered")
+        self.assertIs(self.llm_manager.model, reconnected_model)
+        self.assertEqual(self.llm_manager.get_resilience_stats()["retry_retries"], 1)
+
+    def test_unexpected_errors_are_not_retried(self):
+        self.llm_manager.model.respond.side_effect = ValueError("bad prompt")
+
+        with self.assertRaises(ValueError):
+            self.llm_manager.respond_to_text("Hi", [])
+        self.assertEqual(self.llm_manager.model.respond.call_count, 1)
+
+    def test_prefetched_handle_is_reused(self):
+        image_path = self.make_image("photo.png")
+        self.llm_manager.model.respond.return_value = MagicMock(content="A photo.")
+
+        self.llm_manager.prefetch_image(image_path).result()
+        os.remove(image_path)
+        self.llm_manager.describe_image(image_path)
+        history = [{'actor': 'user', 'type': 'image', 'content': None, 'image_path': image_path}]
+        self.llm_manager.respond_to_text("And the colors?", history)
+
+        self.assertEqual(self.llm_manager.client.prepare_image.call_count, 1)
+        self.assertEqual(self.llm_manager.upload_stats["handle_hits"], 2)
+
+    def test_identical_content_is_uploaded_once(self):
+        first = self.make_image("first.png", b"same bytes")
+        second = self.make_image("second.png", b"same bytes")
+
+        handle = self.llm_manager.prefetch_image(first).result()
+        self.assertIs(self.llm_manager.prefetch_image(second).result(), handle)
+        self.assertEqual(self.llm_manager.client.prepare_image.call_count, 1)
+
+    def test_modified_file_is_uploaded_again(self):
+        image_path = self.make_image("edit.png", b"before")
+        self.llm_manager.prefetch_image(image_path).result()
+        self.make_image("edit.png", b"after, with a different size")
+
+        self.llm_manager.prefetch_image(image_path).result()
+        self.assertEqual(self.llm_manager.client.prepare_image.call_count, 2)
+
+    def test_upload_from_old_connection_is_not_cached(self):
+        image_path = self.make_image("slow.png")
+
+        def prepare_during_reconnect(data, name=None):
+            self.llm_manager._forget_uploads()
+            return MagicMock(name="stale handle")
+
+        self.llm_manager.client.prepare_image.side_effect = prepare_during_reconnect
+        self.llm_manager.prefetch_image(image_path).result()
+
+        self.assertEqual(len(self.llm_manager._handles), 0)
+        self.assertEqual(len(self.llm_manager._pending_uploads), 0)
+
+    def test_embed_uses_the_embedding_model(self):
+        self.llm_manager.embedding_identifier = "text-embedding-nomic"
+        embedding_model = self.mock_client.embedding.model.return_value
+        embedding_model.embed.return_value = [[0.1, 0.2], [0.3, 0.4]]
+
+        vectors = self.llm_manager.embed(["red car", "night"])
+        self.llm_manager.embed(["again"])
+
+        self.assertEqual(vectors, [[0.1, 0.2], [0.3, 0.4]])
+        self.mock_client.embedding.model.assert_called_once_with("text-embedding-nomic")
+        embedding_model.embed.assert_any_call(["red car", "night"])
+
+    def test_fast_profile_limits_output_and_downscales_images(self):
+        from PIL import Image
+        path = os.path.join(self.temp_dir.name, "big.png")
+        Image.new("RGB", (2000, 1000)).save(path)
+        self.llm_manager.model.respond.return_value = MagicMock(content="A dark frame.")
+
+        self.assertEqual(self.llm_manager.describe_image(path, profile="fast"), "A dark frame.")
+
+        _, kwargs = self.llm_manager.model.respond.call_args
+        self.assertEqual(kwargs["config"], {"maxTokens": 80, "temperature": 0.2})
+        data, _ = self.llm_manager.client.prepare_image.call_args
+        with Image.open(io.BytesIO(data[0])) as uploaded:
+            self.assertEqual(uploaded.size, (512, 256))
+        self.assertEqual(self.llm_manager.get_profile_stats()["fast"]["requests"], 1)
+
+    def test_detailed_profile_keeps_model_defaults(self):
+        self.llm_manager.model.respond.return_value = MagicMock(content="Ok.")
+        self.llm_manager.respond_to_text("Hi", [])
+        _, kwargs = self.llm_manager.model.respond.call_args
+        self.assertNotIn("config", kwargs)
+        with self.assertRaises(ValueError):
+            self.llm_manager.get_profile("unknown")
+
+    def test_embed_without_embedding_model(self):
+        with self.assertRaises(ValueError):
+            self.llm_manager.embed(["text"])
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from local_vision.logging_setup import SamplingFilter, configure_logging, parse_levels, shutdown_logging
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestLoggingSetup(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = logging.getLogger()
+        self.saved_handlers = list(self.root.handlers)
+        self.saved_level = self.root.level
+
+    def tearDown(self):
+        shutdown_logging()
+        for handler in list(self.root.handlers):
+            self.root.removeHandler(handler)
+        for handler in self.saved_handlers:
+            self.root.addHandler(handler)
+        self.root.setLevel(self.saved_level)
+        logging.getLogger("test.quiet").setLevel(logging.NOTSET)
+        self.temp_dir.cleanup()
+
+    def test_records_are_written_as_json_lines_from_the_listener(self):
+        log_file = os.path.join(self.temp_dir.name, "logs", "app.jsonl")
+        configure_logging("INFO", log_file=log_file, levels={"test.quiet": "ERROR"}, console=False)
+
+        logging.getLogger("test.loud").info("hello %s", "world", extra={"conversation_id": 7})
+        logging.getLogger("test.quiet").warning("not written")
+        logging.getLogger("test.loud").debug("below root level")
+        shutdown_logging()
+
+        with open(log_file, encoding="utf-8") as f:
+            entries = [json.loads(line) for line in f]
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(entries[0]["logger"], "test.loud")
+        self.assertEqual(entries[0]["message"], "hello world")
+        self.assertEqual(entries[0]["conversation_id"], 7)
+        self.assertEqual(entries[0]["level"], "INFO")
+
+    def test_sampling_filter_limits_bursts_and_reports_suppressed(self):
+        clock = FakeClock()
+        sampling = SamplingFilter(burst=2, interval=10.0, clock=clock)
+
+        def record(key):
+            rec = logging.LogRecord("x", logging.INFO, "", 0, "msg", (), None)
+            if key:
+                rec.sample_key = key
+            return rec
+
+        self.assertEqual([sampling.filter(record("tts")) for _ in range(5)], [True, True, False, False, False])
+        self.assertTrue(sampling.filter(record(None)))
+        self.assertTrue(sampling.filter(record("other")))
+
+        clock.now = 10.0
+        passed = record("tts")
+        self.assertTrue(sampling.filter(passed))
+        self.assertEqual(passed.suppressed, 3)
+
+    def test_parse_levels(self):
+        self.assertEqual(
+            parse_levels("local_vision.logic.tts_manager=warning, local_vision.ui = DEBUG,broken"),
+            {"local_vision.logic.tts_manager": "WARNING", "local_vision.ui": "DEBUG"}
+        )
+        self.assertEqual(parse_levels(""), {})
+
+    def test_modules_log_through_their_own_logger(self):
+        # Records sent to the root logger cannot be given a level per subsystem.
+        package = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'local_vision'))
+        root_calls = []
+        for directory, _, files in os.walk(package):
+            for name in files:
+                if name.endswith(".py"):
+                    with open(os.path.join(directory, name), encoding="utf-8") as f:
+                        source = f.read()
+                    if re.search(r"\blogging\.(debug|info|warning|error|exception|critical)\(", source):
+                        root_calls.append(os.path.relpath(os.path.join(directory, name), package))
+        self.assertEqual(root_calls, [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,8 @@
 import unittest
+import random
 import sys
 import os
+import time
 from unittest.mock import MagicMock
 
 sys.modules['lmstudio'] = MagicMock()
@@ -8,6 +10,19 @@ sys.modules['lmstudio'] = MagicMock()
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from local_vision.logic.llm_manager import LLM_Manager
+from local_vision.logic.text_normalizer import MarkdownStreamStripper, render_for_speech, strip_markdown
+
+SAMPLES = [
+    "This is **bold**, *italic*, ***both*** and __strong__ with snake_case_name.",
+    "# Title\n\n## Sub\nSee [Google](https://google.com) or https://example.com/a_b_c.\n- Item 1\n- Item 2\n",
+    "Code:\n```python\nprint('x')\n```\nAfter `code` and ``a`b``.",
+    "2 * 3 * 4 = 24, ![a cat](cat.png) wow! *a **b** c*",
+    "  leading\n\n   \ntrailing  \n\n",
+    "#hashtag # not\n   ### Indented",
+    "Unclosed **bold and `tick\n```\nopen fence",
+    "see http://x.io/a.```x``` b",
+    "https://*x***- and http://y.io/b_c_ done",
+]
 
 class TestMarkdownStripper(unittest.TestCase):
     def setUp(self):
@@ -71,5 +86,52 @@ code
         self.assertNotIn("```", result)
         self.assertNotIn("](", result)
 
+    def test_keeps_identifiers_and_urls(self):
+        text = "Call snake_case_name or see https://example.com/some_path_here for 2 * 3 * 4."
+        self.assertEqual(strip_markdown(text), text)
+
+    def test_nested_emphasis_and_images(self):
+        self.assertEqual(strip_markdown("*a **b** c* and ***d***"), "a b c and d")
+        self.assertEqual(strip_markdown("![A cat](cat.png) sleeping"), "A cat sleeping")
+
+    def test_unclosed_fence_drops_rest(self):
+        self.assertEqual(strip_markdown("Intro\n```\ncode"), "Intro")
+
+    def test_streaming_matches_one_shot(self):
+        for text in SAMPLES:
+            expected = strip_markdown(text)
+            for seed in range(50):
+                rng = random.Random(seed)
+                stripper = MarkdownStreamStripper()
+                pieces = []
+                index = 0
+                while index < len(text):
+                    size = rng.randint(1, 5)
+                    pieces.append(stripper.feed(text[index:index + size]))
+                    index += size
+                pieces.append(stripper.flush())
+                self.assertEqual("".join(pieces), expected, f"{text!r} with seed {seed}")
+
+    def test_streaming_holds_split_markers(self):
+        stripper = MarkdownStreamStripper()
+        self.assertEqual(stripper.feed("A *"), "A")
+        self.assertEqual(stripper.feed("*bold*"), "")
+        self.assertEqual(stripper.feed("* and mo"), " bold and")
+        self.assertEqual(stripper.feed("re "), " more")
+        self.assertEqual(stripper.flush(), "")
+
+    def test_render_for_speech(self):
+        text = "# Result\n- First item\n- Second: see https://www.example.com/page\n```\ncode\n```\n| a | b |\n|---|---|\n| 1 | 2 |"
+        self.assertEqual(
+            render_for_speech(text),
+            "Result.\nFirst item.\nSecond: see link to example.com.\nCode block omitted.\na, b\n1, 2"
+        )
+
+    def test_pathological_input_is_linear(self):
+        for text in ["*a" * 20000, "**a " * 10000, "[a" * 20000, "_" * 40000, "`" * 40000]:
+            start = time.perf_counter()
+            strip_markdown(text)
+            self.assertLess(time.perf_counter() - start, 1.0, text[:10])
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,106 @@
+import unittest
+from unittest.mock import MagicMock
+import os
+import sys
+import threading
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from local_vision.logic.model_supervisor import ModelSupervisor
+from local_vision.logic.request_scheduler import RequestScheduler
+from local_vision.logic.resilience import CircuitOpenError
+
+
+class TestModelSupervisor(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 100.0
+        self.llm_manager = MagicMock()
+        self.llm_manager.model_identifier = "vision-model"
+        self.llm_manager.scheduler = RequestScheduler()
+        self.llm_manager.last_activity = 0.0
+        self.llm_manager.model.get_context_length.return_value = 8192
+        self.llm_manager._execute_with_retry.side_effect = lambda func, *args, **kwargs: func(*args, **kwargs)
+        self.states = []
+        self.supervisor = ModelSupervisor(
+            self.llm_manager,
+            keep_alive_interval=60,
+            on_state_change=lambda status: self.states.append(status["state"]),
+            clock=lambda: self.now
+        )
+
+    def test_warm_up_reports_loading_then_ready(self):
+        self.llm_manager.client.llm.list_loaded.return_value = []
+
+        self.assertTrue(self.supervisor.warm_up())
+
+        self.assertEqual(self.states, [ModelSupervisor.LOADING, ModelSupervisor.READY])
+        self.llm_manager.model.respond.assert_called_once_with("Hi", config={"maxTokens": 1})
+        status = self.supervisor.status()
+        self.assertEqual(status["context_length"], 8192)
+        self.assertTrue(status["loaded"])
+        self.assertEqual(self.llm_manager.last_activity, 100.0)
+
+    def test_warm_up_waits_for_a_slot_and_uses_retry(self):
+        self.llm_manager.scheduler = RequestScheduler(max_concurrent=1)
+        self.llm_manager.client.llm.list_loaded.return_value = []
+
+        with self.llm_manager.scheduler.slot():
+            worker = threading.Thread(target=self.supervisor.warm_up)
+            worker.start()
+            worker.join(0.2)
+            self.assertTrue(worker.is_alive())
+            self.llm_manager.model.respond.assert_not_called()
+        worker.join(5)
+
+        self.assertEqual(self.states[-1], ModelSupervisor.READY)
+        self.llm_manager._execute_with_retry.assert_called_once()
+        self.assertEqual(self.llm_manager.scheduler.stats()["completed"], 2)
+
+    def test_open_breaker_marks_model_unavailable(self):
+        self.llm_manager.client.llm.list_loaded.return_value = [MagicMock(identifier="vision-model")]
+        self.llm_manager._execute_with_retry.side_effect = CircuitOpenError(10.0)
+
+        self.assertFalse(self.supervisor.warm_up())
+
+        self.llm_manager.model.respond.assert_not_called()
+        self.assertEqual(self.states[-1], ModelSupervisor.UNAVAILABLE)
+
+    def test_resident_model_skips_loading_state(self):
+        self.llm_manager.client.llm.list_loaded.return_value = [MagicMock(identifier="vision-model")]
+
+        self.supervisor.warm_up()
+
+        self.assertEqual(self.states, [ModelSupervisor.READY])
+
+    def test_failed_warm_up_marks_model_unavailable(self):
+        self.llm_manager.client.llm.list_loaded.side_effect = ConnectionError("refused")
+        self.llm_manager.model.respond.side_effect = ConnectionError("refused")
+
+        self.assertFalse(self.supervisor.warm_up())
+
+        self.assertEqual(self.states[-1], ModelSupervisor.UNAVAILABLE)
+        self.assertIn("refused", self.supervisor.status()["error"])
+
+    def test_ping_keeps_model_loaded_but_not_during_requests(self):
+        self.llm_manager.client.llm.list_loaded.return_value = [MagicMock(identifier="vision-model")]
+
+        with self.llm_manager.scheduler.slot():
+            self.supervisor.ping()
+        self.llm_manager.model.respond.assert_not_called()
+
+        self.supervisor.ping()
+        self.assertEqual(self.supervisor.status()["pings"], 1)
+        self.assertEqual(self.llm_manager.last_activity, 100.0)
+
+    def test_ping_reloads_unloaded_model(self):
+        self.llm_manager.client.llm.list_loaded.return_value = []
+
+        self.supervisor.ping()
+
+        self.assertEqual(self.states, [ModelSupervisor.LOADING, ModelSupervisor.READY])
+        self.assertEqual(self.supervisor.status()["pings"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
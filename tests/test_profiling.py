@@ -0,0 +1,75 @@
+import unittest
+import os
+import sys
+import tempfile
+import time
+import tkinter
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from local_vision.profiling import LagMonitor, ProfileCapture, blocking_handler
+
+
+def slow_handler(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class TestLagMonitor(unittest.TestCase):
+    def test_stall_is_recorded_with_the_blocking_function(self):
+        monitor = LagMonitor(interval=0.01, threshold=0.1, sample_interval=0.005)
+        monitor.start()
+        try:
+            time.sleep(0.01)
+            self.assertLess(monitor.tick(), 0.1)
+            slow_handler(0.3)
+            lag = monitor.tick()
+        finally:
+            monitor.stop()
+
+        self.assertGreaterEqual(lag, 0.2)
+        stats = monitor.stats()
+        self.assertEqual(stats["ticks"], 2)
+        self.assertEqual(stats["stalls"], 1)
+        stall = monitor.stalls()[0]
+        self.assertGreater(stall["samples"], 0)
+        self.assertIn("slow_handler", stall["location"])
+        self.assertIn("slow_handler (test_profiling.py", stall["stacks"][0]["frames"][-1])
+
+    def test_handler_is_the_first_application_frame_after_tkinter(self):
+        tk_file = os.path.join(os.path.dirname(tkinter.__file__), "__init__.py")
+        app_file = os.path.abspath(__file__)
+        stack = (
+            (app_file, 10, "run"),
+            (tk_file, 1500, "mainloop"),
+            (tk_file, 1900, "__call__"),
+            (app_file, 20, "_on_send_text"),
+            (app_file, 30, "save_interaction"),
+            (tk_file, 700, "update"),
+        )
+        handler, location = blocking_handler(stack)
+        self.assertEqual(handler, "_on_send_text (test_profiling.py:20)")
+        self.assertEqual(location, "save_interaction (test_profiling.py:30)")
+
+
+class TestProfileCapture(unittest.TestCase):
+    def test_capture_writes_profile_and_allocation_dumps(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            capture = ProfileCapture(temp_dir)
+            self.assertEqual(capture.stop(), [])
+            capture.start()
+            self.assertTrue(capture.running)
+            data = [str(i) * 10 for i in range(1000)]
+            paths = capture.stop()
+
+            self.assertFalse(capture.running)
+            self.assertEqual([os.path.splitext(path)[1] for path in paths], [".prof", ".tracemalloc", ".txt"])
+            for path in paths:
+                self.assertGreater(os.path.getsize(path), 0)
+            with open(paths[2], encoding="utf-8") as f:
+                self.assertIn("Top allocations by line", f.read())
+        self.assertEqual(len(data), 1000)
+
+if __name__ == '__main__':
+    unittest.main()
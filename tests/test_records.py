@@ -0,0 +1,42 @@
+import unittest
+import gc
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from local_vision.records import Conversation, Interaction, LLMResult, decode_records, encode_records, to_records
+
+
+class TestRecords(unittest.TestCase):
+    def test_rows_become_records_that_read_like_dicts(self):
+        rows = [(1, 7, "2024-01-01", "user", "image", None, "photo.png"), (2, 7, "2024-01-01", "system", "description", "A cat.", None)]
+        interactions = to_records(Interaction, rows)
+
+        self.assertEqual(interactions[1].content, "A cat.")
+        self.assertEqual(interactions[0]["image_path"], "photo.png")
+        self.assertEqual(interactions[1].get("image_path", "none"), None)
+        self.assertIn("type", interactions[0])
+        self.assertNotIn("score", interactions[0])
+        with self.assertRaises(KeyError):
+            interactions[0]["score"]
+        with self.assertRaises(KeyError):
+            interactions[0]["to_dict"]
+        self.assertIsNone(interactions[0].get("get"))
+        self.assertEqual(interactions[1].to_dict()["type"], "description")
+        self.assertFalse(gc.is_tracked(interactions[0]))
+        self.assertEqual(to_records(Conversation, None), [])
+        self.assertTrue(gc.is_tracked(LLMResult("batch", [{"path": "a.png"}])))
+
+    def test_records_round_trip_through_buffers(self):
+        interactions = [Interaction(i, 1, "2024-01-01", "user", "text", f"message {i}") for i in range(3)]
+        data = encode_records(interactions)
+        self.assertEqual(decode_records(memoryview(data), Interaction), interactions)
+
+        buffer = bytearray()
+        result = LLMResult("description", "A dog.", "req-1", 1.5)
+        self.assertIs(encode_records(result, buffer), buffer)
+        self.assertEqual(decode_records(buffer, LLMResult, many=False), result)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import unittest
+import os
+import random
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from local_vision.logic.resilience import CircuitBreaker, CircuitOpenError, RetryExecutor, RetryPolicy
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestResilience(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10.0, clock=self.clock)
+        self.executor = RetryExecutor(
+            policy=RetryPolicy(max_attempts=3, base_delay=0.5, max_delay=4.0, rng=random.Random(1)),
+            breaker=self.breaker,
+            sleep=self.clock.sleep,
+            clock=self.clock
+        )
+
+    def test_backoff_is_jittered_and_capped(self):
+        policy = RetryPolicy(base_delay=0.5, max_delay=2.0, rng=random.Random(7))
+        for retry_number in range(8):
+            delay = policy.delay(retry_number)
+            self.assertGreaterEqual(delay, 0)
+            self.assertLessEqual(delay, min(2.0, 0.5 * 2 ** retry_number))
+
+    def test_retries_transient_errors_then_succeeds(self):
+        outcomes = [ConnectionError("reset"), TimeoutError("slow"), "ok"]
+
+        def call():
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        reconnects = []
+        self.assertEqual(self.executor.call(call, on_retry=reconnects.append), "ok")
+        self.assertEqual(len(reconnects), 2)
+        stats = self.executor.stats()
+        self.assertEqual(stats["retry_retries"], 2)
+        self.assertEqual(stats["breaker_state"], "closed")
+
+    def test_fatal_errors_are_not_retried(self):
+        calls = []
+
+        def call():
+            calls.append(1)
+            raise ValueError("bad request")
+
+        with self.assertRaises(ValueError):
+            self.executor.call(call)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(self.executor.stats()["retry_fatal_errors"], 1)
+
+    def test_deadline_stops_retrying(self):
+        def call():
+            raise ConnectionError("down")
+
+        with self.assertRaises(ConnectionError):
+            self.executor.call(call, deadline=self.clock() + 0.001)
+        self.assertEqual(self.executor.stats()["retry_deadline_exceeded"], 1)
+
+    def test_breaker_opens_fails_fast_and_probes_once(self):
+        def down():
+            raise ConnectionError("down")
+
+        with self.assertRaises(ConnectionError):
+            self.executor.call(down)
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+        calls = []
+        with self.assertRaises(CircuitOpenError):
+            self.executor.call(lambda: calls.append(1))
+        self.assertEqual(calls, [])
+
+        self.clock.now += 10.0
+        self.breaker.before_call()
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(self.executor.call(lambda: "ok"), "ok")
+
+    def test_failed_probe_reopens_breaker(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.clock.now += 10.0
+        self.breaker.before_call()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(self.breaker.stats()["opened"], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
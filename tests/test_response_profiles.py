@@ -0,0 +1,48 @@
+import unittest
+import configparser
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from local_vision.logic.response_profiles import DEFAULT_PROFILES, parse_channel_profiles, read_profiles
+
+
+class TestResponseProfiles(unittest.TestCase):
+    def test_config_overrides_and_adds_profiles(self):
+        config = configparser.ConfigParser()
+        config.read_string(
+            "[Profile fast]\nMaxTokens = 40\nImageMaxEdge =\n"
+            "[Profile Alt Text]\nDescriptionPrompt = Escreva um texto alternativo.\n"
+        )
+        profiles = read_profiles(config)
+
+        self.assertEqual(profiles["fast"].max_tokens, 40)
+        self.assertIsNone(profiles["fast"].image_max_edge)
+        self.assertEqual(profiles["fast"].temperature, 0.2)
+        self.assertEqual(DEFAULT_PROFILES["fast"].max_tokens, 80)
+        self.assertEqual(profiles["alt text"].description_prompt, "Escreva um texto alternativo.")
+        self.assertEqual(profiles["alt text"].max_tokens, DEFAULT_PROFILES["balanced"].max_tokens)
+
+    def test_prompts_and_history_budget(self):
+        fast = DEFAULT_PROFILES["fast"]
+        self.assertIn("Imagem 5", fast.image_prompt(count=3, first=5))
+        self.assertEqual(fast.image_prompt(), fast.description_prompt)
+
+        history = [{'type': 'summary', 'content': 'Earlier'}] + [{'type': 'text', 'content': str(i)} for i in range(10)]
+        trimmed = fast.trim_history(history)
+        self.assertEqual([i['content'] for i in trimmed], ['Earlier', '4', '5', '6', '7', '8', '9'])
+        # The kept part only moves in blocks of two user/reply pairs for fast.
+        history += [{'type': 'text', 'content': str(i)} for i in range(10, 12)]
+        self.assertEqual([i['content'] for i in fast.trim_history(history)][:2], ['Earlier', '8'])
+        history += [{'type': 'text', 'content': str(i)} for i in range(12, 14)]
+        self.assertEqual([i['content'] for i in fast.trim_history(history)][:2], ['Earlier', '8'])
+        self.assertIs(DEFAULT_PROFILES["detailed"].trim_history(history), history)
+        self.assertIsNone(DEFAULT_PROFILES["detailed"].prediction_config())
+
+    def test_parse_channel_profiles(self):
+        self.assertEqual(parse_channel_profiles("42=fast, 7 = Detailed, bad, =x"), {42: "fast", 7: "detailed"})
+        self.assertEqual(parse_channel_profiles(""), {})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import unittest
+from unittest.mock import MagicMock
+import hashlib
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from local_vision.data.database_manager import DatabaseManager
+from local_vision.data.history_manager import HistoryManager
+from local_vision.logic.semantic_search import SemanticIndexer
+from local_vision.logic.vector_index import VectorIndex, np, pack_vector, unpack_vector
+
+# Words that a real embedding model would place close together share a concept.
+SYNONYMS = {"vehicle": "car", "automobile": "car", "dark": "night", "evening": "night", "kitten": "cat"}
+
+
+def stub_embed(texts):
+    """A stub embedding server: bag of concepts hashed into 32 dimensions."""
+    vectors = []
+    for text in texts:
+        vector = [0.0] * 32
+        for word in text.lower().replace(".", " ").replace(",", " ").split():
+            word = SYNONYMS.get(word, word)
+            vector[hashlib.md5(word.encode()).digest()[0] % 32] += 1.0
+        vectors.append(vector)
+    return vectors
+
+
+class TestVectorIndex(unittest.TestCase):
+    def test_search_remove_and_replace(self):
+        index = VectorIndex()
+        index.add("a", [1.0, 0.0, 0.0])
+        index.add("b", [0.7, 0.7, 0.0])
+        index.add("c", [0.0, 0.0, 1.0])
+
+        self.assertEqual([item for _, item in index.search([1.0, 0.1, 0.0], k=2)], ["a", "b"])
+        index.remove("a")
+        index.add("c", [1.0, 0.0, 0.0])
+        results = index.search([1.0, 0.1, 0.0], k=5)
+        self.assertEqual([item for _, item in results], ["c", "b"])
+        self.assertAlmostEqual(results[0][0], 0.995, places=2)
+        self.assertEqual(len(index), 2)
+
+    def test_vectors_are_packed_as_float16(self):
+        blob = pack_vector([0.5, -0.25, 1.0])
+        self.assertEqual(len(blob), 6)
+        self.assertEqual(list(unpack_vector(blob)), [0.5, -0.25, 1.0])
+
+    @unittest.skipIf(np is None, "NumPy is not installed")
+    def test_ivf_search_agrees_with_exact_search(self):
+        rng = np.random.default_rng(3)
+        centers = rng.normal(size=(30, 48))
+        vectors = centers[rng.integers(0, 30, 3000)] + 0.2 * rng.normal(size=(3000, 48))
+        approximate = VectorIndex(ann_threshold=1000, probes=4)
+        exact = VectorIndex(ann_threshold=0)
+        for item, vector in enumerate(vectors):
+            approximate.add(item, vector)
+            exact.add(item, vector)
+
+        queries = vectors[:20] + 0.05 * rng.normal(size=(20, 48))
+        found = sum(
+            len({i for _, i in approximate.search(q, 10)} & {i for _, i in exact.search(q, 10)}) for q in queries
+        )
+        self.assertGreaterEqual(found / 200, 0.9)
+
+
+class TestSemanticIndexer(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_manager = DatabaseManager(os.path.join(self.temp_dir.name, "test.db"))
+        self.db_manager.connect()
+        self.db_manager.create_tables()
+        self.history_manager = HistoryManager(self.db_manager)
+
+        self.llm_manager = MagicMock()
+        self.llm_manager.embedding_identifier = "stub-embedder"
+        self.llm_manager.embed.side_effect = stub_embed
+
+    def tearDown(self):
+        self.db_manager.conn.close()
+        self.temp_dir.cleanup()
+
+    def test_backfills_incrementally_and_finds_by_meaning(self):
+        cars = self.history_manager.create_conversation("a")
+        cats = self.history_manager.create_conversation("b")
+        self.history_manager.save_interaction(cars, "user", "image", image_path="car.png")
+        self.history_manager.save_interaction(cars, "system", "description", content="A red vehicle parked in the dark.")
+        self.history_manager.save_interaction(cats, "system", "description", content="A kitten sleeping on a sofa.")
+
+        indexer = SemanticIndexer(self.llm_manager, self.history_manager, batch_size=1)
+        indexer.load()
+        self.assertEqual(indexer.index_pending(), 2)
+        self.assertEqual(self.llm_manager.embed.call_count, 2)
+
+        results = indexer.search("red car at night", k=1)
+        self.assertEqual(results[0]["conversation_id"], cars)
+        self.assertEqual(results[0]["type"], "description")
+
+        # Only the new interaction is embedded on the next pass.
+        self.history_manager.save_interaction(cats, "user", "text", content="Is the cat asleep?")
+        self.assertEqual(indexer.index_pending(), 1)
+
+        # A restarted indexer loads the stored vectors instead of embedding again.
+        restarted = SemanticIndexer(self.llm_manager, self.history_manager)
+        restarted.load()
+        self.assertEqual(len(restarted.index), 3)
+        self.assertEqual(restarted.index_pending(), 0)
+        self.assertEqual(restarted.search("kitten", k=1)[0]["conversation_id"], cats)
+
+        self.history_manager.delete_conversation(cats)
+        restarted.remove_conversation(cats)
+        self.assertEqual([r["conversation_id"] for r in restarted.search("kitten", k=5)], [cars])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,204 @@
+import unittest
+from unittest.mock import MagicMock
+import asyncio
+import base64
+import json
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from local_vision.data.database_manager import DatabaseManager
+from local_vision.data.history_manager import HistoryManager
+from local_vision.logic.request_scheduler import RequestScheduler
+from local_vision.logic.resilience import RetryExecutor
+from local_vision.server import APIServer
+
+async def read_response(reader):
+    head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+    status = int(head[0].split(" ")[1])
+    headers = {}
+    for line in head[1:]:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+
+    if headers.get("transfer-encoding") == "chunked":
+        body = b""
+        while True:
+            size = int((await reader.readline()).strip(), 16)
+            chunk = await reader.readexactly(size + 2)
+            if size == 0:
+                break
+            body += chunk[:-2]
+    else:
+        body = await reader.readexactly(int(headers.get("content-length", 0)))
+    return status, headers, body
+
+class TestAPIServer(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_manager = DatabaseManager(os.path.join(self.temp_dir.name, "test.db"))
+        self.db_manager.connect()
+        self.db_manager.create_tables()
+        self.history_manager = HistoryManager(self.db_manager)
+
+        self.image_path = os.path.join(self.temp_dir.name, "cat.png")
+        with open(self.image_path, "wb") as f:
+            f.write(b"fake image")
+
+        self.llm_manager = MagicMock()
+        self.llm_manager.scheduler = RequestScheduler()
+        self.llm_manager.get_resilience_stats.return_value = RetryExecutor().stats()
+        self.llm_manager.get_prompt_cache_stats.return_value = {
+            "turns": 3, "prefix_hits": 2, "cache_hits": 2, "prompt_tokens": 900, "cached_tokens": 700, "cache_hit_rate": 0.667
+        }
+        self.llm_manager.get_routing_stats.return_value = {
+            "routes": {"image": "vision-model", "text_with_images": "vision-model", "text": "text-model"},
+            "models": {"text-model": {"requests": 2, "avg_ms": 150.0}},
+        }
+
+        self.llm_manager.profiles = {"fast": "fast profile", "detailed": "detailed profile"}
+
+        def get_profile(name=None):
+            if (name or "detailed") not in self.llm_manager.profiles:
+                raise ValueError(f"Unknown response profile: {name}")
+            return self.llm_manager.profiles[name or "detailed"]
+
+        self.llm_manager.get_profile.side_effect = get_profile
+        self.llm_manager.get_profile_stats.return_value = {"fast": {"requests": 4, "avg_ms": 900.0, "avg_tokens": 31.0}}
+
+        def describe_image(image_path, result_queue=None, stream=False, profile=None):
+            if stream:
+                result_queue.put({"type": "stream_start"})
+                result_queue.put({"type": "fragment", "content": "A "})
+                result_queue.put({"type": "fragment", "content": "cat"})
+            return "A cat"
+
+        self.llm_manager.describe_image.side_effect = describe_image
+        self.llm_manager.respond_to_text.return_value = "Sunny."
+
+    def tearDown(self):
+        self.db_manager.conn.close()
+        self.temp_dir.cleanup()
+
+    def run_with_server(self, scenario):
+        async def runner():
+            server = APIServer(self.llm_manager, self.history_manager, port=0)
+            await server.start()
+            try:
+                reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+
+                async def request(method, path, payload=None):
+                    body = json.dumps(payload).encode() if payload is not None else b""
+                    writer.write(
+                        f"{method} {path} HTTP/1.1\r\nHost: test\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body
+                    )
+                    await writer.drain()
+                    return await read_response(reader)
+
+                await scenario(request, server)
+                writer.close()
+            finally:
+                await server.close()
+
+        asyncio.run(runner())
+
+    def test_describe_by_path_and_base64_on_one_connection(self):
+        async def scenario(request, server):
+            status, headers, body = await request("POST", "/v1/describe", {"image_path": self.image_path})
+            self.assertEqual(status, 200)
+            self.assertEqual(headers["connection"], "keep-alive")
+            self.assertEqual(json.loads(body), {"description": "A cat"})
+
+            encoded = base64.b64encode(b"fake image").decode()
+            status, _, body = await request("POST", "/v1/describe", {"image_base64": encoded})
+            self.assertEqual(status, 200)
+            self.assertEqual(json.loads(body)["description"], "A cat")
+
+        self.run_with_server(scenario)
+
+    def test_describe_streams_server_sent_events(self):
+        async def scenario(request, server):
+            status, headers, body = await request("POST", "/v1/describe", {"image_path": self.image_path, "stream": True})
+            self.assertEqual(status, 200)
+            self.assertEqual(headers["content-type"], "text/event-stream; charset=utf-8")
+            events = [block.split("\n")[0] for block in body.decode().strip().split("\n\n")]
+            self.assertEqual(events, ["event: reset", "event: fragment", "event: fragment", "event: done"])
+
+        self.run_with_server(scenario)
+
+    def test_conversation_chat_and_history(self):
+        async def scenario(request, server):
+            status, _, body = await request("POST", "/v1/conversations", {"nickname": "tool"})
+            self.assertEqual(status, 201)
+            conversation_id = json.loads(body)["conversation_id"]
+
+            status, _, body = await request("POST", f"/v1/conversations/{conversation_id}/messages", {"message": "Weather?"})
+            self.assertEqual(status, 200)
+            self.assertEqual(json.loads(body)["response"], "Sunny.")
+
+            status, _, body = await request("GET", f"/v1/conversations/{conversation_id}/history")
+            interactions = json.loads(body)["interactions"]
+            self.assertEqual([i["content"] for i in interactions], ["Weather?", "Sunny."])
+
+        self.run_with_server(scenario)
+
+    def test_errors_and_metrics(self):
+        async def scenario(request, server):
+            status, _, _ = await request("GET", "/nope")
+            self.assertEqual(status, 404)
+            status, _, _ = await request("PUT", "/v1/describe")
+            self.assertEqual(status, 405)
+            status, _, _ = await request("POST", "/v1/describe", {})
+            self.assertEqual(status, 400)
+            status, _, body = await request("POST", "/v1/describe", {"image_path": self.image_path, "profile": "huge"})
+            self.assertEqual(status, 400)
+            self.assertIn("detailed, fast", json.loads(body)["error"])
+            status, _, _ = await request("POST", "/v1/describe", {"image_path": self.image_path, "profile": "fast"})
+            self.assertEqual(status, 200)
+            self.assertEqual(self.llm_manager.describe_image.call_args.kwargs["profile"], "fast profile")
+
+            conversation_id = self.history_manager.create_conversation("api")
+            status, _, _ = await request("GET", f"/v1/conversations/{conversation_id}/history?limit=0")
+            self.assertEqual(status, 400)
+
+            status, headers, body = await request("GET", "/metrics")
+            self.assertEqual(status, 200)
+            text = body.decode()
+            self.assertIn('local_vision_http_requests_total{route="unmatched",status="404"} 1', text)
+            self.assertIn("local_vision_llm_requests_waiting 0", text)
+            self.assertIn("local_vision_llm_breaker_open 0", text)
+            self.assertIn('local_vision_llm_model_requests_total{model="text-model"} 2', text)
+            self.assertIn("local_vision_llm_prompt_cache_cached_tokens_total 700", text)
+            self.assertIn('local_vision_llm_profile_latency_avg_ms{profile="fast"} 900.0', text)
+
+        self.run_with_server(scenario)
+
+    def test_rejects_when_queue_is_full(self):
+        async def scenario(request, server):
+            server.max_queued_requests = 0
+            status, _, _ = await request("POST", "/v1/describe", {"image_path": self.image_path})
+            self.assertEqual(status, 503)
+            self.assertEqual(server.metrics.rejected, 1)
+
+        self.run_with_server(scenario)
+
+    def test_rejects_invalid_content_length(self):
+        async def scenario(request, server):
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            for value in ("abc", "-5"):
+                writer.write(f"POST /v1/describe HTTP/1.1\r\nContent-Length: {value}\r\n\r\n".encode())
+                await writer.drain()
+                status, _, body = await read_response(reader)
+                self.assertEqual(status, 400)
+                self.assertIn("Content-Length", json.loads(body)["error"])
+                writer.close()
+                reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            writer.close()
+
+        self.run_with_server(scenario)
+
+if __name__ == '__main__':
+    unittest.main()
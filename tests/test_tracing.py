@@ -0,0 +1,75 @@
+import unittest
+import json
+import os
+import sys
+import tempfile
+import threading
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from local_vision.tracing import Tracer
+
+class TestTracer(unittest.TestCase):
+    def setUp(self):
+        self.tracer = Tracer()
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tracer.configure(False)
+        self.temp_dir.cleanup()
+
+    def test_disabled_tracer_records_nothing(self):
+        with self.tracer.span("stage"):
+            pass
+        self.tracer.record("stage", 0.5)
+        self.assertEqual(self.tracer.percentiles(), {})
+        self.assertIs(self.tracer.span("a"), self.tracer.span("b"))
+
+    def test_percentiles(self):
+        self.tracer.configure(True)
+        for ms in range(1, 101):
+            self.tracer.record("llm.predict", ms / 1000)
+        stats = self.tracer.percentiles()["llm.predict"]
+        self.assertEqual(stats["count"], 100)
+        self.assertAlmostEqual(stats["p50_ms"], 51)
+        self.assertAlmostEqual(stats["p95_ms"], 96)
+        self.assertAlmostEqual(stats["p99_ms"], 100)
+
+    def test_request_id_bound_per_thread_and_written_to_jsonl(self):
+        trace_file = os.path.join(self.temp_dir.name, "traces.jsonl")
+        self.tracer.configure(True, trace_file)
+
+        with self.tracer.request("req-1"):
+            with self.tracer.span("ui.submit"):
+                pass
+
+            def worker():
+                with self.tracer.request("req-1"):
+                    with self.tracer.span("llm.predict", stream=False):
+                        pass
+            thread = threading.Thread(target=worker)
+            thread.start()
+            thread.join()
+
+        with self.tracer.span("orphan"):
+            pass
+        self.tracer.configure(False)
+
+        with open(trace_file) as f:
+            entries = [json.loads(line) for line in f]
+        self.assertEqual([e["span"] for e in entries], ["ui.submit", "llm.predict", "orphan"])
+        self.assertEqual([e["request_id"] for e in entries], ["req-1", "req-1", None])
+        self.assertFalse(entries[1]["stream"])
+
+    def test_span_marks_errors(self):
+        trace_file = os.path.join(self.temp_dir.name, "traces.jsonl")
+        self.tracer.configure(True, trace_file)
+        with self.assertRaises(ValueError):
+            with self.tracer.span("db.commit"):
+                raise ValueError("boom")
+        self.tracer.configure(False)
+        with open(trace_file) as f:
+            self.assertEqual(json.loads(f.readline())["error"], "ValueError")
+
+if __name__ == '__main__':
+    unittest.main()